@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/benchmarks/bench_asr_backends.py
+"""
+文字起こしバックエンドの実時間係数（処理時間 / 音声長）の比較
+
+各バックエンドで同じ音声（デフォルト tests/data/test_audio.wav）を文字起こしし、
+モデルの読み込みを除いた処理時間と実時間係数を Markdown の表で出力します。
+インストールされていないバックエンド（faster-whisper など）はスキップします。
+
+Usage:
+    python benchmarks/bench_asr_backends.py [audio.wav] [--model-name small] [--device cpu] [--repeat 3]
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from audio2midi.asr_backends import available_asr_backends, get_asr_backend  # noqa: E402
+from audio2midi.audio_buffer import AudioBuffer  # noqa: E402
+
+
+def run_backend(name: str, samples, model_name: str, device: str, language, repeat: int):
+    """(最短時間（秒）, 結果) を返します。実行できない場合は None。"""
+    backend = get_asr_backend(name, model_name=model_name, device=device)
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            # 日本語コメント: 1回目はモデルの読み込みを含むため計測しない
+            result = backend.transcribe(samples, language=language)
+        except ImportError:
+            return None
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = backend.transcribe(samples, language=language)
+            best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="文字起こしバックエンドの比較")
+    parser.add_argument("audio", nargs="?", default=str(ROOT / "tests" / "data" / "test_audio.wav"),
+                        help="音声ファイル")
+    parser.add_argument("--model-name", type=str, default="small", help="Whisperモデル名")
+    parser.add_argument("--device", type=str, default="cpu", help="使用するデバイス")
+    parser.add_argument("--language", type=str, help="文字起こしの言語")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数（最短時間を採用）")
+    args = parser.parse_args()
+
+    buffer = AudioBuffer.from_file(args.audio)
+    print(f"音声: {Path(args.audio).name}（{buffer.duration:.2f}秒）, モデル: {args.model_name}")
+    print()
+    print("| backend | time [s] | RTF | segments |")
+    print("|---|---:|---:|---:|")
+    for name in available_asr_backends():
+        measured = run_backend(name, buffer.samples, args.model_name, args.device, args.language, args.repeat)
+        if measured is None:
+            print(f"| {name} | unavailable | - | - |")
+            continue
+        seconds, result = measured
+        print(f"| {name} | {seconds:.3f} | {seconds / buffer.duration:.3f} | {len(result['segments'])} |")
+
+
+if __name__ == "__main__":
+    main()
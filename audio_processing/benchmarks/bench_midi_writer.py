@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/benchmarks/bench_midi_writer.py
+"""
+MIDIファイル出力のベンチマーク（smf_writer と、従来の midiutil / mido による出力の比較）
+
+従来の実装（ノートごとに midiutil.MIDIFile.addNote / mido.Message を作成）はこのファイル内に残し、
+同じノート列（デフォルト 100,000 件）を出力したときの処理時間とピークメモリ（tracemalloc）を比較します。
+
+Usage:
+    python benchmarks/bench_midi_writer.py [--notes 100000] [--repeat 3]
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import mido
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from audio2midi.generate_midi_with_lyrics import create_midi_with_lyrics  # noqa: E402
+from audio2midi.midi_utils import note_events_to_midi  # noqa: E402
+from audio2midi.note_table import NoteTable  # noqa: E402
+
+
+def make_notes(n_notes: int, seed: int = 0):
+    """隙間を含む連続したノートと、それに対応するマッチング結果（1ノート1文字）を生成します。"""
+    rng = np.random.default_rng(seed)
+    durations = rng.uniform(0.1, 0.6, size=n_notes)
+    starts = np.concatenate([[0.0], np.cumsum(durations + rng.uniform(0.0, 0.1, size=n_notes))[:-1]])
+    ends = starts + durations
+    pitches = rng.integers(48, 80, size=n_notes).astype(np.float64)
+    notes = list(zip(starts.tolist(), ends.tolist(), pitches.tolist()))
+    matched = [
+        {
+            "text_segment": {"start": s, "end": e, "text": "あ"},
+            "note_segment": {"start": s, "end": e, "note": p},
+            "overlap_start": s,
+            "overlap_end": e
+        }
+        for s, e, p in notes
+    ]
+    return notes, matched
+
+
+def legacy_midiutil(matched, output_file: str, tempo: int = 120, velocity: int = 100) -> None:
+    """従来の create_midi_with_lyrics（midiutil でノートとテキストを1件ずつ追加）"""
+    from midiutil import MIDIFile
+
+    midi = MIDIFile(2)
+    midi.addTrackName(0, 0, "Vocal Notes")
+    midi.addTrackName(1, 0, "Lyrics")
+    midi.addTempo(0, 0, tempo)
+    midi.addTempo(1, 0, tempo)
+    for segment in sorted(matched, key=lambda x: x["overlap_start"]):
+        start = segment["overlap_start"]
+        duration = segment["overlap_end"] - start
+        midi.addNote(0, 0, int(segment["note_segment"]["note"]), start, duration, velocity)
+        text = "".join(ch for ch in segment["text_segment"]["text"] if ord(ch) < 128)
+        if text:
+            midi.addText(1, start + 0.01, text)
+    with open(output_file, "wb") as f:
+        midi.writeFile(f)
+
+
+def legacy_mido(notes, out_path: str, bpm: int = 120, velocity: int = 64, ticks_per_beat: int = 480) -> None:
+    """従来の note_events_to_midi（mido.Message をイベントごとに作成）"""
+    mid = mido.MidiFile(ticks_per_beat=ticks_per_beat)
+    track = mido.MidiTrack()
+    mid.tracks.append(track)
+    track.append(mido.MetaMessage("set_tempo", tempo=mido.bpm2tempo(bpm), time=0))
+    prev_tick = 0
+    for start_time, end_time, note_val in sorted(notes, key=lambda x: x[0]):
+        start_tick = int((start_time * ticks_per_beat * bpm) / 60.0)
+        end_tick = int((end_time * ticks_per_beat * bpm) / 60.0)
+        track.append(mido.Message("note_on", note=int(round(note_val)), velocity=velocity, time=start_tick - prev_tick))
+        track.append(mido.Message("note_off", note=int(round(note_val)), velocity=velocity, time=end_tick - start_tick))
+        prev_tick = end_tick
+    mid.save(out_path)
+
+
+def measure(fn, repeat: int):
+    """repeat 回実行して (最短時間（秒）, ピークメモリ（MB）) を返します。"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1024 ** 2
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="MIDIファイル出力のベンチマーク")
+    parser.add_argument("--notes", type=int, default=100_000, help="ノート数")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数（最短時間を採用）")
+    parser.add_argument("--output-dir", type=str, default="/tmp", help="MIDIファイルの出力先")
+    args = parser.parse_args()
+
+    notes, matched = make_notes(args.notes)
+    table = NoteTable.from_tuples(notes)
+    out = Path(args.output_dir)
+
+    groups = [
+        ("歌詞付き（create_midi_with_lyrics）", [
+            ("midiutil (legacy)", lambda: legacy_midiutil(matched, str(out / "legacy_midiutil.mid"))),
+            ("smf_writer", lambda: create_midi_with_lyrics(matched, str(out / "smf_lyrics.mid"))),
+        ]),
+        ("ノートのみ（note_events_to_midi）", [
+            ("mido (legacy)", lambda: legacy_mido(notes, str(out / "legacy_mido.mid"))),
+            ("smf_writer", lambda: note_events_to_midi(notes, str(out / "smf_notes.mid"))),
+            ("smf_writer(NoteTable)", lambda: note_events_to_midi(table, str(out / "smf_table.mid"))),
+        ]),
+    ]
+    print(f"notes={args.notes}")
+    for title, cases in groups:
+        print(title)
+        print(f"{'implementation':>22} {'time[s]':>9} {'peak[MB]':>9}")
+        baseline = None
+        for name, fn in cases:
+            seconds, peak_mb = measure(fn, args.repeat)
+            baseline = baseline or seconds
+            print(f"{name:>22} {seconds:>9.4f} {peak_mb:>9.1f} ({baseline / seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
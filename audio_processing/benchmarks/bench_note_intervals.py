@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/benchmarks/bench_note_intervals.py
+"""
+midi_notes_to_intervals のマイクロベンチマーク
+
+3分・30分・300分相当（CREPE step_size=10ms）のフレーム配列に対して、
+ベクトル化実装と参照実装（フレームごとの Python ループ）の処理時間を比較します。
+
+Usage:
+    python benchmarks/bench_note_intervals.py [--minutes 3 30 300] [--repeat 3]
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from audio2midi.note_utils import midi_notes_to_intervals, midi_notes_to_intervals_reference  # noqa: E402
+
+FRAMES_PER_SECOND = 100  # step_size=10ms
+
+
+def make_pitch_track(minutes: float, seed: int = 0):
+    """歌声に近いフレーム列（ノート・ビブラート・無声区間）を生成します。"""
+    rng = np.random.default_rng(seed)
+    n_frames = int(minutes * 60 * FRAMES_PER_SECOND)
+    note_lengths = rng.integers(5, 80, size=n_frames // 5 + 1)
+    boundaries = np.cumsum(note_lengths)
+    note_index = np.searchsorted(boundaries, np.arange(n_frames), side="right")
+    pitches = rng.uniform(45, 75, size=len(note_lengths))
+    vibrato = 0.15 * np.sin(2 * np.pi * 5.5 * np.arange(n_frames) / FRAMES_PER_SECOND)
+    midi_notes = pitches[note_index] + vibrato
+    confidence = np.clip(rng.normal(0.8, 0.2, size=n_frames), 0, 1)
+    silent = rng.random(len(note_lengths)) < 0.2
+    midi_notes[silent[note_index]] = np.nan
+    return midi_notes, confidence
+
+
+def best_of(fn, repeat: int) -> float:
+    """repeat 回実行して最短時間（秒）を返します。デバッグ出力は捨てます。"""
+    best = float("inf")
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="midi_notes_to_intervals のベンチマーク")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[3, 30, 300], help="音声長（分）")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数（最短時間を採用）")
+    args = parser.parse_args()
+
+    print(f"{'minutes':>8} {'frames':>10} {'reference[s]':>13} {'vectorized[s]':>14} {'speedup':>8}")
+    for minutes in args.minutes:
+        midi_notes, confidence = make_pitch_track(minutes)
+        kwargs = dict(sr=16000, hop_length=160, min_duration=0.1, confidence_threshold=0.5)
+        reference = best_of(lambda: midi_notes_to_intervals_reference(midi_notes, confidence, **kwargs), args.repeat)
+        vectorized = best_of(lambda: midi_notes_to_intervals(midi_notes, confidence, **kwargs), args.repeat)
+        print(f"{minutes:>8g} {len(midi_notes):>10} {reference:>13.4f} {vectorized:>14.4f} {reference / vectorized:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
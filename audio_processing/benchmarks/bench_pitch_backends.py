@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/benchmarks/bench_pitch_backends.py
+"""
+ピッチ抽出バックエンドの速度と精度の比較表
+
+各バックエンドで同じ音声（デフォルト tests/data/test_audio.wav）を処理し、
+実時間係数（処理時間 / 音声長）と、基準バックエンドの結果に対する精度を Markdown の表で出力します。
+- RPA: 基準の有声フレームのうち、推定も有声かつ ±50セント以内のフレームの割合
+- note F1: ノート単位（開始時刻 ±50ms・音高が一致）の F 値
+
+正解ラベル付きのデータがないため、基準（デフォルト crepe-full、使えない場合は pyin）との一致度を精度とします。
+TensorFlow がない環境では CREPE のバックエンドはスキップします。
+
+Usage:
+    python benchmarks/bench_pitch_backends.py [audio.wav] [--reference crepe-full] [--repeat 3] [--output table.md]
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from audio2midi.audio_buffer import AudioBuffer  # noqa: E402
+from audio2midi.note_utils import midi_notes_to_intervals  # noqa: E402
+from audio2midi.pitch_backends import available_backends, get_backend  # noqa: E402
+from audio2midi.timeline import Timeline  # noqa: E402
+
+
+def run_backend(name: str, buffer: AudioBuffer, repeat: int):
+    """repeat 回実行して (最短時間（秒）, 結果) を返します。実行できない場合は None。"""
+    backend = get_backend(name)
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            try:
+                result = backend.extract(buffer)
+            except ImportError:
+                return None
+            best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def raw_pitch_accuracy(estimate: np.ndarray, reference: np.ndarray) -> float:
+    """基準の有声フレームのうち、推定が ±0.5 半音以内のフレームの割合"""
+    n = min(len(estimate), len(reference))
+    estimate, reference = estimate[:n], reference[:n]
+    voiced = ~np.isnan(reference)
+    if not voiced.any():
+        return float("nan")
+    with np.errstate(invalid="ignore"):
+        hits = np.abs(estimate[voiced] - reference[voiced]) <= 0.5
+    return float(np.mean(hits))
+
+
+def to_notes(result):
+    midi_notes, confidence, time_axis, sr = result
+    with contextlib.redirect_stdout(io.StringIO()):
+        return midi_notes_to_intervals(
+            midi_notes, confidence, sr, timeline=Timeline.from_time_axis(time_axis, sr), as_table=True
+        )
+
+
+def note_f1(estimate, reference, onset_tolerance: float = 0.05) -> float:
+    """開始時刻が onset_tolerance 秒以内・音高が一致するノートを1対1で対応付けた F 値"""
+    if len(estimate) == 0 or len(reference) == 0:
+        return 0.0
+    used = np.zeros(len(estimate), dtype=bool)
+    matched = 0
+    for start, pitch in zip(reference.start.tolist(), reference.pitch.tolist()):
+        candidates = np.flatnonzero(
+            ~used & (np.abs(estimate.start - start) <= onset_tolerance) & (estimate.pitch == pitch)
+        )
+        if len(candidates):
+            used[candidates[0]] = True
+            matched += 1
+    precision = matched / len(estimate)
+    recall = matched / len(reference)
+    return 0.0 if matched == 0 else 2 * precision * recall / (precision + recall)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ピッチ抽出バックエンドの比較")
+    parser.add_argument("audio", nargs="?", default=str(ROOT / "tests" / "data" / "test_audio.wav"),
+                        help="音声ファイル")
+    parser.add_argument("--reference", type=str, default="crepe-full", help="精度の基準とするバックエンド")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数（最短時間を採用）")
+    parser.add_argument("--output", type=str, help="表を書き出す Markdown ファイル")
+    args = parser.parse_args()
+
+    buffer = AudioBuffer.from_file(args.audio)
+    results = {}
+    for name in available_backends():
+        measured = run_backend(name, buffer, args.repeat)
+        if measured is not None:
+            results[name] = measured
+
+    reference_name = args.reference if args.reference in results else "pyin"
+    _, reference = results[reference_name]
+    reference_notes = to_notes(reference)
+
+    lines = [
+        f"音声: {Path(args.audio).name}（{buffer.duration:.2f}秒）, 基準: {reference_name}",
+        "",
+        "| backend | time [s] | RTF | RPA | note F1 |",
+        "|---|---:|---:|---:|---:|",
+    ]
+    for name in available_backends():
+        if name not in results:
+            lines.append(f"| {name} | unavailable | - | - | - |")
+            continue
+        seconds, result = results[name]
+        lines.append(
+            f"| {name} | {seconds:.3f} | {seconds / buffer.duration:.3f} | "
+            f"{raw_pitch_accuracy(result[0], reference[0]):.3f} | {note_f1(to_notes(result), reference_notes):.3f} |"
+        )
+    table = "\n".join(lines)
+    print(table)
+    if args.output:
+        Path(args.output).write_text(table + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/benchmarks/suite/conftest.py
+"""
+ステージ別ベンチマーク（pytest-benchmark）の共通フィクスチャ
+
+合成信号の長さ（秒）は環境変数 AUDIO2MIDI_BENCH_SECONDS（カンマ区切り、デフォルト "30,300"）で指定します。
+"""
+
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from synthetic import SyntheticVocal, vocal_like_signal
+
+from audio2midi import pitch_extraction
+from audio2midi.pitch_extraction import (
+    CREPE_BINS,
+    CREPE_FRAME_LENGTH,
+    CREPE_SR,
+    _CENTS_MAPPING,
+    _frame_audio,
+    _local_average_cents,
+)
+
+DURATIONS = [float(s) for s in os.environ.get("AUDIO2MIDI_BENCH_SECONDS", "30,300").split(",") if s.strip()]
+
+
+@pytest.fixture(scope="session", params=DURATIONS, ids=lambda seconds: f"{seconds:g}s")
+def vocal(request) -> SyntheticVocal:
+    """長さごとの合成信号（同じ長さでは常に同じ信号）"""
+    return vocal_like_signal(request.param)
+
+
+def _stub_predict(audio, sr, model_capacity="full", step_size=10, viterbi=True, verbose=0, center=True):
+    """
+    crepe.predict と同じ形の結果を返すスタブ。
+
+    フレーム分割と正規化は本物と同じ処理を行い、ニューラルネットの代わりに
+    フレームの零交差数から求めた周波数のビンを中心とする活性化を返します。
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    if center:
+        audio = np.pad(audio, CREPE_FRAME_LENGTH // 2)
+    frames = _frame_audio(audio, step_size)
+    crossings = np.count_nonzero(np.diff(np.signbit(frames), axis=1), axis=1)
+    frequency = np.maximum(crossings, 1) / 2 * CREPE_SR / CREPE_FRAME_LENGTH
+    cents = 1200 * np.log2(frequency / 10)
+    centers = np.clip(np.searchsorted(_CENTS_MAPPING, cents), 0, CREPE_BINS - 1)
+    bins = np.arange(CREPE_BINS)
+    activation = np.exp(-0.5 * ((bins[None, :] - centers[:, None]) / 2.0) ** 2).astype(np.float32)
+    confidence = activation.max(axis=1)
+    frequency = 10 * 2 ** (_local_average_cents(activation, centers) / 1200)
+    time = np.arange(len(frames)) * step_size / 1000
+    return time, frequency, confidence, activation
+
+
+@pytest.fixture
+def stub_crepe(monkeypatch):
+    """TensorFlow を使わずに extract_pitch_crepe を実行できるよう、CREPE をスタブに置き換えます。"""
+    monkeypatch.setitem(sys.modules, "crepe", types.SimpleNamespace(predict=_stub_predict))
+    monkeypatch.setattr(pitch_extraction, "load_crepe_model", lambda capacity: None)
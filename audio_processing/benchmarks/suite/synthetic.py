@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/benchmarks/suite/synthetic.py
+"""
+ベンチマーク用の歌声に似た合成信号
+
+フレーズ（数個のノートの連なり）と無音を交互に並べ、各ノートは前のノートからの
+短いスイープ（ポルタメント）とビブラートを持つ正弦波（倍音付き）で合成します。
+背景には白色雑音を加えます。乱数のシードを固定しているため、同じ引数からは
+常に同じ信号が生成され、実行間で結果を比較できます。
+
+正解のピッチ（フレームごとの MIDI ノート）とフレーズの区間も一緒に返すため、
+ピッチ抽出より後段のステージは音声を処理せずに単独で計測できます。
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+SR = 16000
+
+
+@dataclass
+class SyntheticVocal:
+    """
+    合成信号と、その生成に使った正解データ。
+
+    Attributes:
+        samples: 音声（float32, モノラル）
+        sr: サンプリングレート
+        midi: サンプルごとの MIDI ノート（無音部分は NaN）
+        phrases: フレーズの区間（秒）のリスト
+    """
+
+    samples: np.ndarray
+    sr: int
+    midi: np.ndarray
+    phrases: List[Tuple[float, float]]
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sr
+
+    def pitch_track(self, step_size: int = 10) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        CREPE の出力と同じ形の (midi_notes, confidence, time) を返します。
+
+        信頼度は有声部分で 0.9 前後、無音部分で 0.1 前後の値です。
+        """
+        hop_length = self.sr * step_size // 1000
+        midi_notes = self.midi[::hop_length].astype(np.float64)
+        rng = np.random.default_rng(len(midi_notes))
+        voiced = ~np.isnan(midi_notes)
+        confidence = np.where(voiced, 0.9, 0.1) + rng.uniform(-0.08, 0.08, size=len(midi_notes))
+        time = np.arange(len(midi_notes)) * step_size / 1000
+        return midi_notes, confidence, time
+
+    def segments(self) -> List[Dict[str, Any]]:
+        """フレーズごとに1つの、Whisper 形式のセグメント"""
+        return [
+            {"id": i, "start": round(start, 2), "end": round(end, 2), "text": f"phrase {i}"}
+            for i, (start, end) in enumerate(self.phrases)
+        ]
+
+
+def vocal_like_signal(
+    duration: float,
+    sr: int = SR,
+    seed: int = 0,
+    note_range: Tuple[int, int] = (55, 74),
+    note_duration: Tuple[float, float] = (0.15, 0.6),
+    notes_per_phrase: Tuple[int, int] = (3, 8),
+    silence: Tuple[float, float] = (0.3, 1.2),
+    glide: float = 0.04,
+    vibrato_rate: float = 5.5,
+    vibrato_depth: float = 0.3,
+    noise_db: float = -35.0
+) -> SyntheticVocal:
+    """
+    歌声に似た合成信号を生成します。
+
+    Args:
+        duration: 信号の長さ（秒）
+        sr: サンプリングレート
+        seed: 乱数のシード
+        note_range: ノートの音域（MIDI ノート番号）
+        note_duration: ノート長の範囲（秒）
+        notes_per_phrase: 1フレーズのノート数の範囲
+        silence: フレーズ間の無音の長さの範囲（秒）
+        glide: 前のノートからのスイープの長さ（秒）
+        vibrato_rate: ビブラートの周期（Hz）
+        vibrato_depth: ビブラートの深さ（半音）
+        noise_db: 背景雑音のレベル（ピーク振幅に対する dB）
+
+    Returns:
+        SyntheticVocal: 合成信号と正解データ
+    """
+    rng = np.random.default_rng(seed)
+    n_samples = int(duration * sr)
+    midi = np.full(n_samples, np.nan)
+    envelope = np.zeros(n_samples)
+    phrases: List[Tuple[float, float]] = []
+
+    position = int(rng.uniform(*silence) * sr)
+    while position < n_samples:
+        n_notes = int(rng.integers(notes_per_phrase[0], notes_per_phrase[1] + 1))
+        lengths = (rng.uniform(*note_duration, size=n_notes) * sr).astype(int)
+        pitches = rng.integers(note_range[0], note_range[1] + 1, size=n_notes).astype(np.float64)
+        end = min(position + int(lengths.sum()), n_samples)
+        if end - position < sr // 10:
+            break
+
+        # 日本語コメント: ノートの頭で前のノートから glide 秒かけて音高を移す（スイープ）
+        onsets = position + np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        knots_x = np.concatenate([onsets, onsets[1:] + int(glide * sr), [end]])
+        knots_y = np.concatenate([pitches, pitches[:-1], [pitches[-1]]])
+        order = np.argsort(knots_x, kind="stable")
+        t = np.arange(position, end)
+        contour = np.interp(t, knots_x[order], knots_y[order])
+        contour += vibrato_depth * np.sin(2 * np.pi * vibrato_rate * t / sr) * np.minimum((t - position) / (0.3 * sr), 1.0)
+        midi[position:end] = contour
+
+        fade = min(int(0.02 * sr), (end - position) // 2)
+        phrase_envelope = np.ones(end - position)
+        phrase_envelope[:fade] = np.linspace(0, 1, fade)
+        phrase_envelope[len(phrase_envelope) - fade:] = np.linspace(1, 0, fade)
+        envelope[position:end] = phrase_envelope
+        phrases.append((position / sr, end / sr))
+        position = end + int(rng.uniform(*silence) * sr)
+
+    frequency = np.where(np.isnan(midi), 0.0, 440.0 * 2 ** ((np.nan_to_num(midi) - 69) / 12))
+    phase = 2 * np.pi * np.cumsum(frequency) / sr
+    voice = np.sin(phase) + 0.35 * np.sin(2 * phase) + 0.15 * np.sin(3 * phase)
+    noise = 10 ** (noise_db / 20) * rng.standard_normal(n_samples)
+    samples = 0.5 * envelope * voice / 1.5 + noise
+    return SyntheticVocal(samples.astype(np.float32), sr, midi, phrases)
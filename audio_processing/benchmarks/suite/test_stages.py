@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/benchmarks/suite/test_stages.py
+"""
+audio2midi の各ステージと、ステージをつないだ全体の処理時間のベンチマーク
+
+ピッチ抽出より後段のステージは、合成信号の正解ピッチ（SyntheticVocal.pitch_track）を
+入力にして単独で計測します。CREPE はスタブ（conftest.stub_crepe）に置き換えるため、
+ニューラルネット以外の前処理・後処理の時間を計測します。
+
+Usage:
+    pytest benchmarks/suite --benchmark-autosave
+    pytest benchmarks/suite --benchmark-compare --benchmark-compare-fail=mean:10%
+"""
+
+import sys
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from audio2midi.audio_buffer import AudioBuffer  # noqa: E402
+from audio2midi.generate_midi_with_lyrics import export_segments  # noqa: E402
+from audio2midi.midi_utils import note_events_to_midi  # noqa: E402
+from audio2midi.note_utils import match_segments_and_notes, midi_notes_to_intervals  # noqa: E402
+from audio2midi.pitch_extraction import cluster_notes_with_confidence, extract_pitch_crepe  # noqa: E402
+from audio2midi.timeline import Timeline  # noqa: E402
+
+
+def _describe(benchmark, vocal, **extra) -> None:
+    """比較時に入力の規模が分かるよう、結果に入力の情報を記録します。"""
+    benchmark.extra_info["audio_seconds"] = vocal.duration
+    benchmark.extra_info["phrases"] = len(vocal.phrases)
+    benchmark.extra_info.update(extra)
+
+
+def test_extract_pitch_crepe(benchmark, vocal, stub_crepe):
+    buffer = AudioBuffer.from_array(vocal.samples, vocal.sr)
+    midi_notes, _, _, _ = benchmark(extract_pitch_crepe, buffer, model="tiny", step_size=10)
+    _describe(benchmark, vocal, frames=len(midi_notes))
+
+
+def test_cluster_notes_with_confidence(benchmark, vocal):
+    midi_notes, confidence, time = vocal.pitch_track()
+    notes = benchmark(cluster_notes_with_confidence, time, midi_notes, confidence)
+    _describe(benchmark, vocal, frames=len(midi_notes), notes=len(notes))
+
+
+def test_midi_notes_to_intervals(benchmark, vocal):
+    midi_notes, confidence, _ = vocal.pitch_track()
+    table = benchmark(midi_notes_to_intervals, midi_notes, confidence, vocal.sr, as_table=True)
+    _describe(benchmark, vocal, frames=len(midi_notes), notes=len(table))
+
+
+def _intervals(vocal):
+    midi_notes, confidence, _ = vocal.pitch_track()
+    return midi_notes_to_intervals(midi_notes, confidence, vocal.sr, as_table=True)
+
+
+def test_match_segments_and_notes(benchmark, vocal):
+    segments, table = vocal.segments(), _intervals(vocal)
+    matched = benchmark(match_segments_and_notes, segments, table)
+    _describe(benchmark, vocal, notes=len(table), matched=len(matched))
+
+
+@pytest.mark.parametrize("output_format", ["midi", "json", "csv"])
+def test_export_segments(benchmark, vocal, tmp_path, output_format):
+    matched = match_segments_and_notes(vocal.segments(), _intervals(vocal))
+    output_path = tmp_path / f"output.{output_format}"
+    benchmark(export_segments, matched, str(output_path), format=output_format)
+    _describe(benchmark, vocal, matched=len(matched))
+
+
+def test_note_events_to_midi(benchmark, vocal, tmp_path):
+    table = _intervals(vocal)
+    benchmark(note_events_to_midi, table, out_path=str(tmp_path / "notes.mid"))
+    _describe(benchmark, vocal, notes=len(table))
+
+
+def _run_stages(buffer, segments, output_path):
+    """run_pipeline のピッチ抽出以降と同じ順にステージを実行します（文字起こしは合成信号のフレーズ）。"""
+    midi_notes, confidence, time, sr = extract_pitch_crepe(buffer, model="tiny", step_size=10)
+    table = midi_notes_to_intervals(
+        midi_notes, confidence, sr, as_table=True, timeline=Timeline.from_time_axis(time, sr)
+    )
+    matched = match_segments_and_notes(segments, table)
+    export_segments(matched, output_path, format="midi")
+    return matched
+
+
+def test_end_to_end(benchmark, vocal, stub_crepe, tmp_path):
+    buffer = AudioBuffer.from_array(vocal.samples, vocal.sr)
+    matched = benchmark(_run_stages, buffer, vocal.segments(), str(tmp_path / "output.mid"))
+    _describe(benchmark, vocal, matched=len(matched))
+
+
+def test_run_pipeline(benchmark, vocal, stub_crepe, tmp_path, monkeypatch):
+    """main.py と同じ引数で run_pipeline 全体を実行します（Whisper の読み込み部分は合成信号のフレーズで代替）。"""
+    pytest.importorskip("whisper")
+    import soundfile as sf
+
+    import main
+    from audio2midi import pipeline
+
+    audio_path = tmp_path / "vocal.wav"
+    sf.write(audio_path, vocal.samples, vocal.sr)
+    segments = vocal.segments()
+    monkeypatch.setattr(pipeline, "transcribe_audio", lambda *a, **k: {"text": "", "segments": segments, "language": "ja"})
+    monkeypatch.setattr(sys, "argv", ["main.py", str(audio_path), "--no-cache", "--output-path", str(tmp_path / "out.mid")])
+    args = main.parse_args()
+
+    benchmark(pipeline.run_pipeline, args)
+    _describe(benchmark, vocal)
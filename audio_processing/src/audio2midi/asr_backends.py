@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/src/audio2midi/asr_backends.py
+"""
+文字起こし（ASR）のバックエンド
+
+どのバックエンドも openai-whisper の model.transcribe と同じ形式の結果
+（text, segments, language。segments の各要素は start, end, text, avg_logprob など）を返します。
+
+- whisper: openai-whisper（PyTorch）。従来の実装
+- faster-whisper: faster-whisper（CTranslate2）。CPU では int8 量子化で高速に動作します
+- cascade: まず小さいモデル（tiny）で文字起こしし、avg_logprob が低いセグメントの区間だけを
+  指定のモデルで文字起こしし直します
+
+Usage:
+    from audio2midi.asr_backends import get_asr_backend
+
+    backend = get_asr_backend("faster-whisper", model_name="small", device="cpu")
+    result = backend.transcribe(samples, language="ja")
+"""
+
+import importlib.util
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .audio_buffer import SAMPLE_RATE
+from .model_cache import get_registry, load_whisper_model
+
+logger = logging.getLogger(__name__)
+
+
+class AsrBackend:
+    """
+    文字起こしバックエンドのインターフェース。
+
+    transcribe() は 16kHz モノラル float32 の配列（whisper バックエンドのみファイルパスも可）を受け取り、
+    Whisper 形式の結果を返します。register_asr_backend() で登録すると --asr-backend から使用できます。
+    """
+
+    name = "base"
+
+    def transcribe(
+        self,
+        audio: Any,
+        language: Optional[str] = None,
+        word_timestamps: bool = False
+    ) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class WhisperBackend(AsrBackend):
+    """openai-whisper（PyTorch）による文字起こし。"""
+
+    name = "whisper"
+
+    def __init__(self, model_name: str = "large", device: str = "cpu") -> None:
+        self.model_name = model_name
+        self.device = device
+
+    def transcribe(
+        self,
+        audio: Any,
+        language: Optional[str] = None,
+        word_timestamps: bool = False
+    ) -> Dict[str, Any]:
+        model = load_whisper_model(self.model_name, device=self.device)
+        options: Dict[str, Any] = {}
+        if language:
+            options["language"] = language
+        if word_timestamps:
+            options["word_timestamps"] = True
+        return model.transcribe(audio, **options)
+
+
+class FasterWhisperBackend(AsrBackend):
+    """
+    faster-whisper（CTranslate2）による文字起こし（faster-whisper が必要）。
+
+    Args:
+        model_name: Whisperモデル名（tiny/base/small/medium/large-v3 など。"large" は large-v3 とみなします）
+        device: 使用するデバイス
+        compute_type: CTranslate2 の演算精度（CPU では "int8"、GPU では "float16" が目安）
+    """
+
+    name = "faster-whisper"
+
+    def __init__(self, model_name: str = "large", device: str = "cpu", compute_type: str = "int8") -> None:
+        self.model_name = "large-v3" if model_name == "large" else model_name
+        self.device = device
+        self.compute_type = compute_type
+
+    def _load_model(self) -> Any:
+        def loader():
+            from faster_whisper import WhisperModel
+            return WhisperModel(self.model_name, device=self.device, compute_type=self.compute_type)
+
+        return get_registry().get(("faster-whisper", self.device, self.model_name, self.compute_type), loader)
+
+    def transcribe(
+        self,
+        audio: Any,
+        language: Optional[str] = None,
+        word_timestamps: bool = False
+    ) -> Dict[str, Any]:
+        model = self._load_model()
+        segments, info = model.transcribe(audio, language=language, word_timestamps=word_timestamps)
+        # 日本語コメント: segments は遅延評価のジェネレータなので、ここで全てデコードする
+        results = []
+        for index, segment in enumerate(segments):
+            item = {
+                "id": index,
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "tokens": list(segment.tokens),
+                "temperature": segment.temperature,
+                "avg_logprob": segment.avg_logprob,
+                "compression_ratio": segment.compression_ratio,
+                "no_speech_prob": segment.no_speech_prob,
+            }
+            if word_timestamps and segment.words:
+                item["words"] = [
+                    {"word": w.word, "start": w.start, "end": w.end, "probability": w.probability}
+                    for w in segment.words
+                ]
+            results.append(item)
+        return {
+            "text": "".join(s["text"] for s in results),
+            "segments": results,
+            "language": info.language,
+        }
+
+
+class CascadeBackend(AsrBackend):
+    """
+    小さいモデルで文字起こしし、自信のないセグメントだけを大きいモデルでやり直すバックエンド。
+
+    avg_logprob が threshold 未満のセグメント（隣接するものはまとめる）の区間を前後 padding 秒
+    広げて切り出し、final で文字起こしし直して置き換えます。やり直す区間が音声の
+    full_rerun_ratio 以上になる場合は、音声全体を final で文字起こしします。
+
+    Args:
+        draft: 最初に使うバックエンド（小さいモデル）
+        final: やり直しに使うバックエンド（大きいモデル）
+        threshold: やり直しの基準とする avg_logprob
+        padding: やり直す区間の前後に付ける余白（秒）
+        full_rerun_ratio: 音声全体をやり直す基準（やり直す区間の合計 / 音声長）
+    """
+
+    name = "cascade"
+
+    def __init__(
+        self,
+        draft: AsrBackend,
+        final: AsrBackend,
+        threshold: float = -1.0,
+        padding: float = 0.5,
+        full_rerun_ratio: float = 0.5
+    ) -> None:
+        self.draft = draft
+        self.final = final
+        self.threshold = threshold
+        self.padding = padding
+        self.full_rerun_ratio = full_rerun_ratio
+
+    def _low_confidence_spans(self, segments: List[Dict[str, Any]]) -> List[Tuple[float, float]]:
+        """avg_logprob が閾値未満のセグメントの区間（隣接するものは結合）"""
+        spans: List[Tuple[float, float]] = []
+        for segment in segments:
+            if segment.get("avg_logprob", 0.0) >= self.threshold:
+                continue
+            start, end = segment["start"], segment["end"]
+            if spans and start - spans[-1][1] <= 2 * self.padding:
+                spans[-1] = (spans[-1][0], max(spans[-1][1], end))
+            else:
+                spans.append((start, end))
+        return spans
+
+    def transcribe(
+        self,
+        audio: Any,
+        language: Optional[str] = None,
+        word_timestamps: bool = False
+    ) -> Dict[str, Any]:
+        audio = np.asarray(audio, dtype=np.float32)
+        draft = self.draft.transcribe(audio, language=language, word_timestamps=word_timestamps)
+        spans = self._low_confidence_spans(draft["segments"])
+        duration = len(audio) / SAMPLE_RATE
+        rerun = sum(end - start for start, end in spans)
+        logger.info("カスケード: 再文字起こし %d区間, %.1f秒 / %.1f秒", len(spans), rerun, duration)
+        if not spans:
+            return draft
+        # 日本語コメント: 言語は最初の結果に合わせ、区間ごとの言語判定の揺れを防ぐ
+        language = language or draft.get("language")
+        if rerun >= self.full_rerun_ratio * duration:
+            return self.final.transcribe(audio, language=language, word_timestamps=word_timestamps)
+
+        segments = [
+            s for s in draft["segments"]
+            if not any(start <= (s["start"] + s["end"]) / 2 <= end for start, end in spans)
+        ]
+        for start, end in spans:
+            clip_start = max(start - self.padding, 0.0)
+            clip_end = min(end + self.padding, duration)
+            clip = audio[int(clip_start * SAMPLE_RATE):int(clip_end * SAMPLE_RATE)]
+            for segment in self.final.transcribe(clip, language=language, word_timestamps=word_timestamps)["segments"]:
+                segment = dict(segment)
+                segment["start"] += clip_start
+                segment["end"] += clip_start
+                if segment.get("words"):
+                    segment["words"] = [
+                        {**w, "start": w["start"] + clip_start, "end": w["end"] + clip_start}
+                        for w in segment["words"]
+                    ]
+                # 余白部分で拾ったセグメントは draft 側のものを残す
+                if start <= (segment["start"] + segment["end"]) / 2 <= end:
+                    segments.append(segment)
+        segments.sort(key=lambda s: s["start"])
+        for index, segment in enumerate(segments):
+            segment["id"] = index
+        return {"text": "".join(s["text"] for s in segments), "segments": segments, "language": language}
+
+
+def _default_engine() -> str:
+    """faster-whisper がインストールされていればそれを、なければ openai-whisper を使います。"""
+    return "faster-whisper" if importlib.util.find_spec("faster_whisper") else "whisper"
+
+
+def _cascade_factory(model_name: str = "large", device: str = "cpu", **kwargs: Any) -> CascadeBackend:
+    engine = _ASR_BACKENDS[_default_engine()]
+    return CascadeBackend(
+        draft=engine(model_name="tiny", device=device),
+        final=engine(model_name=model_name, device=device),
+        **kwargs
+    )
+
+
+_ASR_BACKENDS: Dict[str, Callable[..., AsrBackend]] = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+    CascadeBackend.name: _cascade_factory,
+}
+
+
+def register_asr_backend(name: str, factory: Callable[..., AsrBackend]) -> None:
+    """
+    文字起こしバックエンドを登録します。
+
+    Args:
+        name: バックエンド名
+        factory: model_name, device キーワード引数を受け取り AsrBackend を返す関数（クラス）
+    """
+    _ASR_BACKENDS[name] = factory
+
+
+def available_asr_backends() -> List[str]:
+    """登録されている文字起こしバックエンド名の一覧"""
+    return sorted(_ASR_BACKENDS)
+
+
+def get_asr_backend(name: str = "whisper", model_name: str = "large", device: str = "cpu") -> AsrBackend:
+    """
+    バックエンド名から AsrBackend を作成します。
+
+    Raises:
+        ValueError: 未登録のバックエンド名が指定された場合
+    """
+    if name not in _ASR_BACKENDS:
+        raise ValueError(f"未登録の文字起こしバックエンドです: {name}（利用可能: {', '.join(available_asr_backends())}）")
+    return _ASR_BACKENDS[name](model_name=model_name, device=device)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/src/audio2midi/audio_buffer.py
+"""
+デコード済みの音声を各ステージで共有するための AudioBuffer
+
+音声ファイルを1度だけデコード・リサンプリングして float32 のモノラル配列として保持し、
+Whisper（文字起こし）と CREPE（ピッチ抽出）の両方にその配列（またはビュー）を渡します。
+Whisper と CREPE はどちらも 16kHz の入力を前提としているため、既定のサンプリングレートは 16kHz です。
+
+Usage:
+    from audio2midi.audio_buffer import AudioBuffer
+
+    buffer = AudioBuffer.from_file("song.mp3")
+    chorus = buffer.view(30.0, 60.0)
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import librosa
+import numpy as np
+import soundfile as sf
+import soxr
+
+# Whisper / CREPE の入力サンプリングレート
+SAMPLE_RATE = 16000
+
+
+@dataclass(frozen=True, eq=False)
+class AudioBuffer:
+    """
+    デコード済みのモノラル音声。
+
+    samples は読み取り専用の float32 配列です。加工する場合は
+    preprocessing.PreprocessingChain などで新しい AudioBuffer を作成します。
+    """
+    samples: np.ndarray  # モノラル float32 の音声データ
+    sr: int              # サンプリングレート（Hz）
+    source: Optional[str] = None  # デコード元のファイルパス
+
+    @classmethod
+    def from_file(cls, audio_path: str, sr: Optional[int] = SAMPLE_RATE) -> "AudioBuffer":
+        """
+        音声ファイルをデコードし、モノラル・指定のサンプリングレートに変換します。
+
+        soundfile で読めない形式（mp3, m4a など）は librosa（ffmpeg/audioread）で読み込みます。
+
+        Args:
+            audio_path: 音声ファイルのパス
+            sr: 変換後のサンプリングレート（None の場合はファイルのサンプリングレートのまま）
+
+        Returns:
+            AudioBuffer: デコード済みの音声
+        """
+        try:
+            data, file_sr = sf.read(audio_path, dtype="float32", always_2d=True)
+            samples = data.mean(axis=1) if data.shape[1] > 1 else data[:, 0]
+            if sr is None:
+                sr = file_sr
+            elif file_sr != sr:
+                samples = soxr.resample(samples, file_sr, sr)
+        except RuntimeError:  # soundfile が対応していない形式
+            samples, sr = librosa.load(audio_path, sr=sr, mono=True, dtype=np.float32)
+        return cls.from_array(samples, sr, source=str(audio_path))
+
+    @classmethod
+    def from_array(cls, samples: np.ndarray, sr: int, source: Optional[str] = None) -> "AudioBuffer":
+        """配列から AudioBuffer を作成します（float32 で連続なら複製しません）。"""
+        # 日本語コメント: 呼び出し元の配列のフラグを変えないよう、ビューを読み取り専用にする
+        samples = np.ascontiguousarray(samples, dtype=np.float32).view()
+        samples.flags.writeable = False
+        return cls(samples=samples, sr=int(sr), source=source)
+
+    @property
+    def duration(self) -> float:
+        """音声長（秒）"""
+        return len(self.samples) / self.sr
+
+    def view(self, start: Optional[float] = None, end: Optional[float] = None) -> np.ndarray:
+        """
+        指定した時間範囲（秒）のサンプルをコピーせずに返します。
+        """
+        start_index = 0 if start is None else max(int(round(start * self.sr)), 0)
+        end_index = len(self.samples) if end is None else int(round(end * self.sr))
+        return self.samples[start_index:end_index]
+
+    def resampled(self, sr: int) -> "AudioBuffer":
+        """指定したサンプリングレートの AudioBuffer を返します（同じ場合は自身を返します）。"""
+        if sr == self.sr:
+            return self
+        return AudioBuffer.from_array(soxr.resample(self.samples, self.sr, sr), sr, source=self.source)
@@ -24,14 +24,19 @@ Command line:
 """
 
 import argparse
+import logging
 import sys
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Union
 
-import torch
-import whisper
-from pydub import AudioSegment
-from pydub.effects import normalize
+import soundfile as sf
+
+from .asr_backends import get_asr_backend
+from .audio_buffer import SAMPLE_RATE, AudioBuffer
+from .preprocessing import build_chain
+from .vad import RegionMap, detect_voiced_regions
+
+logger = logging.getLogger(__name__)
 
 class AudioTranscriptionError(Exception):
     """音声文字起こし処理中のエラーを表すカスタム例外クラス"""
@@ -43,7 +48,10 @@ def preprocess_audio(
     noise_reduction: bool = False
 ) -> str:
     """
-    音声ファイルの前処理を行います。
+    音声ファイルの前処理を行い、結果をWAVファイルとして書き出します。
+
+    パイプライン内では前処理をメモリ上で行うため（preprocessing 参照）、
+    この関数は前処理済みのファイルが必要な場合にのみ使用します。
 
     Args:
         audio_path (str): 入力音声ファイルのパス
@@ -57,40 +65,38 @@ def preprocess_audio(
         AudioTranscriptionError: 音声処理に失敗した場合
     """
     try:
-        audio = AudioSegment.from_file(audio_path)
-        
-        if noise_reduction:
-            # ノーマライズして音量を調整
-            audio = normalize(audio)
-            
-            # 必要に応じて他のノイズ削減処理を追加可能
-            # 例: ローパスフィルター、ハイパスフィルターなど
+        buffer = AudioBuffer.from_file(audio_path, sr=None)
+        buffer, _ = build_chain(normalize_peak=noise_reduction).run(buffer)
         
         if output_path is None:
             output_path = str(Path(audio_path).with_suffix('.processed.wav'))
         
-        audio.export(output_path, format='wav')
+        sf.write(output_path, buffer.samples, buffer.sr)
         return output_path
     
     except Exception as e:
         raise AudioTranscriptionError(f"音声前処理中にエラーが発生しました: {str(e)}")
 
 def transcribe_audio(
-    audio_path: str,
+    audio_path: Union[str, AudioBuffer],
     model_name: str = "large",
     device: str = "cpu",
     language: Optional[str] = None,
-    noise_reduction: bool = False
+    noise_reduction: bool = False,
+    word_timestamps: bool = False,
+    backend: str = "whisper"
 ) -> Dict[str, Any]:
     """
     音声ファイルからテキストを抽出します。
 
     Args:
-        audio_path (str): 音声ファイルのパス
+        audio_path (str or AudioBuffer): 音声ファイルのパス、またはデコード済みの音声（16kHz）
         model_name (str): 使用するWhisperモデル名. Defaults to "large".
         device (str): 使用するデバイス ("cpu" or "cuda"). Defaults to "cpu".
         language (str, optional): 文字起こしの言語 (例: "ja" for 日本語). Defaults to None.
         noise_reduction (bool): ノイズ削減を適用するかどうか. Defaults to False.
+        word_timestamps (bool): 単語ごとのタイムスタンプ（各セグメントの "words"）を出力するかどうか. Defaults to False.
+        backend (str): 文字起こしバックエンド（whisper / faster-whisper / cascade、asr_backends 参照）. Defaults to "whisper".
 
     Returns:
         Dict[str, Any]: Whisperの転写結果オブジェクト。以下のキーを含みます：
@@ -102,29 +108,80 @@ def transcribe_audio(
         FileNotFoundError: 音声ファイルが見つからない場合
         AudioTranscriptionError: モデルの読み込みまたは処理に失敗した場合
     """
-    audio_path = Path(audio_path)
-    if not audio_path.exists():
+    if not isinstance(audio_path, AudioBuffer) and not Path(audio_path).exists():
         raise FileNotFoundError(f"音声ファイルが見つかりません: {audio_path}")
 
     try:
-        # 必要に応じて音声の前処理を実行
-        if noise_reduction:
-            audio_path = preprocess_audio(str(audio_path), noise_reduction=True)
+        # Whisper には 16kHz の配列を直接渡す（ファイルの再デコードや一時WAVの書き出しを行わない）
+        if isinstance(audio_path, AudioBuffer):
+            buffer = audio_path.resampled(SAMPLE_RATE)
+        elif noise_reduction or backend != "whisper":
+            buffer = AudioBuffer.from_file(audio_path, sr=SAMPLE_RATE)
+        else:
+            buffer = None
         
-        # Whisperモデルの読み込み
-        model = whisper.load_model(model_name, device=device)
+        # 必要に応じて音声の前処理を実行（メモリ上でノーマライズ）
+        if noise_reduction:
+            buffer, _ = build_chain(normalize_peak=True).run(buffer)
         
-        # 文字起こしオプションの設定
-        transcribe_options: Dict[str, Any] = {}
-        if language:
-            transcribe_options["language"] = language
+        # バックエンドの作成（モデルはプロセス内で1度だけ読み込まれる）
+        asr = get_asr_backend(backend, model_name=model_name, device=device)
         
         # 実際の文字起こし
-        result = model.transcribe(str(audio_path), **transcribe_options)
+        audio = buffer.samples if buffer is not None else str(audio_path)
+        result = asr.transcribe(audio, language=language, word_timestamps=word_timestamps)
         return result
     except Exception as e:
         raise AudioTranscriptionError(f"文字起こし処理中にエラーが発生しました: {str(e)}")
 
+
+def transcribe_voiced_regions(
+    audio_path: Union[str, AudioBuffer],
+    regions: Optional[Any] = None,
+    top_db: float = 35.0,
+    min_silence: float = 0.5,
+    **kwargs: Any
+) -> Dict[str, Any]:
+    """
+    有音区間だけを連結した音声を文字起こしし、タイムスタンプを元の音声の時間軸に戻します。
+
+    区間の間の無音は Whisper に渡さないため、その分の推論時間がかかりません。
+
+    Args:
+        audio_path (str or AudioBuffer): 音声ファイルのパス、またはデコード済みの音声
+        regions (np.ndarray, optional): (区間数, 2) の有音区間（audio_path のサンプルインデックス）。
+            None の場合は vad.detect_voiced_regions で検出します.
+        top_db (float): regions を検出する場合の無音判定の閾値（dB）. Defaults to 35.0.
+        min_silence (float): regions を検出する場合に区間を分割する最小の無音長（秒）. Defaults to 0.5.
+        **kwargs: transcribe_audio に渡すオプション（model_name, device, language など）
+
+    Returns:
+        Dict[str, Any]: transcribe_audio と同じ形式の転写結果（segments と words の時刻は元の時間軸）
+
+    Raises:
+        FileNotFoundError: 音声ファイルが見つからない場合
+        AudioTranscriptionError: モデルの読み込みまたは処理に失敗した場合
+    """
+    if isinstance(audio_path, AudioBuffer):
+        buffer = audio_path
+    elif Path(audio_path).exists():
+        buffer = AudioBuffer.from_file(audio_path, sr=SAMPLE_RATE)
+    else:
+        raise FileNotFoundError(f"音声ファイルが見つかりません: {audio_path}")
+
+    if regions is None:
+        regions = detect_voiced_regions(buffer.samples, buffer.sr, top_db=top_db, min_silence=min_silence)
+    region_map = RegionMap(regions, buffer.sr)
+    if len(region_map) == 0:
+        return {"text": "", "segments": [], "language": kwargs.get("language")}
+
+    voiced = AudioBuffer.from_array(region_map.concatenate(buffer.samples), buffer.sr, source=buffer.source)
+    logger.info("文字起こし（有音区間のみ）: %d区間, %.2f秒 / %.2f秒", len(region_map), voiced.duration, buffer.duration)
+    result = transcribe_audio(voiced, **kwargs)
+    result["segments"] = region_map.remap_segments(result.get("segments", []))
+    return result
+
+
 def main() -> None:
     """
     コマンドライン引数を解析し、音声文字起こしを実行します。
@@ -135,6 +192,7 @@ def main() -> None:
     parser.add_argument("--device", type=str, default="cpu", help="使用するデバイス (cpu/cuda)")
     parser.add_argument("--language", type=str, help="文字起こしの言語 (例: ja)")
     parser.add_argument("--noise-reduction", action="store_true", help="ノイズ削減を適用する")
+    parser.add_argument("--backend", type=str, default="whisper", help="文字起こしバックエンド (whisper/faster-whisper/cascade)")
     
     args = parser.parse_args()
     
@@ -144,7 +202,8 @@ def main() -> None:
             args.model,
             args.device,
             args.language,
-            args.noise_reduction
+            args.noise_reduction,
+            backend=args.backend
         )
         print("文字起こし結果:", transcription)
     except (FileNotFoundError, AudioTranscriptionError) as e:
@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/src/audio2midi/batch.py
+"""
+複数の音声ファイルをまとめて処理するバッチモジュール
+
+ディレクトリ・globパターン・マニフェストファイルのいずれかから入力を集め、
+ワーカープロセスのプールに分配して処理します。各ワーカーは複数のファイルを
+順に処理するため、読み込んだモデルはワーカー内で再利用されます（model_cache 参照）。
+
+出力ディレクトリには入力ごとの出力ファイルに加えて、以下が書き出されます：
+- batch_state.jsonl: 処理済みファイルの記録（--resume で中断したバッチを再開する際に使用）
+- batch_summary.json: バッチ全体の集計レポート
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .instrumentation import get_recorder
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".flac", ".m4a", ".ogg", ".aac", ".aiff", ".aif"}
+MANIFEST_EXTENSIONS = {".txt", ".lst", ".json"}
+STATE_FILE = "batch_state.jsonl"
+SUMMARY_FILE = "batch_summary.json"
+
+# (audio_path, output_path, options) を受け取り出力パスを返す関数
+ProcessFn = Callable[[str, str, argparse.Namespace], str]
+
+
+def _read_manifest(manifest_path: Path) -> List[Path]:
+    """
+    マニフェストファイルから入力ファイルの一覧を読み込みます。
+
+    .json の場合はパスのリスト、または {"files": [...]} 形式。
+    それ以外は1行1パスのテキスト形式（空行と # で始まる行は無視）。
+    相対パスはマニフェストファイルのディレクトリを基準に解決します。
+    """
+    base_dir = manifest_path.parent
+    if manifest_path.suffix.lower() == ".json":
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        entries = data["files"] if isinstance(data, dict) else data
+    else:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            entries = [
+                line.strip() for line in f
+                if line.strip() and not line.lstrip().startswith("#")
+            ]
+    return [base_dir / entry for entry in entries]
+
+
+def collect_inputs(source: str) -> List[Path]:
+    """
+    ディレクトリ・globパターン・マニフェストファイルから入力ファイルを集めます。
+
+    Args:
+        source: ディレクトリパス、globパターン（例: "songs/**/*.wav"）、
+            またはマニフェストファイル（.txt/.lst/.json）のパス
+
+    Returns:
+        List[Path]: 重複を除いてソートされた入力ファイルの絶対パスのリスト
+
+    Raises:
+        FileNotFoundError: 入力が1つも見つからない場合
+    """
+    path = Path(source)
+    if path.is_dir():
+        inputs = [
+            p for p in path.rglob("*")
+            if p.is_file() and p.suffix.lower() in AUDIO_EXTENSIONS
+        ]
+    elif path.is_file() and path.suffix.lower() in MANIFEST_EXTENSIONS:
+        inputs = _read_manifest(path)
+    elif glob.has_magic(source):
+        inputs = [Path(p) for p in glob.glob(source, recursive=True) if Path(p).is_file()]
+    elif path.is_file():
+        inputs = [path]
+    else:
+        inputs = []
+
+    if not inputs:
+        raise FileNotFoundError(f"処理対象の音声ファイルが見つかりません: {source}")
+    return sorted({p.resolve() for p in inputs})
+
+
+def output_path_for(
+    audio_path: Path,
+    inputs_root: Path,
+    output_dir: Path,
+    output_format: str
+) -> Path:
+    """
+    入力ファイルに対応する出力ファイルパスを返します。
+
+    入力のディレクトリ構成を出力ディレクトリ以下に再現するため、
+    同じファイル名の入力が別ディレクトリにあっても衝突しません。
+    """
+    relative = audio_path.resolve().relative_to(inputs_root)
+    extension = "mid" if output_format == "midi" else output_format
+    return output_dir / relative.with_suffix(f".{extension}")
+
+
+def _check_output_clashes(output_paths: Dict[Path, Path]) -> None:
+    """
+    出力パスが重複する入力がないか確認します（a.wav と a.mp3 が同じディレクトリにある場合など）。
+
+    Raises:
+        ValueError: 複数の入力が同じ出力パスに対応する場合
+    """
+    by_output: Dict[Path, List[Path]] = {}
+    for audio_path, output_path in output_paths.items():
+        by_output.setdefault(output_path, []).append(audio_path)
+    clashes = {output: paths for output, paths in by_output.items() if len(paths) > 1}
+    if clashes:
+        details = "; ".join(
+            f"{output} <- {', '.join(str(p) for p in paths)}" for output, paths in sorted(clashes.items())
+        )
+        raise ValueError(f"複数の入力ファイルが同じ出力ファイルに対応します: {details}")
+
+
+def _inputs_root(source: str, inputs: List[Path]) -> Path:
+    """
+    出力パスの基準にするディレクトリを返します。
+
+    source がディレクトリの場合はそのディレクトリ、それ以外（globパターン・マニフェスト）は
+    入力ファイル群に共通する親ディレクトリです。ディレクトリを基準にすることで、
+    ファイルが追加されても既存の入力の出力パスは変わらず、--resume で再開できます。
+    """
+    path = Path(source)
+    if path.is_dir():
+        return path.resolve()
+    parents = [str(p.resolve().parent) for p in inputs]
+    return Path(os.path.commonpath(parents))
+
+
+def load_completed(state_path: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    状態ファイルから正常に処理済みの入力を読み込みます。
+
+    途中で書き込みが中断された最終行は無視します。
+    """
+    completed: Dict[str, Dict[str, Any]] = {}
+    if not state_path.exists():
+        return completed
+    with open(state_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "ok" and Path(record["output"]).exists():
+                completed[record["input"]] = record
+            else:
+                completed.pop(record.get("input"), None)
+    return completed
+
+
+def _init_worker(model_cache_mb: Optional[float]) -> None:
+    """ワーカープロセスの初期化処理。モデルキャッシュの予算を設定します。"""
+    if model_cache_mb is not None:
+        from .model_cache import configure_registry
+        configure_registry(int(model_cache_mb * 1024 * 1024))
+
+
+def process_file(audio_path: str, output_path: str, options: argparse.Namespace) -> str:
+    """
+    ワーカープロセスで1ファイルを処理します（デフォルトの ProcessFn）。
+
+    ワーカー内でモデルを使い回すため、ステージの並列実行は
+    スレッド方式に固定します（プロセス方式ではモデルが毎回読み込まれるため）。
+    """
+    from .pipeline import run_pipeline
+
+    options = argparse.Namespace(**vars(options))
+    options.parallel_executor = "thread"
+    return run_pipeline(options, audio_path=audio_path, output_path=output_path)
+
+
+def _timed_call(
+    process_fn: ProcessFn,
+    audio_path: str,
+    output_path: str,
+    options: argparse.Namespace
+) -> Dict[str, Any]:
+    """
+    処理時間を計測しながら1ファイルを処理し、状態ファイル用のレコードを返します。
+
+    ワーカー内で記録したステージごとの計測結果は record["metrics"] に入れて返します。
+    """
+    recorder = get_recorder()
+    recorder.clear()
+    started = time.perf_counter()
+    record: Dict[str, Any] = {"input": audio_path, "output": output_path}
+    try:
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        process_fn(audio_path, output_path, options)
+        record["status"] = "ok"
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    record["metrics"] = recorder.drain()
+    return record
+
+
+def run_batch(
+    source: str,
+    output_dir: str,
+    options: argparse.Namespace,
+    workers: int = 1,
+    resume: bool = False,
+    process_fn: ProcessFn = process_file
+) -> Dict[str, Any]:
+    """
+    入力ファイル群をワーカープロセスのプールで処理します。
+
+    Args:
+        source: ディレクトリ・globパターン・マニフェストファイル
+        output_dir: 出力ディレクトリ
+        options: パイプラインのオプション（main.py の引数）
+        workers: ワーカープロセス数
+        resume: True の場合、状態ファイルに記録済みで出力パスが今回と同じ入力をスキップする
+        process_fn: 1ファイルを処理する関数（プロセス間で受け渡せるトップレベル関数）
+
+    Returns:
+        Dict[str, Any]: batch_summary.json に書き出したものと同じ集計レポート
+
+    Raises:
+        FileNotFoundError: 入力が1つも見つからない場合
+        ValueError: 拡張子だけが異なる入力など、複数の入力が同じ出力パスに対応する場合
+    """
+    inputs = collect_inputs(source)
+    inputs_root = _inputs_root(source, inputs)
+    out_dir = Path(output_dir)
+    output_paths = {
+        audio_path: output_path_for(audio_path, inputs_root, out_dir, options.output_format)
+        for audio_path in inputs
+    }
+    # 日本語コメント: 同じ出力ファイルに2つのワーカーが書き込まないよう、プールを起動する前に確認する
+    _check_output_clashes(output_paths)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    state_path = out_dir / STATE_FILE
+
+    if resume:
+        # 日本語コメント: 出力形式などが変わって出力パスが異なる場合は、処理済みでも再処理する
+        expected_outputs = {str(p): str(output_paths[p]) for p in inputs}
+        completed = {
+            k: v for k, v in load_completed(state_path).items()
+            if k in expected_outputs and v["output"] == expected_outputs[k]
+        }
+    else:
+        completed = {}
+        state_path.unlink(missing_ok=True)
+
+    jobs = []
+    for audio_path in inputs:
+        key = str(audio_path)
+        if key in completed:
+            continue
+        jobs.append((key, str(output_paths[audio_path])))
+
+    logger.info("バッチ処理: 入力 %d 件（スキップ %d 件）, ワーカー %d", len(inputs), len(inputs) - len(jobs), workers)
+
+    started = time.perf_counter()
+    records: List[Dict[str, Any]] = []
+    model_cache_mb = getattr(options, "model_cache_mb", None)
+    # 日本語コメント: TensorFlow/PyTorch は fork と相性が悪いため spawn を使う
+    with ProcessPoolExecutor(
+        max_workers=max(workers, 1),
+        mp_context=get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(model_cache_mb,)
+    ) as executor, open(state_path, "a", encoding="utf-8") as state_file:
+        futures = [
+            executor.submit(_timed_call, process_fn, audio_path, output_path, options)
+            for audio_path, output_path in jobs
+        ]
+        for future in as_completed(futures):
+            record = future.result()
+            # 日本語コメント: 計測結果は状態ファイルには書かず、ファイル名のラベルを付けて親プロセスに集約する
+            get_recorder().extend(record.pop("metrics", []), file=record["input"])
+            records.append(record)
+            # 中断されても再開できるよう、1件ごとに状態ファイルへ追記する
+            state_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            state_file.flush()
+            status = "完了" if record["status"] == "ok" else f"失敗 ({record['error']})"
+            logger.info("[%d/%d] %s: %s %.1f秒", len(records), len(jobs), record['input'], status, record['seconds'])
+
+    failed = [r for r in records if r["status"] != "ok"]
+    summary = {
+        "source": source,
+        "output_dir": str(out_dir),
+        "total_inputs": len(inputs),
+        "skipped": len(inputs) - len(jobs),
+        "processed": len(records) - len(failed),
+        "failed": len(failed),
+        "workers": workers,
+        "wall_seconds": round(time.perf_counter() - started, 3),
+        "busy_seconds": round(sum(r["seconds"] for r in records), 3),
+        "failures": failed,
+        "outputs": {
+            **{k: v["output"] for k, v in completed.items()},
+            **{r["input"]: r["output"] for r in records if r["status"] == "ok"},
+        },
+    }
+    with open(out_dir / SUMMARY_FILE, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/src/audio2midi/dag.py
+"""
+パイプラインのステージを依存関係のグラフとして実行し、変更のないステージの結果を再利用するモジュール
+
+各ステージは入力（上流のステージ名）とパラメータを宣言します。ステージのフィンガープリントは
+「音声の内容のハッシュ・ステージ名・パラメータ・入力のフィンガープリント」から作られるため、
+あるステージのパラメータを変えると、そのステージと下流のステージだけが再計算されます
+（例: --min-duration を変えた場合は note_intervals → matching → export のみ）。
+
+出力は ResultCache に保存します（保存形式はステージごとのコーデックで指定）。
+結果を再利用できたステージの上流は、読み込みも実行もしません。
+
+Usage:
+    graph = StageGraph(hash_audio_file(path), ResultCache())
+    graph.add(Stage("transcription", transcribe, params={"model_name": "large"}, codec="json"))
+    graph.add(Stage("summary", summarize, inputs=("transcription",), params={"n": 3}, codec="json"))
+    result = graph.run("summary")
+    print(graph.format_explain())
+"""
+
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from . import instrumentation
+from .note_table import NoteTable
+from .result_cache import ResultCache, hash_audio_file
+
+logger = logging.getLogger(__name__)
+
+# ステージの状態（--explain の表示）
+REUSED = "reused"
+COMPUTED = "computed"
+SKIPPED = "skipped"
+
+
+class Codec(NamedTuple):
+    """ステージの出力を ResultCache に保存・読み込みする関数の組"""
+    load: Callable[[ResultCache, str, str], Optional[Any]]
+    store: Callable[[ResultCache, str, str, Any], None]
+
+
+def _load_notes(cache: ResultCache, stage: str, key: str) -> Optional[NoteTable]:
+    data = cache.load_array(stage, key)
+    return None if data is None else NoteTable(data)
+
+
+def _load_file(cache: ResultCache, stage: str, key: str) -> Optional[str]:
+    # 日本語コメント: 出力ファイルが消えたり書き換えられたりした場合は再出力する
+    record = cache.load_json(stage, key)
+    if record is None or not os.path.exists(record["path"]) or hash_audio_file(record["path"]) != record["sha256"]:
+        return None
+    return record["path"]
+
+
+def _store_file(cache: ResultCache, stage: str, key: str, path: str) -> None:
+    cache.store_json(stage, key, {"path": str(Path(path).resolve()), "sha256": hash_audio_file(path)})
+
+
+_CODECS: Dict[str, Codec] = {
+    # JSON に変換できる値（文字起こし結果、マッチング結果など）
+    "json": Codec(ResultCache.load_json, ResultCache.store_json),
+    # ピッチ抽出結果 (midi_notes, confidence, time, sr)
+    "pitch": Codec(
+        lambda cache, stage, key: cache.load_pitch(key),
+        lambda cache, stage, key, value: cache.store_pitch(key, value)
+    ),
+    # NoteTable
+    "notes": Codec(_load_notes, lambda cache, stage, key, table: cache.store_array(stage, key, table.data)),
+    # 出力ファイルのパス（ファイルの内容のハッシュを記録し、変わっていなければ再利用する）
+    "file": Codec(_load_file, _store_file),
+}
+
+
+def register_codec(name: str, codec: Codec) -> None:
+    """
+    ステージの出力の保存形式を登録します。
+
+    Args:
+        name: コーデック名（Stage.codec に指定する名前）
+        codec: 読み込み・保存の関数の組
+    """
+    _CODECS[name] = codec
+
+
+@dataclass
+class Stage:
+    """
+    グラフの1ステージ。
+
+    Args:
+        name: ステージ名（計測のステージ名、キャッシュのディレクトリ名にも使用します）
+        fn: 入力のステージの出力を inputs の順に位置引数として受け取り、出力を返す関数
+        inputs: 入力となる上流のステージ名
+        params: 出力に影響するパラメータ（JSON に変換できる値。フィンガープリントに含めます）
+        codec: 出力の保存形式（None の場合は保存せず、必要なときに毎回実行します）
+        count: 計測の処理件数を出力から求める関数
+    """
+    name: str
+    fn: Callable[..., Any]
+    inputs: Tuple[str, ...] = ()
+    params: Dict[str, Any] = field(default_factory=dict)
+    codec: Optional[str] = None
+    count: Optional[Callable[[Any], int]] = None
+
+
+class StageGraph:
+    """
+    ステージの依存関係グラフ。
+
+    ステージは上流から順に add() します（未登録のステージを入力にはできないため、循環は起きません）。
+
+    Args:
+        source: 入力（音声ファイル）の内容のハッシュ
+        cache: 出力の保存先（None の場合は保存も再利用もしません）
+    """
+
+    def __init__(self, source: str, cache: Optional[ResultCache] = None) -> None:
+        self.source = source
+        self.cache = cache
+        self.stages: Dict[str, Stage] = {}
+        self.status: Dict[str, str] = {}
+        self._values: Dict[str, Any] = {}
+        self._fingerprints: Dict[str, str] = {}
+
+    def add(self, stage: Stage) -> Stage:
+        """ステージを追加します。"""
+        if stage.name in self.stages:
+            raise ValueError(f"ステージが重複しています: {stage.name}")
+        unknown = [name for name in stage.inputs if name not in self.stages]
+        if unknown:
+            raise ValueError(f"未登録のステージを入力にしています: {stage.name} <- {unknown}")
+        if stage.codec is not None and stage.codec not in _CODECS:
+            raise ValueError(f"未登録のコーデックです: {stage.codec}")
+        self.stages[stage.name] = stage
+        return stage
+
+    def fingerprint(self, name: str) -> str:
+        """ステージのパラメータと上流のフィンガープリントから、出力を識別するキーを返します。"""
+        if name not in self._fingerprints:
+            stage = self.stages[name]
+            params = dict(stage.params)
+            if stage.inputs:
+                params["inputs"] = {upstream: self.fingerprint(upstream) for upstream in stage.inputs}
+            self._fingerprints[name] = ResultCache.make_key(self.source, name, params)
+        return self._fingerprints[name]
+
+    def _load(self, stage: Stage) -> Optional[Any]:
+        if self.cache is None or stage.codec is None:
+            return None
+        return _CODECS[stage.codec].load(self.cache, stage.name, self.fingerprint(stage.name))
+
+    def is_cached(self, name: str) -> bool:
+        """
+        ステージの出力が既にあるか（実行済み、または保存された出力を読み込めるか）を返します。
+
+        保存された出力を読み込めた場合は、その値を run() で再利用します。
+        """
+        if name in self._values:
+            return True
+        value = self._load(self.stages[name])
+        if value is None:
+            return False
+        self._values[name] = value
+        self.status[name] = REUSED
+        logger.info("%s の結果をキャッシュから読み込みました", name)
+        return True
+
+    def provide(self, name: str, value: Any) -> None:
+        """グラフの外で計算したステージの出力を登録し、保存します（並列実行したステージなど）。"""
+        stage = self.stages[name]
+        self._values[name] = value
+        self.status[name] = COMPUTED
+        if self.cache is not None and stage.codec is not None:
+            _CODECS[stage.codec].store(self.cache, name, self.fingerprint(name), value)
+
+    def run(self, name: str) -> Any:
+        """
+        ステージの出力を返します。保存された出力がなければ、必要な上流のステージから実行します。
+
+        Args:
+            name: ステージ名
+
+        Returns:
+            ステージの出力
+        """
+        if self.is_cached(name):
+            return self._values[name]
+        stage = self.stages[name]
+        inputs = [self.run(upstream) for upstream in stage.inputs]
+        with instrumentation.stage(name) as s:
+            value = stage.fn(*inputs)
+            if stage.count is not None:
+                s.items = stage.count(value)
+        self.provide(name, value)
+        return value
+
+    def explain(self) -> List[Tuple[str, str, str]]:
+        """
+        ステージごとの (ステージ名, 状態, フィンガープリント) を追加した順に返します。
+
+        状態は reused（保存された出力を再利用）、computed（実行）、skipped（不要なため実行も読み込みもしていない）です。
+        """
+        return [
+            (name, self.status.get(name, SKIPPED), self.fingerprint(name)[:12])
+            for name in self.stages
+        ]
+
+    def format_explain(self) -> str:
+        """explain() を表形式の文字列にします。"""
+        width = max((len(name) for name in self.stages), default=0)
+        return "\n".join(
+            f"{name:<{width}}  {status:<8}  {fingerprint}"
+            for name, status, fingerprint in self.explain()
+        )
+
+
+def stage_params(fn: Callable[..., Any], kwargs: Dict[str, Any], exclude: Sequence[str] = ()) -> Dict[str, Any]:
+    """
+    関数とキーワード引数からステージのパラメータを作ります（関数名も含めます）。
+
+    Args:
+        fn: ステージで呼び出す関数
+        kwargs: キーワード引数
+        exclude: 出力に影響しないため含めない引数名（デバイスなど）
+
+    Returns:
+        Dict[str, Any]: ステージのパラメータ
+    """
+    params = {k: v for k, v in kwargs.items() if k not in exclude}
+    params["function"] = f"{fn.__module__}.{fn.__qualname__}"
+    return params
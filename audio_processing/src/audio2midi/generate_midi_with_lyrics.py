@@ -7,10 +7,19 @@
 
 import json
 import csv
+import logging
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 import unicodedata
-from midiutil import MIDIFile
+
+import numpy as np
+
+from .note_table import NoteTable
+from .smf_writer import SMFWriter, TempoMap
+
+Segments = Union[List[Dict], NoteTable]
+
+logger = logging.getLogger(__name__)
 
 def convert_to_safe_text(text: str) -> str:
     """
@@ -26,95 +35,124 @@ def convert_to_safe_text(text: str) -> str:
     # この例では単純にASCII文字以外を削除
     return ''.join(ch for ch in text if ord(ch) < 128)
 
+def _iter_table_segments(
+    table: NoteTable,
+    lyrics: Optional[Sequence[str]] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    NoteTable の各ノートを、マッチング結果と同じ形式の辞書として1件ずつ返します。
+
+    歌詞は lyric_index 列で lyrics を参照します（-1 または lyrics 未指定の場合は空文字列）。
+    """
+    lyrics = lyrics or []
+    for start, end, note, lyric_index in zip(
+        table.start.tolist(), table.end.tolist(),
+        table.pitch.tolist(), table.lyric_index.tolist()
+    ):
+        text = lyrics[lyric_index] if 0 <= lyric_index < len(lyrics) else ""
+        yield {
+            "text_segment": {"start": start, "end": end, "text": text},
+            "note_segment": {"start": start, "end": end, "note": note},
+            "overlap_start": start,
+            "overlap_end": end
+        }
+
+def _segment_columns(
+    matched_segments: Segments,
+    lyrics: Optional[Sequence[str]] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    """
+    セグメントを開始時間順に並べ、(開始時間, 終了時間, ノート番号, テキスト) の列にします。
+
+    NoteTable は辞書に変換せず、列をそのまま使います。
+    """
+    if isinstance(matched_segments, NoteTable):
+        table = matched_segments.sorted()
+        lyrics = lyrics or []
+        texts = [
+            lyrics[i] if 0 <= i < len(lyrics) else ""
+            for i in table.lyric_index.tolist()
+        ]
+        return table.start, table.end, table.pitch, texts
+
+    segments = sorted(matched_segments, key=lambda x: x["overlap_start"])
+    start = np.array([s["overlap_start"] for s in segments], dtype=np.float64)
+    end = np.array([s["overlap_end"] for s in segments], dtype=np.float64)
+    note = np.array([s["note_segment"]["note"] for s in segments], dtype=np.float64)
+    return start, end, note, [s["text_segment"]["text"] for s in segments]
+
 def create_midi_with_lyrics(
-    matched_segments: List[Dict],
+    matched_segments: Segments,
     output_file: str,
     tempo: int = 120,
     velocity: int = 100,
     min_duration: float = 0.1,  # 最小ノート長を追加
-    text_offset: float = 0.01   # テキストイベントのオフセットを追加
+    text_offset: float = 0.01,  # テキストイベントのオフセットを追加
+    lyrics: Optional[Sequence[str]] = None,
+    lyric_encoding: str = "utf-8"
 ) -> None:
     """
     マッチングされたセグメントからMIDIファイルを生成します。
+
+    ノートのトラックと歌詞のトラック（lyric メタイベント）を smf_writer で直接書き出します。
     
     Args:
-        matched_segments: マッチングされたセグメントのリスト
+        matched_segments: マッチングされたセグメントのリスト、または NoteTable
         output_file: 出力MIDIファイルパス
         tempo: テンポ（BPM）
         velocity: ノートのベロシティ（0-127）
         min_duration: 最小ノート長（秒）
         text_offset: テキストイベントの時間オフセット（秒）
+        lyrics: NoteTable の lyric_index が参照する歌詞のリスト
+        lyric_encoding: 歌詞の文字コード（"utf-8" または "shift_jis"）
     """
-    midi = MIDIFile(2)  # 2トラックに変更（ノート用とテキスト用）
-    note_track = 0
-    text_track = 1
-    time = 0
-
-    midi.addTrackName(note_track, time, "Vocal Notes")
-    midi.addTrackName(text_track, time, "Lyrics")
-    midi.addTempo(note_track, time, tempo)
-    midi.addTempo(text_track, time, tempo)
+    start, end, note, texts = _segment_columns(matched_segments, lyrics)
+    logger.debug("Processing %d matched segments", len(note))
     
-    # デバッグ情報の出力
-    print(f"Processing {len(matched_segments)} matched segments")
+    # バリデーションチェック（不正なセグメントは件数をまとめて警告し、出力しない）
+    negative = (start < 0) | (end < 0)
+    too_short = ~negative & (end - start < min_duration)
+    note_int = np.trunc(note)
+    invalid = ~negative & ~too_short & ~((note_int >= 0) & (note_int <= 127))
+    if negative.any():
+        logger.warning("Skipped %d segments with negative time values", int(negative.sum()))
+    if too_short.any():
+        logger.warning("Skipped %d segments shorter than minimum %ss", int(too_short.sum()), min_duration)
+    if invalid.any():
+        logger.warning("Skipped %d segments with invalid MIDI note numbers", int(invalid.sum()))
+    keep = ~(negative | too_short | invalid)
     
-    # セグメントを時間でソート
-    sorted_segments = sorted(matched_segments, key=lambda x: x["overlap_start"])
-    
-    for i, segment in enumerate(sorted_segments):
-        note = segment["note_segment"]["note"]
-        start = segment["overlap_start"]
-        end = segment["overlap_end"]
-        duration = end - start
-        text = segment["text_segment"]["text"]
-        
-        # バリデーションチェックを追加
-        if start < 0 or end < 0:
-            print(f"Warning: Negative time values at segment {i} - start: {start}, end: {end}")
-            continue
-            
-        if duration < min_duration:
-            print(f"Warning: Duration {duration}s is less than minimum {min_duration}s at segment {i}")
-            continue
-            
-        if not (0 <= int(note) <= 127):
-            print(f"Warning: Invalid MIDI note number {note} at segment {i}")
-            continue
-        
-        # テキストをASCII範囲に変換
-        safe_text = convert_to_safe_text(text)
-        
-        # ノートイベントを追加（ノートトラックに）
-        try:
-            midi.addNote(note_track, 0, int(note), start, duration, velocity)
-            # テキストイベントを別トラックに追加（わずかな時間オフセットを付ける）
-            if safe_text:  # 空文字列でない場合のみ追加
-                midi.addText(text_track, start + text_offset, safe_text)
-            print(f"Added note {int(note)} at {start}s with duration {duration}s and text '{safe_text}'")
-        except Exception as e:
-            print(f"Error adding note at segment {i}: {e}")
-            print(f"Segment details: note={note}, start={start}, duration={duration}, text='{text}'")
-            continue
+    writer = SMFWriter(TempoMap.constant(tempo))
+    writer.add_note_track("Vocal Notes", start[keep], end[keep], note_int[keep].astype(np.int64), velocity)
+    # テキストイベントを別トラックに追加（わずかな時間オフセットを付ける。空文字列は追加しない）
+    lyric_index = [i for i in np.flatnonzero(keep).tolist() if texts[i]]
+    writer.add_lyric_track(
+        "Lyrics", start[lyric_index] + text_offset, [texts[i] for i in lyric_index], encoding=lyric_encoding
+    )
 
     # MIDIファイルの書き出し
     try:
-        with open(output_file, "wb") as f:
-            midi.writeFile(f)
-        print(f"Successfully wrote MIDI file to {output_file}")
+        writer.write(output_file)
+        logger.info("Successfully wrote MIDI file to %s (%d notes)", output_file, int(keep.sum()))
     except Exception as e:
-        print(f"Error writing MIDI file: {e}")
+        logger.error("Error writing MIDI file: %s", e)
 
 def export_to_json(
-    matched_segments: List[Dict],
-    output_file: str
+    matched_segments: Segments,
+    output_file: str,
+    lyrics: Optional[Sequence[str]] = None
 ) -> None:
     """
     マッチングされたセグメントをJSONファイルとして出力します。
     
     Args:
-        matched_segments: マッチングされたセグメントのリスト
+        matched_segments: マッチングされたセグメントのリスト、または NoteTable
         output_file: 出力JSONファイルパス
+        lyrics: NoteTable の lyric_index が参照する歌詞のリスト
     """
+    if isinstance(matched_segments, NoteTable):
+        matched_segments = list(_iter_table_segments(matched_segments, lyrics))
+
     output_data = {
         "segments": matched_segments,
         "metadata": {
@@ -126,17 +164,42 @@ def export_to_json(
     with open(output_file, "w", encoding="utf-8") as f:
         json.dump(output_data, f, ensure_ascii=False, indent=2)
 
+def load_segments_json(input_file: str) -> List[Dict[str, Any]]:
+    """
+    export_to_json で出力したJSONファイルからマッチング結果を読み込みます。
+
+    Args:
+        input_file: 入力JSONファイルパス
+
+    Returns:
+        List[Dict[str, Any]]: マッチングされたセグメントのリスト
+
+    Raises:
+        FileNotFoundError: ファイルが見つからない場合
+        ValueError: export_to_json の形式でない場合
+    """
+    with open(input_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not isinstance(data.get("segments"), list):
+        raise ValueError(f"マッチング結果のJSONではありません: {input_file}")
+    return data["segments"]
+
 def export_to_csv(
-    matched_segments: List[Dict],
-    output_file: str
+    matched_segments: Segments,
+    output_file: str,
+    lyrics: Optional[Sequence[str]] = None
 ) -> None:
     """
     マッチングされたセグメントをCSVファイルとして出力します。
     
     Args:
-        matched_segments: マッチングされたセグメントのリスト
+        matched_segments: マッチングされたセグメントのリスト、または NoteTable
         output_file: 出力CSVファイルパス
+        lyrics: NoteTable の lyric_index が参照する歌詞のリスト
     """
+    if isinstance(matched_segments, NoteTable):
+        matched_segments = _iter_table_segments(matched_segments, lyrics)
+
     fieldnames = [
         "start_time", "end_time", "text",
         "note", "note_start", "note_end"
@@ -157,27 +220,29 @@ def export_to_csv(
             })
 
 def export_segments(
-    matched_segments: List[Dict],
+    matched_segments: Segments,
     output_path: str,
     format: str = "midi",
+    lyrics: Optional[Sequence[str]] = None,
     **kwargs
 ) -> None:
     """
     マッチングされたセグメントを指定された形式で出力します。
     
     Args:
-        matched_segments: マッチングされたセグメントのリスト
+        matched_segments: マッチングされたセグメントのリスト、または NoteTable
         output_path: 出力ファイルパス
         format: 出力形式 ("midi", "json", "csv")
+        lyrics: NoteTable の lyric_index が参照する歌詞のリスト
         **kwargs: 各形式固有のオプション
     """
     output_path = Path(output_path)
     
     if format == "midi":
-        create_midi_with_lyrics(matched_segments, str(output_path), **kwargs)
+        create_midi_with_lyrics(matched_segments, str(output_path), lyrics=lyrics, **kwargs)
     elif format == "json":
-        export_to_json(matched_segments, str(output_path))
+        export_to_json(matched_segments, str(output_path), lyrics=lyrics)
     elif format == "csv":
-        export_to_csv(matched_segments, str(output_path))
+        export_to_csv(matched_segments, str(output_path), lyrics=lyrics)
     else:
         raise ValueError(f"Unsupported format: {format}")
\ No newline at end of file
@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/src/audio2midi/instrumentation.py
+"""
+パイプラインのステージごとの計測（処理時間・CPU時間・ピークメモリ・処理件数）
+
+stage() はコンテキストマネージャとしてもデコレータとしても使えます。計測結果は
+StageRecord としてプロセス内の MetricsRecorder（get_recorder()）に蓄積され、
+--metrics-out で JSON Lines（.jsonl など）または Prometheus のテキスト形式（.prom / .txt）
+として書き出せます。
+
+ピークメモリは resource.getrusage の ru_maxrss（プロセス開始からの最大常駐メモリ）です。
+ステージの前後で値が増えていれば、そのステージでピークが更新されたことを表します。
+
+ステージの開始・終了を知りたい場合（サービスの進捗通知など）は listen() でリスナーを登録します。
+リスナーは contextvars で管理するため、登録したコンテキスト（スレッド・タスク）内のステージだけが通知されます。
+記録先も recording() で同じようにコンテキストごとに切り替えられます（常駐サービスのジョブごとの記録など）。
+
+Usage:
+    from audio2midi.instrumentation import get_recorder, stage
+
+    with stage("pitch") as s:
+        result = extract_pitch(buffer)
+        s.items = len(result[0])
+
+    @stage("export")
+    def export(...):
+        ...
+
+    get_recorder().write("metrics.jsonl")
+"""
+
+import json
+import logging
+import sys
+import time
+from contextlib import ContextDecorator, contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_SUFFIXES = {".prom", ".txt"}
+
+# (イベント名 "start" / "end", ステージ名, 終了時の StageRecord) を受け取る関数
+StageListener = Callable[[str, str, Optional["StageRecord"]], None]
+
+_listeners: ContextVar[Tuple[StageListener, ...]] = ContextVar("audio2midi_stage_listeners", default=())
+_current_recorder: ContextVar[Optional["MetricsRecorder"]] = ContextVar("audio2midi_metrics_recorder", default=None)
+
+
+def peak_rss_mb() -> float:
+    """プロセスの最大常駐メモリ（MB）。取得できない環境では 0"""
+    if resource is None:
+        return 0.0
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # 日本語コメント: ru_maxrss の単位は Linux では KB、macOS ではバイト
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+@dataclass
+class StageRecord:
+    """
+    1回のステージ実行の計測結果。
+
+    Attributes:
+        stage: ステージ名
+        wall_seconds: 経過時間（秒）
+        cpu_seconds: プロセスの CPU 時間（秒）
+        peak_rss_mb: ステージ終了時点のプロセスの最大常駐メモリ（MB）
+        rss_growth_mb: ステージ中に最大常駐メモリが増えた量（MB）
+        items: 処理件数（フレーム数・セグメント数など。ステージごとに意味が異なります）
+        labels: 付加情報（ファイル名など）
+        started_at: 開始時刻（UNIX 時間）
+    """
+
+    stage: str
+    wall_seconds: float
+    cpu_seconds: float
+    peak_rss_mb: float
+    rss_growth_mb: float
+    items: Optional[int] = None
+    labels: Dict[str, str] = field(default_factory=dict)
+    started_at: float = 0.0
+
+
+class MetricsRecorder:
+    """StageRecord を蓄積し、JSON Lines / Prometheus のテキスト形式で書き出します。"""
+
+    def __init__(self) -> None:
+        self.records: List[StageRecord] = []
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def add(self, record: StageRecord) -> None:
+        self.records.append(record)
+
+    def extend(self, records: List[Dict[str, Any]], **labels: str) -> None:
+        """
+        辞書形式の記録（ワーカープロセスから受け取ったものなど）を追加します。
+
+        Args:
+            records: StageRecord を asdict() した辞書のリスト
+            **labels: 各記録に追加するラベル
+        """
+        for record in records:
+            record = dict(record)
+            record["labels"] = {**record.get("labels", {}), **labels}
+            self.add(StageRecord(**record))
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """蓄積した記録を辞書のリストとして取り出し、空にします。"""
+        records = [asdict(r) for r in self.records]
+        self.records = []
+        return records
+
+    def clear(self) -> None:
+        self.records = []
+
+    def to_jsonl(self) -> str:
+        """1記録1行の JSON Lines"""
+        return "".join(json.dumps(asdict(r), ensure_ascii=False) + "\n" for r in self.records)
+
+    def to_prometheus(self) -> str:
+        """
+        ステージごとに集計した Prometheus のテキスト形式。
+
+        時間と件数は合計、ピークメモリは最大値、runs は実行回数です。
+        """
+        totals: Dict[str, Dict[str, float]] = {}
+        for r in self.records:
+            total = totals.setdefault(r.stage, {"runs": 0, "wall": 0.0, "cpu": 0.0, "rss": 0.0, "items": 0})
+            total["runs"] += 1
+            total["wall"] += r.wall_seconds
+            total["cpu"] += r.cpu_seconds
+            total["rss"] = max(total["rss"], r.peak_rss_mb)
+            total["items"] += r.items or 0
+
+        metrics = [
+            ("audio2midi_stage_runs_total", "counter", "ステージの実行回数", "runs"),
+            ("audio2midi_stage_wall_seconds_total", "counter", "ステージの経過時間の合計（秒）", "wall"),
+            ("audio2midi_stage_cpu_seconds_total", "counter", "ステージの CPU 時間の合計（秒）", "cpu"),
+            ("audio2midi_stage_peak_rss_megabytes", "gauge", "ステージ終了時点の最大常駐メモリ（MB）", "rss"),
+            ("audio2midi_stage_items_total", "counter", "ステージの処理件数の合計", "items"),
+        ]
+        lines = []
+        for name, kind, help_text, key in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for stage_name, total in totals.items():
+                lines.append(f'{name}{{stage="{stage_name}"}} {total[key]:g}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Union[str, Path]) -> Path:
+        """
+        記録をファイルに書き出します。
+
+        拡張子が .prom / .txt の場合は Prometheus のテキスト形式、それ以外は JSON Lines です。
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        text = self.to_prometheus() if path.suffix.lower() in PROMETHEUS_SUFFIXES else self.to_jsonl()
+        path.write_text(text, encoding="utf-8")
+        return path
+
+
+_recorder = MetricsRecorder()
+
+
+def get_recorder() -> MetricsRecorder:
+    """
+    現在のコンテキストの MetricsRecorder。
+
+    recording() の with ブロック内ではその記録先、それ以外ではプロセス内で共有する記録先を返します。
+    """
+    recorder = _current_recorder.get()
+    return _recorder if recorder is None else recorder
+
+
+@contextmanager
+def recording(recorder: Optional[MetricsRecorder] = None) -> Iterator[MetricsRecorder]:
+    """
+    with ブロック内（同じコンテキスト）で実行されるステージの記録先を recorder に切り替えます。
+
+    Args:
+        recorder: 記録先（None の場合は新しい MetricsRecorder）
+
+    Returns:
+        記録先の MetricsRecorder
+    """
+    recorder = MetricsRecorder() if recorder is None else recorder
+    token = _current_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current_recorder.reset(token)
+
+
+@contextmanager
+def listen(listener: StageListener) -> Iterator[None]:
+    """
+    with ブロック内（同じコンテキスト）で実行されるステージの開始・終了を listener に通知します。
+
+    Args:
+        listener: (イベント名, ステージ名, StageRecord または None) を受け取る関数
+    """
+    token = _listeners.set(_listeners.get() + (listener,))
+    try:
+        yield
+    finally:
+        _listeners.reset(token)
+
+
+def _notify(event: str, name: str, record: Optional["StageRecord"]) -> None:
+    for listener in _listeners.get():
+        try:
+            listener(event, name, record)
+        except Exception:
+            logger.exception("ステージのリスナーでエラーが発生しました")
+
+
+class stage(ContextDecorator):
+    """
+    ステージの処理時間・CPU時間・ピークメモリ・処理件数を計測します。
+
+    with 文で使う場合は items 属性（または add_items()）に処理件数を設定できます。
+    デコレータとして使う場合は呼び出しごとに新しい計測が行われます。
+
+    Args:
+        name: ステージ名
+        recorder: 記録先（None の場合は get_recorder()）
+        **labels: 記録に付けるラベル
+    """
+
+    def __init__(self, name: str, recorder: Optional[MetricsRecorder] = None, **labels: str) -> None:
+        self.name = name
+        self.recorder = recorder
+        self.labels = labels
+        self.items: Optional[int] = None
+
+    def _recreate_cm(self) -> "stage":
+        # 日本語コメント: デコレータとして再入・並行して呼ばれても計測値が混ざらないよう毎回複製する
+        return stage(self.name, self.recorder, **self.labels)
+
+    def add_items(self, count: int) -> None:
+        self.items = (self.items or 0) + int(count)
+
+    def __enter__(self) -> "stage":
+        _notify("start", self.name, None)
+        self._rss_before = peak_rss_mb()
+        self._started_at = time.time()
+        self._cpu_started = time.process_time()
+        self._wall_started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> bool:
+        wall = time.perf_counter() - self._wall_started
+        cpu = time.process_time() - self._cpu_started
+        rss = peak_rss_mb()
+        record = StageRecord(
+            stage=self.name,
+            wall_seconds=round(wall, 6),
+            cpu_seconds=round(cpu, 6),
+            peak_rss_mb=round(rss, 3),
+            rss_growth_mb=round(rss - self._rss_before, 3),
+            items=self.items,
+            labels=dict(self.labels),
+            started_at=round(self._started_at, 3),
+        )
+        (get_recorder() if self.recorder is None else self.recorder).add(record)
+        _notify("end", self.name, record)
+        logger.debug(
+            "ステージ %s: %.3f秒 (CPU %.3f秒), ピークメモリ %.1fMB, 件数 %s",
+            self.name, wall, cpu, rss, self.items
+        )
+        return False
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/src/audio2midi/longform.py
+"""
+長時間の音声（アルバム1枚分など）をチャンクに分割して並列に文字起こしするモジュール
+
+Whisper の model.transcribe は30秒の窓を先頭から順にデコードするため、音声が長いほど
+処理時間が比例して伸びます。ここでは音声を音量の小さい位置で chunk_duration 秒程度の
+チャンクに分割し、ワーカープロセスのプール（ワーカーごとにモデルを1度だけ読み込む）で
+並列に文字起こしした後、セグメントを元の時間軸に戻して結合します。
+
+チャンクの前後には overlap 秒の重なりを付けて境界の単語が切れないようにし、
+結合時は「中点が担当範囲に入るセグメント」だけを残して重複を取り除きます。
+
+Usage:
+    from audio2midi.longform import transcribe_longform
+
+    result = transcribe_longform(buffer, workers=4, model_name="small", language="ja")
+"""
+
+import logging
+import multiprocessing
+import os
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import librosa
+import numpy as np
+
+from .audio_buffer import SAMPLE_RATE, AudioBuffer
+from .parallel_stages import _init_stage_process
+
+logger = logging.getLogger(__name__)
+
+# (音声, **オプション) -> Whisper 形式の結果
+TranscribeFn = Callable[..., Dict[str, Any]]
+
+
+def find_split_points(
+    samples: np.ndarray,
+    sr: int,
+    chunk_duration: float = 120.0,
+    search_window: float = 10.0,
+    frame_length: int = 2048,
+    hop_length: int = 512
+) -> np.ndarray:
+    """
+    音声を chunk_duration 秒程度に分割する位置を、音量の小さいフレームから選びます。
+
+    前の分割位置から chunk_duration 秒後を中心に ±search_window 秒の範囲で
+    RMS が最小のフレームを分割位置とします。
+
+    Args:
+        samples: 音声データ
+        sr: サンプリングレート
+        chunk_duration: チャンクの目安の長さ（秒）
+        search_window: 分割位置を探す範囲（秒）
+        frame_length: RMS のフレーム長（サンプル数）
+        hop_length: RMS のホップ長（サンプル数）
+
+    Returns:
+        np.ndarray: 先頭 0 と末尾 len(samples) を含む分割位置（サンプルインデックス、昇順）
+    """
+    n_samples = len(samples)
+    chunk = int(chunk_duration * sr)
+    window = int(search_window * sr)
+    boundaries = [0]
+    if n_samples <= chunk + window:
+        return np.array([0, n_samples], dtype=np.int64)
+
+    rms = librosa.feature.rms(y=np.asarray(samples), frame_length=frame_length, hop_length=hop_length)[0]
+    while n_samples - boundaries[-1] > chunk + window:
+        target = boundaries[-1] + chunk
+        lo = max((target - window) // hop_length, boundaries[-1] // hop_length + 1)
+        hi = min((target + window) // hop_length + 1, len(rms))
+        boundaries.append(int((lo + int(np.argmin(rms[lo:hi]))) * hop_length))
+    boundaries.append(n_samples)
+    return np.array(boundaries, dtype=np.int64)
+
+
+def _shift_segment(segment: Dict[str, Any], offset: float) -> Dict[str, Any]:
+    """セグメント（と単語）の時刻を offset 秒ずらしたコピーを返します。"""
+    segment = dict(segment)
+    segment["start"] = segment["start"] + offset
+    segment["end"] = segment["end"] + offset
+    if segment.get("words"):
+        segment["words"] = [
+            {**word, "start": word["start"] + offset, "end": word["end"] + offset}
+            for word in segment["words"]
+        ]
+    return segment
+
+
+def merge_chunk_segments(
+    chunk_segments: Sequence[List[Dict[str, Any]]],
+    keep_ranges: Sequence[Tuple[float, float]]
+) -> List[Dict[str, Any]]:
+    """
+    チャンクごとのセグメント（元の時間軸に変換済み）を1つのリストに結合します。
+
+    重なり部分で両方のチャンクに現れるセグメントは、中点がそのチャンクの担当範囲
+    [keep_start, keep_end) に入るものだけを残します。結合後は開始時刻が前のセグメントの
+    終了時刻より前にならないよう揃え、id を振り直します。
+
+    Args:
+        chunk_segments: チャンクごとのセグメントのリスト
+        keep_ranges: チャンクごとの担当範囲（秒）
+
+    Returns:
+        List[Dict[str, Any]]: 結合したセグメントのリスト
+    """
+    merged: List[Dict[str, Any]] = []
+    for segments, (keep_start, keep_end) in zip(chunk_segments, keep_ranges):
+        for segment in segments:
+            midpoint = (segment["start"] + segment["end"]) / 2
+            if keep_start <= midpoint < keep_end:
+                merged.append(segment)
+    merged.sort(key=lambda s: s["start"])
+
+    previous_end = 0.0
+    for index, segment in enumerate(merged):
+        segment["id"] = index
+        segment["start"] = max(segment["start"], previous_end)
+        segment["end"] = max(segment["end"], segment["start"])
+        previous_end = segment["end"]
+    return merged
+
+
+def _transcribe_chunk(
+    samples: np.ndarray,
+    sr: int,
+    offset: float,
+    transcribe_fn: Optional[TranscribeFn],
+    options: Dict[str, Any]
+) -> Dict[str, Any]:
+    """1チャンクを文字起こしし、セグメントの時刻を元の時間軸に戻します（ワーカーで実行）。"""
+    if transcribe_fn is None:
+        from .audio_to_text import transcribe_audio
+        transcribe_fn = transcribe_audio
+    result = transcribe_fn(AudioBuffer.from_array(samples, sr), **options)
+    return {
+        "segments": [_shift_segment(s, offset) for s in result.get("segments", [])],
+        "language": result.get("language"),
+    }
+
+
+def transcribe_longform(
+    audio_path: Any,
+    workers: Optional[int] = None,
+    chunk_duration: float = 120.0,
+    overlap: float = 1.0,
+    search_window: float = 10.0,
+    transcribe_fn: Optional[TranscribeFn] = None,
+    **options: Any
+) -> Dict[str, Any]:
+    """
+    長時間の音声をチャンクに分割し、ワーカープロセスで並列に文字起こしします。
+
+    Args:
+        audio_path: 音声ファイルのパス、またはデコード済みの音声（AudioBuffer）
+        workers: ワーカープロセス数（None の場合は CPU コア数とチャンク数の小さい方、1 の場合は同一プロセスで順に実行）
+        chunk_duration: チャンクの目安の長さ（秒）
+        overlap: チャンクの前後に付ける重なり（秒）
+        search_window: 分割位置を探す範囲（秒）
+        transcribe_fn: チャンクを文字起こしする関数（None の場合は audio_to_text.transcribe_audio）。
+            プロセス間で受け渡せるトップレベル関数である必要があります
+        **options: transcribe_fn に渡すオプション（model_name, device, language など）
+
+    Returns:
+        Dict[str, Any]: transcribe_audio と同じ形式の転写結果（text, segments, language）
+    """
+    buffer = audio_path if isinstance(audio_path, AudioBuffer) else AudioBuffer.from_file(audio_path, sr=SAMPLE_RATE)
+    samples, sr = buffer.samples, buffer.sr
+    boundaries = find_split_points(samples, sr, chunk_duration, search_window)
+    pad = int(overlap * sr)
+
+    jobs = []
+    keep_ranges = []
+    for start, end in zip(boundaries[:-1].tolist(), boundaries[1:].tolist()):
+        chunk_start = max(start - pad, 0)
+        chunk_end = min(end + pad, len(samples))
+        # 日本語コメント: ワーカーに送るのは読み取り専用ビューではなく連続したコピー
+        jobs.append((np.array(samples[chunk_start:chunk_end]), sr, chunk_start / sr, transcribe_fn, options))
+        keep_ranges.append((start / sr, end / sr))
+    keep_ranges[-1] = (keep_ranges[-1][0], float("inf"))
+
+    n_workers = min(workers or os.cpu_count() or 1, len(jobs))
+    logger.info("長時間モード: %.1f秒を%dチャンクに分割, ワーカー %d", buffer.duration, len(jobs), n_workers)
+    if n_workers <= 1:
+        results = [_transcribe_chunk(*job) for job in jobs]
+    else:
+        # 日本語コメント: 各ワーカーのスレッド数をコア数 / ワーカー数に制限し、モデルはワーカーごとに1度だけ読み込む
+        threads = max((os.cpu_count() or 1) // n_workers, 1)
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(n_workers, initializer=_init_stage_process, initargs=(threads,)) as pool:
+            results = pool.starmap(_transcribe_chunk, jobs, chunksize=1)
+
+    segments = merge_chunk_segments([r["segments"] for r in results], keep_ranges)
+    languages = Counter(r["language"] for r in results if r["language"])
+    return {
+        "text": "".join(s["text"] for s in segments),
+        "segments": segments,
+        "language": options.get("language") or (languages.most_common(1)[0][0] if languages else None),
+    }
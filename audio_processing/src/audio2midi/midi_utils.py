@@ -5,11 +5,18 @@
 MIDIファイル生成のためのユーティリティモジュール
 """
 
-from typing import List, Tuple
-import mido
+import logging
+from typing import List, Tuple, Union
+
+import numpy as np
+
+from .note_table import NoteTable
+from .smf_writer import SMFWriter, TempoMap
+
+logger = logging.getLogger(__name__)
 
 def note_events_to_midi(
-    note_events: List[Tuple[float, float, float]],
+    note_events: Union[List[Tuple[float, float, float]], NoteTable],
     out_path: str = "output.mid",
     bpm: int = 120,
     velocity: int = 64,
@@ -18,63 +25,38 @@ def note_events_to_midi(
     """
     ノートイベントのリストからMIDIファイルを生成します。
 
+    smf_writer でイベントを tick 順に並べてから delta time を求めるため、
+    ノートが重なっている場合も正しい時刻で書き出されます。
+
     Args:
-        note_events: [(start_time, end_time, note_value), ...] の形式のノートリスト
+        note_events: [(start_time, end_time, note_value), ...] の形式のノートリスト、または NoteTable
         out_path: 出力MIDIファイルのパス
         bpm: テンポ（拍/分）
-        velocity: ノートのベロシティ（0-127）
+        velocity: ノートのベロシティ（0-127）。NoteTable の場合は velocity 列を使用します
         ticks_per_beat: 1拍あたりのtick数
     """
-    # MIDIファイルとトラックの作成
-    mid = mido.MidiFile(ticks_per_beat=ticks_per_beat)
-    track = mido.MidiTrack(name="Vocal")
-    mid.tracks.append(track)
-
-    # テンポ設定
-    tempo = mido.bpm2tempo(bpm)
-    track.append(mido.MetaMessage('set_tempo', tempo=tempo, time=0))
-
-    # 前回のイベントのtick位置を記録
-    prev_tick = 0
-
-    # ノートイベントをソート
-    sorted_events = sorted(note_events, key=lambda x: x[0])
-
-    for start_time, end_time, note_val in sorted_events:
-        # 音高を整数に丸める
-        note_int = int(round(note_val))
-        if not 0 <= note_int <= 127:
-            print(f"Warning: Note value {note_int} out of MIDI range (0-127), skipping")
-            continue
-
-        # 秒→ticks変換
-        start_tick = int((start_time * ticks_per_beat * bpm) / 60.0)
-        end_tick = int((end_time * ticks_per_beat * bpm) / 60.0)
-
-        # Note Onイベント
-        delta_on = start_tick - prev_tick
-        track.append(mido.Message(
-            'note_on',
-            note=note_int,
-            velocity=velocity,
-            time=delta_on
-        ))
-
-        # Note Offイベント
-        delta_off = end_tick - start_tick
-        track.append(mido.Message(
-            'note_off',
-            note=note_int,
-            velocity=velocity,
-            time=delta_off
-        ))
-
-        # 前回のtick位置を更新
-        prev_tick = end_tick
+    if isinstance(note_events, NoteTable):
+        start, end, pitch = note_events.start, note_events.end, note_events.pitch
+        velocities: Union[int, np.ndarray] = note_events.velocity
+    else:
+        columns = np.array(note_events, dtype=np.float64).reshape(-1, 3)
+        start, end, pitch = columns[:, 0], columns[:, 1], columns[:, 2]
+        velocities = velocity
+
+    # 音高を整数に丸める
+    note_int = np.rint(pitch)
+    in_range = (note_int >= 0) & (note_int <= 127)
+    if not in_range.all():
+        logger.warning("%d notes out of MIDI range (0-127), skipping", int((~in_range).sum()))
+    if not isinstance(velocities, int):
+        velocities = velocities[in_range]
+
+    writer = SMFWriter(TempoMap.constant(bpm, ticks_per_beat))
+    writer.add_note_track("Vocal", start[in_range], end[in_range], note_int[in_range].astype(np.int64), velocities)
 
     # MIDIファイルの保存
     try:
-        mid.save(out_path)
-        print(f"Successfully saved MIDI file to {out_path}")
+        writer.write(out_path)
+        logger.info("Successfully saved MIDI file to %s", out_path)
     except Exception as e:
-        print(f"Error saving MIDI file: {e}") 
\ No newline at end of file
+        logger.error("Error saving MIDI file: %s", e)
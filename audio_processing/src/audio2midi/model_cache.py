@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/src/audio2midi/model_cache.py
+"""
+Whisper / CREPE モデルをプロセス内で共有するためのモデルレジストリ
+
+モデルは (モデル名, デバイス, 容量) をキーとして1プロセスにつき1度だけ読み込まれ、
+メモリ予算を超えた場合は最も長く使われていないモデルから解放されます（LRU）。
+
+Usage:
+    from audio2midi.model_cache import load_whisper_model, get_registry
+
+    model = load_whisper_model("large", device="cpu")
+    print(get_registry().stats())
+
+メモリ予算は環境変数 AUDIO2MIDI_MODEL_CACHE_MB、または configure_registry() で設定します。
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .parallel_stages import apply_stage_thread_limits
+
+# (モデル名, デバイス, 容量)
+ModelKey = Tuple[str, str, str]
+
+
+@dataclass
+class _CacheEntry:
+    """レジストリに保持されるモデルとその付随情報"""
+    model: Any
+    size_bytes: int
+    on_evict: Optional[Callable[[Any], None]] = None
+
+
+def estimate_model_bytes(model: Any) -> int:
+    """
+    モデルのおおよそのメモリ使用量（バイト）を推定します。
+
+    PyTorch モジュールはパラメータとバッファの合計、
+    Keras モデルはパラメータ数 × 4 バイト（float32）で計算します。
+    推定できない場合は 0 を返します。
+    """
+    if hasattr(model, "parameters") and hasattr(model, "buffers"):
+        tensors = list(model.parameters()) + list(model.buffers())
+        return int(sum(t.numel() * t.element_size() for t in tensors))
+    if hasattr(model, "count_params"):
+        return int(model.count_params()) * 4
+    return 0
+
+
+class ModelRegistry:
+    """
+    読み込み済みモデルを保持する LRU レジストリ。
+
+    Args:
+        max_bytes: 保持するモデルの合計サイズの上限（None の場合は無制限）
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[ModelKey, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[ModelKey, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(
+        self,
+        key: ModelKey,
+        loader: Callable[[], Any],
+        size_fn: Callable[[Any], int] = estimate_model_bytes,
+        on_evict: Optional[Callable[[Any], None]] = None
+    ) -> Any:
+        """
+        キーに対応するモデルを返します。未読み込みの場合は loader で読み込みます。
+
+        同じキーの読み込みが並行して要求された場合、読み込みは1度だけ行われます。
+
+        Args:
+            key: (モデル名, デバイス, 容量)
+            loader: モデルを読み込む関数
+            size_fn: モデルサイズ（バイト）を推定する関数
+            on_evict: モデルが解放される際に呼ばれる関数
+
+        Returns:
+            読み込み済みのモデル
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.model
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # 日本語コメント: 待っている間に他のスレッドが読み込んだ可能性がある
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.model
+                self.misses += 1
+
+            model = loader()
+            entry = _CacheEntry(model=model, size_bytes=size_fn(model), on_evict=on_evict)
+
+            with self._lock:
+                self._entries[key] = entry
+                evicted = self._evict_over_budget(keep=key)
+
+        for old in evicted:
+            if old.on_evict is not None:
+                old.on_evict(old.model)
+        return model
+
+    def _evict_over_budget(self, keep: Optional[ModelKey]) -> List[_CacheEntry]:
+        """メモリ予算を超えている間、LRU 順にエントリを取り除きます（ロック取得済みで呼ぶこと）。"""
+        evicted: List[_CacheEntry] = []
+        if self.max_bytes is None:
+            return evicted
+        for key in list(self._entries):
+            if self.total_bytes() <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            evicted.append(self._entries.pop(key))
+            self.evictions += 1
+        return evicted
+
+    def total_bytes(self) -> int:
+        """保持しているモデルの推定合計サイズ（バイト）"""
+        return sum(entry.size_bytes for entry in self._entries.values())
+
+    def keys(self) -> List[ModelKey]:
+        """保持しているモデルのキー（古い順）"""
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self) -> None:
+        """全てのモデルを解放し、カウンタをリセットします。"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+        for entry in entries:
+            if entry.on_evict is not None:
+                entry.on_evict(entry.model)
+
+    def stats(self) -> Dict[str, Any]:
+        """ヒット数・ミス数・解放数などの統計情報を返します。"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "models": len(self._entries),
+                "total_bytes": self.total_bytes(),
+                "max_bytes": self.max_bytes,
+            }
+
+
+def _budget_from_env() -> Optional[int]:
+    """環境変数 AUDIO2MIDI_MODEL_CACHE_MB からメモリ予算を読み取ります。"""
+    value = os.environ.get("AUDIO2MIDI_MODEL_CACHE_MB")
+    if not value:
+        return None
+    return int(float(value) * 1024 * 1024)
+
+
+_registry = ModelRegistry(max_bytes=_budget_from_env())
+
+
+def get_registry() -> ModelRegistry:
+    """プロセス共通のモデルレジストリを返します。"""
+    return _registry
+
+
+def configure_registry(max_bytes: Optional[int]) -> ModelRegistry:
+    """
+    プロセス共通のモデルレジストリのメモリ予算を変更します。
+
+    Args:
+        max_bytes: 合計サイズの上限（バイト）。None で無制限。
+
+    Returns:
+        ModelRegistry: 設定後のレジストリ
+    """
+    with _registry._lock:
+        _registry.max_bytes = max_bytes
+        evicted = _registry._evict_over_budget(keep=None)
+    for entry in evicted:
+        if entry.on_evict is not None:
+            entry.on_evict(entry.model)
+    return _registry
+
+
+def load_whisper_model(model_name: str = "large", device: str = "cpu") -> Any:
+    """
+    Whisper モデルをレジストリ経由で読み込みます。
+
+    Args:
+        model_name: Whisperモデル名（tiny/base/small/medium/large など）
+        device: 使用するデバイス ("cpu" or "cuda")
+
+    Returns:
+        whisper.Whisper: 読み込み済みのモデル
+    """
+    def _load() -> Any:
+        import whisper
+        apply_stage_thread_limits()
+        return whisper.load_model(model_name, device=device)
+
+    return _registry.get(("whisper", device, model_name), _load)
+
+
+def _release_crepe_model(capacity: str) -> Callable[[Any], None]:
+    """CREPE 内部のモデルキャッシュからも参照を外す関数を返します。"""
+    def _release(_model: Any) -> None:
+        import crepe.core
+        crepe.core.models[capacity] = None
+    return _release
+
+
+def load_crepe_model(capacity: str = "full") -> Any:
+    """
+    CREPE の Keras モデルをレジストリ経由で読み込みます。
+
+    crepe.predict は crepe.core.models に保持されたモデルを再利用するため、
+    ここで読み込んだモデルはそのまま crepe.predict からも使われます。
+
+    Args:
+        capacity: CREPEモデルサイズ ('tiny', 'small', 'medium', 'large', 'full')
+
+    Returns:
+        keras.Model: 読み込み済みのモデル
+    """
+    def _load() -> Any:
+        import crepe.core
+        # 日本語コメント: TensorFlow のスレッド数はモデルを構築（ランタイムを初期化）する前にしか設定できない
+        apply_stage_thread_limits()
+        return crepe.core.build_and_load_model(capacity)
+
+    return _registry.get(("crepe", "cpu", capacity), _load, on_evict=_release_crepe_model(capacity))
@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/src/audio2midi/note_table.py
+"""
+ノート情報を列指向で保持するための NoteTable と、スカラー API 用の NoteEvent
+
+NoteTable は NumPy の構造化配列（NOTE_DTYPE）をそのまま保持するため、
+1ノートあたり37バイトで済みます（タプルや辞書のリストでは1ノートあたり数百バイト）。
+segment_notes や postprocess_notes の出力とは同じ型なので、変換なしで受け渡せます。
+スライスは元の配列のビューを返すため、コピーは発生しません。
+
+time_range() 用に、整列済みかどうかと終了時間の累積最大値をテーブルごとにキャッシュします。
+そのため start・end の列は読み取り専用のビューとして返し、書き換えは table["end"] = ... で行います。
+
+Usage:
+    from audio2midi.note_table import NoteTable
+
+    table = NoteTable.from_tuples([(0.0, 0.5, 60), (0.5, 1.0, 62)])
+    chorus = table.time_range(30.0, 60.0)
+    for note in chorus:
+        print(note.start_time, note.midi_note)
+"""
+
+import sys
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# ノートの構造化配列の型（開始時間・終了時間・MIDIノート番号（連続値）・ベロシティ・平均信頼度・歌詞のインデックス）
+# segment_notes・postprocess_notes の出力と NoteTable で共通の型です
+NOTE_DTYPE = np.dtype([
+    ("start", np.float64),
+    ("end", np.float64),
+    ("pitch", np.float64),
+    ("velocity", np.uint8),
+    ("confidence", np.float64),
+    ("lyric_index", np.int32),
+])
+
+# time_range() のキャッシュが依存する列（読み取り専用のビューとして返す）
+_INDEXED_COLUMNS = ("start", "end")
+
+# ベロシティの既定値と、歌詞が割り当てられていないノートの lyric_index
+DEFAULT_VELOCITY = 100
+NO_LYRIC = -1
+
+
+def empty_notes(size: int = 0) -> np.ndarray:
+    """指定した長さのノート配列を作成します（velocity・confidence・lyric_index は既定値）。"""
+    notes = np.zeros(size, dtype=NOTE_DTYPE)
+    notes["velocity"] = DEFAULT_VELOCITY
+    notes["confidence"] = 1.0
+    notes["lyric_index"] = NO_LYRIC
+    return notes
+
+# Python 3.10 以降では __slots__ 付きのデータクラスとして定義する
+_DATACLASS_OPTIONS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
+class NoteEvent:
+    """ノートイベントを表すデータクラス"""
+    start_time: float  # 開始時間（秒）
+    end_time: float    # 終了時間（秒）
+    midi_note: float   # MIDIノート番号（連続値）
+    velocity: int = 100  # ベロシティ（音の強さ）
+    confidence: float = 1.0  # ピッチ推定の信頼度
+
+
+class NoteTable:
+    """
+    構造化配列で保持されたノートの集合。
+
+    start・end の列を data から直接書き換えた場合や、ビューを共有する別のテーブル経由で
+    書き換えた場合は、invalidate() で time_range() のキャッシュを破棄してください。
+
+    Args:
+        data: NOTE_DTYPE の構造化配列（コピーせずに保持します）
+    """
+
+    __slots__ = ("data", "_search_index")
+
+    def __init__(self, data: np.ndarray) -> None:
+        if data.dtype != NOTE_DTYPE:
+            raise TypeError(f"NoteTable requires dtype {NOTE_DTYPE}, got {data.dtype}")
+        self.data = data
+        # (開始時間順のテーブル, その終了時間の累積最大値)。未計算なら None
+        self._search_index: Optional[Tuple["NoteTable", np.ndarray]] = None
+
+    # ------------------------------------------------------------------
+    # 生成
+    # ------------------------------------------------------------------
+    @classmethod
+    def empty(cls, size: int = 0) -> "NoteTable":
+        """指定した長さの（lyric_index が NO_LYRIC の）テーブルを作成します。"""
+        return cls(empty_notes(size))
+
+    @classmethod
+    def from_arrays(
+        cls,
+        start: Any,
+        end: Any,
+        pitch: Any,
+        velocity: Any = 100,
+        confidence: Any = 1.0,
+        lyric_index: Any = NO_LYRIC
+    ) -> "NoteTable":
+        """列ごとの配列（またはスカラー）からテーブルを作成します。"""
+        table = cls.empty(len(start))
+        table.data["start"] = start
+        table.data["end"] = end
+        table.data["pitch"] = pitch
+        table.data["velocity"] = velocity
+        table.data["confidence"] = confidence
+        table.data["lyric_index"] = lyric_index
+        return table
+
+    @classmethod
+    def from_tuples(cls, notes: Sequence[Tuple[float, float, float]], velocity: int = 100) -> "NoteTable":
+        """[(start_time, end_time, midi_note), ...] からテーブルを作成します。"""
+        if len(notes) == 0:
+            return cls.empty()
+        columns = np.asarray(notes, dtype=np.float64).reshape(len(notes), -1)
+        return cls.from_arrays(columns[:, 0], columns[:, 1], columns[:, 2], velocity=velocity)
+
+    @classmethod
+    def from_events(cls, events: Iterable[NoteEvent]) -> "NoteTable":
+        """NoteEvent のリストからテーブルを作成します。"""
+        events = list(events)
+        return cls.from_arrays(
+            [e.start_time for e in events],
+            [e.end_time for e in events],
+            [e.midi_note for e in events],
+            velocity=[e.velocity for e in events],
+            confidence=[e.confidence for e in events]
+        )
+
+    @classmethod
+    def from_notes(cls, notes: np.ndarray) -> "NoteTable":
+        """
+        ノートの構造化配列からテーブルを作成します。
+
+        NOTE_DTYPE の配列はコピーせずに保持し、それ以外（start・end・pitch を含む構造化配列）は
+        同じ名前の列をコピーします（ない列は既定値）。
+        """
+        if notes.dtype == NOTE_DTYPE:
+            return cls(notes)
+        table = cls.empty(len(notes))
+        for name in notes.dtype.names:
+            if name in NOTE_DTYPE.names:
+                table.data[name] = notes[name]
+        return table
+
+    # ------------------------------------------------------------------
+    # 列へのアクセス（いずれもコピーなしのビュー。start・end は読み取り専用）
+    # ------------------------------------------------------------------
+    def _column(self, name: str) -> np.ndarray:
+        column = self.data[name]
+        if name in _INDEXED_COLUMNS:
+            column.flags.writeable = False
+        return column
+
+    @property
+    def start(self) -> np.ndarray:
+        return self._column("start")
+
+    @property
+    def end(self) -> np.ndarray:
+        return self._column("end")
+
+    @property
+    def pitch(self) -> np.ndarray:
+        return self.data["pitch"]
+
+    @property
+    def velocity(self) -> np.ndarray:
+        return self.data["velocity"]
+
+    @property
+    def confidence(self) -> np.ndarray:
+        return self.data["confidence"]
+
+    @property
+    def lyric_index(self) -> np.ndarray:
+        return self.data["lyric_index"]
+
+    @property
+    def nbytes(self) -> int:
+        """テーブルが保持する配列のバイト数"""
+        return self.data.nbytes
+
+    # ------------------------------------------------------------------
+    # シーケンスとしての振る舞い
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, index: Union[int, str, slice, np.ndarray]) -> Union[NoteEvent, np.ndarray, "NoteTable"]:
+        """
+        整数なら NoteEvent、列名なら列のビュー、
+        スライス（ビュー）・マスク・インデックス配列なら NoteTable を返します。
+        """
+        if isinstance(index, (int, np.integer)):
+            return self._event(self.data[index])
+        if isinstance(index, str):
+            return self._column(index)
+        return NoteTable(self.data[index])
+
+    def __setitem__(self, name: str, values: Any) -> None:
+        """列を書き換えます（start・end の場合は time_range() のキャッシュを破棄します）。"""
+        self.data[name] = values
+        if name in _INDEXED_COLUMNS:
+            self.invalidate()
+
+    def __iter__(self) -> Iterator[NoteEvent]:
+        for row in self.data:
+            yield self._event(row)
+
+    def __repr__(self) -> str:
+        return f"NoteTable({len(self)} notes, {self.nbytes} bytes)"
+
+    @staticmethod
+    def _event(row: np.void) -> NoteEvent:
+        return NoteEvent(
+            start_time=float(row["start"]),
+            end_time=float(row["end"]),
+            midi_note=float(row["pitch"]),
+            velocity=int(row["velocity"]),
+            confidence=float(row["confidence"])
+        )
+
+    def to_tuples(self) -> List[Tuple[float, float, float]]:
+        """
+        [(start_time, end_time, midi_note), ...] 形式に変換します。
+
+        全ノートの音高が整数値の場合（midi_notes_to_intervals の出力など）は、
+        タプル版と同じく midi_note を int で返します。
+        """
+        return list(zip(self.start.tolist(), self.end.tolist(), self.pitch_values()))
+
+    def pitch_values(self) -> List[float]:
+        """音高のリストを返します（全ノートが整数値の場合は int のリスト）。"""
+        pitch = self.pitch
+        if np.array_equal(pitch, np.round(pitch)):
+            pitch = pitch.astype(np.int64)
+        return pitch.tolist()
+
+    # ------------------------------------------------------------------
+    # 並べ替えと時間範囲の検索
+    # ------------------------------------------------------------------
+    def invalidate(self) -> None:
+        """time_range() のキャッシュ（整列状態と終了時間の累積最大値）を破棄します。"""
+        self._search_index = None
+
+    def _index(self) -> Tuple["NoteTable", np.ndarray]:
+        """開始時間順のテーブルと、その終了時間の累積最大値を返します（初回のみ計算）。"""
+        if self._search_index is None:
+            starts = self.data["start"]
+            if np.all(starts[1:] >= starts[:-1]):
+                table = self
+            else:
+                table = NoteTable(self.data[np.argsort(starts, kind="stable")])
+            # 日本語コメント: 終了時間の累積最大値は単調増加なので二分探索に使える
+            ends = table.data["end"]
+            max_end = np.maximum.accumulate(ends) if len(ends) else ends.copy()
+            self._search_index = (table, max_end)
+        return self._search_index
+
+    def is_sorted(self) -> bool:
+        """開始時間順に並んでいるかどうか"""
+        return self._index()[0] is self
+
+    def sorted(self) -> "NoteTable":
+        """開始時間順に並べたテーブルを返します（既に整列済みなら自身を返します）。"""
+        return self._index()[0]
+
+    def time_range(self, start: float, end: float) -> "NoteTable":
+        """
+        区間 [start, end) と重なるノートを返します。
+
+        整列状態と終了時間の累積最大値は初回の呼び出しで求めてキャッシュするため、
+        2回目以降は二分探索と、見つかった範囲の走査だけで済みます（O(log n + 範囲内のノート数)）。
+        ノート同士が重ならない場合は元の配列（整列済みでない場合は並べ替えたコピー）のビューを返します。
+
+        Args:
+            start: 区間の開始時間（秒）
+            end: 区間の終了時間（秒）
+
+        Returns:
+            NoteTable: 区間と重なるノート
+        """
+        table, max_end = self._index()
+        lo = int(np.searchsorted(max_end, start, side="right"))
+        hi = int(np.searchsorted(table.data["start"], end, side="left"))
+        candidates = table.data[lo:max(lo, hi)]
+        overlaps = candidates["end"] > start
+        if overlaps.all():
+            return NoteTable(candidates)
+        return NoteTable(candidates[overlaps])
+
+
+def as_note_table(notes: Union[NoteTable, np.ndarray, Sequence[Tuple[float, float, float]]]) -> NoteTable:
+    """
+    NoteTable・構造化配列・タプルのリストのいずれかを NoteTable に変換します。
+    """
+    if isinstance(notes, NoteTable):
+        return notes
+    if isinstance(notes, np.ndarray) and notes.dtype.names:
+        return NoteTable.from_notes(notes)
+    return NoteTable.from_tuples(list(notes))
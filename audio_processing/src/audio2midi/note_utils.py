@@ -5,10 +5,212 @@
 音符とセグメントの処理に関するユーティリティモジュール
 """
 
-from typing import List, Tuple, Dict, Any, Union, Optional
+import logging
+from typing import List, Tuple, Dict, Any, Union, Optional, Callable
 import numpy as np
 
+from .note_table import NoteTable, empty_notes
+from .timeline import Timeline
+
+logger = logging.getLogger(__name__)
+
+def _log_interval_header(
+    midi_notes: np.ndarray,
+    confidence: np.ndarray,
+    sr: int,
+    hop_length: int,
+    min_duration: float,
+    confidence_threshold: float
+) -> None:
+    """ノートインターバル変換の入力情報をログに記録します。"""
+    logger.debug(
+        "ノートインターバル変換: MIDIノート配列長 %d, 信頼度配列長 %d, サンプリングレート %dHz, "
+        "ホップ長 %dサンプル, 最小ノート長 %s秒, 信頼度閾値 %s",
+        len(midi_notes), len(confidence), sr, hop_length, min_duration, confidence_threshold
+    )
+
+def _log_interval_summary(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    notes: np.ndarray
+) -> None:
+    """生成されたインターバル（開始時間・終了時間・ノートの各列）の概要をログに記録します。"""
+    if not len(starts):
+        logger.warning("インターバルが生成されませんでした")
+    elif logger.isEnabledFor(logging.DEBUG):
+        durations = np.asarray(ends) - np.asarray(starts)
+        logger.debug(
+            "生成されたインターバル: %d個, 時間範囲 %.2f秒 - %.2f秒, 音域 %d - %d (MIDI note), ノート長 %.3f秒 - %.3f秒",
+            len(starts), starts[0], ends[-1], min(notes), max(notes), durations.min(), durations.max()
+        )
+
+def _split_at_anchor_changes(
+    midi_notes: np.ndarray,
+    run_start: int,
+    run_end: int,
+    tolerance: float = 0.5,
+    initial_window: int = 64
+) -> List[int]:
+    """
+    有声区間 [run_start, run_end) を、区間先頭の音高から tolerance 以上離れた位置で分割します。
+
+    分割後は新しい区間の先頭が基準になるため、次の分割点は基準からの差が閾値を超える
+    最初のフレームです。探索は窓幅を倍々に広げながら NumPy で行うため、
+    安定した長いノートでも Python のループはノート数回で済みます。
+
+    Returns:
+        List[int]: 各ノートの開始フレーム（run_start を含む）
+    """
+    starts = [run_start]
+    anchor_index = run_start
+    while True:
+        anchor = midi_notes[anchor_index]
+        search_from = anchor_index + 1
+        window = initial_window
+        change = -1
+        while search_from < run_end:
+            search_to = min(search_from + window, run_end)
+            jumps = np.abs(midi_notes[search_from:search_to] - anchor) >= tolerance
+            if jumps.any():
+                change = search_from + int(np.argmax(jumps))
+                break
+            search_from = search_to
+            window *= 2
+        if change < 0:
+            return starts
+        starts.append(change)
+        anchor_index = change
+
+def _segment_voiced_runs(
+    midi_notes: np.ndarray,
+    voiced: np.ndarray,
+    tolerance: float = 0.5
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    有声区間をノート単位に分割し、各ノートの開始・終了フレームを返します。
+
+    まず np.diff で隣接フレーム間の音高の跳躍を分割候補とし、各候補区間が
+    「区間先頭から tolerance 未満の範囲に収まり、次の区間の先頭で tolerance 以上離れる」
+    ことを配列演算でまとめて検証します。検証に通らない有声区間（緩やかなグライドなど）のみ
+    _split_at_anchor_changes で逐次的に分割します。
+
+    Returns:
+        (開始フレームの配列, 終了フレームの配列)
+    """
+    n_frames = len(voiced)
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+    if len(run_starts) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+
+    # 分割候補: 有声区間の先頭と、有声フレーム間で tolerance 以上跳躍した位置
+    filled = np.where(voiced, midi_notes, 0.0)
+    jumps = np.zeros(n_frames, dtype=bool)
+    jumps[1:] = voiced[1:] & voiced[:-1] & (np.abs(np.diff(filled)) >= tolerance)
+    is_start = jumps.copy()
+    is_start[run_starts] = True
+    seg_starts = np.flatnonzero(is_start)
+
+    run_id = np.cumsum(edges[:-1] == 1) - 1  # フレームが属する有声区間（無声フレームは直前の区間）
+    seg_run = run_id[seg_starts]
+    seg_ends = np.minimum(np.append(seg_starts[1:], n_frames), run_ends[seg_run])
+
+    # 検証1: 各候補区間が区間先頭の音高から tolerance 未満に収まっている
+    seg_id = np.cumsum(is_start) - 1
+    seg_id[seg_id < 0] = 0
+    deviation = np.where(voiced, np.abs(filled - filled[seg_starts[seg_id]]), 0.0)
+    within = np.maximum.reduceat(deviation, seg_starts) < tolerance
+    # 検証2: 跳躍で終わる区間は、次の区間の先頭が区間先頭から tolerance 以上離れている
+    ends_at_jump = seg_ends < run_ends[seg_run]
+    jump_index = np.minimum(seg_ends, n_frames - 1)
+    separated = ~ends_at_jump | (np.abs(filled[jump_index] - filled[seg_starts]) >= tolerance)
+
+    bad_runs = np.unique(seg_run[~(within & separated)])
+    if len(bad_runs) == 0:
+        return seg_starts.astype(np.int64), seg_ends.astype(np.int64)
+
+    # 検証に通らなかった有声区間のみ逐次的に分割し直す
+    good = ~np.isin(seg_run, bad_runs)
+    starts_list = [seg_starts[good]]
+    ends_list = [seg_ends[good]]
+    for run_start, run_end in zip(run_starts[bad_runs].tolist(), run_ends[bad_runs].tolist()):
+        starts = _split_at_anchor_changes(midi_notes, run_start, run_end, tolerance)
+        starts_list.append(np.asarray(starts, dtype=np.int64))
+        ends_list.append(np.asarray(starts[1:] + [run_end], dtype=np.int64))
+    starts_arr = np.concatenate(starts_list).astype(np.int64)
+    ends_arr = np.concatenate(ends_list).astype(np.int64)
+    order = np.argsort(starts_arr, kind="stable")
+    return starts_arr[order], ends_arr[order]
+
 def midi_notes_to_intervals(
+    midi_notes: np.ndarray,
+    confidence: np.ndarray,
+    sr: int,
+    hop_length: int = 160,  # CREPEのstep_size=10msに対応（10ms * 16000Hz = 160サンプル）
+    min_duration: float = 0.1,
+    confidence_threshold: float = 0.5,  # 信頼度の閾値
+    as_table: bool = False,
+    timeline: Optional[Timeline] = None
+) -> Union[List[Tuple[float, float, float]], NoteTable]:
+    """
+    連続したMIDIノートをインターバル（開始時間、終了時間、ノート）に変換します。
+
+    有声フレームのマスクから np.diff で有声区間と音高の変化点を求めてノートに分割し、
+    最小ノート長に満たないものを配列演算でまとめて除外します。
+    結果は midi_notes_to_intervals_reference と完全に一致します。
+
+    Args:
+        midi_notes: MIDIノート番号の配列
+        confidence: CREPEによる信頼度スコアの配列
+        sr: サンプリングレート
+        hop_length: フレーム間のホップ長（サンプル数）
+        min_duration: 最小ノート長（秒）
+        confidence_threshold: 信頼度の閾値
+        as_table: True の場合、タプルのリストの代わりに NoteTable を返す
+        timeline: フレームの時間軸（指定した場合は sr と hop_length の代わりに使い、
+            ノートの時刻は timeline.offset を含む絶対時刻になる）
+
+    Returns:
+        List of (start_time, end_time, note)、または as_table=True の場合は NoteTable
+    """
+    if timeline is None:
+        timeline = Timeline(sr=sr, hop_length=hop_length)
+    _log_interval_header(
+        midi_notes, confidence, timeline.sr, timeline.hop_length, min_duration, confidence_threshold
+    )
+
+    midi_notes = np.asarray(midi_notes, dtype=np.float64)
+    confidence = np.asarray(confidence)
+    frame_duration = timeline.frame_duration  # 1フレームあたりの秒数
+    # 日本語コメント: 参照実装の zip と同様に短い方の長さまでを走査する
+    n_frames = min(len(midi_notes), len(confidence))
+
+    # 有声フレームのマスクと有声区間（ランレングス）
+    with np.errstate(invalid="ignore"):
+        voiced = (confidence[:n_frames] >= confidence_threshold) & ~np.isnan(midi_notes[:n_frames])
+    starts_arr, ends_arr = _segment_voiced_runs(midi_notes[:n_frames], voiced)
+
+    # 最後まで有声のノートは配列末尾で終わる（参照実装の「最後のノートの処理」）
+    ends_arr[ends_arr == n_frames] = len(midi_notes)
+
+    # 最小ノート長によるフィルタリング
+    keep = (ends_arr - starts_arr) * frame_duration >= min_duration
+    starts_arr = starts_arr[keep]
+    ends_arr = ends_arr[keep]
+
+    start_times = timeline.frame_to_time(starts_arr)
+    end_times = timeline.frame_to_time(ends_arr)
+    notes = np.round(midi_notes[starts_arr]).astype(np.int64)
+
+    _log_interval_summary(start_times, end_times, notes)
+
+    if as_table:
+        return NoteTable.from_arrays(start_times, end_times, notes)
+    return list(zip(start_times.tolist(), end_times.tolist(), notes.tolist()))
+
+def midi_notes_to_intervals_reference(
     midi_notes: np.ndarray,
     confidence: np.ndarray,
     sr: int,
@@ -19,6 +221,9 @@ def midi_notes_to_intervals(
     """
     連続したMIDIノートをインターバル（開始時間、終了時間、ノート）に変換します。
 
+    フレームごとに Python のループで処理する参照実装です。
+    midi_notes_to_intervals はこの関数と同じ結果を返すことをテストで確認しています。
+
     Args:
         midi_notes: MIDIノート番号の配列
         confidence: CREPEによる信頼度スコアの配列
@@ -30,14 +235,7 @@ def midi_notes_to_intervals(
     Returns:
         List of (start_time, end_time, note)
     """
-    print(f"\nノートインターバル変換デバッグ情報:")
-    print(f"入力データ情報:")
-    print(f"- MIDIノート配列長: {len(midi_notes)}")
-    print(f"- 信頼度配列長: {len(confidence)}")
-    print(f"- サンプリングレート: {sr}Hz")
-    print(f"- ホップ長: {hop_length}サンプル")
-    print(f"- 最小ノート長: {min_duration}秒")
-    print(f"- 信頼度閾値: {confidence_threshold}")
+    _log_interval_header(midi_notes, confidence, sr, hop_length, min_duration, confidence_threshold)
 
     intervals = []
     current_note = None
@@ -80,38 +278,119 @@ def midi_notes_to_intervals(
                 round(current_note)
             ))
 
-    print(f"\n生成されたインターバル:")
-    print(f"- インターバル数: {len(intervals)}")
-    if intervals:
-        print(f"- 時間範囲: {intervals[0][0]:.2f}秒 - {intervals[-1][1]:.2f}秒")
-        notes = [interval[2] for interval in intervals]
-        print(f"- 音域範囲: {min(notes)} - {max(notes)} (MIDI note)")
-        durations = [interval[1] - interval[0] for interval in intervals]
-        print(f"- ノート長範囲: {min(durations):.3f}秒 - {max(durations):.3f}秒")
-        print(f"- 総時間: {intervals[-1][1]:.2f}秒")
-    else:
-        print("警告: インターバルが生成されませんでした")
+    _log_interval_summary(
+        [interval[0] for interval in intervals],
+        [interval[1] for interval in intervals],
+        [interval[2] for interval in intervals]
+    )
 
     return intervals
 
+def _log_matching_header(
+    segments: List[Dict[str, Union[float, str]]],
+    n_notes: int,
+    first_note: Optional[Tuple[float, float]] = None,
+    last_note: Optional[Tuple[float, float]] = None
+) -> None:
+    """マッチングの入力情報（セグメント数・ノート数と最初・最後のノートの時間範囲）をログに記録します。"""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    logger.debug("マッチング入力: セグメント数 %d, ノート数 %d", len(segments), n_notes)
+    if segments:
+        logger.debug(
+            "セグメントの時間範囲: 最初 %ss - %ss, 最後 %ss - %ss",
+            segments[0]['start'], segments[0]['end'], segments[-1]['start'], segments[-1]['end']
+        )
+    if n_notes:
+        logger.debug(
+            "ノートの時間範囲: 最初 %ss - %ss, 最後 %ss - %ss",
+            first_note[0], first_note[1], last_note[0], last_note[1]
+        )
+
+def segments_to_words(segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Whisper のセグメントを単語単位のセグメントに展開します。
+
+    transcribe_audio(word_timestamps=True) の結果に含まれる各セグメントの
+    "words" を {"start", "end", "text", "segment_id"} の形式に変換します。
+    "words" を持たないセグメントはそのまま残します。
+
+    Args:
+        segments: Whisper のセグメントのリスト
+
+    Returns:
+        単語単位のセグメントのリスト
+    """
+    words: List[Dict[str, Any]] = []
+    for segment in segments:
+        segment_words = segment.get("words")
+        if not segment_words:
+            words.append(segment)
+            continue
+        for word in segment_words:
+            words.append({
+                "start": word["start"],
+                "end": word["end"],
+                "text": word["word"].strip(),
+                "segment_id": segment.get("id")
+            })
+    return words
+
+def _note_columns(
+    notes: Union[List[Tuple[float, float, float]], NoteTable]
+) -> Tuple[np.ndarray, np.ndarray, List[Any]]:
+    """
+    ノートを開始時間順の (開始時間の配列, 終了時間の配列, 音高のリスト) に変換します。
+
+    既に開始時間順に並んでいる場合は並べ替えを行いません。
+    """
+    if isinstance(notes, NoteTable):
+        table = notes.sorted()
+        return table.start, table.end, table.pitch_values()
+
+    n_notes = len(notes)
+    starts = np.fromiter((n[0] for n in notes), dtype=np.float64, count=n_notes)
+    ends = np.fromiter((n[1] for n in notes), dtype=np.float64, count=n_notes)
+    pitches = [n[2] for n in notes]
+    if n_notes and np.any(starts[1:] < starts[:-1]):
+        order = np.argsort(starts, kind="stable")
+        starts, ends = starts[order], ends[order]
+        pitches = [pitches[k] for k in order.tolist()]
+    return starts, ends, pitches
+
+# 1バッチで展開する (セグメント, ノート) 候補ペアの上限（メモリ使用量の制限）
+_MAX_CANDIDATES = 1 << 22
+
 def match_segments_and_notes(
     segments: List[Dict[str, Union[float, str]]],
-    notes: List[Tuple[float, float, float]]
+    notes: Union[List[Tuple[float, float, float]], NoteTable],
+    word_level: bool = False
 ) -> List[Dict[str, Any]]:
     """
     Whisperのセグメント(start, end, text)リストと
     ノート情報(start_sec, end_sec, note_val)をマッチングさせます。
 
+    ノートを開始時間順に並べ、終了時間の累積最大値と開始時間に対する二分探索で
+    各セグメントと重なり得るノートの範囲を求めます（ソート＆スイープ）。
+    重なりのある (セグメント, ノート) の組をすべて報告するため、
+    1つのノートが複数のセグメントにまたがる場合や、1つのセグメントが
+    複数のノートを含む場合もすべて出力されます。
+    計算量は O((n+m) log n + 出力数) です（ノート同士が重ならない場合）。
+
     Parameters
     ----------
     segments : list of dict
         例: [{"start": 2.0, "end": 3.5, "text": "あ"}, ...]
-    notes : list of tuple
+    notes : list of tuple or NoteTable
         例: [(start_sec, end_sec, note_val), ...]
+    word_level : bool, optional
+        True の場合、セグメントの "words"（Whisper の word_timestamps）を
+        単語単位のセグメントとしてマッチングします
 
     Returns
     -------
     list of dict
+        セグメントの開始時間順、同一セグメント内はノートの開始時間順
         [
           {
             "text_segment": {"start":..., "end":..., "text":...},
@@ -122,20 +401,118 @@ def match_segments_and_notes(
           ...
         ]
     """
-    # デバッグ情報の出力
-    print("\nデバッグ情報:")
-    print(f"セグメント数: {len(segments)}")
-    print(f"ノート数: {len(notes)}")
-    
-    if segments:
-        print("\nセグメントの時間範囲:")
-        print(f"最初のセグメント: {segments[0]['start']}s - {segments[0]['end']}s")
-        print(f"最後のセグメント: {segments[-1]['start']}s - {segments[-1]['end']}s")
-    
+    if word_level:
+        segments = segments_to_words(segments)
+
+    note_starts, note_ends, note_pitches = _note_columns(notes)
+    n_notes = len(note_starts)
+    if n_notes:
+        _log_matching_header(
+            segments, n_notes,
+            (note_starts[0].item(), note_ends[0].item()),
+            (note_starts[-1].item(), note_ends[-1].item())
+        )
+    else:
+        _log_matching_header(segments, n_notes)
+
+    matched: List[Dict[str, Any]] = []
+    if not segments or not n_notes:
+        logger.debug("マッチング結果: %d個のセグメントが見つかりました", len(matched))
+        return matched
+
+    seg_starts = np.fromiter((w["start"] for w in segments), dtype=np.float64, count=len(segments))
+    seg_ends = np.fromiter((w["end"] for w in segments), dtype=np.float64, count=len(segments))
+    seg_order = np.argsort(seg_starts, kind="stable")
+
+    # 日本語コメント: 終了時間の累積最大値は単調増加なので、セグメント開始より後に終わるノートの先頭を二分探索できる
+    max_ends = np.maximum.accumulate(note_ends)
+    lo = np.searchsorted(max_ends, seg_starts[seg_order], side="right")
+    hi = np.searchsorted(note_starts, seg_ends[seg_order], side="left")
+    counts = np.maximum(hi - lo, 0)
+
+    # 候補ペアの総数が上限を超えないよう、セグメントをバッチに分けて展開する
+    batch_starts = [0]
+    cumulative = np.cumsum(counts)
+    while batch_starts[-1] < len(seg_order):
+        base = cumulative[batch_starts[-1] - 1] if batch_starts[-1] else 0
+        next_start = int(np.searchsorted(cumulative, base + _MAX_CANDIDATES, side="right"))
+        batch_starts.append(max(next_start, batch_starts[-1] + 1))
+
+    # 日本語コメント: 辞書の生成時に NumPy スカラーを作らないよう、Python のリストから参照する
+    note_start_list = note_starts.tolist()
+    note_end_list = note_ends.tolist()
+
+    for b0, b1 in zip(batch_starts[:-1], batch_starts[1:]):
+        batch_counts = counts[b0:b1]
+        total = int(batch_counts.sum())
+        if total == 0:
+            continue
+        seg_idx = np.repeat(seg_order[b0:b1], batch_counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(batch_counts) - batch_counts, batch_counts)
+        note_idx = np.repeat(lo[b0:b1], batch_counts) + offsets
+
+        overlap_starts = np.maximum(seg_starts[seg_idx], note_starts[note_idx])
+        overlap_ends = np.minimum(seg_ends[seg_idx], note_ends[note_idx])
+        keep = overlap_starts < overlap_ends
+
+        for w_idx, n_idx, o_start, o_end in zip(
+            seg_idx[keep].tolist(), note_idx[keep].tolist(),
+            overlap_starts[keep].tolist(), overlap_ends[keep].tolist()
+        ):
+            matched.append({
+                "text_segment": segments[w_idx],
+                "note_segment": {
+                    "start": note_start_list[n_idx],
+                    "end": note_end_list[n_idx],
+                    "note": note_pitches[n_idx]
+                },
+                "overlap_start": o_start,
+                "overlap_end": o_end
+            })
+
+    logger.debug("マッチング結果: %d個のセグメントが見つかりました", len(matched))
+    return matched
+
+def match_segments_and_notes_two_pointer(
+    segments: List[Dict[str, Union[float, str]]],
+    notes: Union[List[Tuple[float, float, float]], NoteTable]
+) -> List[Dict[str, Any]]:
+    """
+    Whisperのセグメント(start, end, text)リストと
+    ノート情報(start_sec, end_sec, note_val)をマッチングさせます。
+
+    セグメントとノートを1つずつ進める2ポインタ法による従来の実装です。
+    各ステップで片側しか進めないため、複数のセグメントにまたがるノートや
+    複数のノートを含むセグメントの重なりの一部を取りこぼします。
+    比較用（benchmarks/bench_matching.py）に残しています。
+
+    Parameters
+    ----------
+    segments : list of dict
+        例: [{"start": 2.0, "end": 3.5, "text": "あ"}, ...]
+    notes : list of tuple or NoteTable
+        例: [(start_sec, end_sec, note_val), ...]
+
+    Returns
+    -------
+    list of dict
+        [
+          {
+            "text_segment": {"start":..., "end":..., "text":...},
+            "note_segment": {"start":..., "end":..., "note":...},
+            "overlap_start": float,
+            "overlap_end": float
+          },
+          ...
+        ]
+    """
+    if isinstance(notes, NoteTable):
+        notes = notes.sorted().to_tuples()
+
     if notes:
-        print("\nノートの時間範囲:")
-        print(f"最初のノート: {notes[0][0]}s - {notes[0][1]}s")
-        print(f"最後のノート: {notes[-1][0]}s - {notes[-1][1]}s")
+        _log_matching_header(segments, len(notes), notes[0][:2], notes[-1][:2])
+    else:
+        _log_matching_header(segments, len(notes))
 
     matched = []
     i, j = 0, 0
@@ -168,7 +545,7 @@ def match_segments_and_notes(
         else:
             j += 1
 
-    print(f"\nマッチング結果: {len(matched)}個のセグメントが見つかりました")
+    logger.debug("マッチング結果: %d個のセグメントが見つかりました", len(matched))
     return matched
 
 def convert_pitch_to_note(pitch_value):
@@ -179,7 +556,318 @@ def convert_pitch_to_note(pitch_value):
     # 実際の変換ロジックをここに書く
     pass
 
+NotesLike = Union[List[Tuple[float, float, float]], np.ndarray, NoteTable]
+
+# 列: (開始時間, 終了時間, 音高, 信頼度, 入力での位置)
+_Columns = Tuple[Any, Any, Any, Any, Any]
+
+def _merge_short_kernel(
+    starts: Any,
+    ends: Any,
+    pitches: Any,
+    confidences: Any,
+    indices: Any,
+    n_notes: int,
+    min_duration: float,
+    tolerance: float,
+    out_start: Any,
+    out_end: Any,
+    out_pitch: Any,
+    out_confidence: Any,
+    out_index: Any
+) -> int:
+    """
+    開始時間順の列に対して短いノートのマージを1パスで行い、出力したノート数を返します。
+
+    次のノートへのマージは入力の列を書き換えて行います。
+    confidence 列は pitch と同様にノート長で重み付けして平均します。
+    マージ先のノート（残る方のノート）の入力での位置を out_index に書き込みます。
+    numba の njit と Python の両方で動作するよう、基本的な演算のみで書いています。
+    """
+    count = 0
+    for i in range(n_notes):
+        start = starts[i]
+        end = ends[i]
+        note = pitches[i]
+        duration = end - start
+
+        if duration >= min_duration:
+            out_start[count] = start
+            out_end[count] = end
+            out_pitch[count] = note
+            out_confidence[count] = confidences[i]
+            out_index[count] = indices[i]
+            count += 1
+        elif count > 0:
+            # 前のノートとのマージを試みる
+            prev_duration = out_end[count - 1] - out_start[count - 1]
+            if abs(note - out_pitch[count - 1]) <= tolerance:
+                total = prev_duration + duration
+                out_pitch[count - 1] = (out_pitch[count - 1] * prev_duration + note * duration) / total
+                out_confidence[count - 1] = (out_confidence[count - 1] * prev_duration + confidences[i] * duration) / total
+                out_end[count - 1] = end
+        elif i + 1 < n_notes:
+            # 次のノートとのマージを試みる
+            next_duration = ends[i + 1] - starts[i + 1]
+            if abs(note - pitches[i + 1]) <= tolerance:
+                # 日本語コメント: 浮動小数点の結果を参照実装と揃えるため同じ順序で計算する
+                total = duration + ends[i + 1] - starts[i + 1]
+                pitches[i + 1] = (note * duration + pitches[i + 1] * next_duration) / total
+                confidences[i + 1] = (confidences[i] * duration + confidences[i + 1] * next_duration) / total
+                starts[i + 1] = start
+        # マージできない短いノートは無視
+
+    return count
+
+def _smooth_vibrato_kernel(
+    starts: Any,
+    ends: Any,
+    pitches: Any,
+    confidences: Any,
+    indices: Any,
+    n_notes: int,
+    time_window: float,
+    cent_tolerance: float,
+    out_start: Any,
+    out_end: Any,
+    out_pitch: Any,
+    out_confidence: Any,
+    out_index: Any,
+    max_queue: Any,
+    min_queue: Any
+) -> int:
+    """
+    開始時間順の列に対してビブラートの平滑化を1パスで行い、出力したノート数を返します。
+
+    時間窓の終端は開始ノートとともに単調に進むため、窓の右端のポインタと
+    窓内の最大・最小音高を保持する単調キュー（max_queue / min_queue、長さ n_notes）を使い回し、
+    窓ごとのリストを作りません。重み付き平均はマージする窓に対してのみ参照実装と同じ順序で
+    合計するため、結果は smooth_vibrato_reference と一致します。
+    マージした窓は先頭のノートの入力での位置を out_index に書き込みます。
+    """
+    count = 0
+    max_head = max_tail = 0
+    min_head = min_tail = 0
+    i = j = 0
+
+    while i < n_notes:
+        # 時間窓 [i, j) を右に広げる
+        window_end = starts[i] + time_window
+        if j < i:
+            j = i
+        while j < n_notes and starts[j] < window_end:
+            pitch = pitches[j]
+            while max_tail > max_head and pitches[max_queue[max_tail - 1]] <= pitch:
+                max_tail -= 1
+            max_queue[max_tail] = j
+            max_tail += 1
+            while min_tail > min_head and pitches[min_queue[min_tail - 1]] >= pitch:
+                min_tail -= 1
+            min_queue[min_tail] = j
+            min_tail += 1
+            j += 1
+        while max_tail > max_head and max_queue[max_head] < i:
+            max_head += 1
+        while min_tail > min_head and min_queue[min_head] < i:
+            min_head += 1
+
+        if j - i > 1 and (pitches[max_queue[max_head]] - pitches[min_queue[min_head]]) * 100 <= cent_tolerance:
+            # ビブラートとみなしてマージ（重み付き平均で新しい音程を計算）
+            total_duration = 0.0
+            weighted_pitch = 0.0
+            weighted_confidence = 0.0
+            for m in range(i, j):
+                total_duration += ends[m] - starts[m]
+            for m in range(i, j):
+                weighted_pitch += (ends[m] - starts[m]) * pitches[m]
+            for m in range(i, j):
+                weighted_confidence += (ends[m] - starts[m]) * confidences[m]
+            out_start[count] = starts[i]
+            out_end[count] = ends[j - 1]
+            out_pitch[count] = weighted_pitch / total_duration
+            out_confidence[count] = weighted_confidence / total_duration
+            out_index[count] = indices[i]
+            count += 1
+            i = j
+            continue
+
+        out_start[count] = starts[i]
+        out_end[count] = ends[i]
+        out_pitch[count] = pitches[i]
+        out_confidence[count] = confidences[i]
+        out_index[count] = indices[i]
+        count += 1
+        i += 1
+
+    return count
+
+_jit_kernels: Dict[str, Callable[..., int]] = {}
+
+def _get_jit_kernel(kernel: Callable[..., int]) -> Optional[Callable[..., int]]:
+    """numba が利用可能な場合、JITコンパイルしたカーネルを返します（numba は初回のみ import）。"""
+    if kernel.__name__ not in _jit_kernels:
+        try:
+            from numba import njit
+        except ImportError:  # numba は任意依存
+            return None
+        _jit_kernels[kernel.__name__] = njit(cache=True, nogil=True)(kernel)
+    return _jit_kernels[kernel.__name__]
+
+def _sorted_columns(notes: NotesLike) -> _Columns:
+    """
+    ノートを開始時間順（安定ソート）の列に変換します。
+
+    構造化配列と NoteTable は NumPy 配列の列（コピー）に、タプルのリストは
+    Python のリストの列に変換します。既に開始時間順に並んでいる場合は並べ替えを行いません。
+    最後の列は各ノートの入力での位置です（ベロシティや歌詞のインデックスを引き継ぐために使います）。
+    """
+    if isinstance(notes, (np.ndarray, NoteTable)):
+        data = notes.data if isinstance(notes, NoteTable) else notes
+        starts = np.asarray(data["start"], dtype=np.float64)
+        if np.all(starts[1:] >= starts[:-1]):
+            order = np.arange(len(data))
+        else:
+            order = np.argsort(starts, kind="stable")
+        return (
+            starts[order], np.asarray(data["end"], dtype=np.float64)[order],
+            np.asarray(data["pitch"], dtype=np.float64)[order],
+            np.asarray(data["confidence"], dtype=np.float64)[order], order
+        )
+
+    starts = [n[0] for n in notes]
+    columns = (starts, [n[1] for n in notes], [n[2] for n in notes], [0.0] * len(starts))
+    if all(a <= b for a, b in zip(starts, starts[1:])):
+        return (*columns, list(range(len(starts))))
+    order = sorted(range(len(starts)), key=starts.__getitem__)
+    return (*([column[k] for k in order] for column in columns), order)
+
+def _run_kernel(kernel: Callable[..., int], columns: _Columns, *params: float) -> _Columns:
+    """
+    列に対してカーネルを実行し、出力の列を返します（入力の列は書き換えられます）。
+
+    配列の列は numba が利用可能ならJITコンパイルしたカーネルで処理し、
+    それ以外は Python のリスト上で同じカーネルを実行します。
+    """
+    n_notes = len(columns[0])
+    queues = (n_notes,) if kernel is _smooth_vibrato_kernel else ()
+    jit_kernel = _get_jit_kernel(kernel) if isinstance(columns[0], np.ndarray) else None
+
+    if jit_kernel is not None:
+        out = (np.empty(n_notes), np.empty(n_notes), np.empty(n_notes), np.empty(n_notes),
+               np.empty(n_notes, dtype=np.int64))
+        buffers = tuple(np.empty(size, dtype=np.int64) for size in queues for _ in range(2))
+        count = jit_kernel(*columns, n_notes, *params, *out, *buffers)
+        return tuple(column[:count] for column in out)
+
+    # 日本語コメント: NumPy スカラーの生成を避けるため Python のリストとして走査する
+    as_arrays = isinstance(columns[0], np.ndarray)
+    if as_arrays:
+        columns = tuple(column.tolist() for column in columns)
+    out = tuple([0] * n_notes for _ in range(5))
+    buffers = tuple([0] * size for size in queues for _ in range(2))
+    count = kernel(*columns, n_notes, *params, *out, *buffers)
+    out = tuple(column[:count] for column in out)
+    if as_arrays:
+        out = (*(np.asarray(column, dtype=np.float64) for column in out[:4]), np.asarray(out[4], dtype=np.int64))
+    return out
+
+def _notes_from_columns(like: NotesLike, columns: _Columns) -> NotesLike:
+    """
+    列を入力と同じ形式（タプルのリスト・NOTE_DTYPE の配列・NoteTable）のノートに戻します。
+
+    velocity と lyric_index は、入力での位置が指すノート（マージで残ったノート）から引き継ぎます。
+    """
+    starts, ends, pitches, confidences, indices = columns
+    if not isinstance(like, (np.ndarray, NoteTable)):
+        return list(zip(starts, ends, pitches))
+    notes = empty_notes(len(starts))
+    notes["start"] = starts
+    notes["end"] = ends
+    notes["pitch"] = pitches
+    notes["confidence"] = confidences
+    source = like.data if isinstance(like, NoteTable) else like
+    for name in ("velocity", "lyric_index"):
+        if name in source.dtype.names:
+            notes[name] = source[name][indices]
+    return NoteTable(notes) if isinstance(like, NoteTable) else notes
+
 def merge_short_notes(
+    notes: NotesLike,
+    min_duration: float = 0.05,
+    cent_tolerance: float = 100.0
+) -> NotesLike:
+    """
+    短いノートを前後のノートとマージまたは削除します。
+
+    入力が既に開始時間順であれば並べ替えを行わず、1パスで処理します。
+    結果は merge_short_notes_reference と同じです。構造化配列・NoteTable は
+    配列のまま処理し、confidence 列は pitch と同様にノート長で重み付けして平均します。
+
+    Args:
+        notes: [(start_time, end_time, midi_note), ...] の形式のノートリスト、
+            NOTE_DTYPE の構造化配列、または NoteTable
+        min_duration: 最小ノート長（秒）
+        cent_tolerance: 同一ノートとみなすセント差の閾値
+
+    Returns:
+        入力と同じ形式のマージ処理後のノート
+    """
+    columns = _run_kernel(_merge_short_kernel, _sorted_columns(notes), min_duration, cent_tolerance / 100.0)
+    return _notes_from_columns(notes, columns)
+
+def smooth_vibrato(
+    notes: NotesLike,
+    time_window: float = 0.2,
+    cent_tolerance: float = 200.0
+) -> NotesLike:
+    """
+    ビブラートやしゃくりと思われる短い音程変化を平滑化します。
+
+    時間窓と窓内の最大・最小音高を単調キューで更新しながら1パスで処理します。
+    結果は smooth_vibrato_reference と同じです。
+
+    Args:
+        notes: [(start_time, end_time, midi_note), ...] の形式のノートリスト、
+            NOTE_DTYPE の構造化配列、または NoteTable
+        time_window: 検討する時間窓（秒）
+        cent_tolerance: ビブラートとみなす音程差の閾値（セント）
+
+    Returns:
+        入力と同じ形式の平滑化されたノート
+    """
+    columns = _run_kernel(_smooth_vibrato_kernel, _sorted_columns(notes), time_window, cent_tolerance)
+    return _notes_from_columns(notes, columns)
+
+def postprocess_notes(
+    notes: NotesLike,
+    min_duration: float = 0.05,
+    merge_cent_tolerance: float = 100.0,
+    vibrato_window: float = 0.2,
+    vibrato_cent_tolerance: float = 200.0
+) -> NotesLike:
+    """
+    短いノートのマージとビブラートの平滑化を1つのステージとして実行します。
+
+    smooth_vibrato(merge_short_notes(notes, ...), ...) と同じ結果を返しますが、
+    並べ替えは最初の1回だけ（整列済みなら行わない）で、中間結果をタプルや
+    構造化配列に戻さずに列のまま次のパスへ渡します。マージ後のノートは開始時間順に
+    並んでいるため、2回目の並べ替えは不要です。
+
+    Args:
+        notes: タプルのリスト、NOTE_DTYPE の構造化配列、または NoteTable
+        min_duration: 最小ノート長（秒）
+        merge_cent_tolerance: 短いノートのマージで同一ノートとみなすセント差の閾値
+        vibrato_window: ビブラートとして検討する時間窓（秒）
+        vibrato_cent_tolerance: ビブラートとみなす音程差の閾値（セント）
+
+    Returns:
+        入力と同じ形式の後処理済みノート
+    """
+    merged = _run_kernel(_merge_short_kernel, _sorted_columns(notes), min_duration, merge_cent_tolerance / 100.0)
+    smoothed = _run_kernel(_smooth_vibrato_kernel, merged, vibrato_window, vibrato_cent_tolerance)
+    return _notes_from_columns(notes, smoothed)
+
+def merge_short_notes_reference(
     notes: List[Tuple[float, float, float]],
     min_duration: float = 0.05,
     cent_tolerance: float = 100.0
@@ -187,6 +875,9 @@ def merge_short_notes(
     """
     短いノートを前後のノートとマージまたは削除します。
 
+    リストを並べ替えてから1ノートずつ処理する参照実装です。
+    merge_short_notes と postprocess_notes はこの関数と同じ結果を返すことをテストで確認しています。
+
     Args:
         notes: [(start_time, end_time, midi_note), ...] の形式のノートリスト
         min_duration: 最小ノート長（秒）
@@ -241,7 +932,7 @@ def merge_short_notes(
 
     return merged_notes
 
-def smooth_vibrato(
+def smooth_vibrato_reference(
     notes: List[Tuple[float, float, float]],
     time_window: float = 0.2,
     cent_tolerance: float = 200.0
@@ -249,6 +940,9 @@ def smooth_vibrato(
     """
     ビブラートやしゃくりと思われる短い音程変化を平滑化します。
 
+    開始ノートごとに時間窓内のノートのリストを作り直す参照実装です。
+    smooth_vibrato と postprocess_notes はこの関数と同じ結果を返すことをテストで確認しています。
+
     Args:
         notes: [(start_time, end_time, midi_note), ...] の形式のノートリスト
         time_window: 検討する時間窓（秒）
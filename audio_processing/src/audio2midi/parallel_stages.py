@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/src/audio2midi/parallel_stages.py
+"""
+文字起こしとピッチ抽出を並列に実行するためのモジュール
+
+Whisper による文字起こしと CREPE によるピッチ抽出は
+`match_segments_and_notes` まで互いの結果を参照しないため、
+同時に実行することで 1 曲あたりの処理時間を「遅い方のステージ」程度に短縮できます。
+
+CPU は両ステージで分け合うため、`transcription_share` で
+文字起こし側に割り当てるコアの割合を指定します（残りがピッチ抽出側）。
+
+スレッド方式では、各ステージのスレッド内で PyTorch / TensorFlow のスレッド数を制限します。
+フレームワークはステージ内で初めて import されることが多いため、モデルの読み込み処理
+（model_cache）からも apply_stage_thread_limits() を呼び、読み込み直後に制限を適用します。
+"""
+
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# (関数, 位置引数, キーワード引数) の組
+StageCall = Tuple[Callable[..., Any], Tuple[Any, ...], Dict[str, Any]]
+
+EXECUTORS = ("process", "thread")
+
+logger = logging.getLogger(__name__)
+
+# スレッド数を制御する環境変数（ライブラリの import 前に設定する必要がある）
+_THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "TF_NUM_INTRAOP_THREADS",
+)
+
+
+def split_cpus(transcription_share: float = 0.5, total_cpus: Optional[int] = None) -> Tuple[int, int]:
+    """
+    CPUコア数を文字起こし用とピッチ抽出用に分割します。
+
+    Args:
+        transcription_share: 文字起こしに割り当てる割合（0-1）
+        total_cpus: 使用する総コア数（None の場合は os.cpu_count()）
+
+    Returns:
+        (文字起こし用スレッド数, ピッチ抽出用スレッド数)。どちらも1以上。
+    """
+    if not 0.0 <= transcription_share <= 1.0:
+        raise ValueError(f"transcription_share must be between 0 and 1: {transcription_share}")
+
+    total = total_cpus or os.cpu_count() or 1
+    if total < 2:
+        return 1, 1
+
+    transcription_threads = int(round(total * transcription_share))
+    transcription_threads = min(max(transcription_threads, 1), total - 1)
+    return transcription_threads, total - transcription_threads
+
+
+class FrameworkThreadLimit:
+    """
+    読み込み済みの PyTorch / TensorFlow のスレッド数を制限し、restore() で元に戻します。
+
+    未読み込みのフレームワークには何もしません（import を誘発しないため）。apply() は何度呼んでもよく、
+    前回以降に読み込まれたフレームワークにだけ新たに適用します。
+    TensorFlow のスレッド数は初期化後に変更できないため、適用済み・初期化済みの場合は何もせず、
+    restore() でも元に戻しません。
+
+    Args:
+        torch_threads: PyTorch のスレッド数（None の場合は変更しない）
+        tf_threads: TensorFlow の intra-op スレッド数（None の場合は変更しない）
+    """
+
+    def __init__(self, torch_threads: Optional[int] = None, tf_threads: Optional[int] = None) -> None:
+        self.torch_threads = torch_threads
+        self.tf_threads = tf_threads
+        self._previous_torch_threads: Optional[int] = None
+        self._tf_applied = False
+
+    def apply(self) -> None:
+        if self.torch_threads and self._previous_torch_threads is None and "torch" in sys.modules:
+            torch = sys.modules["torch"]
+            self._previous_torch_threads = torch.get_num_threads()
+            torch.set_num_threads(self.torch_threads)
+
+        if self.tf_threads and not self._tf_applied and "tensorflow" in sys.modules:
+            self._tf_applied = True
+            tf = sys.modules["tensorflow"]
+            try:
+                tf.config.threading.set_intra_op_parallelism_threads(self.tf_threads)
+                tf.config.threading.set_inter_op_parallelism_threads(1)
+            except RuntimeError:
+                # 日本語コメント: 既に初期化済みのランタイムは再設定できない
+                pass
+
+    def restore(self) -> None:
+        if self._previous_torch_threads is not None:
+            sys.modules["torch"].set_num_threads(self._previous_torch_threads)
+            self._previous_torch_threads = None
+
+
+_stage_thread_limit: ContextVar[Optional[FrameworkThreadLimit]] = ContextVar(
+    "audio2midi_stage_thread_limit", default=None
+)
+
+
+def apply_stage_thread_limits() -> None:
+    """
+    実行中のステージのスレッド数の制限を、その時点で読み込み済みのフレームワークに適用します。
+
+    モデルを読み込む関数が、フレームワークを import した直後（モデルを構築する前）に呼び出します。
+    ステージの外で呼ばれた場合は何もしません。
+    """
+    limit = _stage_thread_limit.get()
+    if limit is not None:
+        limit.apply()
+
+
+def _init_stage_process(threads: int) -> None:
+    """ワーカープロセスの初期化処理。ライブラリの import 前にスレッド数を固定します。"""
+    for name in _THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+
+
+def _run_in_processes(
+    calls: Dict[str, StageCall],
+    threads: Dict[str, int],
+    poll_interval: float
+) -> Dict[str, Any]:
+    """各ステージを専用のプロセスで実行し、いずれかが失敗したら全プロセスを停止します。"""
+    # 日本語コメント: TensorFlow/PyTorch は fork と相性が悪いため spawn を使う
+    ctx = multiprocessing.get_context("spawn")
+    pools = {
+        name: ctx.Pool(1, initializer=_init_stage_process, initargs=(threads[name],))
+        for name in calls
+    }
+    try:
+        pending = {
+            name: pools[name].apply_async(fn, args, kwargs)
+            for name, (fn, args, kwargs) in calls.items()
+        }
+        results: Dict[str, Any] = {}
+        while pending:
+            for name in list(pending):
+                async_result = pending[name]
+                async_result.wait(poll_interval)
+                if async_result.ready():
+                    # 失敗していれば元の例外がここで再送出される
+                    results[name] = async_result.get()
+                    del pending[name]
+        return results
+    finally:
+        for pool in pools.values():
+            pool.terminate()
+            pool.join()
+
+
+def _run_in_threads(
+    calls: Dict[str, StageCall],
+    limits: Dict[str, FrameworkThreadLimit]
+) -> Dict[str, Any]:
+    """
+    各ステージをデーモンスレッドで実行します。
+
+    各スレッドはステージの実行中だけ limits[name] を適用し、終了時に元に戻します。
+
+    失敗時に残りのスレッドを待たずに戻れるよう、デーモンスレッドを使用します。
+    実行中のステージを途中で止める手段はないため、残りのスレッドはステージが終わるまで
+    動き続け、その結果は捨てられます。常駐するワーカー（batch / service）では、その間
+    次のジョブと CPU を取り合うことになります。
+    """
+    results: Dict[str, Any] = {}
+    errors: Dict[str, BaseException] = {}
+    lock = threading.Lock()
+    finished = threading.Condition(lock)
+
+    def _target(name: str, call: StageCall) -> None:
+        fn, args, kwargs = call
+        limit = limits[name]
+        # 日本語コメント: 新しいスレッドは空のコンテキストで始まるため、ここで設定すればこのステージだけに効く
+        _stage_thread_limit.set(limit)
+        try:
+            limit.apply()
+            try:
+                value = fn(*args, **kwargs)
+            finally:
+                # 日本語コメント: プロセス全体の設定なので、結果を通知する前に元に戻す
+                limit.restore()
+        except BaseException as e:
+            # 日本語コメント: 呼び出し元のスレッドで再送出する
+            with finished:
+                errors[name] = e
+                finished.notify_all()
+            return
+        with finished:
+            results[name] = value
+            finished.notify_all()
+
+    for name, call in calls.items():
+        threading.Thread(target=_target, args=(name, call), name=f"stage-{name}", daemon=True).start()
+
+    with finished:
+        while not errors and len(results) < len(calls):
+            finished.wait()
+        if errors:
+            running = [name for name in calls if name not in results and name not in errors]
+            if running:
+                logger.warning("ステージ %s は失敗後も完了までバックグラウンドで実行されます", ", ".join(running))
+            raise next(iter(errors.values()))
+    return results
+
+
+def run_transcription_and_pitch(
+    transcribe_call: StageCall,
+    pitch_call: StageCall,
+    executor: str = "process",
+    transcription_share: float = 0.5,
+    total_cpus: Optional[int] = None,
+    poll_interval: float = 0.1
+) -> Tuple[Any, Any]:
+    """
+    文字起こしとピッチ抽出を同時に実行します。
+
+    どちらかのステージで例外が発生した場合、もう一方の完了を待たずに
+    その例外をそのまま送出します（プロセス実行時は残りのワーカーを停止します）。
+
+    Args:
+        transcribe_call: 文字起こしステージの (関数, 位置引数, キーワード引数)
+        pitch_call: ピッチ抽出ステージの (関数, 位置引数, キーワード引数)
+        executor: "process"（ステージごとに専用プロセス）または "thread"
+        transcription_share: 文字起こしに割り当てるCPUの割合（0-1）
+        total_cpus: 使用する総コア数（None の場合は全コア）
+        poll_interval: プロセス実行時の完了確認間隔（秒）
+
+    Returns:
+        (文字起こし結果, ピッチ抽出結果)
+
+    Raises:
+        ValueError: 不明な executor が指定された場合
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unsupported executor: {executor}")
+
+    transcription_threads, pitch_threads = split_cpus(transcription_share, total_cpus)
+    calls = {"transcription": transcribe_call, "pitch": pitch_call}
+
+    if executor == "process":
+        results = _run_in_processes(
+            calls,
+            {"transcription": transcription_threads, "pitch": pitch_threads},
+            poll_interval
+        )
+    else:
+        # 日本語コメント: 同一プロセス内では Whisper は PyTorch、CREPE は TensorFlow の
+        # スレッドプールを使うため、それぞれのフレームワーク側で上限を分ける
+        results = _run_in_threads(calls, {
+            "transcription": FrameworkThreadLimit(torch_threads=transcription_threads),
+            "pitch": FrameworkThreadLimit(tf_threads=pitch_threads),
+        })
+
+    return results["transcription"], results["pitch"]
@@ -0,0 +1,447 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/src/audio2midi/pipeline.py
+"""
+音声 → 歌詞付きMIDI 変換パイプライン本体
+
+main.py（単一ファイル）とバッチ処理のワーカープロセスの両方から
+同じ処理を呼び出せるよう、パイプラインの各ステージをここにまとめています。
+"""
+
+import argparse
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .audio_buffer import AudioBuffer
+from .audio_to_text import transcribe_audio, transcribe_voiced_regions, AudioTranscriptionError
+from .dag import Stage, StageGraph, stage_params
+from .pitch_extraction import extract_pitch_crepe, extract_pitch_crepe_streaming, extract_pitch_crepe_voiced
+from .note_utils import midi_notes_to_intervals, match_segments_and_notes
+from .pitch_backends import PROFILES, extract_pitch
+from .generate_midi_with_lyrics import export_segments
+from .instrumentation import stage
+from .longform import transcribe_longform
+from .note_table import NoteTable
+from .parallel_stages import StageCall, run_transcription_and_pitch
+from .preprocessing import PreprocessingChain, build_chain
+from .result_cache import ResultCache, hash_audio_file
+from .timeline import Timeline
+from .vad import detect_voiced_regions
+
+logger = logging.getLogger(__name__)
+
+def get_device() -> str:
+    """
+    利用可能なデバイス（GPU/CPU）を検出して返します。
+
+    Returns:
+        str: 'cuda' (GPU利用可能時) または 'cpu'
+    """
+    # 日本語コメント: 本来はシステムのGPU/CPUなどをチェックするロジック
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return "cuda"
+    except ImportError:
+        pass
+    return "cpu"
+
+def load_audio_buffer(audio_path: str) -> AudioBuffer:
+    """
+    音声ファイルを1度だけデコードし、文字起こしとピッチ抽出で共有する AudioBuffer を返します。
+
+    Args:
+        audio_path: 音声ファイルパス
+
+    Returns:
+        AudioBuffer: 16kHz モノラル float32 の音声
+    """
+    logger.info("音声をデコード中...")
+    buffer = AudioBuffer.from_file(audio_path)
+    logger.info("デコード完了: %.2f秒の音声", buffer.duration)
+    return buffer
+
+def build_preprocessing_chain(args: argparse.Namespace, device: str) -> PreprocessingChain:
+    """
+    コマンドライン引数から、両ステージ共通の前処理チェーンを組み立てます。
+
+    --noise-reduction（ノーマライズ）は従来どおり文字起こしステージ内でのみ適用します。
+    """
+    return build_chain(
+        highpass_hz=args.highpass,
+        lowpass_hz=args.lowpass,
+        spectral_gating=args.spectral_gate,
+        separator=args.vocal_separator,
+        device=device
+    )
+
+def detect_regions(args: argparse.Namespace, buffer: AudioBuffer) -> np.ndarray:
+    """
+    --vad 指定時に、両ステージで共有する有音区間を1度だけ検出します。
+    """
+    regions = detect_voiced_regions(
+        buffer.samples, buffer.sr, top_db=args.vad_top_db, min_silence=args.vad_min_silence
+    )
+    voiced = float((regions[:, 1] - regions[:, 0]).sum()) / buffer.sr
+    logger.info("有音区間: %d区間, %.2f秒 / %.2f秒", len(regions), voiced, buffer.duration)
+    return regions
+
+def _vad_kwargs(args: argparse.Namespace) -> Dict[str, Any]:
+    """有音区間の検出パラメータ（キャッシュキーにも含まれます）"""
+    return {"top_db": args.vad_top_db, "min_silence": args.vad_min_silence}
+
+def build_transcription_call(
+    args: argparse.Namespace,
+    audio_path: Union[str, AudioBuffer],
+    device: str,
+    regions: Optional[np.ndarray] = None
+) -> StageCall:
+    """
+    文字起こしステージの呼び出し内容を組み立てます。
+
+    Args:
+        args: コマンドライン引数
+        audio_path: 音声ファイルパス、またはデコード済みの音声
+        device: 使用するデバイス
+        regions: --vad 指定時の有音区間（None の場合はステージ内で検出）
+
+    Returns:
+        StageCall: (関数, 位置引数, キーワード引数)
+    """
+    kwargs = {
+        "model_name": args.model_name,
+        "device": device,
+        "language": args.language,
+        "noise_reduction": args.noise_reduction,
+        "word_timestamps": args.word_timestamps,
+        "backend": args.asr_backend
+    }
+    if args.vad:
+        # 有音区間のみを文字起こしし、タイムスタンプを元の時間軸に戻す（--longform より優先）
+        return (transcribe_voiced_regions, (audio_path, regions), {**kwargs, **_vad_kwargs(args)})
+    if args.longform:
+        # 長時間の音声をチャンクに分割し、ワーカープロセスで並列に文字起こしする
+        return (
+            transcribe_longform,
+            (audio_path,),
+            {**kwargs, "workers": args.longform_workers, "chunk_duration": args.longform_chunk}
+        )
+    return (transcribe_audio, (audio_path,), kwargs)
+
+def build_pitch_call(
+    args: argparse.Namespace,
+    audio_path: Union[str, AudioBuffer],
+    regions: Optional[np.ndarray] = None
+) -> StageCall:
+    """
+    ピッチ抽出ステージの呼び出し内容を組み立てます。
+
+    Args:
+        args: コマンドライン引数
+        audio_path: 音声ファイルパス、またはデコード済みの音声
+        regions: --vad 指定時の有音区間（None の場合はステージ内で検出）
+
+    Returns:
+        StageCall: (関数, 位置引数, キーワード引数)
+    """
+    backend = args.pitch_backend or PROFILES.get(args.pitch_profile)
+    if backend:
+        # バックエンド（yin / pyin / CREPE の各モデルサイズ）を明示した場合
+        return (
+            extract_pitch,
+            (audio_path, regions),
+            {
+                "backend": backend,
+                "confidence_threshold": 0.5,
+                "step_size": 10,
+                "fmin": args.min_pitch,
+                "fmax": args.max_pitch
+            }
+        )
+    if args.vad:
+        # 有音区間のフレームだけをまとめて推論する（--stream-pitch より優先）
+        return (
+            extract_pitch_crepe_voiced,
+            (audio_path, regions),
+            {
+                "confidence_threshold": 0.5,
+                "model": 'full',
+                "step_size": 10,
+                **_vad_kwargs(args)
+            }
+        )
+    if args.stream_pitch:
+        # 長時間の録音向け: ブロック単位で読み込み、メモリ使用量を一定に保つ
+        return (
+            extract_pitch_crepe_streaming,
+            (audio_path,),
+            {
+                "confidence_threshold": 0.5,
+                "model": 'full',
+                "step_size": 10,
+                "block_duration": args.stream_block_duration
+            }
+        )
+    return (
+        extract_pitch_crepe,
+        (audio_path,),
+        {
+            "sr_desired": 16000,  # CREPEは16kHzを推奨
+            "confidence_threshold": 0.5,
+            "model": 'full',
+            "step_size": 10,
+            "top_db": args.top_db
+        }
+    )
+
+def streams_pitch_from_file(args: argparse.Namespace, chain: PreprocessingChain) -> bool:
+    """
+    --stream-pitch のピッチ抽出に音声ファイルを直接渡すかどうか。
+
+    前処理がある場合は前処理後の音声全体が必要なため、デコード済みの音声を渡します。
+    """
+    backend = args.pitch_backend or PROFILES.get(args.pitch_profile)
+    return bool(args.stream_pitch and not args.vad and not backend and len(chain) == 0)
+
+def get_transcription_segments(transcription: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    文字起こし結果を表示し、セグメントのリストを取り出します。
+
+    Args:
+        transcription: transcribe_audio の戻り値
+
+    Returns:
+        List[Dict[str, Any]]: タイムスタンプ付きセグメントのリスト
+
+    Raises:
+        AudioTranscriptionError: セグメントが1つも検出されなかった場合
+    """
+    logger.info("検出された言語: %s", transcription.get('language', '不明'))
+    logger.info("文字起こし結果: %s", transcription['text'])
+    
+    segments = transcription["segments"]
+    if not segments:
+        raise AudioTranscriptionError("セグメントが検出されませんでした。")
+    return segments
+
+def _invoke(call: StageCall) -> Any:
+    fn, fn_args, fn_kwargs = call
+    return fn(*fn_args, **fn_kwargs)
+
+def build_stage_graph(
+    args: argparse.Namespace,
+    audio_path: str,
+    device: str,
+    output_path: str
+) -> StageGraph:
+    """
+    パイプラインの各ステージを依存関係のグラフとして組み立てます。
+
+    decode → preprocessing →（vad →）transcription / pitch → note_intervals → matching → export
+    の順に依存し、transcription 以降の出力はキャッシュに保存されます（--no-cache 指定時を除く）。
+    そのため --min-duration だけを変えた再実行では note_intervals 以降のみ、
+    --tempo だけを変えた再実行では export のみが実行されます。
+
+    Args:
+        args: コマンドライン引数
+        audio_path: 音声ファイルパス
+        device: 使用するデバイス
+        output_path: 出力ファイルパス
+
+    Returns:
+        StageGraph: ステージのグラフ
+
+    Raises:
+        FileNotFoundError: 音声ファイルが見つからない場合
+    """
+    if not Path(audio_path).exists():
+        raise FileNotFoundError(f"音声ファイルが見つかりません: {audio_path}")
+    
+    cache = None
+    source = ""
+    if not args.no_cache:
+        cache = ResultCache(args.cache_dir, int(args.cache_max_mb * 1024 * 1024))
+        source = hash_audio_file(audio_path)
+    graph = StageGraph(source, cache)
+    
+    chain = build_preprocessing_chain(args, device)
+    graph.add(Stage("decode", lambda: load_audio_buffer(audio_path), count=lambda buffer: len(buffer.samples)))
+    graph.add(Stage(
+        "preprocessing",
+        lambda buffer: chain.run(buffer)[0],
+        inputs=("decode",),
+        params={
+            "chain": chain.names(),
+            "highpass": args.highpass,
+            "lowpass": args.lowpass,
+            "separator": args.vocal_separator
+        },
+        count=lambda _: len(chain)
+    ))
+    audio_inputs: Tuple[str, ...] = ("preprocessing",)
+    if args.vad:
+        graph.add(Stage(
+            "vad", lambda buffer: detect_regions(args, buffer), inputs=audio_inputs, params=_vad_kwargs(args), count=len
+        ))
+        audio_inputs += ("vad",)
+    
+    def transcribe(buffer: AudioBuffer, regions: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        logger.info("音声文字起こしを実行中...")
+        transcription = _invoke(build_transcription_call(args, buffer, device, regions))
+        # 日本語コメント: セグメントがなければピッチ抽出の前にエラーにする
+        get_transcription_segments(transcription)
+        return transcription
+    
+    def extract(buffer: AudioBuffer, regions: Optional[np.ndarray] = None) -> Any:
+        logger.info("ピッチ抽出を実行中...")
+        return _invoke(build_pitch_call(args, buffer, regions))
+    
+    fn, _, kwargs = build_transcription_call(args, audio_path, device)
+    graph.add(Stage(
+        "transcription",
+        transcribe,
+        inputs=audio_inputs,
+        # 日本語コメント: デバイスとワーカー数は結果に影響しないためパラメータに含めない
+        params=stage_params(fn, kwargs, exclude=("device", "workers")),
+        codec="json",
+        count=lambda transcription: len(transcription["segments"])
+    ))
+    def extract_from_file() -> Any:
+        logger.info("ピッチ抽出を実行中（ストリーミング）...")
+        return _invoke(build_pitch_call(args, audio_path))
+    
+    if streams_pitch_from_file(args, chain):
+        # 日本語コメント: 音声全体をデコードせず、ファイルからブロック単位で読み込む
+        pitch_fn, pitch_inputs = extract_from_file, ()
+    else:
+        pitch_fn, pitch_inputs = extract, audio_inputs
+    fn, _, kwargs = build_pitch_call(args, audio_path)
+    graph.add(Stage(
+        "pitch", pitch_fn, inputs=pitch_inputs, params=stage_params(fn, kwargs), codec="pitch",
+        count=lambda pitch_result: len(pitch_result[0])
+    ))
+    
+    def note_intervals(pitch_result: Any) -> NoteTable:
+        logger.info("ノートインターバルを生成中...")
+        midi_notes, confidence, time, sr = pitch_result
+        return midi_notes_to_intervals(
+            midi_notes,
+            confidence,
+            sr,
+            min_duration=args.min_duration,
+            confidence_threshold=0.5,
+            as_table=True,  # 長時間の音源でもメモリ使用量を抑えるため列指向で保持する
+            # 日本語コメント: ホップ長と先頭フレームの時刻（トリミング分のオフセット）はピッチ抽出の時間軸から求める
+            timeline=Timeline.from_time_axis(time, sr)
+        )
+    
+    graph.add(Stage(
+        "note_intervals",
+        note_intervals,
+        inputs=("pitch",),
+        params={"min_duration": args.min_duration, "confidence_threshold": 0.5},
+        codec="notes",
+        count=len
+    ))
+    
+    def match(transcription: Dict[str, Any], notes: NoteTable) -> List[Dict[str, Any]]:
+        logger.info("歌詞とノートをマッチング中...")
+        return match_segments_and_notes(transcription["segments"], notes, word_level=args.word_timestamps)
+    
+    graph.add(Stage(
+        "matching",
+        match,
+        inputs=("transcription", "note_intervals"),
+        params={"word_level": args.word_timestamps},
+        codec="json",
+        count=len
+    ))
+    
+    midi_kwargs = {
+        "tempo": args.tempo,
+        "velocity": args.velocity,
+        "lyric_encoding": args.lyric_encoding
+    } if args.output_format == "midi" else {}
+    
+    def export(matched_segments: List[Dict[str, Any]]) -> str:
+        logger.info("結果を%s形式で出力中: %s", args.output_format, output_path)
+        export_segments(matched_segments, output_path, format=args.output_format, **midi_kwargs)
+        return output_path
+    
+    graph.add(Stage(
+        "export",
+        export,
+        inputs=("matching",),
+        params={"format": args.output_format, "output_path": str(Path(output_path).resolve()), **midi_kwargs},
+        codec="file"
+    ))
+    return graph
+
+def _needs_transcription_and_pitch(graph: StageGraph) -> bool:
+    """文字起こしとピッチ抽出の両方を実行する必要があるか（並列実行するかの判定）"""
+    if graph.is_cached("export") or graph.is_cached("matching"):
+        return False
+    return not (
+        graph.is_cached("transcription")
+        or graph.is_cached("note_intervals")
+        or graph.is_cached("pitch")
+    )
+
+def run_pipeline(
+    args: argparse.Namespace,
+    audio_path: Optional[str] = None,
+    output_path: Optional[str] = None
+) -> str:
+    """
+    1つの音声ファイルに対してパイプライン全体を実行します。
+
+    キャッシュに出力があるステージは再利用し、パラメータが変わったステージとその下流だけを実行します。
+    --explain 指定時は、ステージごとに再利用したか実行したかをログに出力します。
+
+    Args:
+        args: コマンドライン引数（各ステージのオプション）
+        audio_path: 音声ファイルパス（省略時は args.audio_path）
+        output_path: 出力ファイルパス（省略時は args.output_path）
+
+    Returns:
+        str: 出力ファイルパス
+
+    Raises:
+        FileNotFoundError: 音声ファイルが見つからない場合
+        AudioTranscriptionError: 文字起こしに失敗した場合
+    """
+    audio_path = audio_path or args.audio_path
+    output_path = output_path or args.output_path or f"output.{args.output_format}"
+    device = args.device or get_device()
+    
+    graph = build_stage_graph(args, audio_path, device, output_path)
+    
+    if args.parallel_stages and _needs_transcription_and_pitch(graph):
+        # 1-2. 音声文字起こしとピッチ抽出を並列に実行
+        buffer = graph.run("preprocessing")
+        regions = graph.run("vad") if args.vad else None
+        logger.info("音声文字起こしとピッチ抽出を並列に実行中...")
+        # 日本語コメント: 並列実行では2つのステージの時間が重なるため、まとめて1つのステージとして計測する
+        with stage("transcription+pitch") as s:
+            transcription, pitch_result = run_transcription_and_pitch(
+                build_transcription_call(args, buffer, device, regions),
+                build_pitch_call(args, audio_path if not graph.stages["pitch"].inputs else buffer, regions),
+                executor=args.parallel_executor,
+                transcription_share=args.transcription_cpu_share,
+                total_cpus=args.cpus
+            )
+            s.items = len(pitch_result[0])
+        get_transcription_segments(transcription)
+        graph.provide("transcription", transcription)
+        graph.provide("pitch", pitch_result)
+    
+    # 3-5. ノートインターバルの生成・歌詞とノートのマッチング・結果の出力（必要なステージのみ）
+    graph.run("export")
+    
+    if args.explain:
+        logger.info("ステージの実行状況:\n%s", graph.format_explain())
+    
+    return output_path
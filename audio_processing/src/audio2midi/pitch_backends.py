@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/src/audio2midi/pitch_backends.py
+"""
+ピッチ抽出のバックエンドと、速度・精度のプロファイル
+
+バックエンド:
+- yin: librosa.yin（最も高速。信頼度はフレームの音量から求める簡易的なもの）
+- pyin: librosa.pyin（有声確率を信頼度として使う。TensorFlow 不要）
+- crepe-tiny ... crepe-full: CREPE の各モデルサイズ（TensorFlow が必要）
+
+プロファイル（--pitch-profile）は用途ごとのバックエンドの組み合わせです：
+- fast: yin
+- balanced: crepe-small
+- accurate: crepe-full
+
+どのバックエンドも (midi_notes, confidence, time, sr) を返し、時刻は音声の先頭からの
+絶対時刻（ホップ長は step_size）です。有音区間（vad.detect_voiced_regions）を渡すと、
+その区間だけを処理して timeline.stitch_frames で全体の時間軸に配置します。
+
+Usage:
+    from audio2midi.pitch_backends import extract_pitch, get_backend
+
+    midi_notes, confidence, time, sr = extract_pitch(buffer, backend="pyin")
+    backend = get_backend("crepe-tiny", step_size=10)
+"""
+
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import librosa
+import numpy as np
+
+from .audio_buffer import AudioBuffer
+from .pitch_extraction import CREPE_SR, _pyin, extract_pitch_crepe_voiced
+from .timeline import Timeline, stitch_frames
+
+logger = logging.getLogger(__name__)
+
+PitchResult = Tuple[np.ndarray, np.ndarray, np.ndarray, int]
+
+CREPE_CAPACITIES = ("tiny", "small", "medium", "large", "full")
+
+
+class PitchBackend:
+    """
+    ピッチ抽出バックエンドのインターフェース。
+
+    サブクラスは _extract_array() で1つの連続した区間を処理します。
+    register_backend() で名前を付けて登録すると extract_pitch(backend="名前") や
+    --pitch-backend から使用できます。
+
+    Args:
+        step_size: 分析フレームのステップサイズ（ms）
+        confidence_threshold: 信頼度の閾値（未満のフレームの midi_notes は NaN）
+        fmin: 最低音（音名または Hz）
+        fmax: 最高音（音名または Hz）
+    """
+
+    name = "base"
+
+    def __init__(
+        self,
+        step_size: int = 10,
+        confidence_threshold: float = 0.5,
+        fmin: Union[str, float] = "C2",
+        fmax: Union[str, float] = "C6"
+    ) -> None:
+        self.step_size = step_size
+        self.confidence_threshold = confidence_threshold
+        self.fmin = librosa.note_to_hz(fmin) if isinstance(fmin, str) else float(fmin)
+        self.fmax = librosa.note_to_hz(fmax) if isinstance(fmax, str) else float(fmax)
+
+    def _extract_array(self, samples: np.ndarray, sr: int, hop_length: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        連続した区間の (midi_notes, confidence) を返します。
+
+        フレーム i の中心は i * hop_length サンプル目です（librosa の center=True）。
+        """
+        raise NotImplementedError
+
+    def _track_kwargs(self, buffer: AudioBuffer, hop_length: int) -> Dict[str, Any]:
+        """
+        音声全体から1度だけ求め、各区間の _extract_array() にキーワード引数として渡す値。
+
+        区間ごとに処理しても音声全体を処理した場合と同じ基準で判定したい値（音量の基準など）に使います。
+        """
+        return {}
+
+    def extract(self, buffer: AudioBuffer, regions: Optional[np.ndarray] = None) -> PitchResult:
+        """
+        ピッチを抽出します。
+
+        Args:
+            buffer: デコード済みの音声
+            regions: (区間数, 2) の有音区間（サンプルインデックス）。None の場合は音声全体
+
+        Returns:
+            (midi_notes, confidence, time, sr)
+        """
+        timeline = Timeline.from_step_size(self.step_size, sr=buffer.sr)
+        hop_length = timeline.hop_length
+        n_frames = 1 + len(buffer.samples) // hop_length
+        track_kwargs = self._track_kwargs(buffer, hop_length)
+        if regions is None:
+            midi_notes, confidence = self._extract_array(buffer.samples, buffer.sr, hop_length, **track_kwargs)
+            midi_notes, confidence = midi_notes[:n_frames], confidence[:n_frames]
+        else:
+            note_parts, confidence_parts = [], []
+            for start, end in np.asarray(regions, dtype=np.int64).reshape(-1, 2):
+                # 日本語コメント: 区間の先頭をホップ長の倍数に揃え、全体のフレーム位置と一致させる
+                start -= start % hop_length
+                part_notes, part_confidence = self._extract_array(
+                    buffer.samples[start:end], buffer.sr, hop_length, **track_kwargs
+                )
+                part_timeline = timeline.at_sample(start)
+                note_parts.append((part_timeline, part_notes))
+                confidence_parts.append((part_timeline, part_confidence))
+            midi_notes = stitch_frames(timeline, n_frames, note_parts)
+            confidence = stitch_frames(timeline, n_frames, confidence_parts, fill=0.0)
+        midi_notes = np.asarray(midi_notes, dtype=np.float64)
+        with np.errstate(invalid="ignore"):
+            midi_notes[~(confidence >= self.confidence_threshold)] = np.nan
+        return midi_notes, confidence, timeline.times(len(midi_notes)), buffer.sr
+
+    def __call__(self, buffer: AudioBuffer, regions: Optional[np.ndarray] = None) -> PitchResult:
+        return self.extract(buffer, regions)
+
+
+class YinBackend(PitchBackend):
+    """
+    librosa.yin による高速なピッチ抽出。
+
+    YIN 自体は有声/無声を判定しないため、フレームの RMS が音声全体の最大値から
+    top_db 以内なら信頼度 1、それ以外は 0 とします。
+    """
+
+    name = "yin"
+
+    def __init__(self, frame_length: int = 1024, top_db: float = 35.0, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.frame_length = frame_length
+        self.top_db = top_db
+
+    def _rms(self, samples: np.ndarray, hop_length: int) -> np.ndarray:
+        return librosa.feature.rms(y=samples, frame_length=self.frame_length, hop_length=hop_length)[0]
+
+    def _track_kwargs(self, buffer: AudioBuffer, hop_length: int) -> Dict[str, Any]:
+        # 日本語コメント: 有音区間ごとの最大値を基準にすると、VAD の有無で同じフレームの判定が変わってしまう
+        rms = self._rms(buffer.samples, hop_length)
+        return {"ref": float(rms.max()) if len(rms) else 1.0}
+
+    def _extract_array(
+        self,
+        samples: np.ndarray,
+        sr: int,
+        hop_length: int,
+        ref: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if len(samples) < self.frame_length:
+            n_frames = 1 + len(samples) // hop_length
+            return np.full(n_frames, np.nan), np.zeros(n_frames)
+        f0 = librosa.yin(
+            samples, fmin=self.fmin, fmax=self.fmax, sr=sr,
+            frame_length=self.frame_length, hop_length=hop_length
+        )
+        rms = self._rms(samples, hop_length)
+        loud = librosa.amplitude_to_db(rms, ref=np.max if ref is None else ref) > -self.top_db
+        return librosa.hz_to_midi(f0), loud[:len(f0)].astype(np.float64)
+
+
+class PyinBackend(PitchBackend):
+    """librosa.pyin によるピッチ抽出（有声確率を信頼度として使用）。"""
+
+    name = "pyin"
+
+    def __init__(self, frame_length: int = 2048, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.frame_length = frame_length
+
+    def _extract_array(self, samples: np.ndarray, sr: int, hop_length: int) -> Tuple[np.ndarray, np.ndarray]:
+        if len(samples) < self.frame_length:
+            n_frames = 1 + len(samples) // hop_length
+            return np.full(n_frames, np.nan), np.zeros(n_frames)
+        f0, _, voiced_probability = _pyin(samples, sr, self.fmin, self.fmax, self.frame_length, hop_length)
+        return librosa.hz_to_midi(f0), np.nan_to_num(voiced_probability)
+
+
+class CrepeBackend(PitchBackend):
+    """
+    CREPE によるピッチ抽出（TensorFlow が必要）。
+
+    区間ごとに推論せず、全区間のフレームをまとめて1度に推論します
+    （pitch_extraction.extract_pitch_crepe_voiced）。fmin/fmax は使用しません。
+
+    Args:
+        capacity: CREPEモデルサイズ ('tiny', 'small', 'medium', 'large', 'full')
+    """
+
+    def __init__(self, capacity: str = "full", viterbi: bool = True, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.capacity = capacity
+        self.viterbi = viterbi
+        self.name = f"crepe-{capacity}"
+
+    def extract(self, buffer: AudioBuffer, regions: Optional[np.ndarray] = None) -> PitchResult:
+        if regions is None:
+            regions = np.array([[0, len(buffer.samples)]])
+        return extract_pitch_crepe_voiced(
+            buffer,
+            regions,
+            confidence_threshold=self.confidence_threshold,
+            model=self.capacity,
+            step_size=self.step_size,
+            viterbi=self.viterbi
+        )
+
+
+def _crepe_factory(capacity: str) -> Callable[..., PitchBackend]:
+    def factory(**kwargs) -> PitchBackend:
+        return CrepeBackend(capacity=capacity, **kwargs)
+    return factory
+
+
+_BACKENDS: Dict[str, Callable[..., PitchBackend]] = {
+    YinBackend.name: YinBackend,
+    PyinBackend.name: PyinBackend,
+    **{f"crepe-{capacity}": _crepe_factory(capacity) for capacity in CREPE_CAPACITIES},
+}
+
+# プロファイル名 → バックエンド名
+PROFILES: Dict[str, str] = {
+    "fast": "yin",
+    "balanced": "crepe-small",
+    "accurate": "crepe-full",
+}
+
+
+def register_backend(name: str, factory: Callable[..., PitchBackend]) -> None:
+    """
+    ピッチ抽出バックエンドを登録します。
+
+    Args:
+        name: バックエンド名
+        factory: PitchBackend のキーワード引数（step_size など）を受け取り PitchBackend を返す関数（クラス）
+    """
+    _BACKENDS[name] = factory
+
+
+def available_backends() -> List[str]:
+    """登録されているバックエンド名の一覧"""
+    return sorted(_BACKENDS)
+
+
+def get_backend(name: str, **kwargs) -> PitchBackend:
+    """
+    バックエンド名（またはプロファイル名）から PitchBackend を作成します。
+
+    Raises:
+        ValueError: 未登録の名前が指定された場合
+    """
+    name = PROFILES.get(name, name)
+    if name not in _BACKENDS:
+        raise ValueError(f"未登録のピッチ抽出バックエンドです: {name}（利用可能: {', '.join(available_backends())}）")
+    return _BACKENDS[name](**kwargs)
+
+
+def extract_pitch(
+    audio: Union[str, AudioBuffer],
+    regions: Optional[np.ndarray] = None,
+    backend: str = "crepe-full",
+    **kwargs
+) -> PitchResult:
+    """
+    指定したバックエンドでピッチを抽出します（パイプラインのピッチ抽出ステージ）。
+
+    Args:
+        audio: 音声ファイルパス、またはデコード済みの音声
+        regions: (区間数, 2) の有音区間（None の場合は音声全体）
+        backend: バックエンド名またはプロファイル名
+        **kwargs: バックエンドのオプション（step_size, confidence_threshold, fmin, fmax）
+
+    Returns:
+        (midi_notes, confidence, time, sr)
+    """
+    pitch_backend = get_backend(backend, **kwargs)
+    buffer = audio if isinstance(audio, AudioBuffer) else AudioBuffer.from_file(audio, sr=CREPE_SR)
+    logger.info("ピッチ抽出バックエンド: %s", pitch_backend.name)
+    return pitch_backend.extract(buffer, regions)
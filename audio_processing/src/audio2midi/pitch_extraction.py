@@ -7,27 +7,27 @@
 MIDIノート情報に変換する機能を提供します。
 """
 
-from dataclasses import dataclass
-from typing import List, Tuple, Optional
+import logging
+from typing import Iterator, List, Tuple, Optional, Sequence, Union
 
-import crepe
 import librosa
 import numpy as np
-from scipy.ndimage import median_filter
+import soundfile as sf
+import soxr
 
+from .audio_buffer import AudioBuffer
+from .model_cache import load_crepe_model
+from .note_table import NoteEvent
+from .note_utils import postprocess_notes
+from .segmentation import segment_notes
+from .timeline import Timeline
+from .vad import detect_voiced_regions, voiced_frame_indices
 
-@dataclass
-class NoteEvent:
-    """ノートイベントを表すデータクラス"""
-    start_time: float  # 開始時間（秒）
-    end_time: float    # 終了時間（秒）
-    midi_note: float   # MIDIノート番号（連続値）
-    velocity: int = 100  # ベロシティ（音の強さ）
-    confidence: float = 1.0  # ピッチ推定の信頼度
+logger = logging.getLogger(__name__)
 
 
 def extract_pitch_crepe(
-    wav_path: str,
+    wav_path: Union[str, AudioBuffer],
     sr_desired: int = 16000,  # CREPEは16kHzを推奨
     confidence_threshold: float = 0.6,  # 信頼度の閾値
     model: str = 'full',  # CREPEモデルサイズ
@@ -40,8 +40,8 @@ def extract_pitch_crepe(
 
     Parameters
     ----------
-    wav_path : str
-        対象の音声ファイルパス
+    wav_path : str or AudioBuffer
+        対象の音声ファイルパス、またはデコード済みの音声
     sr_desired : int, optional
         希望するサンプリングレート（デフォルト: 16000 Hz）
     confidence_threshold : float, optional
@@ -58,23 +58,22 @@ def extract_pitch_crepe(
     Tuple[np.ndarray, np.ndarray, np.ndarray, int]
         - midi_notes: フレームごとのMIDIノート番号（NaN含む可能性あり）
         - confidence: フレームごとの信頼度スコア
-        - time: 時間軸の配列（秒）
+        - time: 時間軸の配列（秒、トリミング前の音声の先頭からの絶対時刻）
         - sr_used: 実際に使用されたサンプリングレート
     """
-    print(f"\nCREPEピッチ抽出デバッグ情報:")
-    print(f"入力ファイル: {wav_path}")
-    print(f"パラメータ設定:")
-    print(f"- サンプリングレート: {sr_desired}Hz")
-    print(f"- モデルサイズ: {model}")
-    print(f"- ステップサイズ: {step_size}ms")
-    print(f"- 信頼度閾値: {confidence_threshold}")
-    print(f"- 無音判定閾値: {top_db}dB")
-
-    # 音声ファイルの読み込みと正規化
-    audio_signal, sr_used = librosa.load(wav_path, sr=sr_desired)
-    print(f"\n音声データ情報:")
-    print(f"- 実際のサンプリングレート: {sr_used}Hz")
-    print(f"- 音声長: {len(audio_signal) / sr_used:.2f}秒")
+    logger.debug(
+        "CREPEピッチ抽出: 入力 %s, サンプリングレート %dHz, モデル %s, ステップ %dms, 信頼度閾値 %s, 無音判定閾値 %sdB",
+        wav_path.source if isinstance(wav_path, AudioBuffer) else wav_path,
+        sr_desired, model, step_size, confidence_threshold, top_db
+    )
+
+    # 音声ファイルの読み込みと正規化（デコード済みの音声が渡された場合はそれを使う）
+    if isinstance(wav_path, AudioBuffer):
+        buffer = wav_path.resampled(sr_desired)
+        audio_signal, sr_used = buffer.samples, buffer.sr
+    else:
+        audio_signal, sr_used = librosa.load(wav_path, sr=sr_desired)
+    logger.debug("音声データ: %dHz, %.2f秒", sr_used, len(audio_signal) / sr_used)
     
     # 正規化処理
     audio_signal = librosa.util.normalize(audio_signal)
@@ -83,21 +82,26 @@ def extract_pitch_crepe(
     audio_signal_trimmed, trim_indexes = librosa.effects.trim(audio_signal, top_db=top_db)
     trim_start = trim_indexes[0] / sr_used
     trim_end = trim_indexes[1] / sr_used
-    print(f"\n無音トリミング:")
-    print(f"- トリミング前の長さ: {len(audio_signal) / sr_used:.2f}秒")
-    print(f"- トリミング後の長さ: {len(audio_signal_trimmed) / sr_used:.2f}秒")
-    print(f"- トリミング範囲: {trim_start:.2f}秒 - {trim_end:.2f}秒")
+    logger.debug(
+        "無音トリミング: %.2f秒 → %.2f秒 (範囲 %.2f秒 - %.2f秒)",
+        len(audio_signal) / sr_used, len(audio_signal_trimmed) / sr_used, trim_start, trim_end
+    )
 
-    # CREPEによるピッチ推定
+    # CREPEによるピッチ推定（モデルはレジストリ経由で1度だけ読み込む）
+    import crepe  # 日本語コメント: TensorFlow の読み込みが重いため、CREPE を使う場合のみ import する
+    load_crepe_model(model)
     time, frequency, confidence, _ = crepe.predict(
         audio_signal_trimmed,
         sr_used,
         model_capacity=model,
         step_size=step_size,
         viterbi=True,
-        verbose=1
+        verbose=1 if logger.isEnabledFor(logging.DEBUG) else 0
     )
     
+    # 日本語コメント: CREPE の時刻はトリミング後の信号の先頭が基準なので、元の音声の絶対時刻に戻す
+    time = np.asarray(time, dtype=np.float64) + trim_start
+    
     # 周波数(Hz) → MIDIノート変換
     midi_notes = librosa.hz_to_midi(frequency)
     
@@ -106,17 +110,602 @@ def extract_pitch_crepe(
     
     # ピッチ検出結果の統計
     valid_notes = ~np.isnan(midi_notes)
-    if np.any(valid_notes):
-        print(f"\nピッチ検出結果:")
-        print(f"- 有効なピッチフレーム: {np.sum(valid_notes)} / {len(midi_notes)} ({100 * np.sum(valid_notes) / len(midi_notes):.1f}%)")
-        print(f"- 検出された音域: {np.min(midi_notes[valid_notes]):.1f} - {np.max(midi_notes[valid_notes]):.1f} (MIDI note)")
-        print(f"- 平均信頼度: {np.mean(confidence):.3f}")
-    else:
-        print("\n警告: 有効なピッチが検出されませんでした")
+    if not np.any(valid_notes):
+        logger.warning("有効なピッチが検出されませんでした")
+    elif logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "ピッチ検出結果: 有効フレーム %d / %d (%.1f%%), 音域 %.1f - %.1f (MIDI note), 平均信頼度 %.3f",
+            np.sum(valid_notes), len(midi_notes), 100 * np.sum(valid_notes) / len(midi_notes),
+            np.min(midi_notes[valid_notes]), np.max(midi_notes[valid_notes]), np.mean(confidence)
+        )
     
     return midi_notes, confidence, time, sr_used
 
 
+def _pyin(
+    audio_signal: np.ndarray,
+    sr: int,
+    fmin: Union[str, float],
+    fmax: Union[str, float],
+    frame_length: int,
+    hop_length: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """librosa.pyin を実行し、(f0[Hz], 有声フラグ, 有声確率) を返します。音名の fmin/fmax も受け付けます。"""
+    if isinstance(fmin, str):
+        fmin = librosa.note_to_hz(fmin)
+    if isinstance(fmax, str):
+        fmax = librosa.note_to_hz(fmax)
+    return librosa.pyin(
+        audio_signal,
+        fmin=fmin,
+        fmax=fmax,
+        sr=sr,
+        frame_length=frame_length,
+        hop_length=hop_length
+    )
+
+
+def extract_pitch_librosa(
+    wav_path: Union[str, AudioBuffer],
+    sr_desired: int = 16000,
+    fmin: Union[str, float] = 'C2',
+    fmax: Union[str, float] = 'C6',
+    frame_length: int = 2048,
+    hop_length: int = 160
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    librosa の pYIN を用いて音声のF0を推定し、MIDIノートに変換した配列を返します。
+
+    CREPE（TensorFlow）が使えない環境でも動作します。
+
+    Parameters
+    ----------
+    wav_path : str or AudioBuffer
+        対象の音声ファイルパス、またはデコード済みの音声
+    sr_desired : int, optional
+        希望するサンプリングレート（デフォルト: 16000 Hz）
+    fmin : str or float, optional
+        最低音（音名または Hz）（デフォルト: 'C2'）
+    fmax : str or float, optional
+        最高音（音名または Hz）（デフォルト: 'C6'）
+    frame_length : int, optional
+        フレーム長（サンプル数）（デフォルト: 2048）
+    hop_length : int, optional
+        ホップ長（サンプル数）（デフォルト: 160 = 16kHz で 10ms）
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        - midi_notes: フレームごとのMIDIノート番号（無声フレームはNaN）
+        - voiced_flags: フレームごとの有声フラグ
+    """
+    if isinstance(wav_path, AudioBuffer):
+        buffer = wav_path.resampled(sr_desired)
+        audio_signal, sr_used = buffer.samples, buffer.sr
+    else:
+        audio_signal, sr_used = librosa.load(wav_path, sr=sr_desired)
+    f0, voiced_flags, _ = _pyin(audio_signal, sr_used, fmin, fmax, frame_length, hop_length)
+    midi_notes = librosa.hz_to_midi(f0)
+    return midi_notes, voiced_flags
+
+
+# CREPEモデルの入力仕様（16kHz, 1024サンプル窓, 360ビン）
+CREPE_SR = 16000
+CREPE_FRAME_LENGTH = 1024
+CREPE_BINS = 360
+# CREPEの各ビンに対応するセント値（crepe.core.to_local_average_cents と同じ）
+_CENTS_MAPPING = np.linspace(0, 7180, CREPE_BINS) + 1997.3794084376191
+
+
+def _frame_audio(audio: np.ndarray, step_size: int) -> np.ndarray:
+    """
+    16kHz の信号を CREPE の入力フレーム (n_frames, 1024) に分割し、フレームごとに正規化します。
+
+    呼び出し側で中心化のためのパディングを済ませておく必要があります。
+    crepe.core.get_activation と同じ前処理です。
+    """
+    hop_length = int(CREPE_SR * step_size / 1000)
+    n_frames = 1 + (len(audio) - CREPE_FRAME_LENGTH) // hop_length
+    if n_frames <= 0:
+        return np.empty((0, CREPE_FRAME_LENGTH), dtype=np.float32)
+    frames = np.lib.stride_tricks.as_strided(
+        audio,
+        shape=(n_frames, CREPE_FRAME_LENGTH),
+        strides=(hop_length * audio.itemsize, audio.itemsize)
+    ).astype(np.float32)  # 日本語コメント: as_strided のビューをコピーして書き込み可能にする
+    return _normalize_frames(frames)
+
+
+def _normalize_frames(frames: np.ndarray) -> np.ndarray:
+    """フレームごとに平均0・標準偏差1に正規化します（配列をその場で書き換えます）。"""
+    frames -= np.mean(frames, axis=1)[:, np.newaxis]
+    frames /= np.clip(np.std(frames, axis=1)[:, np.newaxis], 1e-8, None)
+    return frames
+
+
+def _local_average_cents(salience: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """
+    各フレームの中心ビン周辺（±4ビン）の重み付き平均セント値を計算します。
+
+    crepe.core.to_local_average_cents をフレーム方向にベクトル化したものです。
+    """
+    if len(salience) == 0:
+        return np.empty(0)
+    padded = np.pad(salience, ((0, 0), (4, 4)))
+    mapping = np.pad(_CENTS_MAPPING, (4, 4))
+    window = centers[:, np.newaxis] + np.arange(9)[np.newaxis, :]
+    weights = np.take_along_axis(padded, window, axis=1)
+    return np.sum(weights * mapping[window], axis=1) / np.sum(weights, axis=1)
+
+
+def _cents_to_midi(cents: np.ndarray) -> np.ndarray:
+    """CREPEのセント値をMIDIノート番号に変換します（crepe.predict と同じ周波数換算）。"""
+    frequency = 10 * 2 ** (cents / 1200)
+    frequency[np.isnan(frequency)] = 0
+    return librosa.hz_to_midi(frequency)
+
+
+class _StreamingViterbi:
+    """
+    CREPE と同じ HMM（crepe.core.to_viterbi_cents）を固定遅延で逐次デコードするクラス。
+
+    ブロックを跨いでも前向き確率を引き継ぐため、ブロック境界でピッチ軌跡が途切れません。
+    直近 lag_frames フレームは後続フレームを見てから確定します。
+    """
+
+    def __init__(self, lag_frames: int = 100) -> None:
+        bins = np.arange(CREPE_BINS)
+        transition = np.maximum(12 - np.abs(bins[:, np.newaxis] - bins[np.newaxis, :]), 0).astype(np.float64)
+        transition /= np.sum(transition, axis=1)[:, np.newaxis]
+        with np.errstate(divide="ignore"):
+            self._log_transition = np.log(transition)
+        self_emission = 0.1
+        self._log_emission_match = np.log(self_emission + (1 - self_emission) / CREPE_BINS)
+        self._log_emission_other = np.log((1 - self_emission) / CREPE_BINS)
+        self.lag_frames = lag_frames
+        self._log_delta: Optional[np.ndarray] = None
+        self._backpointers: List[np.ndarray] = []
+        self._salience: List[np.ndarray] = []
+
+    def _log_emission(self, observation: int) -> np.ndarray:
+        emission = np.full(CREPE_BINS, self._log_emission_other)
+        emission[observation] = self._log_emission_match
+        return emission
+
+    def _commit(self, n_commit: int) -> np.ndarray:
+        """未確定フレームを後ろから辿り、先頭 n_commit フレームのセント値を確定します。"""
+        state = int(np.argmax(self._log_delta))
+        path = np.empty(len(self._salience), dtype=np.int64)
+        for k in range(len(self._salience) - 1, -1, -1):
+            path[k] = state
+            state = self._backpointers[k][state]
+        salience = np.asarray(self._salience[:n_commit])
+        cents = _local_average_cents(salience, path[:n_commit])
+        del self._salience[:n_commit]
+        del self._backpointers[:n_commit]
+        return cents
+
+    def push(self, activation: np.ndarray) -> np.ndarray:
+        """
+        新しいフレームのアクティベーションを追加し、確定したフレームのセント値を返します。
+        """
+        for salience in activation:
+            emission = self._log_emission(int(np.argmax(salience)))
+            if self._log_delta is None:
+                self._log_delta = np.log(1.0 / CREPE_BINS) + emission
+                self._backpointers.append(np.zeros(CREPE_BINS, dtype=np.int16))
+            else:
+                scores = self._log_delta[:, np.newaxis] + self._log_transition
+                best_prev = np.argmax(scores, axis=0)
+                self._log_delta = scores[best_prev, np.arange(CREPE_BINS)] + emission
+                # 日本語コメント: 値が際限なく小さくならないよう正規化する（argmax は不変）
+                self._log_delta -= np.max(self._log_delta)
+                self._backpointers.append(best_prev.astype(np.int16))
+            self._salience.append(salience)
+
+        n_commit = len(self._salience) - self.lag_frames
+        if n_commit <= 0:
+            return np.empty(0)
+        return self._commit(n_commit)
+
+    def flush(self) -> np.ndarray:
+        """残りの未確定フレームを全て確定します。"""
+        if not self._salience:
+            return np.empty(0)
+        return self._commit(len(self._salience))
+
+
+def _iter_audio_blocks(
+    source: Union[str, np.ndarray, AudioBuffer],
+    sr: Optional[int],
+    block_duration: float
+) -> Iterator[Tuple[np.ndarray, int]]:
+    """
+    音声ファイル（または memmap 等の配列）をモノラル float32 のブロックとして順に読み出します。
+    """
+    if isinstance(source, AudioBuffer):
+        source, sr = source.samples, source.sr
+    if isinstance(source, np.ndarray):
+        if sr is None:
+            raise ValueError("sr must be given when the source is an array")
+        block_size = int(block_duration * sr)
+        for start in range(0, len(source), block_size):
+            block = np.asarray(source[start:start + block_size], dtype=np.float32)
+            if block.ndim == 2:
+                block = block.mean(axis=1)
+            yield block, sr
+        return
+
+    with sf.SoundFile(source) as f:
+        block_size = int(block_duration * f.samplerate)
+        for block in f.blocks(blocksize=block_size, dtype="float32", always_2d=True):
+            yield block.mean(axis=1), f.samplerate
+
+
+def extract_pitch_crepe_stream(
+    source: Union[str, np.ndarray, AudioBuffer],
+    sr: Optional[int] = None,
+    confidence_threshold: float = 0.6,
+    model: str = 'full',
+    step_size: int = 10,
+    block_duration: float = 10.0,
+    viterbi_lag: float = 1.0,
+    batch_size: int = 512
+) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    CREPEによるピッチ推定をブロック単位で行い、結果をチャンクごとに返すジェネレータです。
+
+    音声全体をメモリに読み込まないため、長時間の録音でもメモリ使用量は
+    ブロック長に比例した一定量に抑えられます。ブロック間はCREPEの窓長分だけ
+    重ねて読み込み、Viterbiデコードの状態も引き継ぐため境界でピッチが途切れません。
+
+    extract_pitch_crepe と異なり無音区間のトリミングは行わず、
+    時刻は常に音声の先頭からの絶対時刻です。
+
+    Parameters
+    ----------
+    source : str, np.ndarray or AudioBuffer
+        音声ファイルパス、(サンプル数,) / (サンプル数, チャンネル数) の配列（np.memmap 可）、
+        またはデコード済みの音声
+    sr : int, optional
+        source が配列の場合のサンプリングレート
+    confidence_threshold : float, optional
+        信頼度の閾値（デフォルト: 0.6）
+    model : str, optional
+        CREPEモデルサイズ ('tiny', 'small', 'medium', 'large', 'full')
+    step_size : int, optional
+        分析フレームのステップサイズ（ms）（デフォルト: 10）
+    block_duration : float, optional
+        1ブロックの長さ（秒）（デフォルト: 10.0）
+    viterbi_lag : float, optional
+        Viterbiデコードで確定を遅らせる時間（秒）（デフォルト: 1.0）
+    batch_size : int, optional
+        CREPEの推論バッチサイズ（デフォルト: 512）
+
+    Yields
+    ------
+    Tuple[np.ndarray, np.ndarray, np.ndarray]
+        - time: 時間軸の配列（秒）
+        - midi_notes: MIDIノート番号（信頼度が閾値未満のフレームはNaN）
+        - confidence: 信頼度スコア
+    """
+    crepe_model = load_crepe_model(model)
+    hop_length = int(CREPE_SR * step_size / 1000)
+    decoder = _StreamingViterbi(lag_frames=max(int(viterbi_lag * 1000 / step_size), 1))
+    pending_confidence: List[np.ndarray] = []
+    resampler = None
+
+    # 日本語コメント: crepe.predict(center=True) と同様に先頭に半窓分の無音を付ける
+    buffer = np.zeros(CREPE_FRAME_LENGTH // 2, dtype=np.float32)
+    frames_done = 0  # 確定済みフレーム数
+
+    def _emit(cents: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        nonlocal frames_done
+        if len(cents) == 0:
+            return None
+        confidence = np.concatenate(pending_confidence)
+        chunk_confidence, rest = confidence[:len(cents)], confidence[len(cents):]
+        pending_confidence[:] = [rest]
+        midi_notes = _cents_to_midi(cents)
+        midi_notes[chunk_confidence < confidence_threshold] = np.nan
+        time = (frames_done + np.arange(len(cents))) * step_size / 1000.0
+        frames_done += len(cents)
+        return time, midi_notes, chunk_confidence
+
+    def _process(samples: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        nonlocal buffer
+        buffer = np.concatenate([buffer, samples])
+        frames = _frame_audio(buffer, step_size)
+        if len(frames) == 0:
+            return None
+        # 次のブロックで使う窓の重なり部分だけを残す
+        buffer = buffer[len(frames) * hop_length:]
+        activation = crepe_model.predict(frames, batch_size=batch_size, verbose=0)
+        pending_confidence.append(activation.max(axis=1))
+        return _emit(decoder.push(activation))
+
+    for block, block_sr in _iter_audio_blocks(source, sr, block_duration):
+        if block_sr != CREPE_SR:
+            if resampler is None:
+                resampler = soxr.ResampleStream(block_sr, CREPE_SR, 1, dtype="float32")
+            block = resampler.resample_chunk(block)
+        chunk = _process(block)
+        if chunk is not None:
+            yield chunk
+
+    # 残りのサンプルと末尾のパディングを処理し、未確定のフレームを確定する
+    tail = np.zeros(CREPE_FRAME_LENGTH // 2, dtype=np.float32)
+    if resampler is not None:
+        tail = np.concatenate([resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True), tail])
+    chunk = _process(tail)
+    if chunk is not None:
+        yield chunk
+    chunk = _emit(decoder.flush())
+    if chunk is not None:
+        yield chunk
+
+
+def extract_pitch_crepe_streaming(
+    source: Union[str, np.ndarray, AudioBuffer],
+    **kwargs
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """
+    extract_pitch_crepe_stream の結果を連結し、extract_pitch_crepe と同じ形式で返します。
+
+    音声そのものはブロック単位でしか保持しないため、長時間の録音でも
+    メモリ使用量はフレームごとの結果配列（10ms あたり数十バイト）程度に収まります。
+
+    Parameters
+    ----------
+    source : str, np.ndarray or AudioBuffer
+        音声ファイルパス、配列、またはデコード済みの音声
+    **kwargs
+        extract_pitch_crepe_stream に渡すオプション
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray, int]
+        - midi_notes: フレームごとのMIDIノート番号（NaN含む可能性あり）
+        - confidence: フレームごとの信頼度スコア
+        - time: 時間軸の配列（秒）
+        - sr_used: CREPEの入力サンプリングレート（16000 Hz）
+    """
+    times, notes, confidences = [], [], []
+    for time, midi_notes, confidence in extract_pitch_crepe_stream(source, **kwargs):
+        times.append(time)
+        notes.append(midi_notes)
+        confidences.append(confidence)
+    if not times:
+        empty = np.empty(0)
+        return empty, empty, empty, CREPE_SR
+    return np.concatenate(notes), np.concatenate(confidences), np.concatenate(times), CREPE_SR
+
+
+def extract_pitch_crepe_voiced(
+    audio: Union[str, AudioBuffer],
+    regions: Optional[np.ndarray] = None,
+    confidence_threshold: float = 0.6,
+    model: str = 'full',
+    step_size: int = 10,
+    top_db: float = 35.0,
+    min_silence: float = 0.5,
+    viterbi: bool = True,
+    batch_size: int = 512
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """
+    有音区間のフレームだけをCREPEで推論し、結果を音声全体の時間軸に配置して返します。
+
+    全ての有音区間のフレームを集めて1度の predict でまとめて推論するため、
+    区間の間の無音にはCREPEの推論時間がかかりません。Viterbiデコードは区間ごとに行います。
+    無音区間のフレームは midi_notes が NaN、confidence が 0 になります。
+    時刻は crepe.predict(center=True) と同じく音声の先頭からの絶対時刻です。
+
+    Parameters
+    ----------
+    audio : str or AudioBuffer
+        音声ファイルパス、またはデコード済みの音声
+    regions : np.ndarray, optional
+        (区間数, 2) の有音区間（audio のサンプルインデックス）。None の場合は
+        vad.detect_voiced_regions で検出します
+    confidence_threshold : float, optional
+        信頼度の閾値（デフォルト: 0.6）
+    model : str, optional
+        CREPEモデルサイズ ('tiny', 'small', 'medium', 'large', 'full')
+    step_size : int, optional
+        分析フレームのステップサイズ（ms）（デフォルト: 10）
+    top_db : float, optional
+        regions を検出する場合の無音判定の閾値（デフォルト: 35.0 dB）
+    min_silence : float, optional
+        regions を検出する場合に区間を分割する最小の無音長（秒）（デフォルト: 0.5）
+    viterbi : bool, optional
+        Viterbiデコードで平滑化するかどうか（デフォルト: True）
+    batch_size : int, optional
+        CREPEの推論バッチサイズ（デフォルト: 512）
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray, int]
+        - midi_notes: フレームごとのMIDIノート番号（NaN含む可能性あり）
+        - confidence: フレームごとの信頼度スコア
+        - time: 時間軸の配列（秒）
+        - sr_used: CREPEの入力サンプリングレート（16000 Hz）
+    """
+    buffer, regions = _prepare_crepe_input(audio, regions, top_db, min_silence)
+    frames, indices, n_frames = _select_frames(buffer, regions, step_size)
+    logger.info(
+        "CREPE（有音区間のみ）: %d区間, 推論フレーム %d / %d (%.1f%%)",
+        len(regions), len(indices), n_frames, 100 * len(indices) / max(n_frames, 1)
+    )
+    activation = None
+    if len(indices):
+        activation = load_crepe_model(model).predict(frames, batch_size=batch_size, verbose=0)
+    return _decode_activation(activation, indices, n_frames, step_size, confidence_threshold, viterbi)
+
+
+def _prepare_crepe_input(
+    audio: Union[str, AudioBuffer],
+    regions: Optional[np.ndarray],
+    top_db: float,
+    min_silence: float
+) -> Tuple[AudioBuffer, np.ndarray]:
+    """音声を 16kHz の AudioBuffer にし、有音区間（None の場合は検出）を 16kHz のサンプル位置で返します。"""
+    buffer = audio if isinstance(audio, AudioBuffer) else AudioBuffer.from_file(audio, sr=CREPE_SR)
+    if regions is None:
+        regions = detect_voiced_regions(buffer.samples, buffer.sr, top_db=top_db, min_silence=min_silence)
+    regions = np.asarray(regions, dtype=np.int64).reshape(-1, 2)
+    if buffer.sr != CREPE_SR:
+        regions = regions * CREPE_SR // buffer.sr
+        buffer = buffer.resampled(CREPE_SR)
+    return buffer, regions
+
+
+def _select_frames(
+    buffer: AudioBuffer,
+    regions: np.ndarray,
+    step_size: int
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    有音区間内のフレームを正規化して取り出します。
+
+    Returns:
+        (フレーム (n, 1024), フレーム番号 (n,), 音声全体のフレーム数)
+    """
+    hop_length = int(CREPE_SR * step_size / 1000)
+    n_frames = 1 + len(buffer.samples) // hop_length
+    indices = voiced_frame_indices(regions, hop_length, n_frames)
+    if len(indices) == 0:
+        return np.empty((0, CREPE_FRAME_LENGTH), dtype=np.float32), indices, n_frames
+
+    # 日本語コメント: crepe.predict(center=True) と同じ位置のフレームを、有音区間の分だけ取り出す
+    padded = np.pad(buffer.samples, CREPE_FRAME_LENGTH // 2)
+    all_frames = np.lib.stride_tricks.as_strided(
+        padded,
+        shape=(n_frames, CREPE_FRAME_LENGTH),
+        strides=(hop_length * padded.itemsize, padded.itemsize)
+    )
+    return _normalize_frames(all_frames[indices].astype(np.float32)), indices, n_frames
+
+
+def _decode_activation(
+    activation: Optional[np.ndarray],
+    indices: np.ndarray,
+    n_frames: int,
+    step_size: int,
+    confidence_threshold: float,
+    viterbi: bool
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """
+    _select_frames で選んだフレームのアクティベーションをデコードし、音声全体の時間軸に配置します。
+    """
+    time = Timeline.from_step_size(step_size, sr=CREPE_SR).times(n_frames)
+    midi_notes = np.full(n_frames, np.nan)
+    confidence = np.zeros(n_frames, dtype=np.float32)
+    if activation is None or len(indices) == 0:
+        return midi_notes, confidence, time, CREPE_SR
+    confidence[indices] = activation.max(axis=1)
+
+    # 連続したフレームの並びごとにデコードする（無音を挟んだ区間同士で状態を引き継がない）
+    run_starts = np.flatnonzero(np.diff(indices) != 1) + 1
+    cents = []
+    for salience in np.split(activation, run_starts):
+        if viterbi:
+            decoder = _StreamingViterbi(lag_frames=len(salience))
+            decoder.push(salience)
+            cents.append(decoder.flush())
+        else:
+            cents.append(_local_average_cents(salience, np.argmax(salience, axis=1)))
+    midi_notes[indices] = _cents_to_midi(np.concatenate(cents))
+    midi_notes[confidence < confidence_threshold] = np.nan
+    return midi_notes, confidence, time, CREPE_SR
+
+
+def extract_pitch_crepe_batch(
+    audios: Sequence[Union[str, AudioBuffer]],
+    regions: Optional[Sequence[Optional[np.ndarray]]] = None,
+    confidence_threshold: float = 0.6,
+    model: str = 'full',
+    step_size: int = 10,
+    viterbi: bool = True,
+    batch_size: int = 1024,
+    chunk_frames: int = 16384
+) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray, int]]:
+    """
+    複数の音声のフレームをまとめてCREPEで推論し、ファイルごとの結果に分けて返します。
+
+    短いボーカルステムを1ファイルずつ推論するとバッチが埋まらずCPUを使い切れないため、
+    ファイルを跨いでフレームを連結し、大きなバッチで推論します。Viterbiデコードはファイル
+    （および有音区間）ごとに行うため、結果は各ファイルを extract_pitch_crepe_voiced で
+    処理した場合と同じです。メモリ使用量を抑えるため、連結するフレーム数が chunk_frames を
+    超えた時点で推論します（1ファイルのフレームは分割しません）。
+
+    Parameters
+    ----------
+    audios : Sequence[str or AudioBuffer]
+        音声ファイルパス、またはデコード済みの音声のリスト
+    regions : Sequence[np.ndarray or None], optional
+        ファイルごとの有音区間（サンプルインデックス）。None の要素（または regions=None）は音声全体
+    confidence_threshold : float, optional
+        信頼度の閾値（デフォルト: 0.6）
+    model : str, optional
+        CREPEモデルサイズ ('tiny', 'small', 'medium', 'large', 'full')
+    step_size : int, optional
+        分析フレームのステップサイズ（ms）（デフォルト: 10）
+    viterbi : bool, optional
+        Viterbiデコードで平滑化するかどうか（デフォルト: True）
+    batch_size : int, optional
+        CREPEの推論バッチサイズ（デフォルト: 1024）
+    chunk_frames : int, optional
+        1度の推論に渡す最大フレーム数の目安（デフォルト: 16384 ≒ 64MB）
+
+    Returns
+    -------
+    List[Tuple[np.ndarray, np.ndarray, np.ndarray, int]]
+        audios と同じ順序の (midi_notes, confidence, time, sr_used)
+    """
+    if regions is None:
+        regions = [None] * len(audios)
+    if len(regions) != len(audios):
+        raise ValueError("regions must have one entry per audio")
+
+    crepe_model = load_crepe_model(model)
+    results: List[Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, int]]] = [None] * len(audios)
+    pending: List[Tuple[int, np.ndarray, np.ndarray, int]] = []  # (ファイル番号, フレーム, フレーム番号, 全フレーム数)
+    pending_frames = 0
+    total_frames = 0
+
+    def _flush() -> None:
+        nonlocal pending_frames
+        if not pending:
+            return
+        frames = np.concatenate([item[1] for item in pending])
+        activation = crepe_model.predict(frames, batch_size=batch_size, verbose=0) if len(frames) else None
+        offset = 0
+        for file_index, _, indices, n_frames in pending:
+            part = activation[offset:offset + len(indices)] if activation is not None else None
+            offset += len(indices)
+            results[file_index] = _decode_activation(
+                part, indices, n_frames, step_size, confidence_threshold, viterbi
+            )
+        pending.clear()
+        pending_frames = 0
+
+    for file_index, (audio, file_regions) in enumerate(zip(audios, regions)):
+        buffer = audio if isinstance(audio, AudioBuffer) else AudioBuffer.from_file(audio, sr=CREPE_SR)
+        if file_regions is None:
+            file_regions = np.array([[0, len(buffer.samples)]])
+        buffer, file_regions = _prepare_crepe_input(buffer, file_regions, 0.0, 0.0)
+        frames, indices, n_frames = _select_frames(buffer, file_regions, step_size)
+        pending.append((file_index, frames, indices, n_frames))
+        pending_frames += len(indices)
+        total_frames += len(indices)
+        if pending_frames >= chunk_frames:
+            _flush()
+    _flush()
+
+    logger.info("CREPE（バッチ推論）: %dファイル, 推論フレーム %d", len(audios), total_frames)
+    return results
+
+
 def cluster_notes_with_confidence(
     time_axis: np.ndarray,
     midi_values: np.ndarray,
@@ -158,8 +747,7 @@ def cluster_notes_with_confidence(
         抽出されたノートイベントのリスト
     """
     # デバッグ情報の出力
-    print(f"Input shape: {midi_values.shape}")
-    print(f"Valid notes: {np.sum(~np.isnan(midi_values))}/{len(midi_values)}")
+    logger.debug("Input shape: %s, valid notes: %d/%d", midi_values.shape, np.sum(~np.isnan(midi_values)), len(midi_values))
     
     # ピッチの平滑化前にNaNを補間
     valid_indices = ~np.isnan(midi_values)
@@ -170,107 +758,49 @@ def cluster_notes_with_confidence(
             midi_values[valid_indices]
         )
     else:
-        print("Warning: No valid pitch values found")
+        logger.warning("No valid pitch values found")
         return []
 
     # メディアンフィルタによる平滑化
+    from scipy.ndimage import median_filter  # 日本語コメント: 起動を速くするため、使う場合のみ import する
     midi_smooth = median_filter(midi_values_filled, size=smooth_window)
     
-    # 初期ノートイベントの生成
-    note_events: List[NoteEvent] = []
-    current_note: Optional[float] = None
-    note_start_time: Optional[float] = None
-    current_confidence_sum = 0.0
-    current_frame_count = 0
-    
-    for t, note_val, conf in zip(time_axis, midi_smooth, confidence_values):
-        if conf < confidence_threshold or np.isnan(note_val):
-            if current_note is not None:
-                duration = t - note_start_time
-                if duration >= min_note_length:
-                    avg_confidence = current_confidence_sum / current_frame_count
-                    note_events.append(
-                        NoteEvent(
-                            start_time=note_start_time,
-                            end_time=t,
-                            midi_note=current_note,
-                            confidence=avg_confidence
-                        )
-                    )
-                current_note = None
-                current_confidence_sum = 0.0
-                current_frame_count = 0
-            continue
-        
-        if current_note is None:
-            current_note = note_val
-            note_start_time = t
-            current_confidence_sum = conf
-            current_frame_count = 1
-        else:
-            cent_diff = 100 * (note_val - current_note)
-            if abs(cent_diff) > cent_tolerance:
-                duration = t - note_start_time
-                if duration >= min_note_length:
-                    avg_confidence = current_confidence_sum / current_frame_count
-                    note_events.append(
-                        NoteEvent(
-                            start_time=note_start_time,
-                            end_time=t,
-                            midi_note=current_note,
-                            confidence=avg_confidence
-                        )
-                    )
-                current_note = note_val
-                note_start_time = t
-                current_confidence_sum = conf
-                current_frame_count = 1
-            else:
-                # 重み付き平均でノートを更新
-                current_note = (current_note * current_frame_count + note_val) / (current_frame_count + 1)
-                current_confidence_sum += conf
-                current_frame_count += 1
-
-    # 最後のノートの処理
-    if current_note is not None:
-        duration = time_axis[-1] - note_start_time
-        if duration >= min_note_length:
-            avg_confidence = current_confidence_sum / current_frame_count
-            note_events.append(
-                NoteEvent(
-                    start_time=note_start_time,
-                    end_time=time_axis[-1],
-                    midi_note=current_note,
-                    confidence=avg_confidence
-                )
-            )
-
-    # ノートイベントをタプルのリストに変換
-    note_tuples = [(n.start_time, n.end_time, n.midi_note) for n in note_events]
+    # 初期ノートの生成（フレームループは配列上のカーネルで実行）
+    notes = segment_notes(
+        time_axis,
+        midi_smooth,
+        confidence_values,
+        cent_tolerance=cent_tolerance,
+        min_note_length=min_note_length,
+        confidence_threshold=confidence_threshold
+    )
 
-    # 短いノートのマージと削除
-    from .note_utils import merge_short_notes, smooth_vibrato
-    merged_notes = merge_short_notes(note_tuples, min_note_length, cent_tolerance)
-    
-    # ビブラートの平滑化
-    smoothed_notes = smooth_vibrato(merged_notes, vibrato_window, vibrato_tolerance)
+    # 短いノートのマージと削除、ビブラートの平滑化（1つのステージで処理）
+    smoothed_notes = postprocess_notes(
+        notes,
+        min_duration=min_note_length,
+        merge_cent_tolerance=cent_tolerance,
+        vibrato_window=vibrato_window,
+        vibrato_cent_tolerance=vibrato_tolerance
+    )
     
     # 最終的なノートイベントの生成
-    final_note_events = []
-    for start, end, note in smoothed_notes:
-        final_note_events.append(
-            NoteEvent(
-                start_time=start,
-                end_time=end,
-                midi_note=note,
-                confidence=1.0  # マージ後は信頼度を1.0とする
-            )
+    final_note_events = [
+        NoteEvent(
+            start_time=start,
+            end_time=end,
+            midi_note=note,
+            confidence=1.0  # マージ後は信頼度を1.0とする
+        )
+        for start, end, note in zip(
+            smoothed_notes["start"].tolist(),
+            smoothed_notes["end"].tolist(),
+            smoothed_notes["pitch"].tolist()
         )
+    ]
 
     # デバッグ情報の出力
-    print(f"Generated {len(final_note_events)} note events")
-    if final_note_events:
-        print(f"Average confidence: {np.mean([n.confidence for n in final_note_events]):.3f}")
+    logger.debug("Generated %d note events", len(final_note_events))
     
     return final_note_events
 
@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/src/audio2midi/preprocessing.py
+"""
+音声の前処理チェーン（メモリ上で実行）
+
+AudioBuffer の float32 配列に対して、以下のステージを順に適用します：
+- normalize: ピークノーマライズ
+- highpass / lowpass: Butterworth フィルタ（ゼロ位相）
+- spectral_gate: スペクトルゲーティングによるノイズ削減
+- separator: ボーカル分離（VocalSeparator を実装したプラグイン、例: Demucs）
+
+各ステージは (samples, sr) を受け取り処理後の配列を返す関数で、可能なものは配列をその場で書き換えます。
+ディスクへの書き出しは行わず、結果の AudioBuffer をそのまま後段（Whisper / CREPE）に渡します。
+
+Usage:
+    from audio2midi.preprocessing import build_chain
+
+    chain = build_chain(highpass_hz=80.0, spectral_gating=True)
+    buffer, timings = chain.run(buffer)
+"""
+
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .audio_buffer import AudioBuffer
+
+logger = logging.getLogger(__name__)
+
+# (samples, sr) -> samples
+Stage = Callable[[np.ndarray, int], np.ndarray]
+
+
+class PreprocessingError(Exception):
+    """前処理中のエラーを表すカスタム例外クラス"""
+    pass
+
+
+def normalize(samples: np.ndarray, sr: int, headroom_db: float = 0.1) -> np.ndarray:
+    """
+    ピークが -headroom_db dBFS になるように、配列をその場でスケーリングします。
+
+    pydub.effects.normalize（デフォルトの headroom=0.1dB）と同じ処理です。
+    """
+    peak = float(np.max(np.abs(samples))) if len(samples) else 0.0
+    if peak > 0.0:
+        samples *= np.float32(10.0 ** (-headroom_db / 20.0) / peak)
+    return samples
+
+
+def _butterworth(samples: np.ndarray, sr: int, cutoff: float, btype: str, order: int) -> np.ndarray:
+    """Butterworth フィルタをゼロ位相（前後方向）で適用します。ノートのタイミングをずらさないため。"""
+    from scipy.signal import butter, sosfiltfilt  # 日本語コメント: 起動を速くするため、使う場合のみ import する
+
+    nyquist = sr / 2.0
+    if not 0.0 < cutoff < nyquist:
+        raise PreprocessingError(f"カットオフ周波数は 0 < f < {nyquist}Hz の範囲で指定してください: {cutoff}")
+    sos = butter(order, cutoff / nyquist, btype=btype, output="sos")
+    padlen = min(len(samples) - 1, 3 * (2 * len(sos) + 1))
+    if padlen < 1:
+        return samples
+    samples[:] = sosfiltfilt(sos, samples, padlen=padlen)
+    return samples
+
+
+def highpass(samples: np.ndarray, sr: int, cutoff: float = 80.0, order: int = 4) -> np.ndarray:
+    """ハイパスフィルタ（マイクのハンドリングノイズや空調などの低域ノイズの除去）"""
+    return _butterworth(samples, sr, cutoff, "highpass", order)
+
+
+def lowpass(samples: np.ndarray, sr: int, cutoff: float = 7000.0, order: int = 4) -> np.ndarray:
+    """ローパスフィルタ（ヒスノイズなどの高域ノイズの除去）"""
+    return _butterworth(samples, sr, cutoff, "lowpass", order)
+
+
+def spectral_gate(
+    samples: np.ndarray,
+    sr: int,
+    n_fft: int = 1024,
+    hop_length: int = 256,
+    n_std: float = 1.5,
+    noise_quantile: float = 0.1,
+    prop_decrease: float = 1.0,
+    smooth_bins: int = 3,
+    smooth_frames: int = 5
+) -> np.ndarray:
+    """
+    スペクトルゲーティングによる定常ノイズの削減。
+
+    エネルギーが小さい順に noise_quantile の割合のフレームをノイズとみなし、
+    周波数ビンごとの平均と標準偏差（dB）から閾値を求めます。閾値を下回る
+    時間周波数成分を prop_decrease の割合で減衰させ、マスクは時間・周波数方向に
+    平滑化してミュージカルノイズを抑えます。
+
+    Args:
+        samples: 音声データ
+        sr: サンプリングレート
+        n_fft: FFT 長
+        hop_length: ホップ長
+        n_std: 閾値（ノイズの平均 + n_std × 標準偏差）
+        noise_quantile: ノイズの推定に使うフレームの割合
+        prop_decrease: 減衰の強さ（0: なし, 1: 完全に除去）
+        smooth_bins: マスクを平滑化する周波数方向の幅（ビン数）
+        smooth_frames: マスクを平滑化する時間方向の幅（フレーム数）
+
+    Returns:
+        ノイズ削減後の音声データ（入力と同じ長さ）
+    """
+    if len(samples) < n_fft:
+        return samples
+    from scipy.ndimage import uniform_filter
+    from scipy.signal import istft, stft
+
+    noverlap = n_fft - hop_length
+    _, _, spectrum = stft(samples, fs=sr, nperseg=n_fft, noverlap=noverlap)
+    magnitude_db = 20.0 * np.log10(np.abs(spectrum) + 1e-10)
+
+    # 日本語コメント: エネルギーの小さいフレームをノイズの区間とみなして統計を取る
+    frame_energy = magnitude_db.mean(axis=0)
+    n_noise = max(1, int(len(frame_energy) * noise_quantile))
+    noise_frames = np.argpartition(frame_energy, n_noise - 1)[:n_noise]
+    noise_db = magnitude_db[:, noise_frames]
+    threshold = noise_db.mean(axis=1) + n_std * noise_db.std(axis=1)
+
+    mask = (magnitude_db > threshold[:, None]).astype(np.float32)
+    mask = uniform_filter(mask, size=(smooth_bins, smooth_frames), mode="nearest")
+    gain = 1.0 - prop_decrease * (1.0 - mask)
+
+    _, denoised = istft(spectrum * gain, fs=sr, nperseg=n_fft, noverlap=noverlap)
+    samples[:] = denoised[:len(samples)]
+    return samples
+
+
+class VocalSeparator:
+    """
+    ボーカル分離のプラグインインターフェース。
+
+    separate() はミックス音声を受け取り、同じサンプリングレート・同じ長さの
+    ボーカルのみの音声を返します。register_separator() で名前を付けて登録すると
+    build_chain(separator="名前") や --vocal-separator から使用できます。
+    """
+
+    name = "base"
+
+    def separate(self, samples: np.ndarray, sr: int) -> np.ndarray:
+        raise NotImplementedError
+
+    def __call__(self, samples: np.ndarray, sr: int) -> np.ndarray:
+        return self.separate(samples, sr)
+
+
+class DemucsSeparator(VocalSeparator):
+    """
+    Demucs によるボーカル分離（demucs と torch が必要）。
+
+    Args:
+        model_name: Demucs の事前学習済みモデル名
+        device: 使用するデバイス
+    """
+
+    name = "demucs"
+
+    def __init__(self, model_name: str = "htdemucs", device: str = "cpu") -> None:
+        self.model_name = model_name
+        self.device = device
+
+    def _load_model(self):
+        from .model_cache import get_registry
+
+        def loader():
+            try:
+                from demucs.pretrained import get_model
+            except ImportError as e:
+                raise PreprocessingError(
+                    "ボーカル分離には demucs が必要です: pip install demucs"
+                ) from e
+            model = get_model(self.model_name)
+            model.to(self.device)
+            model.eval()
+            return model
+
+        return get_registry().get(("demucs", self.device, self.model_name), loader)
+
+    def separate(self, samples: np.ndarray, sr: int) -> np.ndarray:
+        import soxr
+        import torch
+        from demucs.apply import apply_model
+
+        model = self._load_model()
+        # 日本語コメント: Demucs はモデルのサンプリングレート（44.1kHz）のステレオ入力を前提とする
+        mix = soxr.resample(samples, sr, model.samplerate).astype(np.float32)
+        wav = torch.from_numpy(np.stack([mix] * model.audio_channels))
+        reference = wav.mean(0)
+        wav = (wav - reference.mean()) / (reference.std() + 1e-8)
+        with torch.no_grad():
+            sources = apply_model(model, wav[None], device=self.device)[0]
+        vocals = sources[model.sources.index("vocals")]
+        vocals = (vocals * (reference.std() + 1e-8) + reference.mean()).mean(0).cpu().numpy()
+        vocals = soxr.resample(vocals, model.samplerate, sr).astype(np.float32)
+        out = np.zeros_like(samples)
+        out[:min(len(out), len(vocals))] = vocals[:len(out)]
+        return out
+
+
+_SEPARATORS: Dict[str, Callable[..., VocalSeparator]] = {
+    DemucsSeparator.name: DemucsSeparator,
+}
+
+
+def register_separator(name: str, factory: Callable[..., VocalSeparator]) -> None:
+    """
+    ボーカル分離のプラグインを登録します。
+
+    Args:
+        name: プラグイン名
+        factory: device キーワード引数を受け取り VocalSeparator を返す関数（クラス）
+    """
+    _SEPARATORS[name] = factory
+
+
+def available_separators() -> List[str]:
+    """登録されているボーカル分離のプラグイン名の一覧"""
+    return sorted(_SEPARATORS)
+
+
+class PreprocessingChain:
+    """
+    前処理ステージを順に適用するチェーン。
+
+    Args:
+        stages: (ステージ名, ステージ関数) のリスト
+    """
+
+    def __init__(self, stages: Optional[List[Tuple[str, Stage]]] = None) -> None:
+        self.stages: List[Tuple[str, Stage]] = list(stages or [])
+
+    def add(self, name: str, stage: Stage) -> "PreprocessingChain":
+        """ステージを末尾に追加します。"""
+        self.stages.append((name, stage))
+        return self
+
+    def __len__(self) -> int:
+        return len(self.stages)
+
+    def names(self) -> List[str]:
+        """ステージ名の一覧（キャッシュキーにも使用します）"""
+        return [name for name, _ in self.stages]
+
+    def run(self, buffer: AudioBuffer) -> Tuple[AudioBuffer, Dict[str, float]]:
+        """
+        チェーンを実行し、処理後の AudioBuffer とステージごとの処理時間（秒）を返します。
+
+        AudioBuffer の配列は読み取り専用のため最初に1度だけ複製し、
+        以降のステージはその配列をその場で書き換えます。
+        """
+        timings: Dict[str, float] = {}
+        if not self.stages:
+            return buffer, timings
+
+        samples = np.array(buffer.samples, dtype=np.float32)
+        for name, stage in self.stages:
+            started = time.perf_counter()
+            result = stage(samples, buffer.sr)
+            samples = np.asarray(result, dtype=np.float32)
+            timings[name] = time.perf_counter() - started
+            logger.info("前処理 %s: %.3f秒", name, timings[name])
+        return AudioBuffer.from_array(samples, buffer.sr, source=buffer.source), timings
+
+
+def build_chain(
+    normalize_peak: bool = False,
+    highpass_hz: Optional[float] = None,
+    lowpass_hz: Optional[float] = None,
+    spectral_gating: bool = False,
+    separator: Optional[str] = None,
+    device: str = "cpu"
+) -> PreprocessingChain:
+    """
+    オプションから前処理チェーンを組み立てます。
+
+    ステージの順序は ボーカル分離 → ハイパス → ローパス → スペクトルゲーティング → ノーマライズ です。
+
+    Args:
+        normalize_peak: ピークノーマライズを行うかどうか
+        highpass_hz: ハイパスフィルタのカットオフ周波数（None の場合は無効）
+        lowpass_hz: ローパスフィルタのカットオフ周波数（None の場合は無効）
+        spectral_gating: スペクトルゲーティングによるノイズ削減を行うかどうか
+        separator: ボーカル分離のプラグイン名（None の場合は無効）
+        device: ボーカル分離に使用するデバイス
+
+    Returns:
+        PreprocessingChain: 前処理チェーン
+
+    Raises:
+        PreprocessingError: 未登録のボーカル分離プラグインが指定された場合
+    """
+    chain = PreprocessingChain()
+    if separator:
+        if separator not in _SEPARATORS:
+            raise PreprocessingError(
+                f"未登録のボーカル分離プラグインです: {separator}（利用可能: {', '.join(available_separators())}）"
+            )
+        chain.add(f"separator:{separator}", _SEPARATORS[separator](device=device))
+    if highpass_hz:
+        chain.add(f"highpass:{highpass_hz:g}", lambda s, sr: highpass(s, sr, highpass_hz))
+    if lowpass_hz:
+        chain.add(f"lowpass:{lowpass_hz:g}", lambda s, sr: lowpass(s, sr, lowpass_hz))
+    if spectral_gating:
+        chain.add("spectral_gate", spectral_gate)
+    if normalize_peak:
+        chain.add("normalize", normalize)
+    return chain
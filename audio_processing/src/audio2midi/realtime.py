@@ -0,0 +1,533 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/src/audio2midi/realtime.py
+"""
+入力ストリーム（標準入力・ローカルソケット）の PCM から、ノートを逐次 MIDI に変換するリアルタイムモード
+
+ファイル単位の処理とは異なり、ブロック（デフォルト 10ms）ごとに次の処理を行い、
+ノートの開始・終了を検出した時点で note_on / note_off を mido で送信します。
+
+1. StreamingYin: 新しく揃ったフレームだけ YIN でピッチを推定（信頼度はフレームの音量から判定）
+2. RealtimeNoteTracker: cluster_notes_with_confidence（segmentation._segment_kernel）と同じ規則
+   （メディアン平滑化・信頼度の閾値・移動平均からのセント差・最小ノート長）でノートを1フレームずつ分割
+
+遅延の内訳（デフォルト設定）は、YIN の窓の半分（16ms）+ メディアン平滑化の先読み（2フレーム = 20ms）
++ ノートの確定に必要な最小ノート長（30ms）+ ブロック長（10ms）+ 計算時間で、目標は 100ms 未満です。
+オフライン処理の最小ノート長（0.1秒）を使うと note_on がその分遅れるため、リアルタイムモードでは短くしています。
+
+遅延は「ノートの開始・終了の時刻」から「そのイベントを送信した時点（ブロックの最後のサンプルが届いた時刻 +
+ブロックの処理時間）」までの時間として LatencyHistogram に記録します。replay_wav で WAV ファイルを
+ブロックごとに流し込むと、同じ計測をオフラインで再現できます。
+
+Usage:
+    # 標準入力（16kHz モノラル s16le）から仮想 MIDI ポートへ
+    arecord -f S16_LE -r 16000 -c 1 -t raw | python src/main.py realtime --midi-port audio2midi
+
+    # WAV をリアルタイムの速度で流し込み、MIDI ファイルと遅延のヒストグラムを出力
+    python src/main.py realtime --replay vocal.wav --output live.mid --latency-out latency.json
+"""
+
+import contextlib
+import json
+import logging
+import os
+import socket
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Deque, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import librosa
+import mido
+import numpy as np
+
+from .audio_buffer import SAMPLE_RATE, AudioBuffer
+
+logger = logging.getLogger(__name__)
+
+# 入力 PCM の形式（リトルエンディアン、モノラル）
+PCM_FORMATS: Dict[str, np.dtype] = {
+    "s16le": np.dtype("<i2"),
+    "f32le": np.dtype("<f4"),
+}
+
+# 遅延の目標（ミリ秒）
+DEFAULT_BUDGET_MS = 100.0
+
+
+@dataclass
+class NoteMessage:
+    """送信する MIDI メッセージと、対応する音声上の時刻"""
+    message: mido.Message  # note_on / note_off
+    time: float            # ノートの開始（note_on）・終了（note_off）の時刻（秒、ストリームの先頭から）
+
+
+class StreamingYin:
+    """
+    ブロック単位で届くサンプルから、新しく揃ったフレームのピッチを YIN で推定します。
+
+    フレーム i はサンプル [i * hop, i * hop + frame_length) を使い、その中心の時刻に対応します。
+    信頼度は YinBackend と同様に音量から求めますが、ファイル全体の最大値は使えないため
+    フレームの RMS が silence_db（dBFS）を超えれば 1、それ以外は 0 とします。
+
+    Args:
+        sr: サンプリングレート
+        step_size: フレームのステップサイズ（ms）
+        frame_duration: YIN の窓の長さ（秒）。遅延の半分はこの長さで決まります
+        fmin: 最低音（音名または Hz）
+        fmax: 最高音（音名または Hz）
+        silence_db: 無音とみなす RMS（dBFS）
+    """
+
+    def __init__(
+        self,
+        sr: int = SAMPLE_RATE,
+        step_size: int = 10,
+        frame_duration: float = 0.032,
+        fmin: Union[str, float] = "C2",
+        fmax: Union[str, float] = "C6",
+        silence_db: float = -40.0
+    ) -> None:
+        self.sr = sr
+        self.hop_length = int(sr * step_size / 1000)
+        self.frame_length = int(round(sr * frame_duration))
+        self.fmin = librosa.note_to_hz(fmin) if isinstance(fmin, str) else float(fmin)
+        self.fmax = librosa.note_to_hz(fmax) if isinstance(fmax, str) else float(fmax)
+        self.silence_db = silence_db
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._offset = 0  # _buffer[0] のサンプルインデックス
+        self._next_frame = 0
+
+    @property
+    def latency(self) -> float:
+        """フレームの中心から、そのフレームのサンプルが揃うまでの時間（秒）"""
+        return self.frame_length / 2 / self.sr
+
+    def process(self, samples: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        サンプルを追加し、新しく揃ったフレームの (time, midi_notes, confidence) を返します。
+
+        信頼度が 0 のフレームの midi_notes は NaN です。
+        """
+        self._buffer = np.concatenate([self._buffer, np.asarray(samples, dtype=np.float32)])
+        end = self._offset + len(self._buffer)
+        n_frames = (end - self.frame_length) // self.hop_length + 1 - self._next_frame
+        if n_frames <= 0:
+            return np.zeros(0), np.zeros(0), np.zeros(0)
+
+        start = self._next_frame * self.hop_length - self._offset
+        window = self._buffer[start:start + self.frame_length + (n_frames - 1) * self.hop_length]
+        f0 = librosa.yin(
+            window, fmin=self.fmin, fmax=self.fmax, sr=self.sr,
+            frame_length=self.frame_length, hop_length=self.hop_length, center=False
+        )
+        rms = librosa.feature.rms(
+            y=window, frame_length=self.frame_length, hop_length=self.hop_length, center=False
+        )[0]
+        confidence = (20 * np.log10(np.maximum(rms, 1e-10)) > self.silence_db).astype(np.float64)
+        midi_notes = librosa.hz_to_midi(f0)
+        midi_notes[confidence < 0.5] = np.nan
+        frames = np.arange(self._next_frame, self._next_frame + n_frames)
+        times = (frames * self.hop_length + self.frame_length / 2) / self.sr
+
+        # 日本語コメント: 次のフレームの先頭より前のサンプルは不要なので捨てる
+        self._next_frame += n_frames
+        drop = self._next_frame * self.hop_length - self._offset
+        self._buffer = self._buffer[drop:]
+        self._offset += drop
+        return times, midi_notes, confidence
+
+
+class RealtimeNoteTracker:
+    """
+    フレームを1つずつ受け取り、ノートの開始・終了を検出します。
+
+    segmentation._segment_kernel と同じく、信頼度が閾値未満のフレームでノートを終了し、
+    ノートの移動平均から cent_tolerance を超えて離れたフレームで新しいノートを開始します。
+    ピッチは smooth_window フレームのメディアンで平滑化するため、smooth_window // 2 フレームを先読みします。
+
+    送信済みの note_on は取り消せないため、ノートが min_note_length 続いた時点で note_on を出力し
+    （それより短いノートは出力しません）、ノートの終了時に note_off を出力します。
+
+    Args:
+        cent_tolerance: 同一ノートとみなすセント差の閾値
+        min_note_length: 最小ノート長（秒）。note_on はノートの開始からこの時間だけ遅れます
+        smooth_window: メディアン平滑化の窓幅（フレーム）
+        confidence_threshold: 信頼度の閾値
+        velocity: ノートのベロシティ
+        channel: MIDI チャンネル
+    """
+
+    def __init__(
+        self,
+        cent_tolerance: float = 40.0,
+        min_note_length: float = 0.03,
+        smooth_window: int = 5,
+        confidence_threshold: float = 0.6,
+        velocity: int = 100,
+        channel: int = 0
+    ) -> None:
+        self.cent_tolerance = cent_tolerance
+        self.min_note_length = min_note_length
+        self.lookahead = smooth_window // 2
+        self.confidence_threshold = confidence_threshold
+        self.velocity = velocity
+        self.channel = channel
+        self._frames: Deque[Tuple[float, float, float]] = deque(maxlen=2 * self.lookahead + 1)
+        self._pending = 0  # 平滑化待ちのフレーム数
+        self._active = False
+        self._current_note = 0.0
+        self._note_start = 0.0
+        self._frame_count = 0
+        self._sounding: Optional[int] = None  # note_on を送信済みのノート番号
+        self._last_time = 0.0
+
+    def push(self, t: float, midi_note: float, confidence: float) -> List[NoteMessage]:
+        """フレームを追加し、確定したイベントを返します。"""
+        self._frames.append((t, midi_note, confidence))
+        self._pending += 1
+        if self._pending <= self.lookahead:
+            return []
+        self._pending -= 1
+        return self._smoothed_step(len(self._frames) - 1 - self.lookahead)
+
+    def flush(self, end_time: Optional[float] = None) -> List[NoteMessage]:
+        """
+        ストリームの終わりに、先読み待ちのフレームを処理して鳴っているノートを終了します。
+
+        Args:
+            end_time: ストリームの終わりの時刻（省略時は最後のフレームの時刻）
+        """
+        events: List[NoteMessage] = []
+        while self._pending > 0:
+            self._pending -= 1
+            events += self._smoothed_step(len(self._frames) - 1 - self._pending)
+        end_time = self._last_time if end_time is None else max(end_time, self._last_time)
+        if self._active:
+            events += self._end(end_time)
+        self._active = False
+        return events
+
+    def _smoothed_step(self, index: int) -> List[NoteMessage]:
+        t, _, confidence = self._frames[index]
+        values = np.array([value for _, value, _ in self._frames], dtype=np.float64)
+        finite = values[~np.isnan(values)]
+        smoothed = float(np.median(finite)) if len(finite) else float("nan")
+        self._last_time = t
+        return self._step(t, smoothed, confidence)
+
+    def _step(self, t: float, note_val: float, confidence: float) -> List[NoteMessage]:
+        events: List[NoteMessage] = []
+        # 日本語コメント: note_val != note_val は NaN の判定（_segment_kernel と同じ）
+        if confidence < self.confidence_threshold or note_val != note_val:
+            if self._active:
+                events += self._end(t)
+                self._active = False
+            return events
+
+        if not self._active:
+            self._start(t, note_val)
+        elif abs(100 * (note_val - self._current_note)) > self.cent_tolerance:
+            events += self._end(t)
+            self._start(t, note_val)
+        else:
+            # 重み付き平均でノートを更新
+            self._current_note = (self._current_note * self._frame_count + note_val) / (self._frame_count + 1)
+            self._frame_count += 1
+
+        if self._sounding is None and t - self._note_start >= self.min_note_length:
+            note = int(round(self._current_note))
+            if 0 <= note <= 127:
+                self._sounding = note
+                events.append(NoteMessage(
+                    mido.Message("note_on", note=note, velocity=self.velocity, channel=self.channel),
+                    self._note_start
+                ))
+        return events
+
+    def _start(self, t: float, note_val: float) -> None:
+        self._active = True
+        self._current_note = note_val
+        self._note_start = t
+        self._frame_count = 1
+
+    def _end(self, t: float) -> List[NoteMessage]:
+        if self._sounding is None:
+            return []
+        note, self._sounding = self._sounding, None
+        return [NoteMessage(mido.Message("note_off", note=note, velocity=0, channel=self.channel), t)]
+
+
+class LatencyHistogram:
+    """
+    イベントごとの遅延（ミリ秒）のヒストグラム。
+
+    Args:
+        bounds_ms: バケットの上限（ミリ秒、昇順）。最後のバケットより大きい値は "+Inf" に数えます
+        budget_ms: 遅延の目標（ミリ秒）
+    """
+
+    DEFAULT_BOUNDS_MS = (5, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100, 150, 200, 500)
+
+    def __init__(self, bounds_ms: Sequence[float] = DEFAULT_BOUNDS_MS, budget_ms: float = DEFAULT_BUDGET_MS) -> None:
+        self.bounds_ms = tuple(bounds_ms)
+        self.budget_ms = budget_ms
+        self.counts = [0] * (len(self.bounds_ms) + 1)
+        self.values: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def add(self, latency_ms: float) -> None:
+        self.values.append(latency_ms)
+        self.counts[int(np.searchsorted(self.bounds_ms, latency_ms, side="left"))] += 1
+
+    def percentile(self, q: float) -> float:
+        """遅延の q パーセンタイル（ミリ秒）。記録がない場合は 0"""
+        return float(np.percentile(self.values, q)) if self.values else 0.0
+
+    def within_budget(self, q: float = 95.0) -> bool:
+        """q パーセンタイルの遅延が目標未満か"""
+        return self.percentile(q) < self.budget_ms
+
+    def summary(self) -> Dict[str, Any]:
+        """件数・パーセンタイル・バケットごとの件数"""
+        labels = [f"<={bound:g}" for bound in self.bounds_ms] + ["+Inf"]
+        return {
+            "count": len(self.values),
+            "budget_ms": self.budget_ms,
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "max_ms": round(max(self.values, default=0.0), 3),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+    def write(self, path: str) -> str:
+        """summary() を JSON ファイルに書き出し、パスを返します。"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+        return path
+
+
+class PortSink:
+    """
+    MIDI ポートにメッセージを送信します（python-rtmidi などの mido のバックエンドが必要）。
+
+    Args:
+        name: ポート名
+        virtual: True の場合は仮想ポートを作成します（他のアプリケーションから接続できます）
+    """
+
+    def __init__(self, name: str, virtual: bool = True) -> None:
+        self.port = mido.open_output(name, virtual=virtual)
+
+    def send(self, event: NoteMessage) -> None:
+        self.port.send(event.message)
+
+    def close(self) -> None:
+        self.port.close()
+
+
+class MidiFileSink:
+    """
+    受け取ったメッセージを、ノートの時刻に合わせた delta time で MIDI ファイルのトラックに追加します。
+
+    ファイルは close() の時点で保存します。
+
+    Args:
+        path: 出力MIDIファイルのパス
+        bpm: テンポ（拍/分）
+        ticks_per_beat: 1拍あたりのtick数
+    """
+
+    def __init__(self, path: str, bpm: int = 120, ticks_per_beat: int = 480) -> None:
+        self.path = path
+        self.tempo = mido.bpm2tempo(bpm)
+        self.midi = mido.MidiFile(ticks_per_beat=ticks_per_beat)
+        self.track = mido.MidiTrack()
+        self.track.name = "Vocal (realtime)"
+        self.track.append(mido.MetaMessage("set_tempo", tempo=self.tempo, time=0))
+        self.midi.tracks.append(self.track)
+        self._tick = 0
+
+    def send(self, event: NoteMessage) -> None:
+        tick = int(mido.second2tick(event.time, self.midi.ticks_per_beat, self.tempo))
+        self.track.append(event.message.copy(time=max(tick - self._tick, 0)))
+        self._tick = max(tick, self._tick)
+
+    def close(self) -> None:
+        self.midi.save(self.path)
+        logger.info("MIDIファイルを保存しました: %s", self.path)
+
+
+class RealtimeTranscriber:
+    """
+    ブロック単位の PCM をピッチ推定・ノート検出に通し、イベントをシンクに送信します。
+
+    Args:
+        estimator: ピッチ推定（省略時は StreamingYin()）
+        tracker: ノート検出（省略時は RealtimeNoteTracker()）
+        sinks: send(NoteMessage) と close() を持つ送信先（PortSink, MidiFileSink など）
+        histogram: 遅延を記録するヒストグラム（省略時は新規作成）
+    """
+
+    def __init__(
+        self,
+        estimator: Optional[StreamingYin] = None,
+        tracker: Optional[RealtimeNoteTracker] = None,
+        sinks: Sequence[Any] = (),
+        histogram: Optional[LatencyHistogram] = None
+    ) -> None:
+        self.estimator = estimator or StreamingYin()
+        self.tracker = tracker or RealtimeNoteTracker()
+        self.sinks = list(sinks)
+        self.histogram = histogram if histogram is not None else LatencyHistogram()
+        self.sr = self.estimator.sr
+        self.samples_seen = 0
+        self.events: List[NoteMessage] = []
+
+    def process(self, samples: np.ndarray) -> List[NoteMessage]:
+        """
+        ブロックを処理し、送信したイベントを返します。
+
+        Args:
+            samples: float32 のモノラル PCM（-1.0〜1.0）
+
+        Returns:
+            List[NoteMessage]: このブロックで確定したイベント
+        """
+        started = time.perf_counter()
+        self.samples_seen += len(samples)
+        times, midi_notes, confidence = self.estimator.process(samples)
+        events: List[NoteMessage] = []
+        for t, midi_note, conf in zip(times.tolist(), midi_notes.tolist(), confidence.tolist()):
+            events += self.tracker.push(t, midi_note, conf)
+        self._emit(events, time.perf_counter() - started)
+        return events
+
+    def close(self) -> List[NoteMessage]:
+        """ストリームの終わりに鳴っているノートを終了し、シンクを閉じます。"""
+        started = time.perf_counter()
+        events = self.tracker.flush(self.samples_seen / self.sr)
+        self._emit(events, time.perf_counter() - started)
+        for sink in self.sinks:
+            sink.close()
+        return events
+
+    def _emit(self, events: List[NoteMessage], elapsed: float) -> None:
+        # 日本語コメント: ブロックの最後のサンプルが届いた時刻に、処理時間を足した時点で送信したものとする
+        arrival = self.samples_seen / self.sr
+        for event in events:
+            for sink in self.sinks:
+                sink.send(event)
+            self.histogram.add((arrival - event.time + elapsed) * 1000)
+            logger.debug("%s note=%d t=%.3f", event.message.type, event.message.note, event.time)
+        self.events += events
+
+
+def read_pcm_blocks(stream: BinaryIO, block_size: int, pcm_format: str = "s16le") -> Iterator[np.ndarray]:
+    """
+    バイナリストリームから block_size サンプルずつ PCM を読み込み、float32 の配列として返します。
+
+    Args:
+        stream: 入力ストリーム（標準入力、ソケットの makefile("rb") など）
+        block_size: 1ブロックのサンプル数
+        pcm_format: 入力の形式（"s16le" または "f32le"）
+    """
+    dtype = PCM_FORMATS[pcm_format]
+    block_bytes = block_size * dtype.itemsize
+    pending = b""
+    while True:
+        chunk = stream.read(block_bytes - len(pending))
+        if not chunk:
+            break
+        pending += chunk
+        if len(pending) < block_bytes:
+            continue
+        yield _decode_pcm(pending, dtype)
+        pending = b""
+    usable = len(pending) - len(pending) % dtype.itemsize
+    if usable:
+        yield _decode_pcm(pending[:usable], dtype)
+
+
+def _decode_pcm(data: bytes, dtype: np.dtype) -> np.ndarray:
+    samples = np.frombuffer(data, dtype=dtype)
+    if dtype.kind == "i":
+        return samples.astype(np.float32) / 32768.0
+    return samples.astype(np.float32)
+
+
+@contextlib.contextmanager
+def open_input(spec: str) -> Iterator[BinaryIO]:
+    """
+    入力を開きます。ソケットの場合は接続を1つ受け付けるまで待ちます。
+
+    Args:
+        spec: "-"（標準入力）、"tcp:HOST:PORT"、"unix:PATH"、またはファイルパス（raw PCM）
+    """
+    if spec == "-":
+        yield sys.stdin.buffer
+        return
+    if spec.startswith(("tcp:", "unix:")):
+        if spec.startswith("tcp:"):
+            host, port = spec[4:].rsplit(":", 1)
+            server = socket.create_server((host, int(port)))
+        else:
+            path = spec[5:]
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(path)
+            server.listen(1)
+        logger.info("入力の接続を待っています: %s", spec)
+        with server:
+            conn, _ = server.accept()
+            with conn, conn.makefile("rb") as stream:
+                yield stream
+        return
+    with open(spec, "rb") as stream:
+        yield stream
+
+
+def run_stream(transcriber: RealtimeTranscriber, blocks: Iterator[np.ndarray]) -> List[NoteMessage]:
+    """ブロックのストリームが終わるまで処理し、送信したイベントをすべて返します。"""
+    try:
+        for block in blocks:
+            transcriber.process(block)
+    finally:
+        transcriber.close()
+    return transcriber.events
+
+
+def replay_wav(
+    audio_path: str,
+    transcriber: RealtimeTranscriber,
+    block_duration: float = 0.01,
+    realtime: bool = False
+) -> List[NoteMessage]:
+    """
+    WAV ファイルをブロックごとに流し込み、ライブ入力と同じ処理・遅延の計測を再現します。
+
+    Args:
+        audio_path: 音声ファイルパス（transcriber のサンプリングレートに変換します）
+        transcriber: 処理に使う RealtimeTranscriber
+        block_duration: 1ブロックの長さ（秒）
+        realtime: True の場合はブロックの長さだけ待ちながら流し込みます（MIDI ポートでの試聴用）
+
+    Returns:
+        List[NoteMessage]: 送信したイベント
+    """
+    samples = AudioBuffer.from_file(audio_path, sr=transcriber.sr).samples
+    block_size = max(int(transcriber.sr * block_duration), 1)
+
+    def blocks() -> Iterator[np.ndarray]:
+        started = time.perf_counter()
+        for i, start in enumerate(range(0, len(samples), block_size)):
+            if realtime:
+                time.sleep(max(started + (i + 1) * block_duration - time.perf_counter(), 0.0))
+            yield samples[start:start + block_size]
+
+    return run_stream(transcriber, blocks())
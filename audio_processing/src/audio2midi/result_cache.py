@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/src/audio2midi/result_cache.py
+"""
+文字起こし・ピッチ抽出の結果をディスクにキャッシュするモジュール
+
+キャッシュキーは「音声ファイルの内容のハッシュ」と「ステージのパラメータ」から作られるため、
+--tempo や --output-format など出力側のオプションだけを変えて再実行した場合は
+Whisper / CREPE を再実行せずに結果を再利用できます。
+
+ディレクトリ構成:
+    <cache_dir>/pitch/<key>/{midi_notes,confidence,time}.npy, meta.json
+    <cache_dir>/<stage>/<key>.{json,npy}（dag.StageGraph のその他のステージの出力。transcription など）
+
+ピッチ抽出結果は .npy で保存し、読み込み時はメモリマップで開きます。
+合計サイズが上限を超えた場合は、最後に参照された時刻が古いエントリから削除します。
+合計サイズはインスタンスごとに最初の保存時に1度だけ数え、以降は保存したエントリの
+サイズを足していきます。キャッシュ全体を走査し直すのは、上限を超えて削除するときだけです。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = Path(os.environ.get("AUDIO2MIDI_CACHE_DIR", Path.home() / ".cache" / "audio2midi"))
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+_PITCH_ARRAYS = ("midi_notes", "confidence", "time")
+
+# 結果の形式を変更したステージのバージョン（古いキャッシュを使わないようキーに含める）
+# pitch 2: time がトリミング前の音声の先頭からの絶対時刻になった
+# note_intervals 2: ノートの構造化配列を note_table.NOTE_DTYPE に統一した
+_STAGE_VERSIONS = {"pitch": 2, "note_intervals": 2}
+
+PitchResult = Tuple[np.ndarray, np.ndarray, np.ndarray, int]
+
+
+def hash_audio_file(audio_path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    音声ファイルの内容の SHA-256 ハッシュを返します。
+
+    ファイル名や更新日時ではなく内容に基づくため、同じ音声を別名で処理しても同じキーになります。
+    """
+    digest = hashlib.sha256()
+    with open(audio_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _json_default(value: Any) -> Any:
+    """NumPy の値を JSON に変換します。"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class ResultCache:
+    """
+    内容アドレス型の結果キャッシュ。
+
+    Args:
+        cache_dir: キャッシュディレクトリ
+        max_bytes: キャッシュの合計サイズの上限（バイト）
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # 日本語コメント: キャッシュの合計サイズの見積もり（None は未計測）
+        self._total_bytes: Optional[int] = None
+
+    @staticmethod
+    def make_key(audio_hash: str, stage: str, params: Dict[str, Any]) -> str:
+        """
+        音声のハッシュ・ステージ名・パラメータからキャッシュキーを作成します。
+        """
+        key_fields: Dict[str, Any] = {"audio": audio_hash, "stage": stage, "params": params}
+        if stage in _STAGE_VERSIONS:
+            key_fields["version"] = _STAGE_VERSIONS[stage]
+        payload = json.dumps(
+            key_fields,
+            sort_keys=True,
+            default=_json_default
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _entry_bytes(entry: Path) -> int:
+        """エントリ（ファイルまたはピッチ抽出結果のディレクトリ）のサイズ"""
+        if entry.is_dir():
+            return sum(p.stat().st_size for p in entry.iterdir())
+        return entry.stat().st_size
+
+    def _replace(self, tmp_path: Union[str, Path], entry: Path) -> None:
+        """
+        一時ファイルをエントリに置き換え、合計サイズの見積もりを更新してから上限を確認します。
+
+        ディレクトリのエントリが既にある場合は置き換えられず OSError になります。
+        """
+        if self._total_bytes is None:
+            self._total_bytes = self.total_bytes()
+        previous = self._entry_bytes(entry) if entry.exists() else 0
+        os.replace(tmp_path, entry)
+        self._total_bytes += self._entry_bytes(entry) - previous
+        self.evict()
+
+    def _touch(self, path: Path) -> None:
+        """LRU 判定のため、参照時刻を更新します。"""
+        now = time.time()
+        os.utime(path, (now, now))
+
+    def load_pitch(self, key: str) -> Optional[PitchResult]:
+        """
+        ピッチ抽出結果を読み込みます。配列は読み取り専用のメモリマップとして返します。
+
+        Returns:
+            (midi_notes, confidence, time, sr)、キャッシュにない場合は None
+        """
+        entry = self.cache_dir / "pitch" / key
+        meta_path = entry / "meta.json"
+        if not meta_path.exists():
+            self.misses += 1
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = [np.load(entry / f"{name}.npy", mmap_mode="r") for name in _PITCH_ARRAYS]
+        self._touch(entry)
+        self.hits += 1
+        return arrays[0], arrays[1], arrays[2], int(meta["sr"])
+
+    def store_pitch(self, key: str, result: PitchResult) -> None:
+        """ピッチ抽出結果を保存します。"""
+        midi_notes, confidence, time_axis, sr = result
+        pitch_dir = self.cache_dir / "pitch"
+        pitch_dir.mkdir(parents=True, exist_ok=True)
+        # 日本語コメント: 書き込み途中のエントリを読まないよう、一時ディレクトリに書いてから置き換える
+        tmp_dir = Path(tempfile.mkdtemp(dir=pitch_dir, prefix=".tmp-"))
+        try:
+            for name, array in zip(_PITCH_ARRAYS, (midi_notes, confidence, time_axis)):
+                np.save(tmp_dir / f"{name}.npy", np.asarray(array))
+            with open(tmp_dir / "meta.json", "w", encoding="utf-8") as f:
+                json.dump({"sr": int(sr)}, f)
+            self._replace(tmp_dir, pitch_dir / key)
+        except OSError:
+            # 他のプロセスが同じキーを先に書き込んだ場合など
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def load_json(self, stage: str, key: str) -> Optional[Any]:
+        """
+        ステージの結果を JSON から読み込みます。
+
+        Returns:
+            保存された値、キャッシュにない場合は None
+        """
+        path = self.cache_dir / stage / f"{key}.json"
+        if not path.exists():
+            self.misses += 1
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+        self._touch(path)
+        self.hits += 1
+        return result
+
+    def store_json(self, stage: str, key: str, result: Any) -> None:
+        """ステージの結果をコンパクトな JSON として保存します。"""
+        stage_dir = self.cache_dir / stage
+        stage_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=stage_dir, prefix=".tmp-", suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+        self._replace(tmp_path, stage_dir / f"{key}.json")
+
+    def load_array(self, stage: str, key: str) -> Optional[np.ndarray]:
+        """
+        ステージの結果を .npy から読み込みます（構造化配列も可）。
+
+        Returns:
+            np.ndarray、キャッシュにない場合は None
+        """
+        path = self.cache_dir / stage / f"{key}.npy"
+        if not path.exists():
+            self.misses += 1
+            return None
+        array = np.load(path)
+        self._touch(path)
+        self.hits += 1
+        return array
+
+    def store_array(self, stage: str, key: str, array: np.ndarray) -> None:
+        """ステージの結果を .npy として保存します。"""
+        stage_dir = self.cache_dir / stage
+        stage_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=stage_dir, prefix=".tmp-", suffix=".npy")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, np.asarray(array))
+        self._replace(tmp_path, stage_dir / f"{key}.npy")
+
+    def _entries(self) -> Dict[Path, Tuple[float, int]]:
+        """キャッシュエントリごとの (最終参照時刻, サイズ) を返します。"""
+        entries: Dict[Path, Tuple[float, int]] = {}
+        if not self.cache_dir.exists():
+            return entries
+        for stage_dir in self.cache_dir.iterdir():
+            if not stage_dir.is_dir() or stage_dir.name.startswith("."):
+                continue
+            for entry in stage_dir.iterdir():
+                if entry.name.startswith(".tmp-"):
+                    continue
+                entries[entry] = (entry.stat().st_mtime, self._entry_bytes(entry))
+        return entries
+
+    def total_bytes(self) -> int:
+        """キャッシュの合計サイズ（バイト）。キャッシュ全体を走査して数えます。"""
+        return sum(size for _, size in self._entries().values())
+
+    def evict(self) -> int:
+        """
+        合計サイズが上限を超えている間、最終参照時刻が古いエントリから削除します。
+
+        合計サイズの見積もりが上限以下の場合は、キャッシュを走査せずに戻ります。
+        他のプロセスが書き込んだ分は、次に走査したときに反映されます。
+
+        Returns:
+            int: 削除したエントリ数
+        """
+        if self._total_bytes is not None and self._total_bytes <= self.max_bytes:
+            return 0
+        entries = self._entries()
+        total = sum(size for _, size in entries.values())
+        removed = 0
+        for entry, (_, size) in sorted(entries.items(), key=lambda item: item[1][0]):
+            if total <= self.max_bytes:
+                break
+            if entry.is_dir():
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                entry.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        self._total_bytes = total
+        return removed
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/src/audio2midi/segmentation.py
+"""
+フレーム単位のピッチ列をノートに分割するセグメンテーションエンジン
+
+cluster_notes_with_confidence のセント許容幅・移動平均によるノート分割を
+配列上で行います。numba がインストールされている場合はJITコンパイルした
+カーネルを使用し、ない場合は Python のリスト上で同じカーネルを実行します。
+
+ノートは構造化配列（note_table.NOTE_DTYPE）として返され、postprocess_notes
+（merge_short_notes / smooth_vibrato）へそのまま渡せます。
+"""
+
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from .note_table import empty_notes
+
+
+def _segment_kernel(
+    time_axis: Any,
+    values: Any,
+    confidence: Any,
+    n_frames: int,
+    last_time: float,
+    confidence_threshold: float,
+    cent_tolerance: float,
+    min_note_length: float,
+    out_start: np.ndarray,
+    out_end: np.ndarray,
+    out_pitch: np.ndarray,
+    out_confidence: np.ndarray
+) -> int:
+    """
+    フレーム列を走査してノートを出力配列に書き込み、ノート数を返します。
+
+    numba の njit と Python の両方で動作するよう、基本的な演算のみで書いています。
+    """
+    count = 0
+    active = False
+    current_note = 0.0
+    note_start_time = 0.0
+    confidence_sum = 0.0
+    frame_count = 0
+
+    for i in range(n_frames):
+        t = time_axis[i]
+        note_val = values[i]
+        conf = confidence[i]
+
+        # 日本語コメント: note_val != note_val は NaN の判定
+        if conf < confidence_threshold or note_val != note_val:
+            if active:
+                if t - note_start_time >= min_note_length:
+                    out_start[count] = note_start_time
+                    out_end[count] = t
+                    out_pitch[count] = current_note
+                    out_confidence[count] = confidence_sum / frame_count
+                    count += 1
+                active = False
+                confidence_sum = 0.0
+                frame_count = 0
+            continue
+
+        if not active:
+            active = True
+            current_note = note_val
+            note_start_time = t
+            confidence_sum = conf
+            frame_count = 1
+        elif abs(100 * (note_val - current_note)) > cent_tolerance:
+            if t - note_start_time >= min_note_length:
+                out_start[count] = note_start_time
+                out_end[count] = t
+                out_pitch[count] = current_note
+                out_confidence[count] = confidence_sum / frame_count
+                count += 1
+            current_note = note_val
+            note_start_time = t
+            confidence_sum = conf
+            frame_count = 1
+        else:
+            # 重み付き平均でノートを更新
+            current_note = (current_note * frame_count + note_val) / (frame_count + 1)
+            confidence_sum += conf
+            frame_count += 1
+
+    # 最後のノートの処理
+    if active and last_time - note_start_time >= min_note_length:
+        out_start[count] = note_start_time
+        out_end[count] = last_time
+        out_pitch[count] = current_note
+        out_confidence[count] = confidence_sum / frame_count
+        count += 1
+
+    return count
+
+
+_jit_kernel: Optional[Callable[..., int]] = None
+
+
+def _get_jit_kernel() -> Optional[Callable[..., int]]:
+    """numba が利用可能な場合、JITコンパイルしたカーネルを返します（numba は初回のみ import）。"""
+    global _jit_kernel
+    if _jit_kernel is None:
+        try:
+            from numba import njit
+        except ImportError:  # numba は任意依存
+            return None
+        _jit_kernel = njit(cache=True, nogil=True)(_segment_kernel)
+    return _jit_kernel
+
+
+def segment_notes(
+    time_axis: np.ndarray,
+    midi_values: np.ndarray,
+    confidence_values: np.ndarray,
+    cent_tolerance: float = 40.0,
+    min_note_length: float = 0.1,
+    confidence_threshold: float = 0.6,
+    use_numba: Optional[bool] = None
+) -> np.ndarray:
+    """
+    フレーム単位のピッチ列をノートに分割します。
+
+    信頼度が閾値未満のフレームでノートを終了し、ノートの移動平均から
+    cent_tolerance を超えて離れたフレームで新しいノートを開始します。
+    min_note_length 未満のノートは出力しません。
+
+    Parameters
+    ----------
+    time_axis : np.ndarray
+        時間軸の配列（秒）
+    midi_values : np.ndarray
+        （平滑化済みの）MIDIノート値の配列
+    confidence_values : np.ndarray
+        信頼度値の配列
+    cent_tolerance : float, optional
+        同一ノートとみなすセント差の閾値（デフォルト: 40セント）
+    min_note_length : float, optional
+        最小ノート長（秒）（デフォルト: 0.1秒）
+    confidence_threshold : float, optional
+        信頼度の閾値（デフォルト: 0.6）
+    use_numba : bool, optional
+        numba を使うかどうか（None の場合はインストールされていれば使用）
+
+    Returns
+    -------
+    np.ndarray
+        NOTE_DTYPE の構造化配列（開始時間順）
+    """
+    time_axis = np.asarray(time_axis, dtype=np.float64)
+    midi_values = np.asarray(midi_values, dtype=np.float64)
+    confidence_values = np.asarray(confidence_values)
+    n_frames = min(len(time_axis), len(midi_values), len(confidence_values))
+    if n_frames == 0:
+        return empty_notes()
+
+    # 日本語コメント: 信頼度が float32 の場合は閾値も float32 として比較する（NumPy のスカラー比較と同じ）
+    if np.issubdtype(confidence_values.dtype, np.floating):
+        confidence_threshold = float(confidence_values.dtype.type(confidence_threshold))
+    confidence_values = confidence_values.astype(np.float64)
+
+    # ノート数はフレーム数を超えない
+    out = np.empty((4, n_frames), dtype=np.float64)
+    kernel = _get_jit_kernel() if use_numba is not False else None
+    if use_numba and kernel is None:
+        raise ImportError("numba is not installed")
+
+    if kernel is not None:
+        count = kernel(
+            time_axis, midi_values, confidence_values, n_frames, float(time_axis[-1]),
+            float(confidence_threshold), float(cent_tolerance), float(min_note_length),
+            out[0], out[1], out[2], out[3]
+        )
+    else:
+        # 日本語コメント: NumPy スカラーの生成を避けるため Python のリストとして走査する
+        count = _segment_kernel(
+            time_axis[:n_frames].tolist(), midi_values[:n_frames].tolist(),
+            confidence_values[:n_frames].tolist(), n_frames, float(time_axis[-1]),
+            confidence_threshold, cent_tolerance, min_note_length,
+            out[0], out[1], out[2], out[3]
+        )
+
+    notes = empty_notes(count)
+    notes["start"] = out[0, :count]
+    notes["end"] = out[1, :count]
+    notes["pitch"] = out[2, :count]
+    notes["confidence"] = out[3, :count]
+    return notes
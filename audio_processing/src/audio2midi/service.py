@@ -0,0 +1,379 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/src/audio2midi/service.py
+"""
+モデルを読み込んだまま常駐し、変換ジョブを受け付けるローカルサービス（asyncio）
+
+main.py を毎回起動すると Whisper / CREPE のモデルを毎回読み込み直すことになります。
+このサービスは1つのプロセスでモデルを保持したまま（model_cache のレジストリを共有）、
+TCP（localhost）または Unix ソケットでジョブを受け付け、上限付きのスレッドプールで処理します。
+
+同時に実行するジョブは workers 件まで、実行待ちのジョブは max_pending 件までで、
+それを超えたジョブは "rejected" として即座に断ります（クライアントは時間をおいて再送します）。
+
+プロトコル（1接続1リクエスト、UTF-8 の JSON Lines）:
+    リクエスト:
+        {"op": "submit", "audio_path": "/abs/song.wav", "options": ["--output-format", "json", ...]}
+        {"op": "status"}
+    レスポンス（submit の場合は最後のイベントまで順に送られます）:
+        {"event": "queued", "job_id": "...", "position": 0}
+        {"event": "started", "job_id": "..."}
+        {"event": "stage", "job_id": "...", "stage": "pitch", "status": "start"}
+        {"event": "stage", "job_id": "...", "stage": "pitch", "status": "end", "seconds": 1.23, "items": 3000}
+        {"event": "done", "job_id": "...", "format": "midi", "filename": "song.mid", "content": "<base64>", "seconds": 4.5}
+        {"event": "error", "job_id": "...", "message": "..."}
+        {"event": "rejected", "message": "..."}
+        {"event": "status", "running": 1, "waiting": 0, ...}
+
+options は main.py run と同じ引数（音声ファイルパスを除く）です。
+
+Usage:
+    # サーバー
+    python src/main.py serve --port 8765 --preload-whisper large --preload-crepe full
+
+    # クライアント
+    python src/main.py submit song.wav --output-format json
+"""
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import contextvars
+import json
+import logging
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .batch import ProcessFn, process_file
+from .instrumentation import StageRecord, listen, recording
+from .model_cache import get_registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+FINAL_EVENTS = {"done", "error", "rejected", "status"}
+
+# (音声ファイルパス, main.py run の引数) -> パイプラインのオプション
+OptionsFactory = Callable[[str, List[str]], argparse.Namespace]
+
+
+class OptionParser(argparse.ArgumentParser):
+    """
+    エラー時に終了せず ValueError を送出する ArgumentParser。
+
+    サービスでは複数のジョブが同じプロセスで動くため、標準エラー出力や SystemExit を使わずに
+    メッセージを例外で返します（add_subparsers で作るサブパーサーにも引き継がれます）。
+    """
+
+    def error(self, message: str) -> None:
+        raise ValueError(f"{self.prog}: error: {message}")
+
+    def print_help(self, file: Any = None) -> None:
+        raise ValueError(self.format_help())
+
+    def exit(self, status: int = 0, message: Optional[str] = None) -> None:
+        raise ValueError(message or "無効なオプションです")
+
+
+class JobServer:
+    """
+    変換ジョブを受け付けて処理するサーバー。
+
+    Args:
+        build_options: 音声ファイルパスと引数のリストからパイプラインのオプションを作る関数
+            （不正な引数では ValueError を送出する。OptionParser を使うとよい）
+        process_fn: 1ファイルを処理する関数（デフォルトは batch.process_file）
+        workers: 同時に実行するジョブ数
+        max_pending: 実行待ちにできるジョブ数（超えた場合は rejected を返す）
+        output_dir: 出力ファイルを一時的に置くディレクトリ（None の場合は一時ディレクトリ）
+    """
+
+    def __init__(
+        self,
+        build_options: OptionsFactory,
+        process_fn: ProcessFn = process_file,
+        workers: int = 1,
+        max_pending: int = 8,
+        output_dir: Optional[str] = None
+    ) -> None:
+        self.build_options = build_options
+        self.process_fn = process_fn
+        self.workers = max(workers, 1)
+        self.max_pending = max_pending
+        self._own_output_dir = output_dir is None
+        self.output_dir = Path(output_dir or tempfile.mkdtemp(prefix="audio2midi-service-"))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="audio2midi-job")
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.failed = 0
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, path: Optional[str] = None) -> Any:
+        """
+        接続の受け付けを開始し、待ち受けアドレスを返します。
+
+        Args:
+            host: 待ち受けるホスト（localhost 以外での公開は想定していません）
+            port: ポート番号（0 の場合は空いているポート）
+            path: Unix ソケットのパス（指定した場合は host/port より優先）
+
+        Returns:
+            (host, port) または Unix ソケットのパス
+        """
+        self._slots = asyncio.Semaphore(self.workers)
+        if path:
+            self._server = await asyncio.start_unix_server(self._handle, path=path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host=host, port=port)
+        address = self._server.sockets[0].getsockname()
+        logger.info("サービスを開始しました: %s（ワーカー %d, 待ち上限 %d）", address, self.workers, self.max_pending)
+        return address
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """接続の受け付けを止め、実行中のジョブの終了を待ってから後始末します。"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=True)
+        if self._own_output_dir:
+            shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    async def preload(self, loaders: Sequence[Callable[[], Any]]) -> None:
+        """モデルを読み込む関数をワーカースレッドで実行し、最初のジョブからモデルを使い回せるようにします。"""
+        loop = asyncio.get_running_loop()
+        for loader in loaders:
+            await loop.run_in_executor(self._executor, loader)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "event": "status",
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "models": get_registry().stats(),
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        connected = True
+
+        async def send(event: Dict[str, Any]) -> None:
+            nonlocal connected
+            if not connected:
+                return
+            try:
+                writer.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+                await writer.drain()
+            except ConnectionError:
+                # 日本語コメント: クライアントが切断してもジョブは最後まで実行する（結果はキャッシュに残る）
+                connected = False
+
+        try:
+            line = await reader.readline()
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError:
+                await send({"event": "error", "message": "リクエストが JSON ではありません"})
+                return
+            op = request.get("op")
+            if op == "status":
+                await send(self.status())
+            elif op == "submit":
+                await self._submit(request, send)
+            else:
+                await send({"event": "error", "message": f"未対応の操作です: {op}"})
+        finally:
+            with contextlib.suppress(ConnectionError):
+                writer.close()
+                await writer.wait_closed()
+
+    def _parse_options(self, audio_path: str, argv: List[str]) -> argparse.Namespace:
+        """
+        引数をパースします。
+
+        build_options は OptionParser を使ってエラーを ValueError で返す想定です。
+        通常の ArgumentParser による SystemExit も ValueError に変換します。
+        """
+        try:
+            return self.build_options(audio_path, list(argv))
+        except SystemExit:
+            raise ValueError("無効なオプションです")
+
+    async def _submit(self, request: Dict[str, Any], send: Callable[[Dict[str, Any]], Any]) -> None:
+        job_id = uuid.uuid4().hex[:12]
+        audio_path = request.get("audio_path")
+        if not audio_path or not Path(audio_path).exists():
+            await send({"event": "error", "job_id": job_id, "message": f"音声ファイルが見つかりません: {audio_path}"})
+            return
+        try:
+            options = self._parse_options(audio_path, request.get("options", []))
+        except ValueError as e:
+            await send({"event": "error", "job_id": job_id, "message": str(e)})
+            return
+
+        if self.running >= self.workers and self.waiting >= self.max_pending:
+            await send({"event": "rejected", "message": f"実行待ちのジョブが上限（{self.max_pending}件）に達しています"})
+            return
+
+        await send({"event": "queued", "job_id": job_id, "position": self.waiting})
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            await self._run(job_id, audio_path, options, send)
+        finally:
+            self.running -= 1
+            self._slots.release()
+
+    async def _run(
+        self,
+        job_id: str,
+        audio_path: str,
+        options: argparse.Namespace,
+        send: Callable[[Dict[str, Any]], Any]
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+
+        def listener(event: str, name: str, record: Optional[StageRecord]) -> None:
+            message = {"event": "stage", "job_id": job_id, "stage": name, "status": event}
+            if record is not None:
+                message["seconds"] = record.wall_seconds
+                message["items"] = record.items
+            loop.call_soon_threadsafe(events.put_nowait, message)
+
+        output_format = getattr(options, "output_format", "midi")
+        extension = "mid" if output_format == "midi" else output_format
+        job_dir = self.output_dir / job_id
+        job_dir.mkdir(parents=True, exist_ok=True)
+        output_path = job_dir / f"{Path(audio_path).stem}.{extension}"
+
+        def work() -> str:
+            # 日本語コメント: 常駐プロセスの共有レコーダーに溜め続けないよう、ジョブごとの記録先に切り替える
+            with listen(listener), recording():
+                return self.process_fn(audio_path, str(output_path), options)
+
+        await send({"event": "started", "job_id": job_id})
+        started = time.perf_counter()
+        # 日本語コメント: listen() は contextvars を使うため、ワーカースレッドでもこのジョブのコンテキストで実行する
+        future = loop.run_in_executor(self._executor, contextvars.copy_context().run, work)
+        future.add_done_callback(lambda _: events.put_nowait(None))
+        while (message := await events.get()) is not None:
+            await send(message)
+
+        try:
+            future.result()
+            content = output_path.read_bytes()
+        except Exception as e:
+            self.failed += 1
+            logger.warning("ジョブ %s が失敗しました: %s", job_id, e)
+            await send({"event": "error", "job_id": job_id, "message": f"{type(e).__name__}: {e}"})
+            return
+        finally:
+            shutil.rmtree(job_dir, ignore_errors=True)
+        self.completed += 1
+        await send({
+            "event": "done",
+            "job_id": job_id,
+            "format": output_format,
+            "filename": output_path.name,
+            "content": base64.b64encode(content).decode("ascii"),
+            "seconds": round(time.perf_counter() - started, 3),
+        })
+
+
+async def request(
+    message: Dict[str, Any],
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    path: Optional[str] = None,
+    on_event: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    サービスにリクエストを1つ送り、最後のイベントを返します。
+
+    Args:
+        message: リクエスト（{"op": "submit", ...} など）
+        host: サーバーのホスト
+        port: サーバーのポート
+        path: Unix ソケットのパス（指定した場合は host/port より優先）
+        on_event: 途中のイベント（queued, started, stage）を受け取る関数
+
+    Returns:
+        Dict[str, Any]: 最後のイベント（done, error, rejected, status）
+    """
+    if path:
+        reader, writer = await asyncio.open_unix_connection(path, limit=2 ** 26)
+    else:
+        reader, writer = await asyncio.open_connection(host, port, limit=2 ** 26)
+    try:
+        writer.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+        await writer.drain()
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("サービスとの接続が切れました")
+            event = json.loads(line)
+            if event.get("event") in FINAL_EVENTS:
+                return event
+            if on_event is not None:
+                on_event(event)
+    finally:
+        writer.close()
+        with contextlib.suppress(ConnectionError):
+            await writer.wait_closed()
+
+
+def submit_job(
+    audio_path: str,
+    options: Sequence[str] = (),
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    path: Optional[str] = None,
+    on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+    wait: float = 0.0
+) -> Dict[str, Any]:
+    """
+    ジョブを送信して完了まで待ちます（同期版のクライアント）。
+
+    Args:
+        audio_path: 音声ファイルパス（サーバーから見えるパスに変換して送ります）
+        options: main.py run と同じ引数（音声ファイルパスを除く）
+        host: サーバーのホスト
+        port: サーバーのポート
+        path: Unix ソケットのパス
+        on_event: 途中のイベントを受け取る関数
+        wait: 実行待ちが満杯で断られた場合に再送を続ける時間（秒）
+
+    Returns:
+        Dict[str, Any]: 最後のイベント。done の場合は content（base64）に出力ファイルの内容が入ります
+    """
+    message = {"op": "submit", "audio_path": str(Path(audio_path).resolve()), "options": list(options)}
+    deadline = time.monotonic() + wait
+    while True:
+        event = asyncio.run(request(message, host, port, path, on_event))
+        if event["event"] != "rejected" or time.monotonic() >= deadline:
+            return event
+        time.sleep(min(1.0, max(deadline - time.monotonic(), 0.0)))
+
+
+def decode_content(event: Dict[str, Any]) -> bytes:
+    """done イベントの出力ファイルの内容"""
+    return base64.b64decode(event["content"])
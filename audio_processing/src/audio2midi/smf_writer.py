@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/src/audio2midi/smf_writer.py
+"""
+Standard MIDI File（SMF）を bytearray に直接書き出すエンコーダ
+
+midiutil.MIDIFile や mido.Message のようにイベントごとにオブジェクトを作らず、
+ノートの開始・終了時刻の配列から tick 変換・ソート・可変長数値（delta time）の符号化・
+チャンクの組み立てまでを NumPy の配列演算で行います。10万ノートでもイベントごとの Python の処理はありません
+（歌詞などのメタイベントのみ、テキストの符号化を1件ずつ行います）。
+
+- 秒 → tick の変換はテンポマップ（TempoMap）に従います（テンポの途中変更にも対応）
+- 同じ tick のイベントはメタイベント → note_off → note_on の順に並べます
+- 同じ音高のノートが重なる場合は、後のノートの開始で前のノートを終了します
+- 歌詞は lyric メタイベント（FF 05）として、UTF-8 または Shift_JIS で書き込みます
+
+Usage:
+    from audio2midi.smf_writer import SMFWriter, TempoMap
+
+    writer = SMFWriter(tempo_map=TempoMap([(0.0, 120.0), (30.0, 90.0)]))
+    writer.add_note_track("Vocal Notes", starts, ends, pitches, velocity=100)
+    writer.add_lyric_track("Lyrics", starts, texts, encoding="shift_jis")
+    writer.write("song.mid")
+"""
+
+import struct
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# メタイベントの種類
+META_TEXT = 0x01
+META_TRACK_NAME = 0x03
+META_LYRIC = 0x05
+META_TEMPO = 0x51
+
+# 同じ tick のイベントの並び順
+_PRIORITY_META = 0
+_PRIORITY_NOTE_OFF = 1
+_PRIORITY_NOTE_ON = 2
+
+_END_OF_TRACK = b"\x00\xff\x2f\x00"
+
+ArrayLike = Union[Sequence[float], np.ndarray]
+
+
+class TempoMap:
+    """
+    テンポの変化点（秒, BPM）のリスト。
+
+    Args:
+        changes: (開始時刻（秒）, BPM) のリスト。先頭は 0 秒にしてください
+        ticks_per_beat: 1拍あたりのtick数
+    """
+
+    def __init__(
+        self,
+        changes: Sequence[Tuple[float, float]] = ((0.0, 120.0),),
+        ticks_per_beat: int = 480
+    ) -> None:
+        if not changes or changes[0][0] != 0.0:
+            raise ValueError("テンポマップは 0 秒から始まる必要があります")
+        changes = sorted(changes)
+        self.ticks_per_beat = ticks_per_beat
+        self.times = np.array([t for t, _ in changes], dtype=np.float64)
+        self.bpm = np.array([bpm for _, bpm in changes], dtype=np.float64)
+        # 各変化点までの tick 数（浮動小数点のまま累積し、丸めは変換時に1度だけ行う）
+        ticks_per_second = self.bpm / 60.0 * ticks_per_beat
+        self._start_ticks = np.concatenate([[0.0], np.cumsum(np.diff(self.times) * ticks_per_second[:-1])])
+        self._ticks_per_second = ticks_per_second
+
+    @classmethod
+    def constant(cls, bpm: float = 120.0, ticks_per_beat: int = 480) -> "TempoMap":
+        """一定のテンポのテンポマップを作成します。"""
+        return cls([(0.0, bpm)], ticks_per_beat)
+
+    def to_ticks(self, seconds: ArrayLike) -> np.ndarray:
+        """秒の配列を tick の配列（int64）に変換します。"""
+        seconds = np.asarray(seconds, dtype=np.float64)
+        index = np.maximum(np.searchsorted(self.times, seconds, side="right") - 1, 0)
+        ticks = self._start_ticks[index] + (seconds - self.times[index]) * self._ticks_per_second[index]
+        return np.rint(ticks).astype(np.int64)
+
+    def tempo_events(self) -> Tuple[np.ndarray, List[bytes]]:
+        """テンポのメタイベント（FF 51）の (tick, データ) を返します。"""
+        ticks = np.rint(self._start_ticks).astype(np.int64)
+        data = [struct.pack(">I", int(round(60_000_000 / bpm)))[1:] for bpm in self.bpm.tolist()]
+        return ticks, data
+
+
+def encode_vlq(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    0 以上 2**28 未満の整数の配列を、SMF の可変長数値にまとめて符号化します。
+
+    Returns:
+        (各値のバイト数, (値の数, 4) のバイト列。各行の先頭からバイト数分が符号)
+    """
+    values = np.asarray(values, dtype=np.int64)
+    if len(values) and (values.min() < 0 or values.max() >= 1 << 28):
+        raise ValueError("可変長数値は 0 以上 2**28 未満である必要があります")
+    lengths = 1 + (values >= 1 << 7) + (values >= 1 << 14) + (values >= 1 << 21)
+    out = np.zeros((len(values), 4), dtype=np.uint8)
+    for k in range(4):
+        shift = 7 * np.maximum(lengths - 1 - k, 0)
+        continuation = np.where(k < lengths - 1, 0x80, 0)
+        out[:, k] = np.where(k < lengths, ((values >> shift) & 0x7F) | continuation, 0)
+    return lengths, out
+
+
+class _Events:
+    """1トラック分のイベント（tick・並び順・可変長のデータ）を配列で保持します。"""
+
+    def __init__(self) -> None:
+        self.ticks: List[np.ndarray] = []
+        self.priority: List[np.ndarray] = []
+        self.lengths: List[np.ndarray] = []
+        self.data: List[np.ndarray] = []
+
+    def add(self, ticks: np.ndarray, priority: int, lengths: np.ndarray, data: np.ndarray) -> None:
+        self.ticks.append(np.asarray(ticks, dtype=np.int64))
+        self.priority.append(np.full(len(ticks), priority, dtype=np.int8))
+        self.lengths.append(np.asarray(lengths, dtype=np.int64))
+        self.data.append(np.asarray(data, dtype=np.uint8))
+
+    def add_meta(self, ticks: np.ndarray, meta_type: int, payloads: Sequence[bytes]) -> None:
+        sizes = np.fromiter((len(p) for p in payloads), dtype=np.int64, count=len(payloads))
+        vlq_lengths, vlq = encode_vlq(sizes)
+        prefix = b"\xff" + bytes([meta_type])
+        encoded = [prefix + v[:n].tobytes() + p for v, n, p in zip(vlq, vlq_lengths.tolist(), payloads)]
+        self.add(
+            ticks,
+            _PRIORITY_META,
+            np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded)),
+            np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        )
+
+    def merged(self, other: "_Events") -> "_Events":
+        """2つのトラックのイベントをまとめた新しい _Events を返します。"""
+        events = _Events()
+        for source in (self, other):
+            events.ticks += source.ticks
+            events.priority += source.priority
+            events.lengths += source.lengths
+            events.data += source.data
+        return events
+
+    def encode(self) -> bytes:
+        """tick 順に並べ、delta time を付けたトラックチャンクの中身を返します。"""
+        ticks = np.concatenate(self.ticks) if self.ticks else np.zeros(0, dtype=np.int64)
+        priority = np.concatenate(self.priority) if self.priority else np.zeros(0, dtype=np.int8)
+        lengths = np.concatenate(self.lengths) if self.lengths else np.zeros(0, dtype=np.int64)
+        data = np.concatenate(self.data) if self.data else np.zeros(0, dtype=np.uint8)
+        offsets = np.cumsum(lengths) - lengths
+
+        # 日本語コメント: lexsort は安定ソートなので、同じ tick・同じ優先度のイベントは追加した順のまま
+        order = np.lexsort((priority, ticks))
+        ticks, lengths, offsets = ticks[order], lengths[order], offsets[order]
+        deltas = np.diff(ticks, prepend=0)
+        vlq_lengths, vlq = encode_vlq(deltas)
+
+        event_sizes = vlq_lengths + lengths
+        event_starts = np.cumsum(event_sizes) - event_sizes
+        out = np.empty(int(event_sizes.sum()), dtype=np.uint8)
+        for k in range(4):
+            mask = vlq_lengths > k
+            out[event_starts[mask] + k] = vlq[mask, k]
+        # 可変長のデータを、イベントごとの位置にまとめてコピーする
+        within = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        out[np.repeat(event_starts + vlq_lengths, lengths) + within] = data[np.repeat(offsets, lengths) + within]
+        return out.tobytes() + _END_OF_TRACK
+
+
+class SMFWriter:
+    """
+    SMF のエンコーダ。
+
+    トラックが1つの場合はフォーマット0（テンポもそのトラックに書き込み）、
+    複数の場合はフォーマット1（先頭にテンポのトラックを追加）で出力します。
+
+    Args:
+        tempo_map: テンポマップ（省略時は 120 BPM 一定）
+        ticks_per_beat: 1拍あたりのtick数（tempo_map を指定した場合はその値を使います）
+    """
+
+    def __init__(self, tempo_map: Optional[TempoMap] = None, ticks_per_beat: int = 480) -> None:
+        self.tempo_map = tempo_map or TempoMap.constant(ticks_per_beat=ticks_per_beat)
+        self.ticks_per_beat = self.tempo_map.ticks_per_beat
+        self.tracks: List[_Events] = []
+
+    def _new_track(self, name: Optional[str]) -> _Events:
+        events = _Events()
+        if name:
+            events.add_meta(np.zeros(1, dtype=np.int64), META_TRACK_NAME, [name.encode("utf-8")])
+        self.tracks.append(events)
+        return events
+
+    def add_note_track(
+        self,
+        name: Optional[str],
+        start: ArrayLike,
+        end: ArrayLike,
+        pitch: ArrayLike,
+        velocity: Union[int, ArrayLike] = 100,
+        channel: int = 0
+    ) -> int:
+        """
+        ノートのトラックを追加します。
+
+        Args:
+            name: トラック名
+            start: ノートの開始時刻（秒）
+            end: ノートの終了時刻（秒）
+            pitch: MIDIノート番号（0-127 の整数）
+            velocity: ベロシティ（全ノート共通の値、またはノートごとの配列）
+            channel: MIDIチャンネル（0-15）
+
+        Returns:
+            int: 書き込んだノート数（tick に変換して長さが 0 になったノートは除きます）
+        """
+        start_ticks = self.tempo_map.to_ticks(start)
+        end_ticks = self.tempo_map.to_ticks(end)
+        pitch = np.asarray(pitch, dtype=np.int64)
+        velocity = np.broadcast_to(np.asarray(velocity, dtype=np.int64), pitch.shape)
+        if len(pitch) and (pitch.min() < 0 or pitch.max() > 127):
+            raise ValueError("MIDIノート番号は 0-127 である必要があります")
+
+        # 日本語コメント: 同じ音高のノートが重なる場合、前のノートは後のノートの開始で終了させる
+        order = np.lexsort((start_ticks, pitch))
+        same_pitch = pitch[order][1:] == pitch[order][:-1]
+        next_start = np.where(same_pitch, start_ticks[order][1:], np.iinfo(np.int64).max)
+        end_ticks = end_ticks.copy()
+        end_ticks[order[:-1]] = np.minimum(end_ticks[order[:-1]], next_start)
+
+        keep = end_ticks > start_ticks
+        start_ticks, end_ticks = start_ticks[keep], end_ticks[keep]
+        pitch, velocity = pitch[keep], np.clip(velocity[keep], 1, 127)
+
+        events = self._new_track(name)
+        n = len(pitch)
+        note_on = np.column_stack([np.full(n, 0x90 | channel), pitch, velocity]).astype(np.uint8)
+        note_off = np.column_stack([np.full(n, 0x80 | channel), pitch, np.zeros(n)]).astype(np.uint8)
+        events.add(end_ticks, _PRIORITY_NOTE_OFF, np.full(n, 3), note_off.ravel())
+        events.add(start_ticks, _PRIORITY_NOTE_ON, np.full(n, 3), note_on.ravel())
+        return n
+
+    def add_lyric_track(
+        self,
+        name: Optional[str],
+        times: ArrayLike,
+        texts: Sequence[str],
+        encoding: str = "utf-8",
+        meta_type: int = META_LYRIC
+    ) -> None:
+        """
+        歌詞（またはテキスト）のメタイベントのトラックを追加します。
+
+        Args:
+            name: トラック名
+            times: 各テキストの時刻（秒）
+            texts: テキスト
+            encoding: テキストの文字コード（"utf-8"、"shift_jis" など。変換できない文字は "?" にします）
+            meta_type: メタイベントの種類（META_LYRIC または META_TEXT）
+        """
+        events = self._new_track(name)
+        events.add_meta(
+            self.tempo_map.to_ticks(times),
+            meta_type,
+            [text.encode(encoding, errors="replace") for text in texts]
+        )
+
+    def to_bytes(self) -> bytes:
+        """SMF のバイト列を返します。"""
+        tempo = _Events()
+        tempo_ticks, tempo_data = self.tempo_map.tempo_events()
+        tempo.add_meta(tempo_ticks, META_TEMPO, tempo_data)
+        if len(self.tracks) == 1:
+            tracks = [self.tracks[0].merged(tempo)]
+            file_format = 0
+        else:
+            tracks = [tempo] + self.tracks
+            file_format = 1
+
+        out = bytearray(struct.pack(">4sIHHH", b"MThd", 6, file_format, len(tracks), self.ticks_per_beat))
+        for events in tracks:
+            chunk = events.encode()
+            out += struct.pack(">4sI", b"MTrk", len(chunk))
+            out += chunk
+        return bytes(out)
+
+    def write(self, path: str) -> None:
+        """SMF をファイルに書き出します。"""
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/src/audio2midi/timeline.py
+"""
+フレーム番号と音声の絶対時刻（秒）の対応を表す Timeline
+
+ピッチ抽出のフレーム、ノート、Whisper のセグメントが同じ絶対時刻を共有できるよう、
+サンプリングレート・ホップ長・オフセット（フレーム0の時刻）をまとめて各ステージに渡します。
+無音のトリミングや区間ごと（チャンク・有音区間）の処理ではオフセットだけが異なる
+Timeline を使い、stitch_frames で元の時間軸の配列に結果を配置します。
+
+Usage:
+    from audio2midi.timeline import Timeline
+
+    timeline = Timeline.from_step_size(10)            # CREPE の step_size=10ms
+    times = timeline.times(len(midi_notes))           # フレームごとの絶対時刻
+    chunk_timeline = timeline.shifted(30.0)           # 30秒目から始まるチャンク
+"""
+
+from dataclasses import dataclass, replace
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Timeline:
+    """
+    等間隔のフレーム列の時間軸。
+
+    フレーム i の時刻は offset + i * hop_length / sr（秒）です。
+    """
+    sr: int              # サンプリングレート（Hz）
+    hop_length: int      # フレーム間のホップ長（サンプル数）
+    offset: float = 0.0  # フレーム0の絶対時刻（秒）
+
+    @classmethod
+    def from_step_size(cls, step_size: float, sr: int = 16000, offset: float = 0.0) -> "Timeline":
+        """CREPE の step_size（ms）から Timeline を作成します。"""
+        return cls(sr=sr, hop_length=int(sr * step_size / 1000), offset=offset)
+
+    @classmethod
+    def from_time_axis(cls, time: np.ndarray, sr: int, default_hop_length: int = 160) -> "Timeline":
+        """
+        ピッチ抽出の戻り値の時間軸配列から Timeline を復元します。
+
+        Args:
+            time: フレームごとの時刻（秒、等間隔）
+            sr: サンプリングレート
+            default_hop_length: フレームが2つ未満でホップ長を求められない場合の値
+
+        Returns:
+            Timeline: 先頭フレームの時刻をオフセットとする時間軸
+        """
+        time = np.asarray(time, dtype=np.float64)
+        hop_length = default_hop_length
+        if len(time) >= 2:
+            hop_length = max(int(round(float(np.median(np.diff(time))) * sr)), 1)
+        offset = float(time[0]) if len(time) else 0.0
+        return cls(sr=int(sr), hop_length=hop_length, offset=offset)
+
+    @property
+    def frame_duration(self) -> float:
+        """1フレームあたりの秒数"""
+        return self.hop_length / self.sr
+
+    def frame_to_time(self, frames) -> np.ndarray:
+        """フレーム番号（配列可）を絶対時刻（秒）に変換します。"""
+        return self.offset + np.asarray(frames, dtype=np.float64) * self.frame_duration
+
+    def time_to_frame(self, times) -> np.ndarray:
+        """絶対時刻（秒、配列可）を最も近いフレーム番号に変換します。"""
+        return np.rint((np.asarray(times, dtype=np.float64) - self.offset) / self.frame_duration).astype(np.int64)
+
+    def times(self, n_frames: int) -> np.ndarray:
+        """先頭 n_frames フレームの絶対時刻（秒）"""
+        return self.frame_to_time(np.arange(n_frames))
+
+    def shifted(self, seconds: float) -> "Timeline":
+        """オフセットを seconds 秒ずらした Timeline を返します。"""
+        return replace(self, offset=self.offset + seconds)
+
+    def at_sample(self, sample: int) -> "Timeline":
+        """オフセットを sample サンプル目（この Timeline の sr）からずらした Timeline を返します。"""
+        return self.shifted(sample / self.sr)
+
+
+def stitch_frames(
+    timeline: Timeline,
+    n_frames: int,
+    parts: Iterable[Tuple[Timeline, np.ndarray]],
+    fill: float = np.nan,
+    dtype: Optional[np.dtype] = None
+) -> np.ndarray:
+    """
+    区間ごとに計算したフレーム値を、timeline 上の1本の配列に配置します。
+
+    各区間の Timeline はホップ長が timeline と同じで、オフセットだけが異なる前提です。
+    区間が重なる場合は後の区間の値で上書きし、範囲外のフレームは捨てます。
+
+    Args:
+        timeline: 出力配列の時間軸
+        n_frames: 出力配列のフレーム数
+        parts: (区間の Timeline, 区間のフレーム値) の列
+        fill: どの区間にも含まれないフレームの値
+        dtype: 出力配列の型（None の場合は float64）
+
+    Returns:
+        np.ndarray: (n_frames,) の配列
+    """
+    out = np.full(n_frames, fill, dtype=dtype or np.float64)
+    for part_timeline, values in parts:
+        if part_timeline.hop_length * timeline.sr != timeline.hop_length * part_timeline.sr:
+            raise ValueError("all parts must share the frame duration of the output timeline")
+        values = np.asarray(values)
+        first = int(timeline.time_to_frame(part_timeline.offset))
+        index = first + np.arange(len(values))
+        inside = (index >= 0) & (index < n_frames)
+        out[index[inside]] = values[inside]
+    return out
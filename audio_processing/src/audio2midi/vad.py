@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# /audio_processing/src/audio2midi/vad.py
+"""
+エネルギーベースの音声区間検出（VAD）と、区間のみを処理した結果を元の時間軸へ戻すための RegionMap
+
+曲中の間奏など長い無音区間を CREPE / Whisper の推論から除外するため、
+最初に1度だけ有音区間を求めます。区間はサンプル単位の [start, end) の配列として表します。
+
+Usage:
+    from audio2midi.vad import RegionMap, detect_voiced_regions
+
+    regions = detect_voiced_regions(buffer.samples, buffer.sr)
+    region_map = RegionMap(regions, buffer.sr)
+    voiced_audio = region_map.concatenate(buffer.samples)
+    original_times = region_map.to_original(times_in_voiced_audio)
+"""
+
+from typing import Any, Dict, List
+
+import librosa
+import numpy as np
+
+
+def detect_voiced_regions(
+    samples: np.ndarray,
+    sr: int,
+    top_db: float = 35.0,
+    min_silence: float = 0.5,
+    pad: float = 0.1,
+    min_region: float = 0.05,
+    frame_length: int = 2048,
+    hop_length: int = 512
+) -> np.ndarray:
+    """
+    有音区間を検出します。
+
+    最大音量から top_db 以上小さいフレームを無音とし（librosa.effects.split）、
+    min_silence 秒未満の無音で区切られた区間は1つにまとめます。
+    各区間の前後には pad 秒の余白を付けます（子音や息継ぎの取りこぼし防止）。
+
+    Args:
+        samples: 音声データ
+        sr: サンプリングレート
+        top_db: 無音判定の閾値（dB）
+        min_silence: 区間を分割する最小の無音長（秒）
+        pad: 区間の前後に付ける余白（秒）
+        min_region: これより短い区間は除外（秒）
+        frame_length: エネルギー計算のフレーム長（サンプル数）
+        hop_length: エネルギー計算のホップ長（サンプル数）
+
+    Returns:
+        np.ndarray: (区間数, 2) の [start, end) サンプルインデックス（開始順）
+    """
+    # 日本語コメント: 閾値は最大音量からの相対値のため、完全な無音は別に扱う
+    if len(samples) == 0 or not np.any(samples):
+        return np.empty((0, 2), dtype=np.int64)
+    intervals = librosa.effects.split(
+        np.asarray(samples), top_db=top_db, frame_length=frame_length, hop_length=hop_length
+    )
+    if len(intervals) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+
+    pad_samples = int(pad * sr)
+    starts = np.maximum(intervals[:, 0] - pad_samples, 0)
+    ends = np.minimum(intervals[:, 1] + pad_samples, len(samples))
+
+    # 日本語コメント: 短い無音で区切られた区間をまとめる（余白を付けた後の隙間で判定）
+    gaps = starts[1:] - ends[:-1]
+    new_region = np.concatenate([[True], gaps >= int(min_silence * sr)])
+    merged_starts = starts[new_region]
+    merged_ends = np.maximum.reduceat(ends, np.flatnonzero(new_region))
+
+    regions = np.stack([merged_starts, merged_ends], axis=1).astype(np.int64)
+    keep = (regions[:, 1] - regions[:, 0]) >= int(min_region * sr)
+    return regions[keep]
+
+
+def voiced_frame_indices(regions: np.ndarray, hop_length: int, n_frames: int) -> np.ndarray:
+    """
+    中心が有音区間内にあるフレーム（中心 = フレーム番号 × hop_length）の番号を返します。
+    """
+    if len(regions) == 0:
+        return np.empty(0, dtype=np.int64)
+    first = -(-regions[:, 0] // hop_length)  # 切り上げ
+    last = np.minimum(-(-regions[:, 1] // hop_length), n_frames)
+    counts = np.maximum(last - first, 0)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(first, counts) + offsets
+
+
+class RegionMap:
+    """
+    有音区間だけを連結した音声の時間軸と、元の音声の時間軸との対応。
+
+    Args:
+        regions: (区間数, 2) の [start, end) サンプルインデックス
+        sr: サンプリングレート
+    """
+
+    def __init__(self, regions: np.ndarray, sr: int) -> None:
+        self.regions = np.asarray(regions, dtype=np.int64).reshape(-1, 2)
+        self.sr = sr
+        lengths = self.regions[:, 1] - self.regions[:, 0]
+        # 連結後の音声における各区間の開始位置（サンプル）
+        self.concat_starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+        self.total_samples = int(lengths.sum())
+
+    def __len__(self) -> int:
+        return len(self.regions)
+
+    @property
+    def voiced_duration(self) -> float:
+        """有音区間の合計長（秒）"""
+        return self.total_samples / self.sr
+
+    def concatenate(self, samples: np.ndarray) -> np.ndarray:
+        """有音区間のサンプルを連結した配列を返します。"""
+        if len(self.regions) == 0:
+            return np.empty(0, dtype=samples.dtype)
+        return np.concatenate([samples[start:end] for start, end in self.regions])
+
+    def to_original(self, times: Any) -> np.ndarray:
+        """
+        連結後の音声の時刻（秒）を元の音声の時刻（秒）に変換します。
+
+        区間の境界ちょうどの時刻は、前の区間の終端として扱います。
+        """
+        times = np.asarray(times, dtype=np.float64)
+        if len(self.regions) == 0:
+            return times.copy()
+        positions = times * self.sr
+        index = np.searchsorted(self.concat_starts, positions, side="left") - 1
+        index = np.clip(index, 0, len(self.regions) - 1)
+        return (self.regions[index, 0] + (positions - self.concat_starts[index])) / self.sr
+
+    def remap_segments(self, segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Whisper のセグメント（"words" を含む場合はその時刻も）を元の時間軸に変換します。
+        """
+        remapped = []
+        for segment in segments:
+            segment = dict(segment)
+            segment["start"], segment["end"] = self.to_original([segment["start"], segment["end"]]).tolist()
+            if segment.get("words"):
+                words = []
+                for word in segment["words"]:
+                    word = dict(word)
+                    word["start"], word["end"] = self.to_original([word["start"], word["end"]]).tolist()
+                    words.append(word)
+                segment["words"] = words
+            remapped.append(segment)
+        return remapped
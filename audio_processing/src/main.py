@@ -4,57 +4,69 @@
 """
 音声文字起こしと音楽情報処理のメインスクリプト
 
-このスクリプトは以下の機能を提供します：
-1. 音声文字起こし（Whisper）
-2. ピッチ抽出（librosa）
-3. 歌詞とピッチのマッチング
-4. MIDI/JSON/CSV形式での出力
+このスクリプトは以下のサブコマンドを提供します：
+1. run: 音声文字起こし（Whisper）・ピッチ抽出・歌詞とピッチのマッチングを行い、MIDI/JSON/CSV形式で出力
+   （サブコマンドを省略した場合は run として扱います）
+2. export: run が出力した JSON を別の形式（MIDI/CSV）に変換
+3. analyze: MIDIファイルの内容を表示
+4. serve: モデルを読み込んだまま常駐し、ジョブを受け付けるサービスを起動
+5. submit: serve で起動したサービスにジョブを送信し、結果を受け取る
+6. realtime: 標準入力・ソケットから PCM を読み込み、ノートを逐次 MIDI（仮想ポート・ファイル）に出力
+
+起動を速くするため、各サブコマンドに必要なモジュールは実行時に読み込みます。
+export / analyze / submit は PyTorch・TensorFlow・librosa を読み込みません。
 """
 
 import sys
 import argparse
-from typing import Optional
-
-from audio2midi.audio_to_text import transcribe_audio, AudioTranscriptionError
-from audio2midi.pitch_extraction import extract_pitch_crepe
-from audio2midi.note_utils import midi_notes_to_intervals, match_segments_and_notes
-from audio2midi.generate_midi_with_lyrics import export_segments
+import logging
+from typing import Callable, Dict, List, Optional, Tuple, Type
 
-def get_device() -> str:
-    """
-    利用可能なデバイス（GPU/CPU）を検出して返します。
+logger = logging.getLogger("audio2midi")
 
-    Returns:
-        str: 'cuda' (GPU利用可能時) または 'cpu'
+def add_run_arguments(parser: argparse.ArgumentParser) -> None:
     """
-    # 日本語コメント: 本来はシステムのGPU/CPUなどをチェックするロジック
-    try:
-        import torch
-        if torch.cuda.is_available():
-            return "cuda"
-    except ImportError:
-        pass
-    return "cpu"
+    run サブコマンドの引数を追加します。
 
-def parse_args() -> argparse.Namespace:
+    選択肢の一覧を得るためにバックエンドのレジストリを読み込みます（PyTorch・TensorFlow は読み込みません）。
     """
-    コマンドライン引数をパースします。
-
-    Returns:
-        argparse.Namespace: パースされた引数
-    """
-    parser = argparse.ArgumentParser(description="音声処理パイプライン")
+    from audio2midi.asr_backends import available_asr_backends
+    from audio2midi.parallel_stages import EXECUTORS
+    from audio2midi.pitch_backends import PROFILES, available_backends
+    from audio2midi.preprocessing import available_separators
+    from audio2midi.result_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
     
     # 入力ファイル
-    parser.add_argument("audio_path", type=str, help="音声ファイルパス")
+    parser.add_argument("audio_path", type=str,
+                      help="音声ファイルパス（--batch 指定時はディレクトリ・globパターン・マニフェスト）")
     
     # Whisper関連のオプション
     parser.add_argument("--model-name", type=str, default="large", help="Whisperモデル名")
+    parser.add_argument("--asr-backend", type=str, default="whisper", choices=available_asr_backends(),
+                      help="文字起こしバックエンド（whisper / faster-whisper: CTranslate2 int8 / cascade: tiny で文字起こしし低信頼区間のみやり直す）")
     parser.add_argument("--device", type=str, help="使用するデバイス (cpu/cuda)")
     parser.add_argument("--language", type=str, help="文字起こしの言語 (例: ja)")
     parser.add_argument("--noise-reduction", action="store_true", help="ノイズ削減を適用する")
+    parser.add_argument("--highpass", type=float, help="ハイパスフィルタのカットオフ周波数（Hz）")
+    parser.add_argument("--lowpass", type=float, help="ローパスフィルタのカットオフ周波数（Hz）")
+    parser.add_argument("--spectral-gate", action="store_true",
+                      help="スペクトルゲーティングによるノイズ削減を行う")
+    parser.add_argument("--vocal-separator", type=str, choices=available_separators(),
+                      help="ボーカル分離に使用するプラグイン（例: demucs）")
+    parser.add_argument("--word-timestamps", action="store_true",
+                      help="単語単位のタイムスタンプで歌詞とノートをマッチングする")
+    parser.add_argument("--longform", action="store_true",
+                      help="長時間の音声をチャンクに分割し、複数プロセスで並列に文字起こしする")
+    parser.add_argument("--longform-workers", type=int,
+                      help="長時間モードのワーカープロセス数（省略時はCPUコア数）")
+    parser.add_argument("--longform-chunk", type=float, default=120.0,
+                      help="長時間モードのチャンクの目安の長さ（秒）")
     
     # ピッチ抽出オプション
+    parser.add_argument("--pitch-profile", type=str, choices=sorted(PROFILES),
+                      help="ピッチ抽出の速度/精度のプロファイル（fast: yin, balanced: crepe-small, accurate: crepe-full）")
+    parser.add_argument("--pitch-backend", type=str, choices=available_backends(),
+                      help="ピッチ抽出のバックエンド（--pitch-profile より優先）")
     parser.add_argument("--min-pitch", type=str, default="C2", help="最低音高 (例: C2)")
     parser.add_argument("--max-pitch", type=str, default="C6", help="最高音高 (例: C6)")
     parser.add_argument("--frame-length", type=int, default=2048, help="フレーム長（サンプル数）")
@@ -64,6 +76,17 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--smooth-window", type=int, default=3, help="平滑化の窓幅（フレーム数）")
     parser.add_argument("--smoothing-weight", type=float, default=0.8, help="指数移動平均の重み（0-1）")
     parser.add_argument("--top-db", type=float, default=30.0, help="無音区間検出のdB閾値")
+    parser.add_argument("--stream-pitch", action="store_true",
+                      help="ピッチ抽出をブロック単位のストリーミングで行う（長時間の録音向け。"
+                           "前処理を指定した場合は音声全体をデコードする）")
+    parser.add_argument("--stream-block-duration", type=float, default=10.0,
+                      help="ストリーミング時の1ブロックの長さ（秒）")
+    parser.add_argument("--vad", action="store_true",
+                      help="有音区間を1度だけ検出し、文字起こしとピッチ抽出をその区間のみで行う")
+    parser.add_argument("--vad-top-db", type=float, default=35.0,
+                      help="有音区間検出の無音判定のdB閾値")
+    parser.add_argument("--vad-min-silence", type=float, default=0.5,
+                      help="有音区間を分割する最小の無音長（秒）")
     
     # 出力オプション
     parser.add_argument("--output-format", type=str, default="midi",
@@ -73,8 +96,169 @@ def parse_args() -> argparse.Namespace:
     # MIDI固有のオプション
     parser.add_argument("--tempo", type=int, default=120, help="MIDIテンポ（BPM）")
     parser.add_argument("--velocity", type=int, default=100, help="MIDIベロシティ（0-127）")
+    parser.add_argument("--lyric-encoding", type=str, default="utf-8", choices=["utf-8", "shift_jis"],
+                      help="MIDIの歌詞（lyric メタイベント）の文字コード")
+    
+    # 並列実行オプション
+    parser.add_argument("--parallel-stages", action="store_true",
+                      help="文字起こしとピッチ抽出を並列に実行する")
+    parser.add_argument("--parallel-executor", type=str, default="process",
+                      choices=list(EXECUTORS), help="並列実行の方式（process/thread）")
+    parser.add_argument("--transcription-cpu-share", type=float, default=0.5,
+                      help="並列実行時に文字起こしへ割り当てるCPUの割合（0-1）")
+    parser.add_argument("--cpus", type=int, help="並列実行時に使用する総コア数")
+    
+    # モデルキャッシュオプション
+    parser.add_argument("--model-cache-mb", type=float,
+                      help="プロセス内に保持するモデルの合計サイズ上限（MB）")
+    
+    # 結果キャッシュオプション
+    parser.add_argument("--no-cache", action="store_true",
+                      help="各ステージの結果のキャッシュを使用しない")
+    parser.add_argument("--cache-dir", type=str, default=str(DEFAULT_CACHE_DIR),
+                      help="結果キャッシュのディレクトリ")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024),
+                      help="結果キャッシュの合計サイズ上限（MB）")
+    parser.add_argument("--explain", action="store_true",
+                      help="ステージごとにキャッシュの結果を再利用したか再計算したかを表示する")
+    
+    # バッチ処理オプション
+    parser.add_argument("--batch", action="store_true",
+                      help="audio_path をディレクトリ・globパターン・マニフェストとして一括処理する")
+    parser.add_argument("--output-dir", type=str, default="outputs", help="バッチ処理の出力ディレクトリ")
+    parser.add_argument("--workers", type=int, default=1, help="バッチ処理のワーカープロセス数")
+    parser.add_argument("--resume", action="store_true", help="中断したバッチ処理を再開する")
+    
+    # ログ・計測オプション
+    parser.add_argument("--metrics-out", type=str,
+                      help="ステージごとの計測結果の出力先（.prom/.txt: Prometheus形式、それ以外: JSON Lines）")
+
+def add_export_arguments(parser: argparse.ArgumentParser) -> None:
+    """export サブコマンドの引数を追加します。"""
+    parser.add_argument("input_path", type=str, help="run --output-format json で出力したJSONファイル")
+    parser.add_argument("--output-format", type=str, default="csv",
+                      choices=["midi", "json", "csv"], help="出力形式")
+    parser.add_argument("--output-path", type=str, help="出力ファイルパス（省略時は入力ファイルの拡張子を変更）")
+    parser.add_argument("--tempo", type=int, default=120, help="MIDIテンポ（BPM）")
+    parser.add_argument("--velocity", type=int, default=100, help="MIDIベロシティ（0-127）")
+    parser.add_argument("--lyric-encoding", type=str, default="utf-8", choices=["utf-8", "shift_jis"],
+                      help="MIDIの歌詞（lyric メタイベント）の文字コード")
+
+def add_analyze_arguments(parser: argparse.ArgumentParser) -> None:
+    """analyze サブコマンドの引数を追加します。"""
+    parser.add_argument("midi_path", type=str, help="MIDIファイルパス")
+
+def _add_address_arguments(parser: argparse.ArgumentParser) -> None:
+    """serve / submit 共通の待ち受けアドレスの引数を追加します。"""
+    from audio2midi.service import DEFAULT_HOST, DEFAULT_PORT
+    
+    parser.add_argument("--host", type=str, default=DEFAULT_HOST, help="サービスのホスト")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="サービスのポート")
+    parser.add_argument("--socket", type=str, help="Unix ソケットのパス（指定時は --host/--port より優先）")
+
+def add_serve_arguments(parser: argparse.ArgumentParser) -> None:
+    """serve サブコマンドの引数を追加します。"""
+    _add_address_arguments(parser)
+    parser.add_argument("--workers", type=int, default=1, help="同時に実行するジョブ数")
+    parser.add_argument("--max-pending", type=int, default=8,
+                      help="実行待ちにできるジョブ数（超えたジョブは断る）")
+    parser.add_argument("--preload-whisper", type=str, help="起動時に読み込むWhisperモデル名（例: large）")
+    parser.add_argument("--preload-crepe", type=str, help="起動時に読み込むCREPEモデルサイズ（例: full）")
+    parser.add_argument("--device", type=str, help="事前に読み込むモデルのデバイス (cpu/cuda)")
+    parser.add_argument("--model-cache-mb", type=float,
+                      help="プロセス内に保持するモデルの合計サイズ上限（MB）")
+
+def add_submit_arguments(parser: argparse.ArgumentParser) -> None:
+    """submit サブコマンドの引数を追加します。"""
+    _add_address_arguments(parser)
+    parser.add_argument("-o", "--output", type=str,
+                      help="結果の保存先（省略時はカレントディレクトリに音声ファイル名で保存）")
+    parser.add_argument("--wait", type=float, default=0.0,
+                      help="サービスが混雑している場合に再送を続ける時間（秒）")
+    parser.add_argument("audio_path", type=str, help="音声ファイルパス")
+    parser.add_argument("run_options", nargs=argparse.REMAINDER,
+                      help="run と同じオプション（音声ファイルパスの後に指定。例: --output-format json）")
+
+def add_realtime_arguments(parser: argparse.ArgumentParser) -> None:
+    """realtime サブコマンドの引数を追加します。"""
+    parser.add_argument("--input", type=str, default="-",
+                      help="PCM の入力（-: 標準入力、tcp:HOST:PORT / unix:PATH: 接続を1つ待ち受ける、それ以外: raw PCM ファイル）")
+    parser.add_argument("--replay", type=str,
+                      help="--input の代わりに音声ファイルをリアルタイムの速度で流し込む（遅延の検証用）")
+    parser.add_argument("--fast", action="store_true", help="--replay で待たずに流し込む")
+    parser.add_argument("--pcm-format", type=str, default="s16le", choices=["s16le", "f32le"],
+                      help="入力 PCM の形式（モノラル）")
+    parser.add_argument("--sample-rate", type=int, default=16000, help="入力 PCM のサンプリングレート")
+    parser.add_argument("--block-ms", type=float, default=10.0, help="1回に処理するブロックの長さ（ms）")
+    parser.add_argument("--midi-port", type=str, help="note_on/note_off を送信する仮想MIDIポート名")
+    parser.add_argument("--output", type=str, help="送信したイベントを保存するMIDIファイル")
+    parser.add_argument("--min-note-length", type=float, default=0.03,
+                      help="最小ノート長（秒）。note_on はノートの開始からこの時間だけ遅れる")
+    parser.add_argument("--cent-tolerance", type=float, default=40.0, help="同一ノートとみなすセント差")
+    parser.add_argument("--silence-db", type=float, default=-40.0, help="無音とみなす音量（dBFS）")
+    parser.add_argument("--velocity", type=int, default=100, help="MIDIベロシティ（0-127）")
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="遅延の目標（ms、p95 が超えた場合は警告）")
+    parser.add_argument("--latency-out", type=str, help="遅延のヒストグラムの出力先（JSON）")
+
+# サブコマンド名 → (説明, 引数を追加する関数)
+COMMANDS: Dict[str, Tuple[str, Callable[[argparse.ArgumentParser], None]]] = {
+    "run": ("音声から歌詞付きMIDI/JSON/CSVを生成する", add_run_arguments),
+    "export": ("run が出力したJSONをMIDI/CSVに変換する", add_export_arguments),
+    "analyze": ("MIDIファイルの内容を表示する", add_analyze_arguments),
+    "serve": ("モデルを読み込んだまま常駐し、ジョブを受け付ける", add_serve_arguments),
+    "submit": ("serve で起動したサービスにジョブを送信する", add_submit_arguments),
+    "realtime": ("ライブ入力のピッチを逐次MIDIに変換する", add_realtime_arguments),
+}
+
+def parse_args(
+    argv: Optional[List[str]] = None,
+    parser_class: Type[argparse.ArgumentParser] = argparse.ArgumentParser
+) -> argparse.Namespace:
+    """
+    コマンドライン引数をパースします。
+
+    先頭（--log-level を除く）がサブコマンド名でない場合は run とみなします（従来の `main.py input.wav ...` 形式）。
+    起動を速くするため、引数を組み立てるのは指定されたサブコマンドのものだけです。
+
+    Args:
+        argv: コマンドライン引数（省略時は sys.argv[1:]）
+        parser_class: パーサーのクラス（serve では service.OptionParser でエラーを例外にする）
+
+    Returns:
+        argparse.Namespace: パースされた引数（command にサブコマンド名）
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # 日本語コメント: サブコマンドより前に置ける --log-level（と値）を読み飛ばしてから判定する
+    index = 0
+    while index < len(argv) and (argv[index] == "--log-level" or argv[index].startswith("--log-level=")):
+        index += 2 if argv[index] == "--log-level" else 1
+    if index >= len(argv) or (argv[index] not in COMMANDS and argv[index] not in ("-h", "--help")):
+        argv.insert(min(index, len(argv)), "run")
+    command = argv[min(index, len(argv) - 1)]
     
-    return parser.parse_args()
+    parser = parser_class(description="音声処理パイプライン")
+    parser.add_argument("--log-level", type=str, default="INFO",
+                      choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="ログの出力レベル")
+    subparsers = parser.add_subparsers(dest="command", metavar="{" + ",".join(COMMANDS) + "}")
+    for name, (help_text, add_arguments) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text, description=help_text)
+        subparser.add_argument("--log-level", type=str, default=argparse.SUPPRESS,
+                             choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="ログの出力レベル")
+        if name == command:
+            add_arguments(subparser)
+    return parser.parse_args(argv)
+
+def write_metrics(args: argparse.Namespace) -> None:
+    """
+    --metrics-out 指定時に、ステージごとの計測結果を書き出します。
+
+    Args:
+        args: コマンドライン引数
+    """
+    if args.metrics_out:
+        from audio2midi.instrumentation import get_recorder
+        path = get_recorder().write(args.metrics_out)
+        logger.info("計測結果を出力しました: %s", path)
 
 def process_audio(args: argparse.Namespace) -> None:
     """
@@ -83,83 +267,237 @@ def process_audio(args: argparse.Namespace) -> None:
     Args:
         args: コマンドライン引数
     """
-    device = args.device or get_device()
+    from audio2midi.audio_to_text import AudioTranscriptionError
+    from audio2midi.model_cache import configure_registry, get_registry
+    from audio2midi.pipeline import run_pipeline
+    from audio2midi.preprocessing import PreprocessingError
+    
+    if args.model_cache_mb is not None:
+        configure_registry(int(args.model_cache_mb * 1024 * 1024))
     
     try:
-        # 1. 音声文字起こし
-        print("音声文字起こしを実行中...")
-        transcription = transcribe_audio(
-            args.audio_path,
-            args.model_name,
-            device,
-            args.language,
-            args.noise_reduction
-        )
-        
-        print(f"検出された言語: {transcription.get('language', '不明')}")
-        print(f"文字起こし結果: {transcription['text']}")
+        run_pipeline(args)
         
-        segments = transcription["segments"]
-        if not segments:
-            raise AudioTranscriptionError("セグメントが検出されませんでした。")
+        logger.info("モデルキャッシュ: %s", get_registry().stats())
+        logger.info("処理が完了しました！")
         
-        # 2. ピッチ抽出
-        print("ピッチ抽出を実行中...")
-        midi_notes, confidence, time, sr = extract_pitch_crepe(
+    except (FileNotFoundError, AudioTranscriptionError, PreprocessingError) as e:
+        logger.error("エラーが発生しました: %s", e)
+        sys.exit(1)
+    except Exception as e:
+        logger.error("予期せぬエラーが発生しました: %s", e)
+        sys.exit(1)
+    finally:
+        write_metrics(args)
+
+def process_batch(args: argparse.Namespace) -> None:
+    """
+    複数の音声ファイルをバッチ処理します。
+
+    Args:
+        args: コマンドライン引数
+    """
+    from audio2midi.batch import run_batch
+    
+    try:
+        summary = run_batch(
             args.audio_path,
-            sr_desired=16000,  # CREPEは16kHzを推奨
-            confidence_threshold=0.5,
-            model='full',
-            step_size=10,
-            top_db=args.top_db
+            args.output_dir,
+            args,
+            workers=args.workers,
+            resume=args.resume
         )
-        
-        # 3. ノートインターバルの生成
-        print("ノートインターバルを生成中...")
-        note_intervals = midi_notes_to_intervals(
-            midi_notes,
-            confidence,
-            sr,
-            hop_length=int(sr * (10 / 1000.0)),  # CREPEのstep_size=10msに対応（10ms * サンプリングレート）
-            min_duration=args.min_duration,
-            confidence_threshold=0.5
+    except (FileNotFoundError, ValueError) as e:
+        logger.error("エラーが発生しました: %s", e)
+        sys.exit(1)
+    
+    write_metrics(args)
+    logger.info("バッチ処理が完了しました: 成功 %d 件, 失敗 %d 件, スキップ %d 件",
+                summary['processed'], summary['failed'], summary['skipped'])
+    if summary["failed"]:
+        sys.exit(1)
+
+def process_export(args: argparse.Namespace) -> None:
+    """
+    run が出力した JSON を読み込み、別の形式で出力し直します（文字起こし・ピッチ抽出は行いません）。
+
+    Args:
+        args: コマンドライン引数
+    """
+    from pathlib import Path
+    from audio2midi.generate_midi_with_lyrics import export_segments, load_segments_json
+    
+    try:
+        segments = load_segments_json(args.input_path)
+    except (FileNotFoundError, ValueError) as e:
+        logger.error("エラーが発生しました: %s", e)
+        sys.exit(1)
+    
+    extension = "mid" if args.output_format == "midi" else args.output_format
+    output_path = args.output_path or str(Path(args.input_path).with_suffix(f".{extension}"))
+    midi_kwargs = {
+        "tempo": args.tempo,
+        "velocity": args.velocity,
+        "lyric_encoding": args.lyric_encoding
+    } if args.output_format == "midi" else {}
+    export_segments(segments, output_path, format=args.output_format, **midi_kwargs)
+    logger.info("%d個のセグメントを%s形式で出力しました: %s", len(segments), args.output_format, output_path)
+
+def process_analyze(args: argparse.Namespace) -> None:
+    """
+    MIDIファイルの内容を表示します。
+
+    Args:
+        args: コマンドライン引数
+    """
+    from analyze_midi import analyze_midi
+    
+    analyze_midi(args.midi_path)
+
+def process_serve(args: argparse.Namespace) -> None:
+    """
+    ジョブを受け付けるサービスを起動します（Ctrl+C で終了）。
+
+    Args:
+        args: コマンドライン引数
+    """
+    import asyncio
+    from audio2midi.model_cache import configure_registry, load_crepe_model, load_whisper_model
+    from audio2midi.service import JobServer, OptionParser
+    
+    if args.model_cache_mb is not None:
+        configure_registry(int(args.model_cache_mb * 1024 * 1024))
+    
+    loaders = []
+    if args.preload_whisper:
+        device = args.device or "cpu"
+        loaders.append(lambda: load_whisper_model(args.preload_whisper, device=device))
+    if args.preload_crepe:
+        loaders.append(lambda: load_crepe_model(args.preload_crepe))
+    
+    async def serve() -> None:
+        server = JobServer(
+            lambda audio_path, options: parse_args(["run", audio_path, *options], OptionParser),
+            workers=args.workers,
+            max_pending=args.max_pending
         )
-        
-        # 4. 歌詞とノートのマッチング
-        print("歌詞とノートをマッチング中...")
-        matched_segments = match_segments_and_notes(segments, note_intervals)
-        
-        # 5. 結果の出力
-        output_path = args.output_path or f"output.{args.output_format}"
-        print(f"結果を{args.output_format}形式で出力中: {output_path}")
-        
-        midi_kwargs = {
-            "tempo": args.tempo,
-            "velocity": args.velocity
-        } if args.output_format == "midi" else {}
-        
-        export_segments(
-            matched_segments,
-            output_path,
-            format=args.output_format,
-            **midi_kwargs
+        await server.preload(loaders)
+        await server.start(args.host, args.port, args.socket)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+    
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        logger.info("サービスを終了しました")
+
+def process_submit(args: argparse.Namespace) -> None:
+    """
+    サービスにジョブを送信し、進捗を表示して結果を保存します。
+
+    Args:
+        args: コマンドライン引数
+    """
+    from pathlib import Path
+    from audio2midi.service import decode_content, submit_job
+    
+    def on_event(event):
+        if event["event"] == "queued":
+            logger.info("ジョブ %s を受け付けました（待ち %d件）", event["job_id"], event["position"])
+        elif event["event"] == "stage" and event["status"] == "end":
+            logger.info("%s: %.2f秒", event["stage"], event["seconds"])
+    
+    try:
+        event = submit_job(
+            args.audio_path, args.run_options, args.host, args.port, args.socket,
+            on_event=on_event, wait=args.wait
         )
-        
-        print("処理が完了しました！")
-        
-    except (FileNotFoundError, AudioTranscriptionError) as e:
-        print(f"エラーが発生しました: {str(e)}", file=sys.stderr)
+    except OSError as e:
+        logger.error("サービスに接続できません: %s", e)
         sys.exit(1)
-    except Exception as e:
-        print(f"予期せぬエラーが発生しました: {str(e)}", file=sys.stderr)
+    
+    if event["event"] != "done":
+        logger.error("エラーが発生しました: %s", event.get("message"))
         sys.exit(1)
+    output_path = Path(args.output or event["filename"])
+    output_path.write_bytes(decode_content(event))
+    logger.info("処理が完了しました（%.1f秒）: %s", event["seconds"], output_path)
+
+def process_realtime(args: argparse.Namespace) -> None:
+    """
+    入力ストリームのピッチを逐次 MIDI に変換します（入力の終わりまたは Ctrl+C で終了）。
+
+    Args:
+        args: コマンドライン引数
+    """
+    from audio2midi import realtime
+    
+    sinks = []
+    if args.midi_port:
+        try:
+            sinks.append(realtime.PortSink(args.midi_port))
+        except (ImportError, OSError) as e:
+            logger.error("MIDIポートを開けません（python-rtmidi が必要です）: %s", e)
+            sys.exit(1)
+    if args.output:
+        sinks.append(realtime.MidiFileSink(args.output))
+    
+    transcriber = realtime.RealtimeTranscriber(
+        estimator=realtime.StreamingYin(sr=args.sample_rate, silence_db=args.silence_db),
+        tracker=realtime.RealtimeNoteTracker(
+            cent_tolerance=args.cent_tolerance,
+            min_note_length=args.min_note_length,
+            velocity=args.velocity
+        ),
+        sinks=sinks,
+        histogram=realtime.LatencyHistogram(budget_ms=args.budget_ms)
+    )
+    try:
+        if args.replay:
+            realtime.replay_wav(args.replay, transcriber, args.block_ms / 1000, realtime=not args.fast)
+        else:
+            block_size = max(int(args.sample_rate * args.block_ms / 1000), 1)
+            with realtime.open_input(args.input) as stream:
+                realtime.run_stream(transcriber, realtime.read_pcm_blocks(stream, block_size, args.pcm_format))
+    except KeyboardInterrupt:
+        logger.info("入力を終了しました")
+    
+    histogram = transcriber.histogram
+    summary = histogram.summary()
+    logger.info("ノート数: %d, 遅延 p50 %.1fms / p95 %.1fms / 最大 %.1fms",
+                len(transcriber.events) // 2, summary["p50_ms"], summary["p95_ms"], summary["max_ms"])
+    if histogram and not histogram.within_budget():
+        logger.warning("遅延の p95 が目標（%.0fms）を超えています", args.budget_ms)
+    if args.latency_out:
+        logger.info("遅延のヒストグラムを出力しました: %s", histogram.write(args.latency_out))
 
-def main() -> None:
+def main(argv: Optional[List[str]] = None) -> None:
     """
-    メイン実行関数。コマンドライン引数を処理し、パイプラインを実行します。
+    メイン実行関数。コマンドライン引数を処理し、サブコマンドを実行します。
+
+    Args:
+        argv: コマンドライン引数（省略時は sys.argv[1:]）
     """
-    args = parse_args()
-    process_audio(args)
+    args = parse_args(argv)
+    # 日本語コメント: 依存ライブラリ（numba など）のデバッグログは出さず、audio2midi のログだけレベルを変える
+    logging.basicConfig(format="%(message)s")
+    logger.setLevel(args.log_level)
+    if args.command == "export":
+        process_export(args)
+    elif args.command == "analyze":
+        process_analyze(args)
+    elif args.command == "serve":
+        process_serve(args)
+    elif args.command == "submit":
+        process_submit(args)
+    elif args.command == "realtime":
+        process_realtime(args)
+    elif args.batch:
+        process_batch(args)
+    else:
+        process_audio(args)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
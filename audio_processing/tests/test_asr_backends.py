@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from audio2midi.asr_backends import AsrBackend, CascadeBackend, get_asr_backend
+
+SR = 16000
+
+
+class _FakeBackend(AsrBackend):
+    """音声の長さだけから1秒ごとのセグメントを作る。low に含まれる秒は avg_logprob を低くする。"""
+
+    def __init__(self, label, low=()):
+        self.label = label
+        self.low = set(low)
+        self.calls = []
+
+    def transcribe(self, audio, language=None, word_timestamps=False):
+        self.calls.append(len(audio) / SR)
+        n = int(round(len(audio) / SR))
+        segments = [
+            {"start": float(i), "end": i + 1.0, "text": f"{self.label}{i}",
+             "avg_logprob": -2.0 if i in self.low else -0.2}
+            for i in range(n)
+        ]
+        return {"text": "", "segments": segments, "language": "ja"}
+
+
+def test_cascade_only_reruns_low_confidence_spans():
+    draft = _FakeBackend("d", low={3, 4})
+    final = _FakeBackend("f")
+    cascade = CascadeBackend(draft, final, threshold=-1.0, padding=0.0)
+
+    result = cascade.transcribe(np.zeros(10 * SR, dtype=np.float32))
+    assert final.calls == [2.0]  # 3〜5秒の区間だけをやり直す
+    texts = [s["text"] for s in result["segments"]]
+    assert texts == ["d0", "d1", "d2", "f0", "f1", "d5", "d6", "d7", "d8", "d9"]
+    assert [s["start"] for s in result["segments"]][3:5] == [3.0, 4.0]
+    assert [s["id"] for s in result["segments"]] == list(range(10))
+
+
+def test_cascade_falls_back_to_full_rerun():
+    draft = _FakeBackend("d", low=range(8))
+    final = _FakeBackend("f")
+    result = CascadeBackend(draft, final, full_rerun_ratio=0.5).transcribe(np.zeros(10 * SR, dtype=np.float32))
+    assert final.calls == [10.0]
+    assert all(s["text"].startswith("f") for s in result["segments"])
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_asr_backend("unknown")
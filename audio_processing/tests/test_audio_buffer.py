@@ -0,0 +1,32 @@
+import numpy as np
+import soundfile as sf
+
+from audio2midi.audio_buffer import SAMPLE_RATE, AudioBuffer
+
+
+def test_from_file_decodes_to_mono_16k(tmp_path):
+    sr = 44100
+    t = np.arange(sr) / sr
+    stereo = np.stack([np.sin(2 * np.pi * 440 * t), np.sin(2 * np.pi * 440 * t)], axis=1) * 0.5
+    path = tmp_path / "tone.wav"
+    sf.write(path, stereo, sr)
+
+    buffer = AudioBuffer.from_file(str(path))
+    assert buffer.sr == SAMPLE_RATE
+    assert buffer.samples.dtype == np.float32
+    assert buffer.samples.ndim == 1
+    assert abs(buffer.duration - 1.0) < 1e-3
+    assert not buffer.samples.flags.writeable
+    assert buffer.source == str(path)
+
+
+def test_views_are_zero_copy():
+    samples = np.linspace(-0.25, 0.25, SAMPLE_RATE, dtype=np.float32)
+    buffer = AudioBuffer.from_array(samples, SAMPLE_RATE)
+    assert samples.flags.writeable  # 呼び出し元の配列は変更しない
+    assert np.shares_memory(buffer.samples, samples)
+
+    view = buffer.view(0.25, 0.5)
+    assert len(view) == SAMPLE_RATE // 4
+    assert np.shares_memory(view, buffer.samples)
+    assert buffer.resampled(SAMPLE_RATE) is buffer
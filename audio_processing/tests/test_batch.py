@@ -0,0 +1,128 @@
+import argparse
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from audio2midi.batch import STATE_FILE, SUMMARY_FILE, collect_inputs, load_completed, run_batch
+
+
+def _stub_process(audio_path, output_path, options):
+    """入力名を出力に書き、呼び出しを記録するスタブ（ファイル名に bad を含むと失敗）"""
+    with open(os.environ["BATCH_TEST_CALLS"], "a", encoding="utf-8") as f:
+        f.write(audio_path + "\n")
+    if "bad" in Path(audio_path).name:
+        raise RuntimeError("decode failed")
+    Path(output_path).write_text(audio_path, encoding="utf-8")
+    return output_path
+
+
+@pytest.fixture
+def songs(tmp_path, monkeypatch):
+    monkeypatch.setenv("BATCH_TEST_CALLS", str(tmp_path / "calls.log"))
+    root = tmp_path / "songs"
+    for name in ["a.wav", "album/b.wav", "album/disc2/c.flac", "other/a.wav", "album/notes.txt"]:
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_bytes(b"")
+    return root
+
+
+def _calls(tmp_path):
+    log = tmp_path / "calls.log"
+    return sorted(log.read_text(encoding="utf-8").split()) if log.exists() else []
+
+
+def _options():
+    return argparse.Namespace(output_format="json")
+
+
+def test_collect_inputs_from_directory_glob_and_manifest(songs):
+    expected = sorted(p.resolve() for p in [
+        songs / "a.wav", songs / "album/b.wav", songs / "album/disc2/c.flac", songs / "other/a.wav"
+    ])
+    assert collect_inputs(str(songs)) == expected
+    assert collect_inputs(str(songs / "**" / "*.wav")) == [p for p in expected if p.suffix == ".wav"]
+
+    (songs / "list.txt").write_text("# comment\nalbum/b.wav\n\nother/a.wav\n", encoding="utf-8")
+    assert collect_inputs(str(songs / "list.txt")) == [(songs / "album/b.wav").resolve(), (songs / "other/a.wav").resolve()]
+    (songs / "list.json").write_text(json.dumps({"files": ["a.wav"]}), encoding="utf-8")
+    assert collect_inputs(str(songs / "list.json")) == [(songs / "a.wav").resolve()]
+
+    with pytest.raises(FileNotFoundError):
+        collect_inputs(str(songs / "missing" / "*.wav"))
+
+
+def test_outputs_mirror_input_tree_and_failures_are_recorded(songs, tmp_path):
+    (songs / "album/bad.wav").write_bytes(b"")
+    out = tmp_path / "out"
+    summary = run_batch(str(songs), str(out), _options(), workers=1, process_fn=_stub_process)
+
+    assert summary["total_inputs"] == 5 and summary["processed"] == 4 and summary["failed"] == 1
+    assert summary["failures"][0]["input"] == str((songs / "album/bad.wav").resolve())
+    assert summary["failures"][0]["error"] == "RuntimeError: decode failed"
+    # 日本語コメント: 同じファイル名（a.wav）でもディレクトリ構成を再現するため衝突しない
+    assert sorted(str(Path(p).relative_to(out)) for p in summary["outputs"].values()) == [
+        "a.json", "album/b.json", "album/disc2/c.json", "other/a.json"
+    ]
+    for audio_path, output_path in summary["outputs"].items():
+        assert Path(output_path).read_text(encoding="utf-8") == audio_path
+    assert json.loads((out / SUMMARY_FILE).read_text(encoding="utf-8")) == summary
+
+
+def test_inputs_with_the_same_output_name_are_rejected(songs, tmp_path):
+    (songs / "album/b.mp3").write_bytes(b"")
+    with pytest.raises(ValueError, match="b.mp3"):
+        run_batch(str(songs), str(tmp_path / "out"), _options(), workers=1, process_fn=_stub_process)
+    # 日本語コメント: ワーカーを起動する前に失敗するため、何も処理されない
+    assert _calls(tmp_path) == [] and not (tmp_path / "out").exists()
+
+
+def test_resume_skips_completed_inputs(songs, tmp_path):
+    out = tmp_path / "out"
+    run_batch(str(songs), str(out), _options(), workers=1, process_fn=_stub_process)
+
+    # 日本語コメント: 1件だけ記録された後、書き込み途中で中断された状態ファイルを再現する
+    state_path = out / STATE_FILE
+    lines = state_path.read_text(encoding="utf-8").splitlines()
+    state_path.write_text(lines[0] + "\n" + lines[1][:10], encoding="utf-8")
+    done = json.loads(lines[0])["input"]
+    assert list(load_completed(state_path)) == [done]
+
+    (tmp_path / "calls.log").unlink()
+    summary = run_batch(str(songs), str(out), _options(), workers=1, resume=True, process_fn=_stub_process)
+    assert summary["skipped"] == 1 and summary["processed"] == 3
+    assert done not in _calls(tmp_path) and len(_calls(tmp_path)) == 3
+    assert len(summary["outputs"]) == 4
+
+    # resume なしでは状態ファイルを破棄して全件処理する
+    (tmp_path / "calls.log").unlink()
+    summary = run_batch(str(songs), str(out), _options(), workers=1, process_fn=_stub_process)
+    assert summary["skipped"] == 0 and len(_calls(tmp_path)) == 4
+
+
+def test_resume_reprocesses_inputs_whose_output_path_changed(songs, tmp_path):
+    out = tmp_path / "out"
+    run_batch(str(songs), str(out), argparse.Namespace(output_format="midi"), workers=1, process_fn=_stub_process)
+
+    (tmp_path / "calls.log").unlink()
+    summary = run_batch(str(songs), str(out), _options(), workers=1, resume=True, process_fn=_stub_process)
+    assert summary["skipped"] == 0 and len(_calls(tmp_path)) == 4
+    assert all(Path(p).suffix == ".json" and Path(p).exists() for p in summary["outputs"].values())
+
+
+def test_output_paths_are_rooted_at_the_source_directory(songs, tmp_path):
+    # 日本語コメント: 入力が1つのサブディレクトリだけでも、source を基準にディレクトリ構成を再現する
+    source = tmp_path / "single"
+    (source / "album").mkdir(parents=True)
+    (source / "album/b.wav").write_bytes(b"")
+    out = tmp_path / "out"
+    summary = run_batch(str(source), str(out), _options(), workers=1, process_fn=_stub_process)
+    assert list(summary["outputs"].values()) == [str(out / "album/b.json")]
+
+    # 別のディレクトリにファイルが追加されても、既存の入力の出力パスは変わらずスキップされる
+    (source / "other").mkdir()
+    (source / "other/a.wav").write_bytes(b"")
+    summary = run_batch(str(source), str(out), _options(), workers=1, resume=True, process_fn=_stub_process)
+    assert summary["skipped"] == 1 and summary["processed"] == 1
+    assert sorted(summary["outputs"].values()) == [str(out / "album/b.json"), str(out / "other/a.json")]
@@ -0,0 +1,38 @@
+import numpy as np
+
+from audio2midi.audio_buffer import AudioBuffer
+from audio2midi.pitch_extraction import extract_pitch_crepe_batch, extract_pitch_crepe_voiced
+
+SR = 16000
+
+
+def _buffers():
+    rng = np.random.default_rng(0)
+    buffers = []
+    for seconds, freq in [(0.3, 220.0), (1.1, 330.0), (0.05, 440.0)]:
+        t = np.arange(int(seconds * SR)) / SR
+        samples = np.sin(2 * np.pi * freq * t) + 0.01 * rng.standard_normal(len(t))
+        buffers.append(AudioBuffer.from_array(samples, SR))
+    return buffers
+
+
+def test_batch_matches_single_file_results(crepe_model):
+    buffers = _buffers()
+    regions = [None, np.array([[1600, 8000], [12000, 16000]]), None]
+
+    batched = extract_pitch_crepe_batch(buffers, regions, confidence_threshold=0.5)
+    assert crepe_model.calls == [sum(np.count_nonzero(r[1]) for r in batched)]  # 1度の推論
+
+    for buffer, file_regions, result in zip(buffers, regions, batched):
+        if file_regions is None:
+            file_regions = np.array([[0, len(buffer.samples)]])
+        single = extract_pitch_crepe_voiced(buffer, file_regions, confidence_threshold=0.5)
+        for got, expected in zip(result[:3], single[:3]):
+            np.testing.assert_array_equal(got, expected)
+        assert result[3] == single[3] == SR
+
+
+def test_batch_flushes_in_chunks(crepe_model):
+    results = extract_pitch_crepe_batch(_buffers(), chunk_frames=50)
+    assert len(crepe_model.calls) == 2  # 1つ目のファイル（31フレーム）では閾値に達しない
+    assert [len(r[0]) for r in results] == [31, 111, 6]
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from audio2midi.pitch_extraction import (
+    CREPE_BINS,
+    CREPE_FRAME_LENGTH,
+    _cents_to_midi,
+    _frame_audio,
+    _local_average_cents,
+    extract_pitch_crepe_stream,
+    extract_pitch_crepe_streaming,
+)
+
+SR = 16000
+
+
+def _chirp(seconds, f0=200.0, f1=800.0):
+    t = np.arange(int(seconds * SR)) / SR
+    phase = 2 * np.pi * (f0 * t + (f1 - f0) * t ** 2 / (2 * seconds))
+    return np.sin(phase).astype(np.float32)
+
+
+def _viterbi_path(activation):
+    """crepe.core.to_viterbi_cents と同じ HMM を一括でデコードした状態列"""
+    bins = np.arange(CREPE_BINS)
+    transition = np.maximum(12 - np.abs(bins[:, None] - bins[None, :]), 0).astype(np.float64)
+    transition /= transition.sum(axis=1)[:, None]
+    with np.errstate(divide="ignore"):
+        log_transition = np.log(transition)
+    emission = np.full((CREPE_BINS, CREPE_BINS), 0.9 / CREPE_BINS) + np.eye(CREPE_BINS) * 0.1
+    log_emission = np.log(emission)
+    observations = np.argmax(activation, axis=1)
+
+    log_delta = np.log(1.0 / CREPE_BINS) + log_emission[:, observations[0]]
+    backpointers = []
+    for observation in observations[1:]:
+        scores = log_delta[:, None] + log_transition
+        backpointers.append(np.argmax(scores, axis=0))
+        log_delta = scores.max(axis=0) + log_emission[:, observation]
+    path = [int(np.argmax(log_delta))]
+    for pointers in reversed(backpointers):
+        path.append(int(pointers[path[-1]]))
+    return np.array(path[::-1])
+
+
+def _one_shot(samples, model, confidence_threshold=0.5):
+    """音声全体を1度に推論・デコードした結果（ストリーミングの基準）"""
+    frames = _frame_audio(np.pad(samples, CREPE_FRAME_LENGTH // 2), 10)
+    activation = model.predict(frames)
+    midi_notes = _cents_to_midi(_local_average_cents(activation, _viterbi_path(activation)))
+    confidence = activation.max(axis=1)
+    midi_notes[confidence < confidence_threshold] = np.nan
+    return midi_notes, confidence, np.arange(len(frames)) * 0.01
+
+
+def test_stream_matches_one_shot_decoding_across_blocks(crepe_model):
+    samples = _chirp(1.0)
+    chunks = list(extract_pitch_crepe_stream(
+        samples, sr=SR, confidence_threshold=0.5, block_duration=0.1, viterbi_lag=0.05
+    ))
+    assert len(chunks) > 5  # 日本語コメント: 複数のブロックに分かれて出力される
+
+    expected_notes, expected_confidence, expected_time = _one_shot(samples, crepe_model)
+    midi_notes, confidence, time, sr_used = extract_pitch_crepe_streaming(
+        samples, sr=SR, confidence_threshold=0.5, block_duration=0.1, viterbi_lag=0.05
+    )
+    assert sr_used == SR
+    assert len(time) == 1 + len(samples) // 160
+    np.testing.assert_allclose(midi_notes, expected_notes)
+    np.testing.assert_allclose(confidence, expected_confidence)
+
+    # ブロックの境界を跨いでも時刻は 10ms 間隔で連続する
+    np.testing.assert_allclose(np.concatenate([chunk[0] for chunk in chunks]), expected_time)
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current[0][0] == pytest.approx(previous[0][-1] + 0.01)
+
+
+def test_stream_reads_files_block_by_block(crepe_model, tmp_path):
+    samples = _chirp(0.5)
+    sf.write(tmp_path / "chirp.wav", samples, SR)
+
+    from_file = extract_pitch_crepe_streaming(
+        str(tmp_path / "chirp.wav"), confidence_threshold=0.5, block_duration=0.07, viterbi_lag=0.03
+    )
+    from_array = extract_pitch_crepe_streaming(samples, sr=SR, confidence_threshold=0.5, block_duration=0.5)
+    for got, expected in zip(from_file[:3], from_array[:3]):
+        np.testing.assert_allclose(got, expected, atol=1e-4)
+
+
+@pytest.mark.parametrize("n_samples", [0, 100])
+def test_stream_handles_empty_and_short_input(crepe_model, n_samples):
+    samples = _chirp(1.0)[:n_samples]
+    midi_notes, confidence, time, _ = extract_pitch_crepe_streaming(samples, sr=SR, block_duration=0.1)
+    expected_notes, expected_confidence, expected_time = _one_shot(samples, crepe_model, confidence_threshold=0.6)
+    np.testing.assert_array_equal(time, expected_time)
+    np.testing.assert_allclose(midi_notes, expected_notes)
+    np.testing.assert_allclose(confidence, expected_confidence)
+
+
+def test_stream_requires_sample_rate_for_arrays(crepe_model):
+    with pytest.raises(ValueError):
+        extract_pitch_crepe_streaming(np.zeros(SR, dtype=np.float32))
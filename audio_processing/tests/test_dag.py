@@ -0,0 +1,130 @@
+import json
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from audio2midi.dag import COMPUTED, REUSED, SKIPPED, Stage, StageGraph
+from audio2midi.result_cache import ResultCache
+
+
+def _graph(cache, calls, scale=2):
+    graph = StageGraph("audio-hash", cache)
+
+    def record(name, value):
+        calls.append(name)
+        return value
+
+    graph.add(Stage("load", lambda: record("load", [1, 2, 3])))
+    graph.add(Stage("double", lambda xs: record("double", [x * scale for x in xs]),
+                    inputs=("load",), params={"scale": scale}, codec="json"))
+    graph.add(Stage("total", lambda xs: record("total", sum(xs)), inputs=("double",), codec="json"))
+    return graph
+
+
+def test_rerun_reuses_unchanged_stages(tmp_path):
+    calls = []
+    cache = ResultCache(str(tmp_path))
+    assert _graph(cache, calls).run("total") == 12
+    assert calls == ["load", "double", "total"]
+
+    calls.clear()
+    graph = _graph(cache, calls)
+    assert graph.run("total") == 12
+    assert calls == []
+    assert [status for _, status, _ in graph.explain()] == [SKIPPED, SKIPPED, REUSED]
+
+    calls.clear()
+    graph = _graph(cache, calls, scale=3)
+    assert graph.run("total") == 18
+    assert calls == ["load", "double", "total"]
+    assert [status for _, status, _ in graph.explain()] == [COMPUTED, COMPUTED, COMPUTED]
+
+
+def test_graph_rejects_unknown_inputs():
+    graph = StageGraph("audio-hash")
+    with pytest.raises(ValueError):
+        graph.add(Stage("total", sum, inputs=("missing",)))
+
+
+@pytest.fixture
+def pipeline_args(tmp_path, monkeypatch):
+    import main
+    from audio2midi import pipeline
+
+    sr = 16000
+    t = np.arange(2 * sr) / sr
+    audio_path = tmp_path / "tone.wav"
+    sf.write(audio_path, (0.5 * np.sin(2 * np.pi * 220.0 * t)).astype(np.float32), sr)
+    transcription = {"text": "la", "language": "ja", "segments": [{"start": 0.0, "end": 2.0, "text": "la"}]}
+    monkeypatch.setattr(pipeline, "transcribe_audio", lambda *a, **k: transcription)
+
+    def parse(*extra):
+        return main.parse_args([
+            "run", str(audio_path), "--pitch-backend", "yin", "--device", "cpu",
+            "--cache-dir", str(tmp_path / "cache"), "--output-format", "json",
+            "--output-path", str(tmp_path / "song.json"), *extra
+        ])
+    return parse
+
+
+def _statuses(args):
+    from audio2midi import pipeline
+
+    graph = pipeline.build_stage_graph(args, args.audio_path, "cpu", args.output_path)
+    graph.run("export")
+    return {name: status for name, status, _ in graph.explain()}
+
+
+def test_pipeline_recomputes_only_note_stages(pipeline_args, tmp_path):
+    assert set(_statuses(pipeline_args()).values()) == {COMPUTED}
+    assert set(_statuses(pipeline_args()).values()) == {SKIPPED, REUSED}
+
+    statuses = _statuses(pipeline_args("--min-duration", "0.2"))
+    assert statuses == {
+        "decode": SKIPPED, "preprocessing": SKIPPED, "transcription": REUSED, "pitch": REUSED,
+        "note_intervals": COMPUTED, "matching": COMPUTED, "export": COMPUTED
+    }
+    with open(tmp_path / "song.json", encoding="utf-8") as f:
+        assert json.load(f)["segments"][0]["text_segment"]["text"] == "la"
+
+
+def test_deleted_output_is_written_again(pipeline_args, tmp_path):
+    _statuses(pipeline_args())
+    (tmp_path / "song.json").unlink()
+    statuses = _statuses(pipeline_args())
+    assert statuses["matching"] == REUSED and statuses["export"] == COMPUTED
+    assert (tmp_path / "song.json").exists()
+
+
+
+def test_stream_pitch_reads_file_unless_preprocessing(pipeline_args, tmp_path, monkeypatch):
+    import main
+    from audio2midi import pipeline
+    from audio2midi.audio_buffer import AudioBuffer
+
+    sources = []
+
+    def fake_streaming(source, **kwargs):
+        sources.append(source)
+        return np.full(200, 57.0), np.ones(200), np.arange(200) * 0.01, 16000
+
+    monkeypatch.setattr(pipeline, "extract_pitch_crepe_streaming", fake_streaming)
+    pipeline_args()  # 日本語コメント: 音声ファイルを作成する
+
+    def parse(*extra):
+        return main.parse_args([
+            "run", str(tmp_path / "tone.wav"), "--stream-pitch", "--device", "cpu", "--no-cache",
+            "--output-format", "json", "--output-path", str(tmp_path / "song.json"), *extra
+        ])
+
+    # 前処理がなければ音声全体をデコードせず、ファイルパスを渡す
+    args = parse()
+    graph = pipeline.build_stage_graph(args, args.audio_path, "cpu", args.output_path)
+    assert graph.stages["pitch"].inputs == ()
+    graph.run("pitch")
+    assert sources == [str(tmp_path / "tone.wav")] and "decode" not in graph.status
+
+    # 前処理がある場合は前処理後の音声（全体をデコード済み）を渡す
+    _statuses(parse("--highpass", "80"))
+    assert isinstance(sources[-1], AudioBuffer)
@@ -0,0 +1,84 @@
+import json
+
+import numpy as np
+
+from audio2midi.instrumentation import MetricsRecorder, get_recorder, recording, stage
+
+
+def test_context_manager_records_time_and_items():
+    recorder = MetricsRecorder()
+    with stage("pitch", recorder, file="a.wav") as s:
+        np.sort(np.random.default_rng(0).random(200_000))
+        s.items = 3
+        s.add_items(2)
+
+    (record,) = recorder.records
+    assert record.stage == "pitch"
+    assert record.items == 5
+    assert record.labels == {"file": "a.wav"}
+    assert record.wall_seconds > 0
+    assert record.cpu_seconds >= 0
+    assert record.peak_rss_mb >= record.rss_growth_mb >= 0
+
+
+def test_decorator_records_each_call():
+    recorder = MetricsRecorder()
+
+    @stage("export", recorder)
+    def export(n):
+        return n * 2
+
+    assert export(1) == 2
+    assert export(2) == 4
+    assert [r.stage for r in recorder.records] == ["export", "export"]
+    assert all(r.items is None for r in recorder.records)
+
+
+def test_records_are_written_even_when_stage_fails():
+    recorder = MetricsRecorder()
+    try:
+        with stage("transcription", recorder):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert len(recorder) == 1
+
+
+def test_write_jsonl_and_prometheus(tmp_path):
+    recorder = MetricsRecorder()
+    for items in (10, 20):
+        with stage("pitch", recorder) as s:
+            s.items = items
+    with stage("matching", recorder):
+        pass
+
+    lines = recorder.write(tmp_path / "metrics.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["stage"] for line in lines] == ["pitch", "pitch", "matching"]
+
+    text = recorder.write(tmp_path / "metrics.prom").read_text(encoding="utf-8")
+    assert 'audio2midi_stage_runs_total{stage="pitch"} 2' in text
+    assert 'audio2midi_stage_items_total{stage="pitch"} 30' in text
+    assert "# TYPE audio2midi_stage_wall_seconds_total counter" in text
+
+
+def test_drain_and_extend_move_records_between_recorders():
+    worker = MetricsRecorder()
+    with stage("decode", worker) as s:
+        s.items = 16000
+    records = worker.drain()
+    assert len(worker) == 0
+
+    parent = MetricsRecorder()
+    parent.extend(records, file="song.wav")
+    assert parent.records[0].labels == {"file": "song.wav"}
+    assert parent.records[0].items == 16000
+
+
+def test_recording_scopes_records_to_the_context():
+    shared = len(get_recorder())
+    with recording() as scoped:
+        with stage("pitch"):
+            pass
+        assert get_recorder() is scoped
+    assert len(scoped) == 1
+    assert len(get_recorder()) == shared
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from audio2midi.audio_buffer import AudioBuffer
+from audio2midi.longform import find_split_points, merge_chunk_segments, transcribe_longform
+
+SR = 16000
+
+
+def _fake_transcribe(buffer, **options):
+    """元の音声の整数秒ごとに1セグメントを返す（サンプル値 = 元の音声での時刻）。"""
+    offset = float(buffer.samples[0])
+    seconds = np.arange(np.ceil(offset - 1e-3), offset + buffer.duration - 1.0 + 1e-3)
+    return {
+        "text": "",
+        "language": "ja",
+        "segments": [
+            {"id": i, "start": float(t - offset), "end": float(t + 1.0 - offset), "text": "x"}
+            for i, t in enumerate(seconds)
+        ],
+    }
+
+
+def test_split_points_fall_in_quiet_parts():
+    rng = np.random.default_rng(0)
+    samples = rng.uniform(-0.5, 0.5, 25 * SR).astype(np.float32)
+    samples[int(9.5 * SR):int(10.5 * SR)] = 0.0
+    samples[int(21.0 * SR):int(21.5 * SR)] = 0.0
+
+    boundaries = find_split_points(samples, SR, chunk_duration=10.0, search_window=2.0)
+    assert boundaries[0] == 0 and boundaries[-1] == len(samples)
+    assert 9.5 <= boundaries[1] / SR <= 10.5
+    assert 21.0 <= boundaries[2] / SR <= 21.5
+    assert len(find_split_points(samples[:5 * SR], SR, chunk_duration=10.0)) == 2
+
+
+def test_merge_drops_duplicates_in_overlap():
+    first = [{"start": 0.0, "end": 4.0, "text": "a"}, {"start": 9.0, "end": 11.0, "text": "b"}]
+    second = [{"start": 9.1, "end": 11.0, "text": "b"}, {"start": 11.0, "end": 14.0, "text": "c"}]
+    merged = merge_chunk_segments([first, second], [(0.0, 10.0), (10.0, float("inf"))])
+    assert [s["text"] for s in merged] == ["a", "b", "c"]
+    assert [s["id"] for s in merged] == [0, 1, 2]
+    assert merged[1]["start"] == 9.1  # 中点が2つ目のチャンクの担当範囲にある方を残す
+
+
+def test_transcribe_longform_remaps_chunks_to_original_timeline():
+    samples = (np.arange(30 * SR) / SR).astype(np.float32)
+    result = transcribe_longform(
+        AudioBuffer.from_array(samples, SR),
+        workers=1,
+        chunk_duration=10.0,
+        search_window=0.0,
+        overlap=1.0,
+        transcribe_fn=_fake_transcribe
+    )
+    starts = [s["start"] for s in result["segments"]]
+    assert len(starts) == 30
+    # 日本語コメント: 重なり部分を含めても各秒のセグメントは1つずつ
+    assert starts == pytest.approx([float(i) for i in range(30)])
+    assert result["language"] == "ja"
+    assert all(a["end"] <= b["start"] for a, b in zip(result["segments"], result["segments"][1:]))
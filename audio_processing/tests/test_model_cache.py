@@ -0,0 +1,46 @@
+from audio2midi.model_cache import ModelRegistry
+
+
+class _FakeModel:
+    def __init__(self, name):
+        self.name = name
+
+
+def test_model_registry_loads_once_per_key():
+    registry = ModelRegistry()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return _FakeModel("tiny")
+
+    first = registry.get(("whisper", "cpu", "tiny"), loader, size_fn=lambda m: 10)
+    second = registry.get(("whisper", "cpu", "tiny"), loader, size_fn=lambda m: 10)
+
+    assert first is second
+    assert len(loads) == 1
+    stats = registry.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_model_registry_evicts_least_recently_used_over_budget():
+    registry = ModelRegistry(max_bytes=25)
+    released = []
+
+    def get(capacity):
+        return registry.get(
+            ("crepe", "cpu", capacity),
+            lambda: _FakeModel(capacity),
+            size_fn=lambda m: 10,
+            on_evict=lambda m: released.append(m.name)
+        )
+
+    get("tiny")
+    get("small")
+    get("tiny")  # tiny を最近使用したことにする
+    get("full")
+
+    assert released == ["small"]
+    assert registry.keys() == [("crepe", "cpu", "tiny"), ("crepe", "cpu", "full")]
+    assert registry.stats()["evictions"] == 1
@@ -0,0 +1,127 @@
+import csv
+import sys
+
+import mido
+import numpy as np
+import pytest
+
+from audio2midi.generate_midi_with_lyrics import export_to_csv
+from audio2midi.midi_utils import note_events_to_midi
+from audio2midi.note_table import NOTE_DTYPE, NoteEvent, NoteTable
+from audio2midi.note_utils import (
+    match_segments_and_notes,
+    merge_short_notes,
+    midi_notes_to_intervals,
+    postprocess_notes,
+    smooth_vibrato,
+)
+from audio2midi.segmentation import segment_notes
+
+
+def _table():
+    return NoteTable.from_tuples([(0.0, 0.5, 60), (0.5, 1.0, 62), (1.0, 2.0, 64), (2.5, 3.0, 65)])
+
+
+def test_note_table_layout_and_views():
+    table = _table()
+    assert table.data.dtype == NOTE_DTYPE
+    assert table.nbytes == 4 * NOTE_DTYPE.itemsize
+
+    view = table[1:3]
+    assert isinstance(view, NoteTable)
+    assert np.shares_memory(view.data, table.data)
+    assert table[2] == NoteEvent(1.0, 2.0, 64.0, 100, 1.0)
+    assert table.to_tuples() == [(0.0, 0.5, 60), (0.5, 1.0, 62), (1.0, 2.0, 64), (2.5, 3.0, 65)]
+
+
+def test_note_event_is_slotted():
+    event = NoteEvent(0.0, 1.0, 60.0)
+    if sys.version_info >= (3, 10):
+        assert not hasattr(event, "__dict__")
+
+
+def test_time_range_matches_linear_scan():
+    rng = np.random.default_rng(0)
+    starts = np.sort(rng.uniform(0, 100, size=500))
+    table = NoteTable.from_arrays(starts, starts + rng.uniform(0.01, 3.0, size=500), rng.integers(40, 80, size=500))
+    for lo, hi in [(0.0, 1.0), (10.0, 20.5), (50.0, 50.1), (99.0, 200.0), (-5.0, 0.0)]:
+        expected = [(s, e) for s, e in zip(table.start, table.end) if e > lo and s < hi]
+        found = table.time_range(lo, hi)
+        assert list(zip(found.start, found.end)) == expected
+
+
+def test_time_range_sees_column_writes():
+    table = NoteTable.from_tuples([(0.0, 0.5, 60), (1.0, 1.5, 62), (2.0, 2.5, 64)])
+    assert len(table.time_range(5.0, 6.0)) == 0
+    # 日本語コメント: start・end のビューは読み取り専用で、書き換えは列の代入で行う
+    with pytest.raises(ValueError):
+        table.end[0] = 10.0
+    end = table.end.copy()
+    end[0] = 10.0
+    table["end"] = end
+    assert table.time_range(5.0, 6.0).to_tuples() == [(0.0, 10.0, 60)]
+
+    table.data["start"][2] = 0.5
+    table.invalidate()
+    assert not table.is_sorted()
+    assert table.time_range(0.6, 0.9).to_tuples() == [(0.0, 10.0, 60), (0.5, 2.5, 64)]
+
+
+def test_time_range_index_is_computed_once():
+    table = NoteTable.from_tuples([(2.0, 2.5, 64), (0.0, 0.5, 60), (1.0, 1.5, 62)])
+    assert table.time_range(0.1, 0.2).to_tuples() == [(0.0, 0.5, 60)]
+    index = table._search_index
+    # 日本語コメント: 2回目以降は並べ替えも累積最大値の計算も行わない
+    assert table.time_range(1.1, 1.2).to_tuples() == [(1.0, 1.5, 62)]
+    assert table.time_range(2.1, 2.2).to_tuples() == [(2.0, 2.5, 64)]
+    assert table._search_index is index and not table.is_sorted()
+
+
+def test_segment_notes_output_is_a_note_table_without_copy():
+    notes = segment_notes(np.arange(100) * 0.01, np.repeat([60.0, 64.0], 50), np.ones(100))
+    table = NoteTable.from_notes(notes)
+    assert np.shares_memory(table.data, notes)
+    assert table.velocity.tolist() == [100, 100] and table.lyric_index.tolist() == [-1, -1]
+
+
+def test_postprocessing_keeps_velocity_and_lyric_index():
+    table = NoteTable.from_arrays(
+        [0.0, 1.0, 2.0, 2.5, 2.52], [1.0, 2.0, 2.5, 2.52, 3.0], [60, 64, 67, 67.1, 67],
+        velocity=[10, 20, 30, 40, 50], lyric_index=[0, 1, 2, 3, 4]
+    )
+    # 日本語コメント: マージが起きない場合は全ての列がそのまま残る
+    for result in (
+        merge_short_notes(table[:3], 0.01),
+        smooth_vibrato(table[:3], 0.2, 50.0),
+        postprocess_notes(table[:3], 0.01, 100.0, 0.2, 50.0),
+    ):
+        assert isinstance(result, NoteTable)
+        np.testing.assert_array_equal(result.data, table[:3].data)
+
+    # 短いノート（2.5-2.52）は前のノートに、ビブラートの窓は先頭のノートに吸収される
+    merged = merge_short_notes(table, 0.05)
+    assert merged.velocity.tolist() == [10, 20, 30, 50] and merged.lyric_index.tolist() == [0, 1, 2, 4]
+    smoothed = postprocess_notes(table.data, 0.05, 100.0, 1.0, 50.0)
+    assert smoothed["velocity"].tolist() == [10, 20, 30] and smoothed["lyric_index"].tolist() == [0, 1, 2]
+    assert smoothed["end"].tolist() == [1.0, 2.0, 3.0]
+
+
+def test_pipeline_functions_accept_note_table(tmp_path):
+    midi_notes = np.repeat([60.0, 62.0, np.nan, 64.0], 50)
+    confidence = np.full(len(midi_notes), 0.9)
+    table = midi_notes_to_intervals(midi_notes, confidence, 16000, as_table=True)
+    assert table.to_tuples() == midi_notes_to_intervals(midi_notes, confidence, 16000)
+
+    segments = [{"start": 0.0, "end": 1.0, "text": "a"}, {"start": 1.5, "end": 2.0, "text": "b"}]
+    assert match_segments_and_notes(segments, table) == match_segments_and_notes(segments, table.to_tuples())
+
+    table.lyric_index[:] = [0, 0, 1]
+    csv_path = tmp_path / "notes.csv"
+    export_to_csv(table, str(csv_path), lyrics=["a", "b"])
+    with open(csv_path, encoding="utf-8") as f:
+        assert [row["text"] for row in csv.DictReader(f)] == ["a", "a", "b"]
+
+    midi_path = tmp_path / "notes.mid"
+    note_events_to_midi(table, str(midi_path))
+    notes_on = [m.note for m in mido.MidiFile(str(midi_path)).tracks[0] if m.type == "note_on"]
+    assert notes_on == [60, 62, 64]
@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+
+from audio2midi import note_utils
+from audio2midi.note_utils import (
+    match_segments_and_notes,
+    match_segments_and_notes_two_pointer,
+    midi_notes_to_intervals,
+    midi_notes_to_intervals_reference,
+)
+
+
+def _random_pitch_track(n_frames, seed):
+    """ノート・ビブラート・無声区間・低信頼度区間を含むランダムなフレーム列を生成します。"""
+    rng = np.random.default_rng(seed)
+    midi_notes = np.empty(n_frames)
+    i = 0
+    while i < n_frames:
+        length = int(rng.integers(1, 60))
+        midi_notes[i:i + length] = rng.uniform(40, 80) + rng.normal(0, 0.2, size=len(midi_notes[i:i + length]))
+        i += length
+    midi_notes[rng.random(n_frames) < 0.05] = np.nan
+    confidence = rng.random(n_frames)
+    return midi_notes, confidence
+
+
+def _assert_same_intervals(midi_notes, confidence, **kwargs):
+    expected = midi_notes_to_intervals_reference(midi_notes, confidence, 16000, **kwargs)
+    actual = midi_notes_to_intervals(midi_notes, confidence, 16000, **kwargs)
+    assert actual == expected
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("min_duration", [0.0, 0.05, 0.1, 0.3])
+def test_midi_notes_to_intervals_matches_reference(seed, min_duration):
+    midi_notes, confidence = _random_pitch_track(5000, seed)
+    _assert_same_intervals(midi_notes, confidence, min_duration=min_duration)
+
+
+@pytest.mark.parametrize("confidence_threshold", [0.0, 0.5, 1.0])
+def test_midi_notes_to_intervals_matches_reference_thresholds(confidence_threshold):
+    midi_notes, confidence = _random_pitch_track(3000, 42)
+    _assert_same_intervals(midi_notes, confidence, confidence_threshold=confidence_threshold)
+
+
+def test_midi_notes_to_intervals_slow_glide_splits_like_reference():
+    # 1フレームごとの変化は小さくても、ノート先頭から半音以上離れた時点で分割される
+    midi_notes = np.linspace(60, 64, 400)
+    confidence = np.ones(400)
+    _assert_same_intervals(midi_notes, confidence, min_duration=0.0)
+
+
+@pytest.mark.parametrize("midi_notes,confidence", [
+    (np.array([]), np.array([])),
+    (np.full(50, np.nan), np.ones(50)),
+    (np.full(50, 60.0), np.zeros(50)),
+    (np.full(50, 60.0), np.ones(50)),
+    (np.full(50, 60.5), np.ones(50)),
+    (np.full(50, 60.0), np.ones(30)),  # 長さが異なる場合も参照実装と同じ扱い
+    (np.array([60.0, np.nan, 60.0, 61.0, 61.2]), np.array([1.0, 1.0, np.nan, 1.0, 1.0])),
+])
+def test_midi_notes_to_intervals_edge_cases(midi_notes, confidence):
+    _assert_same_intervals(midi_notes, confidence, min_duration=0.0)
+    _assert_same_intervals(midi_notes, confidence, min_duration=0.1)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_midi_notes_to_intervals_matches_reference_on_stable_notes(seed):
+    # 安定したノート + 小さなビブラート（分割候補の一括検証で処理される経路）
+    rng = np.random.default_rng(seed)
+    note_index = np.repeat(np.arange(200), rng.integers(3, 40, size=200))
+    vibrato = 0.2 * np.sin(np.arange(len(note_index)) * 0.6)
+    midi_notes = rng.integers(48, 72, size=200)[note_index] + vibrato
+    midi_notes[rng.random(200)[note_index] < 0.2] = np.nan
+    confidence = np.clip(rng.normal(0.8, 0.2, size=len(note_index)), 0, 1)
+    _assert_same_intervals(midi_notes, confidence, min_duration=0.05)
+
+
+def _brute_force_overlaps(segments, notes):
+    pairs = []
+    for w in sorted(segments, key=lambda w: w["start"]):
+        for n in sorted(notes, key=lambda n: n[0]):
+            if max(w["start"], n[0]) < min(w["end"], n[1]):
+                pairs.append((w["text"], n, max(w["start"], n[0]), min(w["end"], n[1])))
+    return pairs
+
+
+def _as_pairs(matched):
+    return [
+        (m["text_segment"]["text"],
+         (m["note_segment"]["start"], m["note_segment"]["end"], m["note_segment"]["note"]),
+         m["overlap_start"], m["overlap_end"])
+        for m in matched
+    ]
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("max_candidates", [3, 1 << 22])
+def test_match_segments_and_notes_reports_every_overlap(seed, max_candidates, monkeypatch):
+    monkeypatch.setattr(note_utils, "_MAX_CANDIDATES", max_candidates)
+    rng = np.random.default_rng(seed)
+    seg_starts = rng.uniform(0, 60, size=80)
+    segments = [
+        {"start": float(s), "end": float(s + d), "text": f"w{i}"}
+        for i, (s, d) in enumerate(zip(seg_starts, rng.uniform(0.0, 4.0, size=80)))
+    ]
+    note_starts = rng.uniform(0, 60, size=200)
+    notes = [
+        (float(s), float(s + d), int(p))
+        for s, d, p in zip(note_starts, rng.uniform(0.05, 2.0, size=200), rng.integers(40, 80, size=200))
+    ]
+    assert _as_pairs(match_segments_and_notes(segments, notes)) == _brute_force_overlaps(segments, notes)
+
+
+def test_match_segments_and_notes_finds_overlaps_missed_by_two_pointer():
+    # 長いノートの途中に短いノートが重なる場合、2ポインタ法は (a, 64) を取りこぼす
+    segments = [{"start": 0.0, "end": 1.2, "text": "a"}, {"start": 2.0, "end": 2.5, "text": "b"}]
+    notes = [(0.0, 3.0, 60), (1.0, 1.5, 64)]
+    matched = match_segments_and_notes(segments, notes)
+    assert [(m["text_segment"]["text"], m["note_segment"]["note"]) for m in matched] == [
+        ("a", 60), ("a", 64), ("b", 60)
+    ]
+    assert len(match_segments_and_notes_two_pointer(segments, notes)) == 2
+
+
+def test_match_segments_and_notes_word_level():
+    segments = [{
+        "id": 0, "start": 0.0, "end": 2.0, "text": " hello world",
+        "words": [
+            {"word": " hello", "start": 0.0, "end": 0.8, "probability": 0.9},
+            {"word": " world", "start": 1.0, "end": 2.0, "probability": 0.9},
+        ],
+    }]
+    notes = [(0.0, 0.8, 60), (1.0, 2.0, 64)]
+    matched = match_segments_and_notes(segments, notes, word_level=True)
+    assert [(m["text_segment"]["text"], m["note_segment"]["note"]) for m in matched] == [
+        ("hello", 60), ("world", 64)
+    ]
+    assert all(m["text_segment"]["segment_id"] == 0 for m in matched)
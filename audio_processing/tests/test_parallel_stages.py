@@ -0,0 +1,132 @@
+import multiprocessing
+import sys
+import time
+import types
+from multiprocessing.pool import TERMINATE
+
+import pytest
+
+from audio2midi import parallel_stages
+from audio2midi.parallel_stages import run_transcription_and_pitch, split_cpus
+
+
+class StageFailed(Exception):
+    pass
+
+
+def _echo(tag, delay=0.0):
+    time.sleep(delay)
+    return tag
+
+
+def _fail(message):
+    raise StageFailed(message)
+
+
+@pytest.mark.parametrize("share, total, expected", [
+    (0.5, 8, (4, 4)),
+    (0.3, 8, (2, 6)),     # 2.4 → 2
+    (0.7, 8, (6, 2)),     # 5.6 → 6
+    (0.0, 8, (1, 7)),     # どちらも最低1コア
+    (1.0, 8, (7, 1)),
+    (0.5, 1, (1, 1)),
+])
+def test_split_cpus_rounds_and_bounds(share, total, expected):
+    assert split_cpus(share, total) == expected
+
+
+def test_split_cpus_rejects_invalid_share():
+    with pytest.raises(ValueError):
+        split_cpus(1.5, 8)
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_results_are_returned_in_stage_order(executor):
+    # 日本語コメント: ピッチ抽出の方が先に終わっても (文字起こし, ピッチ) の順で返す
+    result = run_transcription_and_pitch(
+        (_echo, ("words",), {"delay": 0.3}),
+        (_echo, ("notes",), {}),
+        executor=executor,
+        total_cpus=2,
+        poll_interval=0.01
+    )
+    assert result == ("words", "notes")
+
+
+def test_thread_executor_raises_without_waiting_for_sibling():
+    started = time.perf_counter()
+    with pytest.raises(StageFailed, match="pitch broke"):
+        run_transcription_and_pitch(
+            (_echo, ("words",), {"delay": 30.0}),
+            (_fail, ("pitch broke",), {}),
+            executor="thread"
+        )
+    assert time.perf_counter() - started < 5.0
+
+
+def test_process_executor_raises_and_terminates_other_pool(monkeypatch):
+    pools = []
+    ctx = multiprocessing.get_context("spawn")
+
+    class _RecordingContext:
+        def Pool(self, *args, **kwargs):
+            pool = ctx.Pool(*args, **kwargs)
+            pools.append(pool)
+            return pool
+
+    monkeypatch.setattr(parallel_stages.multiprocessing, "get_context", lambda method: _RecordingContext())
+
+    started = time.perf_counter()
+    with pytest.raises(StageFailed, match="transcription broke"):
+        run_transcription_and_pitch(
+            (_fail, ("transcription broke",), {}),
+            (_echo, ("notes",), {"delay": 30.0}),
+            executor="process",
+            poll_interval=0.01
+        )
+    assert time.perf_counter() - started < 20.0
+    assert len(pools) == 2
+    for pool in pools:
+        assert pool._state == TERMINATE
+        assert not any(worker.is_alive() for worker in pool._pool)
+
+
+class _FakeTorch(types.ModuleType):
+    def __init__(self):
+        super().__init__("torch")
+        self.threads = 8
+
+    def get_num_threads(self):
+        return self.threads
+
+    def set_num_threads(self, threads):
+        self.threads = threads
+
+
+def test_thread_limits_apply_after_lazy_import_and_are_restored(monkeypatch):
+    fake_torch = _FakeTorch()
+    seen = {}
+
+    def transcribe():
+        # 日本語コメント: ステージ内で初めてフレームワークを読み込むモデルローダーを再現する
+        monkeypatch.setitem(sys.modules, "torch", fake_torch)
+        parallel_stages.apply_stage_thread_limits()
+        seen["transcription"] = fake_torch.threads
+        return "words"
+
+    def extract():
+        # ピッチ抽出側のスレッドには PyTorch の制限は適用されない
+        parallel_stages.apply_stage_thread_limits()
+        return "notes"
+
+    result = run_transcription_and_pitch(
+        (transcribe, (), {}), (extract, (), {}), executor="thread", transcription_share=0.25, total_cpus=4
+    )
+    assert result == ("words", "notes")
+    assert seen["transcription"] == 1
+    assert fake_torch.threads == 8
+
+
+def test_unknown_executor_is_rejected():
+    with pytest.raises(ValueError):
+        run_transcription_and_pitch((_echo, ("a",), {}), (_echo, ("b",), {}), executor="gpu")
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from audio2midi.audio_buffer import AudioBuffer
+from audio2midi.pitch_backends import CrepeBackend, YinBackend, extract_pitch, get_backend
+
+SR = 16000
+
+
+def _tone_with_gap() -> AudioBuffer:
+    t = np.arange(SR) / SR
+    tone = (0.5 * np.sin(2 * np.pi * 220.0 * t)).astype(np.float32)  # A3 = MIDI 57
+    return AudioBuffer.from_array(np.concatenate([tone, np.zeros(SR, dtype=np.float32), tone]), SR)
+
+
+def test_profiles_resolve_to_backends():
+    assert isinstance(get_backend("fast"), YinBackend)
+    backend = get_backend("balanced")
+    assert isinstance(backend, CrepeBackend) and backend.capacity == "small"
+    with pytest.raises(ValueError):
+        get_backend("unknown")
+
+
+@pytest.mark.parametrize("backend", ["yin", "pyin"])
+def test_librosa_backends_on_absolute_grid(backend):
+    buffer = _tone_with_gap()
+    midi_notes, confidence, time, sr = extract_pitch(buffer, backend=backend)
+    assert sr == SR
+    assert len(midi_notes) == len(confidence) == len(time) == 1 + len(buffer.samples) // 160
+    assert np.allclose(time[:3], [0.0, 0.01, 0.02])
+
+    voiced = ~np.isnan(midi_notes)
+    assert np.nanmedian(midi_notes) == pytest.approx(57.0, abs=0.2)
+    assert voiced[20:80].all() and voiced[220:280].all()
+    assert not voiced[130:170].any()
+
+
+def test_regions_only_process_voiced_parts():
+    buffer = _tone_with_gap()
+    full = extract_pitch(buffer, backend="yin")
+    regions = np.array([[SR + SR // 2 + 37, 3 * SR]])  # 2つ目の音（の前の無音を少し含む）だけ
+    partial = extract_pitch(buffer, regions, backend="yin")
+
+    assert np.isnan(partial[0][:150]).all()
+    assert (partial[1][:150] == 0).all()
+    # 日本語コメント: 区間の先頭は全体のフレーム位置に揃うため、区間の内側は全体を処理した結果と一致する
+    inside = slice(220, 280)
+    assert np.allclose(partial[0][inside], full[0][inside])
+
+
+def test_yin_loudness_is_judged_against_the_whole_track():
+    t = np.arange(SR) / SR
+    loud = (0.8 * np.sin(2 * np.pi * 220.0 * t)).astype(np.float32)
+    quiet = (0.005 * np.sin(2 * np.pi * 330.0 * t)).astype(np.float32)
+    buffer = AudioBuffer.from_array(np.concatenate([loud, quiet]), SR)
+    full = extract_pitch(buffer, backend="yin")
+    partial = extract_pitch(buffer, np.array([[0, SR], [SR, 2 * SR]]), backend="yin")
+
+    # 日本語コメント: 小さい音の区間も、区間単体ではなく音声全体の最大音量を基準に判定される
+    inside = slice(120, 180)
+    assert (full[1][inside] == 0).all()
+    assert np.array_equal(partial[1][inside], full[1][inside])
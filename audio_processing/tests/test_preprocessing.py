@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from audio2midi.audio_buffer import AudioBuffer
+from audio2midi.preprocessing import (
+    PreprocessingError,
+    VocalSeparator,
+    build_chain,
+    highpass,
+    normalize,
+    register_separator,
+    spectral_gate,
+)
+
+SR = 16000
+
+
+def _tone(freq, seconds=1.0, amplitude=0.5):
+    t = np.arange(int(SR * seconds)) / SR
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def test_normalize_and_highpass_work_in_place():
+    samples = _tone(440, amplitude=0.25)
+    out = normalize(samples, SR)
+    assert out is samples
+    np.testing.assert_allclose(np.abs(samples).max(), 10 ** (-0.1 / 20), rtol=1e-5)
+
+    mixed = _tone(30) + _tone(1000)
+    filtered = highpass(mixed.copy(), SR, cutoff=200.0)
+    spectrum = np.abs(np.fft.rfft(filtered))
+    freqs = np.fft.rfftfreq(len(filtered), 1 / SR)
+    assert spectrum[np.argmin(np.abs(freqs - 30))] < 0.01 * spectrum[np.argmin(np.abs(freqs - 1000))]
+
+
+def test_spectral_gate_suppresses_stationary_noise():
+    rng = np.random.default_rng(0)
+    signal = np.concatenate([np.zeros(SR, dtype=np.float32), _tone(440)])
+    noisy = signal + rng.normal(0, 0.02, size=len(signal)).astype(np.float32)
+    denoised = spectral_gate(noisy.copy(), SR)
+    assert len(denoised) == len(noisy)
+    # 無音区間のノイズが減り、トーンの区間はほぼ保たれる
+    assert np.std(denoised[:SR]) < 0.3 * np.std(noisy[:SR])
+    assert np.std(denoised[SR:]) > 0.8 * np.std(signal[SR:])
+
+
+def test_chain_reports_timings_and_uses_plugins():
+    class HalfSeparator(VocalSeparator):
+        def __init__(self, device="cpu"):
+            self.device = device
+
+        def separate(self, samples, sr):
+            samples *= 0.5
+            return samples
+
+    register_separator("half", HalfSeparator)
+    buffer = AudioBuffer.from_array(_tone(440), SR)
+    chain = build_chain(separator="half", highpass_hz=80.0, normalize_peak=True)
+    assert chain.names() == ["separator:half", "highpass:80", "normalize"]
+
+    processed, timings = chain.run(buffer)
+    assert list(timings) == chain.names()
+    assert processed.sr == SR and len(processed.samples) == len(buffer.samples)
+    assert np.abs(buffer.samples).max() == np.float32(0.5)  # 元の AudioBuffer は変更しない
+
+    with pytest.raises(PreprocessingError):
+        build_chain(separator="no-such-separator")
@@ -0,0 +1,95 @@
+import io
+import math
+
+import mido
+import numpy as np
+import soundfile as sf
+
+from audio2midi.realtime import (
+    LatencyHistogram,
+    MidiFileSink,
+    RealtimeNoteTracker,
+    RealtimeTranscriber,
+    read_pcm_blocks,
+    replay_wav,
+)
+
+SR = 16000
+NOTES = [(0.2, 0.7, 60), (0.7, 1.2, 64), (1.5, 2.0, 67), (2.3, 2.6, 57)]
+
+
+def _write_melody(path):
+    t = np.arange(3 * SR) / SR
+    samples = np.zeros_like(t)
+    for start, end, note in NOTES:
+        mask = (t >= start) & (t < end)
+        samples[mask] = 0.5 * np.sin(2 * np.pi * 440.0 * 2 ** ((note - 69) / 12) * (t[mask] - start))
+    sf.write(path, samples.astype(np.float32), SR)
+
+
+def _notes(events):
+    """(note, start, end) のリストに変換します。"""
+    result, starts = [], {}
+    for event in events:
+        if event.message.type == "note_on":
+            starts[event.message.note] = event.time
+        else:
+            result.append((event.message.note, starts.pop(event.message.note), event.time))
+    return result
+
+
+def test_wav_replay_emits_notes_within_latency_budget(tmp_path):
+    _write_melody(tmp_path / "melody.wav")
+    transcriber = RealtimeTranscriber(sinks=[MidiFileSink(str(tmp_path / "live.mid"))])
+    events = replay_wav(str(tmp_path / "melody.wav"), transcriber)
+
+    notes = _notes(events)
+    assert [note for note, _, _ in notes] == [note for _, _, note in NOTES]
+    for (_, start, end), (expected_start, expected_end, _) in zip(notes, NOTES):
+        assert abs(start - expected_start) < 0.03 and abs(end - expected_end) < 0.03
+    assert len(transcriber.histogram) == 2 * len(NOTES)
+    assert transcriber.histogram.within_budget(95)
+
+    midi = mido.MidiFile(tmp_path / "live.mid")
+    assert [m.note for m in midi.tracks[0] if m.type == "note_on"] == [60, 64, 67, 57]
+    assert math.isclose(midi.length, NOTES[-1][1], abs_tol=0.03)
+
+
+def test_tracker_follows_segmentation_rules():
+    tracker = RealtimeNoteTracker(min_note_length=0.03, smooth_window=1)
+    frames = [60.0] * 2 + [math.nan] + [62.0] * 5 + [62.2] * 3 + [65.0] * 4
+    events = []
+    for i, value in enumerate(frames):
+        events += tracker.push(i * 0.01, value, 0.0 if math.isnan(value) else 1.0)
+    events += tracker.flush()
+
+    # 日本語コメント: 最小ノート長未満の 60 は出力せず、セント差が閾値以内の 62.2 は同じノートに含める
+    assert [(e.message.type, e.message.note, round(e.time, 2)) for e in events] == [
+        ("note_on", 62, 0.03), ("note_off", 62, 0.11), ("note_on", 65, 0.11), ("note_off", 65, 0.14)
+    ]
+
+
+def test_read_pcm_blocks_handles_partial_reads():
+    class Trickle(io.RawIOBase):
+        def __init__(self, data):
+            self.data = data
+
+        def read(self, n=-1):
+            size = min(n, 3)
+            chunk, self.data = self.data[:size], self.data[size:]
+            return chunk
+
+    samples = np.array([0, 16384, -32768, 32767, 8192], dtype="<i2")
+    blocks = list(read_pcm_blocks(Trickle(samples.tobytes() + b"\x01"), block_size=2))
+    assert [len(block) for block in blocks] == [2, 2, 1]
+    np.testing.assert_allclose(np.concatenate(blocks), samples / 32768.0)
+
+
+def test_latency_histogram_buckets():
+    histogram = LatencyHistogram(bounds_ms=(10, 100), budget_ms=100)
+    for value in (5, 10, 50, 150):
+        histogram.add(value)
+    summary = histogram.summary()
+    assert summary["buckets"] == {"<=10": 2, "<=100": 1, "+Inf": 1}
+    assert summary["max_ms"] == 150
+    assert not histogram.within_budget(95)
@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+
+from audio2midi import result_cache
+from audio2midi.result_cache import ResultCache, hash_audio_file
+
+
+def _pitch_result(n=100):
+    time_axis = np.arange(n) * 0.01
+    return np.linspace(60, 72, n), np.linspace(0, 1, n), time_axis, 16000
+
+
+def test_key_depends_on_content_params_and_version(tmp_path, monkeypatch):
+    (tmp_path / "a.wav").write_bytes(b"RIFF" + b"\x01" * 3_000_000)
+    (tmp_path / "renamed.wav").write_bytes(b"RIFF" + b"\x01" * 3_000_000)
+    (tmp_path / "other.wav").write_bytes(b"RIFF" + b"\x02" * 3_000_000)
+    audio_hash = hash_audio_file(str(tmp_path / "a.wav"))
+    # 日本語コメント: ファイル名ではなく内容でキーが決まる（1MiB を超えるファイルも分割して読む）
+    assert hash_audio_file(str(tmp_path / "renamed.wav")) == audio_hash
+    assert hash_audio_file(str(tmp_path / "other.wav")) != audio_hash
+
+    params = {"model": "full", "step_size": 10}
+    key = ResultCache.make_key(audio_hash, "pitch", params)
+    assert ResultCache.make_key(audio_hash, "pitch", dict(reversed(params.items()))) == key
+    assert ResultCache.make_key(audio_hash, "pitch", {**params, "step_size": 20}) != key
+    assert ResultCache.make_key(audio_hash, "transcription", params) != key
+
+    monkeypatch.setitem(result_cache._STAGE_VERSIONS, "pitch", result_cache._STAGE_VERSIONS["pitch"] + 1)
+    assert ResultCache.make_key(audio_hash, "pitch", params) != key
+
+
+def test_pitch_round_trips_as_memmap(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    assert cache.load_pitch("k") is None and cache.misses == 1
+
+    expected = _pitch_result()
+    cache.store_pitch("k", expected)
+    loaded = cache.load_pitch("k")
+    assert cache.hits == 1
+    for got, want in zip(loaded[:3], expected[:3]):
+        assert isinstance(got, np.memmap)
+        np.testing.assert_array_equal(got, want)
+    assert loaded[3] == 16000
+
+
+def test_json_segments_round_trip(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    segments = {"text": "さくら", "segments": [{"start": np.float32(0.5), "end": 1.25, "text": "さくら"}]}
+    cache.store_json("transcription", "k", segments)
+    loaded = cache.load_json("transcription", "k")
+    assert loaded == {"text": "さくら", "segments": [{"start": 0.5, "end": 1.25, "text": "さくら"}]}
+    assert cache.load_json("segments", "k") is None
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=10 ** 9)
+    for i, key in enumerate(["old", "recent", "middle"]):
+        cache.store_pitch(key, _pitch_result())
+        os.utime(tmp_path / "pitch" / key, (1000 + i, 1000 + i))
+    entry_bytes = cache.total_bytes() // 3
+
+    # 日本語コメント: 読み込むと参照時刻が更新され、最も新しいエントリになる
+    cache.load_pitch("recent")
+    cache.max_bytes = 3 * entry_bytes
+    cache.store_pitch("new", _pitch_result())
+
+    assert sorted(p.name for p in (tmp_path / "pitch").iterdir()) == ["middle", "new", "recent"]
+    assert cache.total_bytes() <= cache.max_bytes
+
+
+def test_stores_under_the_limit_scan_the_cache_once(tmp_path, monkeypatch):
+    ResultCache(str(tmp_path)).store_json("segments", "existing", [1, 2, 3])
+    cache = ResultCache(str(tmp_path), max_bytes=10 ** 9)
+    scans = []
+    entries = cache._entries
+    monkeypatch.setattr(cache, "_entries", lambda: scans.append(1) or entries())
+
+    for i in range(5):
+        cache.store_json("segments", str(i), {"i": i})
+    cache.store_pitch("k", _pitch_result())
+    cache.store_json("segments", "0", {"i": 10})
+    assert len(scans) == 1
+
+    # 日本語コメント: 見積もりは上書きも含めて実際のサイズと一致する
+    assert cache._total_bytes == cache.total_bytes()
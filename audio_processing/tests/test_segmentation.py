@@ -0,0 +1,116 @@
+import importlib.util
+
+import numpy as np
+import pytest
+
+from audio2midi import note_utils
+from audio2midi.note_table import NOTE_DTYPE
+from audio2midi.note_utils import (
+    merge_short_notes,
+    merge_short_notes_reference,
+    postprocess_notes,
+    smooth_vibrato,
+    smooth_vibrato_reference,
+)
+from audio2midi.segmentation import segment_notes
+
+HAS_NUMBA = importlib.util.find_spec("numba") is not None
+
+
+def _random_frames(seed, n_frames=3000):
+    rng = np.random.default_rng(seed)
+    note_index = np.repeat(np.arange(n_frames), rng.integers(1, 30, size=n_frames))[:n_frames]
+    midi_values = rng.uniform(50, 70, size=n_frames)[note_index] + rng.normal(0, 0.3, size=n_frames)
+    confidence = rng.random(n_frames).astype(np.float32)
+    time_axis = np.arange(n_frames) * 0.01
+    return time_axis, midi_values, confidence
+
+
+def _random_notes(seed, n_notes=300):
+    rng = np.random.default_rng(seed)
+    starts = np.cumsum(rng.uniform(0.01, 0.3, size=n_notes))
+    ends = starts + rng.uniform(0.01, 0.3, size=n_notes)
+    pitches = rng.uniform(55, 65, size=n_notes)
+    notes = np.zeros(n_notes, dtype=NOTE_DTYPE)
+    notes["start"], notes["end"], notes["pitch"] = starts, ends, pitches
+    notes["confidence"] = 1.0
+    return notes
+
+
+def _as_tuples(notes):
+    return list(zip(notes["start"].tolist(), notes["end"].tolist(), notes["pitch"].tolist()))
+
+
+def test_segment_notes_splits_on_cent_tolerance_and_confidence():
+    time_axis = np.arange(10) * 0.1
+    midi_values = np.array([60.0, 60.1, 60.2, 62.0, 62.0, 62.0, 62.0, 64.0, 64.0, 64.0])
+    confidence = np.array([0.9, 0.9, 0.9, 0.9, 0.9, 0.1, 0.9, 0.9, 0.9, 0.9])
+
+    notes = segment_notes(time_axis, midi_values, confidence, cent_tolerance=40.0,
+                          min_note_length=0.1, confidence_threshold=0.6, use_numba=False)
+
+    assert notes["start"].tolist() == pytest.approx([0.0, 0.3, 0.7])
+    assert notes["end"].tolist() == pytest.approx([0.3, 0.5, 0.9])
+    assert notes["pitch"].tolist() == pytest.approx([60.1, 62.0, 64.0])
+
+
+@pytest.mark.skipif(not HAS_NUMBA, reason="numba is not installed")
+@pytest.mark.parametrize("seed", range(5))
+def test_segment_notes_numba_matches_python(seed):
+    time_axis, midi_values, confidence = _random_frames(seed)
+    expected = segment_notes(time_axis, midi_values, confidence, use_numba=False)
+    actual = segment_notes(time_axis, midi_values, confidence, use_numba=True)
+    np.testing.assert_array_equal(actual, expected)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("min_duration,cent_tolerance", [(0.05, 100.0), (0.1, 40.0), (0.2, 300.0)])
+def test_merge_short_notes_matches_reference(seed, min_duration, cent_tolerance):
+    notes = _random_notes(seed)
+    expected = merge_short_notes_reference(_as_tuples(notes), min_duration, cent_tolerance)
+    assert merge_short_notes(_as_tuples(notes), min_duration, cent_tolerance) == expected
+    assert merge_short_notes(_as_tuples(notes)[::-1], min_duration, cent_tolerance) == expected
+    assert _as_tuples(merge_short_notes(notes, min_duration, cent_tolerance)) == expected
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("time_window,cent_tolerance", [(0.2, 200.0), (0.5, 300.0), (0.1, 50.0)])
+def test_smooth_vibrato_matches_reference(seed, time_window, cent_tolerance):
+    notes = _random_notes(seed)
+    expected = smooth_vibrato_reference(_as_tuples(notes), time_window, cent_tolerance)
+    assert smooth_vibrato(_as_tuples(notes), time_window, cent_tolerance) == expected
+    assert _as_tuples(smooth_vibrato(notes, time_window, cent_tolerance)) == expected
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("n_notes,max_gap", [(300, 0.3), (2000, 0.01)])  # 2000ノートはメリスマ相当の密度
+def test_postprocess_notes_matches_reference_chain(seed, n_notes, max_gap):
+    rng = np.random.default_rng(seed)
+    starts = np.cumsum(rng.uniform(0.001, max_gap, size=n_notes))
+    notes = np.zeros(n_notes, dtype=NOTE_DTYPE)
+    notes["start"], notes["end"] = starts, starts + rng.uniform(0.005, 0.2, size=n_notes)
+    notes["pitch"] = 60 + np.cumsum(rng.normal(0, 0.5, size=n_notes))
+    notes["confidence"] = rng.random(n_notes)
+
+    expected = smooth_vibrato_reference(merge_short_notes_reference(_as_tuples(notes), 0.1, 40.0), 0.2, 200.0)
+    assert postprocess_notes(_as_tuples(notes), 0.1, 40.0, 0.2, 200.0) == expected
+    fused = postprocess_notes(notes, 0.1, 40.0, 0.2, 200.0)
+    assert _as_tuples(fused) == expected
+    chained = smooth_vibrato(merge_short_notes(notes, 0.1, 40.0), 0.2, 200.0)
+    np.testing.assert_array_equal(fused, chained)
+
+
+@pytest.mark.skipif(not HAS_NUMBA, reason="numba is not installed")
+@pytest.mark.parametrize("seed", range(3))
+def test_postprocess_notes_numba_matches_python(seed, monkeypatch):
+    notes = _random_notes(seed, n_notes=1000)
+    notes["confidence"] = np.random.default_rng(seed).random(len(notes))
+    compiled = postprocess_notes(notes[::-1], 0.1, 40.0, 0.2, 200.0)
+    monkeypatch.setattr(note_utils, "_get_jit_kernel", lambda kernel: None)
+    np.testing.assert_array_equal(compiled, postprocess_notes(notes[::-1], 0.1, 40.0, 0.2, 200.0))
+
+
+def test_postprocess_notes_handles_empty_input():
+    assert postprocess_notes([]) == []
+    assert merge_short_notes(np.zeros(0, dtype=NOTE_DTYPE)).dtype == NOTE_DTYPE
+    assert len(smooth_vibrato(np.zeros(0, dtype=NOTE_DTYPE))) == 0
@@ -0,0 +1,137 @@
+import asyncio
+import threading
+
+import pytest
+
+from audio2midi.instrumentation import get_recorder, stage
+from audio2midi.service import JobServer, OptionParser, decode_content, request
+
+RELEASE = threading.Event()
+
+
+def _build_options(audio_path, argv):
+    parser = OptionParser()
+    parser.add_argument("--output-format", default="midi", choices=["midi", "json", "csv"])
+    parser.add_argument("--fail", action="store_true")
+    options = parser.parse_args(argv)
+    options.audio_path = audio_path
+    return options
+
+
+def _process(audio_path, output_path, options):
+    with stage("pitch") as s:
+        s.items = 3
+    if options.fail:
+        raise RuntimeError("boom")
+    with stage("export"):
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(f"{options.output_format}:{audio_path}")
+    return output_path
+
+
+def _blocking_process(audio_path, output_path, options):
+    RELEASE.wait(timeout=10)
+    return _process(audio_path, output_path, options)
+
+
+async def _with_server(body, **kwargs):
+    server = JobServer(_build_options, **kwargs)
+    host, port = await server.start(port=0)
+    try:
+        return await body(host, port)
+    finally:
+        await server.close()
+
+
+def test_submit_streams_progress_and_returns_output(tmp_path):
+    audio = tmp_path / "song.wav"
+    audio.write_bytes(b"")
+
+    async def body(host, port):
+        events = []
+        final = await request(
+            {"op": "submit", "audio_path": str(audio), "options": ["--output-format", "csv"]},
+            host, port, on_event=events.append
+        )
+        status = await request({"op": "status"}, host, port)
+        return events, final, status
+
+    events, final, status = asyncio.run(_with_server(body, process_fn=_process))
+    assert [e["event"] for e in events[:2]] == ["queued", "started"]
+    assert [(e["stage"], e["status"]) for e in events[2:]] == [
+        ("pitch", "start"), ("pitch", "end"), ("export", "start"), ("export", "end")
+    ]
+    assert events[3]["items"] == 3
+    assert final["event"] == "done" and final["filename"] == "song.csv"
+    assert decode_content(final).decode("utf-8") == f"csv:{audio}"
+    assert status["completed"] == 1 and status["running"] == 0
+
+
+def test_errors_are_reported(tmp_path):
+    audio = tmp_path / "song.wav"
+    audio.write_bytes(b"")
+
+    async def body(host, port):
+        missing = await request({"op": "submit", "audio_path": str(tmp_path / "none.wav")}, host, port)
+        invalid = await request({"op": "submit", "audio_path": str(audio), "options": ["--bogus"]}, host, port)
+        failed = await request({"op": "submit", "audio_path": str(audio), "options": ["--fail"]}, host, port)
+        return missing, invalid, failed
+
+    missing, invalid, failed = asyncio.run(_with_server(body, process_fn=_process))
+    assert missing["event"] == invalid["event"] == failed["event"] == "error"
+    assert "--bogus" in invalid["message"]
+    assert "boom" in failed["message"]
+
+
+def test_jobs_do_not_accumulate_in_the_shared_recorder(tmp_path):
+    audio = tmp_path / "song.wav"
+    audio.write_bytes(b"")
+    before = len(get_recorder())
+
+    async def body(host, port):
+        return [await request({"op": "submit", "audio_path": str(audio)}, host, port) for _ in range(5)]
+
+    finals = asyncio.run(_with_server(body, process_fn=_process))
+    assert all(f["event"] == "done" for f in finals)
+    assert len(get_recorder()) == before
+
+
+def test_option_errors_raise_instead_of_writing_stderr(capsys):
+    import main
+
+    # 日本語コメント: サブパーサー（run）のエラーや --help も SystemExit にならず ValueError になる
+    with pytest.raises(ValueError, match="--tempo"):
+        main.parse_args(["run", "song.wav", "--tempo", "fast"], OptionParser)
+    with pytest.raises(ValueError, match="usage"):
+        main.parse_args(["run", "song.wav", "--help"], OptionParser)
+    assert capsys.readouterr() == ("", "")
+
+
+def test_full_queue_rejects_new_jobs(tmp_path):
+    audio = tmp_path / "song.wav"
+    audio.write_bytes(b"")
+    message = {"op": "submit", "audio_path": str(audio)}
+
+    async def wait_for(host, port, **expected):
+        for _ in range(200):
+            status = await request({"op": "status"}, host, port)
+            if all(status[k] == v for k, v in expected.items()):
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError(status)
+
+    async def body(host, port):
+        RELEASE.clear()
+        first = asyncio.create_task(request(message, host, port))
+        await wait_for(host, port, running=1)
+        second = asyncio.create_task(request(message, host, port))
+        await wait_for(host, port, waiting=1)
+        third = await request(message, host, port)
+        RELEASE.set()
+        return await first, await second, third
+
+    first, second, third = asyncio.run(
+        _with_server(body, process_fn=_blocking_process, workers=1, max_pending=1)
+    )
+    assert first["event"] == second["event"] == "done"
+    assert third["event"] == "rejected"
@@ -0,0 +1,75 @@
+import mido
+import numpy as np
+import pytest
+
+from audio2midi.generate_midi_with_lyrics import create_midi_with_lyrics
+from audio2midi.midi_utils import note_events_to_midi
+from audio2midi.smf_writer import SMFWriter, TempoMap, encode_vlq
+
+
+def _note_times(path, charset="latin1"):
+    """(秒, 種類, ノート番号) のリスト（mido でデコード）"""
+    events, now = [], 0.0
+    for message in mido.MidiFile(path, charset=charset):
+        now += message.time
+        if message.type in ("note_on", "note_off"):
+            kind = "note_off" if message.type == "note_off" or message.velocity == 0 else "note_on"
+            events.append((round(now, 4), kind, message.note))
+    return events
+
+
+@pytest.mark.parametrize("value, expected", [
+    (0, b"\x00"), (0x7F, b"\x7f"), (0x80, b"\x81\x00"), (0x2000, b"\xc0\x00"), (0x0FFFFFFF, b"\xff\xff\xff\x7f"),
+])
+def test_encode_vlq_matches_spec(value, expected):
+    lengths, out = encode_vlq(np.array([value]))
+    assert out[0, :lengths[0]].tobytes() == expected
+
+
+def test_tempo_map_converts_across_tempo_changes():
+    tempo_map = TempoMap([(0.0, 120.0), (2.0, 60.0)], ticks_per_beat=480)
+    np.testing.assert_array_equal(tempo_map.to_ticks([0.0, 1.0, 2.0, 3.0]), [0, 960, 1920, 2400])
+
+
+def test_writer_round_trips_through_mido(tmp_path):
+    writer = SMFWriter(TempoMap([(0.0, 120.0), (2.0, 60.0)]))
+    writer.add_note_track("Vocal", [0.0, 0.5, 3.0], [1.0, 1.0, 4.5], [60, 64, 67], velocity=[90, 80, 70])
+    writer.add_lyric_track("Lyrics", [0.0, 3.0], ["あ", "い"], encoding="shift_jis")
+    writer.write(str(tmp_path / "song.mid"))
+
+    midi = mido.MidiFile(tmp_path / "song.mid", charset="shift_jis")
+    assert midi.type == 1 and len(midi.tracks) == 3
+    assert [m.text for m in midi.tracks[2] if m.type == "lyrics"] == ["あ", "い"]
+    assert _note_times(str(tmp_path / "song.mid")) == [
+        (0.0, "note_on", 60), (0.5, "note_on", 64), (1.0, "note_off", 60), (1.0, "note_off", 64),
+        (3.0, "note_on", 67), (4.5, "note_off", 67),
+    ]
+
+
+def test_note_events_to_midi_handles_overlapping_notes(tmp_path):
+    path = str(tmp_path / "notes.mid")
+    note_events_to_midi([(0.0, 1.0, 60), (0.5, 1.5, 64), (0.75, 2.0, 60.2)], path)
+
+    assert mido.MidiFile(path).type == 0
+    # 日本語コメント: 同じ音高の重なりは後のノートの開始で前のノートを終了する
+    assert _note_times(path) == [
+        (0.0, "note_on", 60), (0.5, "note_on", 64), (0.75, "note_off", 60), (0.75, "note_on", 60),
+        (1.5, "note_off", 64), (2.0, "note_off", 60),
+    ]
+
+
+def test_create_midi_with_lyrics_writes_lyric_events(tmp_path):
+    segments = [
+        {"text_segment": {"text": "さくら"}, "note_segment": {"note": 62.4}, "overlap_start": 1.0, "overlap_end": 1.5},
+        {"text_segment": {"text": "hana"}, "note_segment": {"note": 60}, "overlap_start": 0.0, "overlap_end": 0.5},
+        {"text_segment": {"text": "x"}, "note_segment": {"note": 64}, "overlap_start": 2.0, "overlap_end": 2.05},
+        {"text_segment": {"text": "y"}, "note_segment": {"note": 200}, "overlap_start": 3.0, "overlap_end": 4.0},
+    ]
+    path = str(tmp_path / "song.mid")
+    create_midi_with_lyrics(segments, path, tempo=90)
+
+    midi = mido.MidiFile(path, charset="utf-8")
+    assert [m.text for m in midi.tracks[2] if m.type == "lyrics"] == ["hana", "さくら"]
+    assert _note_times(path) == [
+        (0.0, "note_on", 60), (0.5, "note_off", 60), (1.0, "note_on", 62), (1.5, "note_off", 62),
+    ]
@@ -0,0 +1,87 @@
+import csv
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from audio2midi.generate_midi_with_lyrics import export_to_json
+
+MAIN = Path(__file__).resolve().parents[1] / "src" / "main.py"
+
+# PyTorch / TensorFlow を読み込むモジュール（どのサブコマンドの起動時にも読み込まない）
+HEAVY_MODULES = {"torch", "tensorflow", "keras", "whisper", "crepe", "faster_whisper", "demucs"}
+# 軽いサブコマンドでは音声処理のライブラリも読み込まない
+AUDIO_MODULES = {"librosa", "scipy", "numba", "soxr"}
+# JIT カーネルを実行するときだけ必要なモジュール（run の起動時にも読み込まない）
+JIT_MODULES = {"numba"}
+# 軽いサブコマンドの import 時間の上限（ミリ秒）
+LIGHT_BUDGET_MS = float(os.environ.get("AUDIO2MIDI_STARTUP_BUDGET_MS", "500"))
+
+
+def _import_profile(*args, cwd=None):
+    """python -X importtime main.py ... を実行し、(読み込まれたトップレベルパッケージ, import 時間の合計（ミリ秒）) を返します。"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", str(MAIN), *args],
+        capture_output=True, text=True, cwd=cwd, check=True
+    )
+    packages = set()
+    total_us = 0
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        packages.add(name.strip().split(".")[0])
+        if not name.startswith("  "):
+            total_us += int(cumulative)
+    return packages, total_us / 1000
+
+
+@pytest.mark.parametrize("args", [["--help"], ["export", "--help"], ["analyze", "--help"], ["submit", "--help"],
+                                  ["realtime", "--help"]])
+def test_light_commands_skip_heavy_imports(args):
+    packages, total_ms = _import_profile(*args)
+    assert not packages & (HEAVY_MODULES | AUDIO_MODULES)
+    assert total_ms < LIGHT_BUDGET_MS
+
+
+def test_run_help_skips_deep_learning_frameworks():
+    packages, _ = _import_profile("run", "--help")
+    assert "audio2midi" in packages
+    assert not packages & (HEAVY_MODULES | JIT_MODULES)
+
+
+def test_export_reexports_json_without_audio_stack(tmp_path):
+    segments = [{
+        "text_segment": {"start": 0.0, "end": 1.0, "text": "la"},
+        "note_segment": {"start": 0.0, "end": 1.0, "note": 60},
+        "overlap_start": 0.0,
+        "overlap_end": 1.0
+    }]
+    export_to_json(segments, str(tmp_path / "song.json"))
+
+    packages, total_ms = _import_profile("export", str(tmp_path / "song.json"), "--output-format", "csv")
+    with open(tmp_path / "song.csv", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0]["text"] == "la" and rows[0]["note"] == "60"
+    assert not packages & (HEAVY_MODULES | AUDIO_MODULES)
+    assert total_ms < LIGHT_BUDGET_MS
+
+
+def test_run_is_the_default_command():
+    import main
+
+    args = main.parse_args(["input.wav", "--tempo", "90"])
+    assert args.command == "run"
+    assert args.audio_path == "input.wav" and args.tempo == 90
+    assert main.parse_args(["run", "input.wav", "--log-level", "DEBUG"]).log_level == "DEBUG"
+    assert main.parse_args(["export", "song.json"]).output_format == "csv"
+
+    # 日本語コメント: サブコマンドより前の --log-level はトップレベルの引数として扱う
+    args = main.parse_args(["--log-level", "DEBUG", "export", "x.json"])
+    assert args.command == "export" and args.input_path == "x.json" and args.log_level == "DEBUG"
+    args = main.parse_args(["--log-level=WARNING", "input.wav", "--tempo", "90"])
+    assert args.command == "run" and args.audio_path == "input.wav" and args.log_level == "WARNING"
+    args = main.parse_args(["--log-level", "ERROR", "run", "input.wav", "--log-level", "DEBUG"])
+    assert args.command == "run" and args.log_level == "DEBUG"
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from audio2midi.note_utils import midi_notes_to_intervals
+from audio2midi.timeline import Timeline, stitch_frames
+
+
+def test_from_time_axis_recovers_hop_and_offset():
+    timeline = Timeline.from_step_size(10, offset=1.25)
+    restored = Timeline.from_time_axis(timeline.times(50), 16000)
+    assert restored == timeline
+    assert np.allclose(timeline.frame_to_time([0, 100]), [1.25, 2.25])
+    assert timeline.time_to_frame(2.25) == 100
+    assert Timeline.from_time_axis(np.array([]), 16000).offset == 0.0
+
+
+def test_intervals_use_timeline_offset():
+    midi_notes = np.array([np.nan] * 5 + [60.0] * 20 + [np.nan] * 5)
+    confidence = np.ones(len(midi_notes))
+    timeline = Timeline.from_step_size(10, offset=3.0)
+
+    relative = midi_notes_to_intervals(midi_notes, confidence, 16000)
+    absolute = midi_notes_to_intervals(midi_notes, confidence, 16000, timeline=timeline)
+    assert relative == [(pytest.approx(0.05), pytest.approx(0.25), 60)]
+    assert absolute == [(pytest.approx(3.05), pytest.approx(3.25), 60)]
+
+
+def test_stitch_frames_places_parts_on_global_grid():
+    timeline = Timeline.from_step_size(10)
+    parts = [
+        (timeline.at_sample(160 * 2), np.array([1.0, 2.0])),
+        (timeline.shifted(0.08), np.array([3.0, 4.0, 5.0])),  # 末尾は範囲外
+    ]
+    stitched = stitch_frames(timeline, 10, parts)
+    assert np.array_equal(np.isnan(stitched), [True, True, False, False, True, True, True, True, False, False])
+    assert stitched[[2, 3, 8, 9]].tolist() == [1.0, 2.0, 3.0, 4.0]
+
+    with pytest.raises(ValueError):
+        stitch_frames(timeline, 10, [(Timeline.from_step_size(5), np.ones(2))])
@@ -0,0 +1,49 @@
+import numpy as np
+
+from audio2midi.vad import RegionMap, detect_voiced_regions, voiced_frame_indices
+
+SR = 16000
+
+
+def _tone(seconds: float) -> np.ndarray:
+    t = np.arange(int(seconds * SR)) / SR
+    return (0.5 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def test_detect_voiced_regions_skips_long_silence_and_merges_short_gaps():
+    silence = np.zeros(2 * SR, dtype=np.float32)
+    short_gap = np.zeros(int(0.2 * SR), dtype=np.float32)
+    audio = np.concatenate([silence, _tone(1.0), short_gap, _tone(1.0), silence, _tone(0.5), silence])
+
+    regions = detect_voiced_regions(audio, SR, min_silence=0.5, pad=0.0)
+    assert len(regions) == 2
+    starts = regions[:, 0] / SR
+    ends = regions[:, 1] / SR
+    assert np.allclose(starts, [2.0, 6.2], atol=0.1)
+    assert np.allclose(ends, [4.2, 6.7], atol=0.1)
+
+    assert len(detect_voiced_regions(np.zeros(SR, dtype=np.float32), SR)) == 0
+
+
+def test_region_map_round_trip():
+    regions = np.array([[SR, 2 * SR], [5 * SR, 7 * SR]])
+    region_map = RegionMap(regions, SR)
+    assert region_map.voiced_duration == 3.0
+
+    samples = np.arange(8 * SR, dtype=np.float32)
+    voiced = region_map.concatenate(samples)
+    assert len(voiced) == 3 * SR
+    assert voiced[SR] == 5 * SR
+
+    assert np.allclose(region_map.to_original([0.0, 0.5, 1.0, 1.5, 3.0]), [1.0, 1.5, 2.0, 5.5, 7.0])
+
+    segments = [{"start": 0.5, "end": 1.5, "text": "a", "words": [{"word": "a", "start": 1.25, "end": 1.5}]}]
+    remapped = region_map.remap_segments(segments)
+    assert remapped[0]["start"] == 1.5 and remapped[0]["end"] == 5.5
+    assert remapped[0]["words"][0]["start"] == 5.25
+    assert segments[0]["start"] == 0.5  # 入力は変更しない
+
+
+def test_voiced_frame_indices():
+    regions = np.array([[0, 480], [1000, 1800], [1900, 1950]])
+    assert voiced_frame_indices(regions, 160, 100).tolist() == [0, 1, 2, 7, 8, 9, 10, 11, 12]